@@ -5,7 +5,9 @@ import numpy as np
 import pandas as pd
 from numpy.ma.core import negative
 
-from ..utils.linearizer import capex_calculator
+from ..utils.heat_intervals import aggregate_temperatures, heat_aggregation_report, print_heat_aggregation_report
+from ..utils.linearizer import capex_calculator, pad_capex_points
+from ..utils.presolve import get_unit_network, presolve_data_file, print_presolve_report
 
 
 class Superstructure:
@@ -36,6 +38,9 @@ class Superstructure:
         - create_datafile-methods: Methods to set up the DataFile for further processing.
     """
 
+    # output blocks of the SuperstructureModel which can be calculated after the solve (see set_modelBlocks)
+    MODEL_BLOCKS = ('GWP', 'FWD', 'LCA')
+
     def __init__(self,
                  ModelName,
                  Objective,
@@ -194,6 +199,7 @@ class Superstructure:
         self.distributor_list = {'U_DIST': []}
         self.decimal_set = {'DC_SET': []}
         self.distributor_subset2 = {'U_DIST_SUB2': []}
+        self.distributor_rest = {'U_DIST_REST': []}
 
         self.connections_set = {'U_CONNECTORS': []}
         self.Scenarios = {'SC': []}  #  Stochastic, maybe redundant
@@ -227,6 +233,11 @@ class Superstructure:
         self.HeatUtilitiesList = {'H_UT': []}
         self.Heat_Temperatures = []
         self.HeatIntervals = {}
+        # optional aggregation of the temperature grid (see set_heatIntervalAggregation)
+        self.heatIntervalTolerance = None
+        self.heatIntervalMax = None
+        self.heatTemperatureMap = {}
+        self.heatAggregationReport = None
         self.UtilitiesList = {'UT': []}
         self.OtherUtilitiesList = {'U_UT': []}
         # ---------------------------
@@ -264,12 +275,71 @@ class Superstructure:
         #  Cost calculation variables
         # ----------------------------
         self.linearizationDetail = 'real'
+        self.linearizationError = 0.01
+        self.linearizationBounds = {}
+        self.capexEncoding = 'binary'
         self.IR = {'IR': 0}
         self.H = {'H': 0}
         self.CECPI = {'CECPI': 0}
         self.K_OM = 0
         # ---------------------------
 
+        # Sparse formulation of the model (see set_sparseModel)
+        # --------------------------
+        self.sparseModel = False
+
+        # Output blocks of the model which are part of the optimization (see set_modelBlocks)
+        # --------------------------
+        self.modelBlocks = None
+
+        # Automatic scaling of the model (see set_autoScaling)
+        # --------------------------
+        self.autoScaling = False
+        self.autoScalingVariables = False
+
+        # Parametric sensitivity with LP ranging of the fixed design (see set_parametricSensitivity)
+        # --------------------------
+        self.parametricSensitivity = False
+
+        # Memoization of the solves of sweeps (see set_solveCache)
+        # --------------------------
+        self.solveCache = False
+        self.solveCacheDirectory = None
+        self.solveCacheMemoryLimit = None
+
+        # Shared payoff table of the multi-criteria optimizers (see set_payoffTable)
+        # --------------------------
+        self.payoffWorkers = None
+        self.payoffDirectory = None
+
+        # Bound propagation screen of the scenarios before the solves (see set_feasibilityScreen)
+        # --------------------------
+        self.feasibilityScreen = False
+
+        # Deduplication of the scenarios of the stochastic modes (see set_scenarioDeduplication)
+        # --------------------------
+        self.scenarioDeduplication = False
+        self.scenarioTolerance = None
+
+        # Time limits and gap targets of the solves of sweeps (see set_solveSchedule)
+        # --------------------------
+        self.solveSchedule = None
+
+        # Solver options tuned for the superstructure (see set_solverTuning)
+        # --------------------------
+        self.solverTuning = False
+        self.solverTuningDirectory = None
+
+        # Telemetry of the solves (see set_solverTelemetry)
+        # --------------------------
+        self.solverTelemetry = False
+
+        # Presolve of the Data_File (see set_presolve)
+        # --------------------------
+        self.presolve = False
+        self.presolveDeadEnds = False
+        self.presolveReport = None
+
         # For special optimization mode run
         # --------------------------
         self.sensitive_parameters = []
@@ -407,12 +477,18 @@ class Superstructure:
             print('Please chose for State either On or Off, a non-negative \
                   lifetime and for COP a value > 1')
 
-    def set_linearizationDetail(self, Detail='real'):
+    def set_linearizationDetail(self, Detail='real', maxError=None, flowBounds=None):
         """
         Parameters
         ----------
         Detail : String
-            Use: "fine" , "average" or "rough"
+            Use: "fine" , "average", "rough", "real" or "adaptive"
+        maxError : Float, optional (only for "adaptive")
+            Maximum relative error of the piece-wise linear CAPEX within the flow range of each unit
+            (default 0.01)
+        flowBounds : Dictionary, optional (only for "adaptive")
+            {unit number: (lower, upper)} reference flow range of single units. Units without bounds use the
+            upper bound derived from the source limits (if finite) and 1/5 and 5 times the reference flow otherwise.
 
         Context
         -------
@@ -423,9 +499,328 @@ class Superstructure:
             average  :  20
             rough    :  10
             real     : New Approach
+            adaptive : As many as needed to meet maxError for the cost exponent and flow range of each unit
 
         """
         self.linearizationDetail = Detail
+        if maxError is not None:
+            self.linearizationError = maxError
+        if flowBounds is not None:
+            self.linearizationBounds = flowBounds
+
+    def set_capexEncoding(self, encoding='binary'):
+        """
+        Parameters
+        ----------
+        encoding : String
+            Use: "binary", "log" or "sos2"
+
+        Context
+        -------
+        Formulation of the piece-wise linear CAPEX in the model:
+
+            binary : one binary variable per linearization interval (lin_CAPEX_z)
+            log    : logarithmic formulation, ceil(log2(intervals)) binary variables per unit (lin_CAPEX_log)
+            sos2   : SOS2 constraints on lin_CAPEX_lambda, no binary variables (the solver has to support SOS2)
+
+        """
+        if encoding not in ('binary', 'log', 'sos2'):
+            raise ValueError("The CAPEX encoding {} is not supported, choose from 'binary', 'log' and 'sos2'"
+                             .format(encoding))
+        self.capexEncoding = encoding
+
+    def set_distributorFormulation(self, formulation='decimal', distributors=None):
+        """
+        Parameters
+        ----------
+        formulation : String
+            Use: "decimal" or "compact" (see Distributor.set_formulation)
+        distributors : List, optional
+            Names or unit numbers of the distributors, the default are all distributors
+
+        Context
+        -------
+        The compact formulation needs fewer binary variables for the same split fractions.
+
+        """
+        found = []
+        for unit in self.UnitsList:
+            if unit.Type == 'Distributor' and (distributors is None or unit.Name in distributors
+                                               or unit.Number in distributors):
+                unit.set_formulation(formulation)
+                found.extend([unit.Name, unit.Number])
+
+        if distributors is not None:
+            missing = [d for d in distributors if d not in found]
+            if missing:
+                raise ValueError('The distributors {} are not part of the superstructure'.format(missing))
+
+    def set_heatIntervalAggregation(self, tolerance=None, maxIntervals=None):
+        """
+        Parameters
+        ----------
+        tolerance : Float, optional
+            Temperatures within the tolerance (K) of the lowest temperature of their cluster are merged
+        maxIntervals : Integer, optional
+            Maximum number of heat intervals, the closest temperatures are merged until the grid is small enough
+
+        Context
+        -------
+        Neighbouring temperatures are merged before the heat intervals are calculated (see utils.heat_intervals),
+        the shifts are saved in heatAggregationReport. Without arguments the aggregation is switched off.
+
+        """
+        if tolerance is not None and tolerance < 0:
+            raise ValueError('The tolerance of the heat interval aggregation has to be non-negative')
+        if maxIntervals is not None and maxIntervals < 1:
+            raise ValueError('The heat interval aggregation needs at least one interval')
+
+        self.heatIntervalTolerance = tolerance
+        self.heatIntervalMax = maxIntervals
+
+    def set_sparseModel(self, sparse=True):
+        """
+        Parameters
+        ----------
+        sparse : Boolean
+            If True the SuperstructureModel is built with the sparse formulation
+
+        Context
+        -------
+        Only the existing connections and non-zero coefficients are indexed, the solution is the same. Parameters
+        which are zero in the Data_File can not be changed afterwards (e.g. in a sensitivity analysis).
+
+        """
+        self.sparseModel = sparse
+
+    def set_modelBlocks(self, blocks=None):
+        """
+        Parameters
+        ----------
+        blocks : List, optional
+            Output blocks which are part of the optimization model, choose from "GWP" (global warming potential,
+            NPE), "FWD" (fresh water demand, NPFWD) and "LCA" (impact categories, IMPACT_TOT). The default (None)
+            builds all blocks.
+
+        Context
+        -------
+        Blocks which are not chosen are calculated from the solution after each solve. The block of the objective
+        is always built, as are all blocks in the multi-objective and stochastic modes.
+
+        """
+        if blocks is not None:
+            blocks = list(blocks)
+            unknown = [block for block in blocks if block not in self.MODEL_BLOCKS]
+            if unknown:
+                raise ValueError('The model blocks {} are not supported, choose from {}'.format(
+                    unknown, self.MODEL_BLOCKS))
+        self.modelBlocks = blocks
+
+    def get_modelBlocks(self, optimization_mode=None):
+        """
+        Parameters
+        ----------
+        optimization_mode : String, optional
+            The default is the optimization mode of the superstructure
+
+        Returns
+        -------
+        blocks : List
+            Output blocks which have to be part of the optimization model (see set_modelBlocks)
+
+        """
+        blocks = getattr(self, 'modelBlocks', None)
+        if optimization_mode is None:
+            optimization_mode = getattr(self, 'optimization_mode', 'single')
+
+        if blocks is None or optimization_mode not in ('single', 'sensitivity', 'cross-parameter sensitivity'):
+            return list(self.MODEL_BLOCKS)
+
+        blocks = set(blocks)
+        if self.objective == 'NPE':
+            blocks.add('GWP')
+        elif self.objective == 'FWD':
+            blocks.add('FWD')
+        elif self.objective in self.ImpactCategories['IMPACT_CATEGORIES']:
+            blocks.add('LCA')
+
+        return [block for block in self.MODEL_BLOCKS if block in blocks]
+
+    def set_autoScaling(self, scaling=True, variables=False):
+        """
+        Parameters
+        ----------
+        scaling : Boolean
+            If True the model instance is scaled before it is solved
+        variables : Boolean
+            If True the continuous variables are scaled as well, otherwise only the constraints
+
+        Context
+        -------
+        Geometric mean scaling of the coefficients (see utils.scaling), the ModelOutput holds the unscaled values.
+
+        """
+        self.autoScaling = scaling
+        self.autoScalingVariables = variables
+
+    def set_parametricSensitivity(self, parametric=True):
+        """
+        Parameters
+        ----------
+        parametric : Boolean
+            If True the sensitivity mode only solves the MILP where the optimal design can change
+
+        Context
+        -------
+        The LP of the fixed design gives the interval in which the design stays optimal (see utils.parametric_lp),
+        the next MILP is solved at its end.
+
+        """
+        self.parametricSensitivity = parametric
+
+    def set_solveCache(self, cache=True, directory=None, memory_limit=None):
+        """
+        Parameters
+        ----------
+        cache : Boolean
+            If True the solves of the sensitivity sweeps are memoized
+        directory : String, optional
+            Directory to store the solved runs in, so they are reused in later sessions as well
+        memory_limit : Float, optional
+            Memory ceiling in MB of the solved runs kept in RAM, default is the limit of utils.solve_cache.SolveCache
+
+        Context
+        -------
+        Solves are identified by the structure and parameter values of the model instance (see utils.solve_cache).
+
+        """
+        self.solveCache = cache
+        self.solveCacheDirectory = directory
+        self.solveCacheMemoryLimit = memory_limit
+
+    def set_payoffTable(self, workers=None, directory=None):
+        """
+        Parameters
+        ----------
+        workers : Integer, optional
+            Number of objectives which are optimized in parallel threads, the solver interface has to support
+            parallel solves (e.g. an executable), default is one after the other
+        directory : String, optional
+            Directory to keep the payoff tables between sessions
+
+        Context
+        -------
+        The payoff table is calculated once per model and data (see optimizers.customs.payoff_table).
+
+        """
+        self.payoffWorkers = workers
+        self.payoffDirectory = directory
+
+    def set_feasibilityScreen(self, screen=True):
+        """
+        Parameters
+        ----------
+        screen : Boolean
+            If True the scenarios of the wait and see and here and now runs are screened for infeasibility before
+            they are solved
+
+        Context
+        -------
+        Bound propagation through the mass balances (see utils.feasibility_screen), only necessary conditions are
+        checked.
+
+        """
+        self.feasibilityScreen = screen
+
+    def set_scenarioDeduplication(self, deduplicate=True, tolerance=None):
+        """
+        Parameters
+        ----------
+        deduplicate : Boolean
+            If True scenarios with the same data are only solved once
+        tolerance : Float, optional
+            Largest relative difference of the parameters for which scenarios are merged, default only merges
+            scenarios with the same data
+
+        Context
+        -------
+        One scenario per group is solved and its result is used for the group (see utils.scenario_reduction).
+
+        """
+        self.scenarioDeduplication = deduplicate
+        self.scenarioTolerance = tolerance
+
+    def set_solveSchedule(self, timeLimit=None, gap=None, budget=None, refine=True):
+        """
+        Parameters
+        ----------
+        timeLimit : Float, optional
+            Time limit of a single solve of the sweep in seconds
+        gap : Float, optional
+            Relative gap target of the solves (e.g. 0.01)
+        budget : Float, optional
+            Wall-clock budget of the whole sweep in seconds
+        refine : Boolean
+            If True the points which stopped at the time limit above the gap target are solved again, worst first,
+            with the budget which is left at the end of the sweep
+
+        Context
+        -------
+        A solve which stops at its time limit is accepted with its incumbent (see optimizers.customs.solve_scheduler).
+        Without arguments the schedule is switched off.
+
+        """
+        if timeLimit is None and gap is None and budget is None:
+            self.solveSchedule = None
+        else:
+            self.solveSchedule = {'timeLimit': timeLimit, 'gap': gap, 'budget': budget, 'refine': refine}
+
+    def set_solverTuning(self, apply=True, directory=None):
+        """
+        Parameters
+        ----------
+        apply : Boolean
+            If True the solver options tuned for this superstructure are used in the runs
+        directory : String, optional
+            Directory of the cache of the tuned options, default is ~/.outdoor/solver_tuning
+
+        Context
+        -------
+        The options are tuned with SuperstructureProblem.tune_solver_options (see optimizers.customs.solver_tuning),
+        options passed to solve_optimization_problem take precedence.
+
+        """
+        self.solverTuning = apply
+        self.solverTuningDirectory = directory
+
+    def set_solverTelemetry(self, telemetry=True):
+        """
+        Parameters
+        ----------
+        telemetry : Boolean
+            If True the log of every solve is written to a temporary file and parsed into the telemetry record of
+            the run (nodes, presolve, root relaxation, incumbent trajectory, see utils.solver_telemetry)
+
+        """
+        self.solverTelemetry = telemetry
+
+    def set_presolve(self, presolve=True, removeDeadEnds=False):
+        """
+        Parameters
+        ----------
+        presolve : Boolean
+            If True create_DataFile returns the Data_File reduced by presolve_DataFile
+        removeDeadEnds : Boolean
+            If True also units without a path to a product pool or an energy producing unit are removed. This can
+            change the optimum (see utils.presolve), so it is off by default
+
+        Context
+        -------
+        Parameters of removed units can not be changed afterwards (see utils.presolve).
+
+        """
+        self.presolve = presolve
+        self.presolveDeadEnds = removeDeadEnds
 
     #------------------------------------------------------------------------------
     #------------------------------------------------------------------------------
@@ -566,7 +961,11 @@ class Superstructure:
 
 
     def add_linearisationIntervals(self):
-        if self.linearizationDetail == "rough":
+        if self.linearizationDetail == "adaptive":
+            # as many points as the unit with the most breakpoints, the other units are padded
+            n = max([len(i.lin_CAPEX_x['lin_CAPEX_x']) for i in self.UnitsList
+                     if i.Number in self.CostUnitsList['U_C']] + [2])
+        elif self.linearizationDetail == "rough":
             n = 10
         elif self.linearizationDetail == "fine":
             n = 301
@@ -575,11 +974,9 @@ class Superstructure:
         else:
             n = 13
 
-        for i in range(1, n):
-            self.LinPointsList['J'].append(i)
-            self.LinIntervalsList['JI'].append(i)
-
-        self.LinPointsList['J'].append(n)
+        # build the sets from scratch, so repeated calls do not extend them
+        self.LinPointsList['J'] = list(range(1, n + 1))
+        self.LinIntervalsList['JI'] = list(range(1, n))
 
     def __add_temperatureIntervals(self):
         """
@@ -609,8 +1006,13 @@ class Superstructure:
 
         """
 
-        k = len(self.Heat_Temperatures) - 1
-        for i in self.Heat_Temperatures:
+        self.HeatIntervals.clear()
+        self.HeatIntervalList['HI'] = []
+
+        gridTemperatures = sorted(set(self.__grid_temperature(t) for t in self.Heat_Temperatures))
+
+        k = len(gridTemperatures) - 1
+        for i in gridTemperatures:
             self.HeatIntervals[k] = i
             if k != 0:
                 self.HeatIntervalList['HI'].append(k)
@@ -640,6 +1042,8 @@ class Superstructure:
     #------------------------------------------------------------------------------
 
     def __set_deltaQ(self):
+        # the intervals of an old temperature grid should not remain
+        self.delta_q['delta_q'] = {}
         for i, j in self.heat_utilities.items():
             for k, t in self.HeatIntervals.items():
                 if t <= i and k < len(self.HeatIntervals) - 1:
@@ -709,6 +1113,42 @@ class Superstructure:
                     if j != {}:
                         self.__set_heatTemperatures(j)
 
+    def __grid_temperature(self, temperature):
+        """
+        Temperature of the (aggregated) grid a process temperature is placed at
+        """
+        return getattr(self, 'heatTemperatureMap', {}).get(temperature, temperature)
+
+    def __aggregate_heatTemperatures(self, printReport=True):
+        """
+        Description
+        -----------
+        Merges the temperatures of the grid (Heat_Temperatures) if a tolerance or maximum number of intervals is
+        set (see set_heatIntervalAggregation) and saves the map from the real to the grid temperatures in
+        heatTemperatureMap and the error bound in heatAggregationReport.
+
+        """
+        tolerance = getattr(self, 'heatIntervalTolerance', None)
+        maxIntervals = getattr(self, 'heatIntervalMax', None)
+
+        if tolerance is None and maxIntervals is None:
+            self.heatTemperatureMap = {}
+            self.heatAggregationReport = None
+            return
+
+        self.heatTemperatureMap = aggregate_temperatures(self.Heat_Temperatures, tolerance, maxIntervals)
+
+        streams = []
+        for i in self.UnitsList:
+            if i.Number in self.CostUnitsList['U_C'] and hasattr(i, 'HeatData'):
+                for k, j in i.HeatData.items():
+                    if j.get('tau') is not None and j.get('TIN') is not None and j.get('TOUT') is not None:
+                        streams.append((i.Name, k, j['TIN'], j['TOUT']))
+
+        self.heatAggregationReport = heat_aggregation_report(streams, self.heatTemperatureMap)
+        if printReport:
+            print_heat_aggregation_report(self.heatAggregationReport)
+
     def __set_heatTemperatures(self, *args):
         """
         Parameters
@@ -807,9 +1247,9 @@ class Superstructure:
             self.HP_ACC_Factor['HP_ACC_Factor'] = ((ir * (1 + ir) ** lt) / ((1 + ir) ** lt - 1))
 
             for i, j in self.HeatIntervals.items():
-                if j == self.HP_T_IN['Temperature']:
+                if j == self.__grid_temperature(self.HP_T_IN['Temperature']):
                     self.HP_T_IN['Interval'] = i + 1
-                elif j == self.HP_T_OUT['Temperature']:
+                elif j == self.__grid_temperature(self.HP_T_OUT['Temperature']):
                     self.HP_T_OUT['Interval'] = i + 1
 
         else:
@@ -817,10 +1257,11 @@ class Superstructure:
             self.HP_Costs['HP_Costs'] = 0
             self.COP_HP['COP_HP'] = 3
 
-    def __fill_betaParameters(self):
+    def __fill_betaParameters(self, units=None):
         """
         Parameters
         ----------
+        units : list of Process objects, optional (default is all units of the superstructure)
 
         Used Attributes are:
 
@@ -848,20 +1289,30 @@ class Superstructure:
                 3. Sets Splits as beta Attributes
                 4. If TIN = TOUT and tau != 0  --> Process is isothermal, beta is
                     1 for on specific Heat Interval
-                5. Appends beta to Process ParameterList
+
+            The beta values are added to the Data_File via the ParameterList of the Process
+            (PhysicalProcess.fill_parameterList)
 
         """
 
-        r = len(self.Heat_Temperatures)
+        if units is None:
+            units = self.UnitsList
 
-        for i in self.UnitsList:
+        # isothermal demands at the highest (heating) or lowest (cooling) temperature of an aggregated grid
+        # (see set_heatIntervalAggregation) are put in the closest interval, the exact grid is not changed
+        aggregated = bool(getattr(self, 'heatTemperatureMap', {}))
+        lastInterval = max(len(self.HeatIntervals) - 1, 1)
+
+        for i in units:
             if (i.Number in self.CostUnitsList['U_C'] and i.Number not in self.HeatGeneratorList["U_FUR"]
                 and i.Number not in self.ElectricityGeneratorList['U_TUR']):
+                # start from an empty dictionary, intervals of an old temperature grid should not remain
+                i.beta['beta'] = {}
                 for k, j in i.HeatData.items():
                     tau = j['tau']
                     if tau is not None:
-                        t_in = j['TIN']
-                        t_out = j['TOUT']
+                        t_in = self.__grid_temperature(j['TIN'])
+                        t_out = self.__grid_temperature(j['TOUT'])
                         if tau > 0:
                             DeltaT = t_out - t_in
                             i.tau_h['tau_h'][k, i.Number] = tau
@@ -871,7 +1322,8 @@ class Superstructure:
                                     i.beta['beta'][i.Number, k, t] = 0
                                 else:
                                     if t_out == s and t_out == t_in:
-                                        i.beta['beta'][i.Number, k, t] = 1
+                                        interval = max(t, 1) if aggregated else t
+                                        i.beta['beta'][i.Number, k, interval] = 1
                                     else:
                                         if t != 0:
                                             if t_out >= self.HeatIntervals[t - 1]:
@@ -888,7 +1340,8 @@ class Superstructure:
                                     i.beta['beta'][i.Number, k, t] = 0
                                 else:
                                     if t_out == s and t_out == t_in:
-                                        i.beta['beta'][i.Number, k, t + 1] = 1
+                                        interval = min(t + 1, lastInterval) if aggregated else t + 1
+                                        i.beta['beta'][i.Number, k, interval] = 1
                                     else:
                                         if t != 0:
                                             if t_in >= self.HeatIntervals[t - 1]:
@@ -896,9 +1349,8 @@ class Superstructure:
                                                                                       t - 1] - s) / DeltaT
                                             else:
                                                 i.beta['beta'][i.Number, k, t] = 0
-                i.ParameterList.append(i.beta)
 
-    def __calc_capexLinearizationParameters(self):
+    def __calc_capexLinearizationParameters(self, units=None):
         """
         Description
         -----------
@@ -911,12 +1363,105 @@ class Superstructure:
 
 
         """
-        for i in self.UnitsList:
+        if units is None:
+            units = self.UnitsList
+
+        flowBounds = {}
+        if self.linearizationDetail == "adaptive":
+            flowBounds = self.__calc_capexFlowBounds()
+
+        for i in units:
+            if i.Number in self.CostUnitsList['U_C']:
+                (i.lin_CAPEX_x, i.lin_CAPEX_y) = capex_calculator(i, self.CECPI,
+                                                                  Detail=self.linearizationDetail,
+                                                                  maxError=getattr(self, 'linearizationError', 0.01),
+                                                                  flowBounds=flowBounds.get(i.Number))
+
+    def __pad_capexLinearizationParameters(self, units=None):
+        """
+        Description
+        -----------
+        Gives all units of the adaptive linearization the same number of points (the length of the set J)
+
+        """
+        if units is None:
+            units = self.UnitsList
+
+        for i in units:
             if i.Number in self.CostUnitsList['U_C']:
-                aa = i.Number
-                (i.lin_CAPEX_x, i.lin_CAPEX_y) = capex_calculator(i, self.CECPI, Detail=self.linearizationDetail)
+                pad_capex_points(i.lin_CAPEX_x, i.lin_CAPEX_y, i.Number, len(self.LinPointsList['J']))
+
+    def __calc_capexFlowBounds(self):
+        """
+        Description
+        -----------
+        Reference flow range of the units for the adaptive CAPEX linearization. The user bounds
+        (linearizationBounds) are used first. For units with a mass flow as reference flow the upper bound is the
+        annual supply of all sources upstream of the unit divided by the full load hours of the unit, if all these
+        sources have a finite upper limit (the substrate load fixes the supply of its source).
 
-    def __calc_accFactorParameter(self):
+        Returns
+        -------
+        flowBounds : Dictionary
+            {unit number: (lower, upper)}, lower is None (default range) for the derived bounds
+
+        """
+        units = {i.Number: i for i in self.UnitsList}
+        myu = {}
+        for i in self.UnitsList:
+            if hasattr(i, 'myu'):
+                myu.update(i.myu['myu'])
+
+        data = {'U': {None: list(units)},
+                'U_SU': {None: self.SourceSet['U_SU']},
+                'U_DIST_SUB': {None: self.distributor_subset['U_DIST_SUB']},
+                'myu': myu}
+        upstream = {}
+        for u, successors in get_unit_network(data).items():
+            for uu in successors:
+                upstream.setdefault(uu, set()).add(u)
+
+        def hours(unit):
+            h = unit.FLH['flh'][unit.Number]
+            return h if h else self.H['H']
+
+        def supply(u_s):
+            source = units[u_s]
+            if self.loadType == 'Substrate' and source.Name == self.loadName:
+                return self.sourceOrProductLoad['sourceOrProductLoad'] / self.H['H'] * hours(source)
+            upperLimit = source.UpperLimit['ul'][u_s]
+            if upperLimit is None or upperLimit >= 1e05:
+                return None
+            return upperLimit * hours(source)
+
+        userBounds = getattr(self, 'linearizationBounds', {})
+        flowBounds = {}
+        for u in self.CostUnitsList['U_C']:
+            if u in userBounds:
+                flowBounds[u] = userBounds[u]
+                continue
+
+            if units[u].kappa_2_capex['kappa_2_capex'].get(u) not in (0, 1):
+                continue
+
+            sources = set()
+            stack = [u]
+            visited = {u}
+            while stack:
+                for uu in upstream.get(stack.pop(), ()):
+                    if uu not in visited:
+                        visited.add(uu)
+                        stack.append(uu)
+                        if uu in self.SourceList['U_S']:
+                            sources.add(uu)
+
+            supplies = [supply(u_s) for u_s in sources]
+            if supplies and None not in supplies:
+                flowBounds[u] = (None, sum(supplies) / hours(units[u]))
+
+        return flowBounds
+
+    def __calc_accFactorParameter(self, units=None):
         """
         Description
         -----------
@@ -924,41 +1469,54 @@ class Superstructure:
         used in the Superstructure Model
 
         """
-        for i in self.UnitsList:
+        if units is None:
+            units = self.UnitsList
+
+        for i in units:
             if i.Number in self.CostUnitsList['U_C']:
                 i.ACC_Factor['ACC_Factor'][i.Number] = i.calc_ACCFactor(self.IR)
 
-    def __set_turnoverParameter(self):
+    def __set_turnoverParameter(self, units=None):
+        if units is None:
+            units = self.UnitsList
 
-        for i in self.UnitsList:
+        for i in units:
             if i.Number in self.CostUnitsList['U_C']:
                 i.turn_over_acc['to_acc'][i.Number] = i.calc_turnoverACC(self.IR)
 
-    def __set_optionalFLH(self):
-        for x in self.UnitsList:
+    def __set_optionalFLH(self, units=None):
+        if units is None:
+            units = self.UnitsList
+
+        for x in units:
             if x.FLH['flh'][x.Number] is None:
                 x.FLH['flh'][x.Number] = self.H['H']
 
-    def __set_optionalKOM(self):
-        for x in self.UnitsList:
+    def __set_optionalKOM(self, units=None):
+        if units is None:
+            units = self.UnitsList
+
+        for x in units:
             if x.Number in self.CostUnitsList['U_C']:
                 if x.K_OM['K_OM'][x.Number] is None:
                     x.K_OM['K_OM'][x.Number] = self.K_OM
 
     def __scan_unit_connections(self):
+        """
+        Description
+        -----------
+        Builds the set U_CONNECTORS (all connected unit pairs) from the split factors myu of the Data_File and the
+        distributor subsets. The set is rebuilt on every call; a dictionary is used to keep the order of the
+        connections with constant time membership checks.
 
-        data_file = self.Data_File[None]
-        connector_data = data_file['myu']
+        """
 
-        for i in connector_data.keys():
-            connection = (i[0], i[1][0])
+        connector_data = self.Data_File[None]['myu']
 
-            if connection not in self.connections_set['U_CONNECTORS']:
-                self.connections_set['U_CONNECTORS'].append(connection)
+        connections = dict.fromkeys((i[0], i[1][0]) for i in connector_data.keys())
+        connections.update(dict.fromkeys(self.distributor_subset['U_DIST_SUB']))
 
-        for i in self.distributor_subset['U_DIST_SUB']:
-            if i not in self.connections_set['U_CONNECTORS']:
-                self.connections_set['U_CONNECTORS'].append(i)
+        self.connections_set['U_CONNECTORS'] = list(connections)
 
     def _set_waste_management_types(self, waste_types: list):
         for waste_type in waste_types:
@@ -1041,6 +1599,7 @@ class Superstructure:
         Fills List with non-indexed Model-important parameters
 
         """
+        self.NI_ParameterList = []
 
         self.NI_ParameterList.append(self.UnitsNumberList)
         self.NI_ParameterList.append(self.UnitsNumberList2)
@@ -1074,6 +1633,7 @@ class Superstructure:
         self.NI_ParameterList.append(self.distributor_subset)
         self.NI_ParameterList.append(self.decimal_set)
         self.NI_ParameterList.append(self.distributor_subset2)
+        self.NI_ParameterList.append(self.distributor_rest)
         self.NI_ParameterList.append(self.OtherUtilitiesList)
         self.NI_ParameterList.append(self.sourceOrProductLoad)
         self.NI_ParameterList.append(self.Scenarios)
@@ -1087,6 +1647,7 @@ class Superstructure:
         Fills List with indexed Model-important parameters
 
         """
+        self.I_ParameterList = []
 
         self.I_ParameterList.append(self.delta_q)
         self.I_ParameterList.append(self.em_fac_ut)
@@ -1110,6 +1671,22 @@ class Superstructure:
     # Add the Parameters from the Lists to the Model-Ready Data File
     # ---------------
 
+    def __set_distributorSets(self):
+        """
+        Description
+        -----------
+        Collects the decimal numbers and binary variables of all distributors (DC_SET, U_DIST_SUB2, U_DIST_REST)
+        again, so changes of the formulation or decimal place of a distributor are part of the Data_File
+
+        """
+        self.decimal_set = {'DC_SET': []}
+        self.distributor_subset2 = {'U_DIST_SUB2': []}
+        self.distributor_rest = {'U_DIST_REST': []}
+
+        for unit in self.UnitsList:
+            if unit.Type == 'Distributor':
+                unit.fill_distributorSets(self)
+
     def __fill_nonIndexedParameters(self):
         """
         Description
@@ -1139,13 +1716,13 @@ class Superstructure:
         self.__set_unitNames()
 
         self.__fill_indexedParameterList()
-        x = self.I_ParameterList
-        for i in x:
+        data = self.Data_File[None]
+        for i in self.I_ParameterList:
             for j, k in i.items():
-                try:
-                    self.Data_File[None][j].update(k)
-                except:
-                    self.Data_File[None][j] = k
+                if j in data:
+                    data[j].update(k)
+                else:
+                    data[j] = copy.copy(k)
 
     # Parameters origin from Process Units
 
@@ -1155,24 +1732,107 @@ class Superstructure:
         -----------
 
         Goes through all Processes and add the Parameters in their ParameterList
-        to the Model-Ready DataFile
+        to the Model-Ready DataFile. Afterwards the connection set U_CONNECTORS is
+        scanned once from the complete Data_File.
 
         """
+        self._unitDataIndices = {}
 
         for z in self.UnitsList:
-            z.fill_parameterList()
-            x = z.ParameterList
-            for i in x:
-                for j, k in i.items():
-                    try:
-                        self.Data_File[None][j].update(k)
-                    except:
-                        self.Data_File[None][j] = copy.copy(k)
+            self.__add_unitParameters(z)
 
-            self.__scan_unit_connections()
+        self.__set_connectionParameters()
 
-            for j in self.connections_set:
-                self.Data_File[None][j] = {None: self.connections_set[j]}
+    def __add_unitParameters(self, unit):
+        """
+        Description
+        -----------
+        Fills the ParameterList of a single Process and adds the Parameters to the Data_File. The indices added by
+        the unit are remembered in _unitDataIndices, so they can be removed again if the unit changes
+        (see update_DataFile_unit).
+
+        """
+        data = self.Data_File[None]
+        indices = {}
+
+        unit.fill_parameterList()
+        for i in unit.ParameterList:
+            for j, k in i.items():
+                if j in data:
+                    data[j].update(k)
+                else:
+                    data[j] = copy.copy(k)
+                indices.setdefault(j, []).extend(k.keys())
+
+        self._unitDataIndices[unit.Number] = indices
+
+    def __remove_unitParameters(self, unit, oldIndices):
+        """
+        Description
+        -----------
+        Removes the Parameter values which were added to the Data_File by an older version of the given Process
+        (oldIndices), but are not part of the current ParameterList of the Process anymore
+
+        """
+        data = self.Data_File[None]
+        newIndices = self._unitDataIndices[unit.Number]
+        for j, indices in oldIndices.items():
+            parameter = data.get(j, {})
+            currentIndices = set(newIndices.get(j, ()))
+            for index in indices:
+                if index not in currentIndices:
+                    parameter.pop(index, None)
+
+    def __set_connectionParameters(self):
+        self.__scan_unit_connections()
+
+        for j in self.connections_set:
+            self.Data_File[None][j] = {None: self.connections_set[j]}
+
+    def __fill_sparseIndexSets(self):
+        """
+        Description
+        -----------
+        Derives the index sets of the sparse model formulation from the Data_File (see set_sparseModel):
+
+            - U_CONNECTORS_I : (u, uu, i) connections with a non-zero split factor myu for component i, for the
+                               outlets of distributors all components
+            - GAMMA_SET      : (u, i, r) non-zero stoichiometric coefficients
+            - THETA_SET      : (u, r, m) non-zero conversion factors
+            - BETA_SET       : (u, ut, hi) non-zero heat interval fractions
+            - KAPPA_UT_SET   : (u, ut, i) non-zero utility reference coefficients
+
+        """
+        data = self.Data_File[None]
+
+        def flat_index(index):
+            flat = []
+            for j in index:
+                if isinstance(j, tuple):
+                    flat.extend(j)
+                else:
+                    flat.append(j)
+            return tuple(flat)
+
+        def non_zero_indices(parameter):
+            return [flat_index(index) for index, value in data.get(parameter, {}).items() if value]
+
+        units = set(data['UU'][None])
+        distributorConnections = list(dict.fromkeys(data['U_DIST_SUB'][None]))
+
+        distributorSet = set(distributorConnections)
+
+        connectionIndices = dict.fromkeys((u, uu, i) for u, uu, i in non_zero_indices('myu')
+                                          if uu in units and (u, uu) not in distributorSet)
+        for u, uu in distributorConnections:
+            if uu in units:
+                connectionIndices.update(dict.fromkeys((u, uu, i) for i in data['I'][None]))
+
+        data['U_CONNECTORS_I'] = {None: list(connectionIndices)}
+        data['GAMMA_SET'] = {None: non_zero_indices('gamma')}
+        data['THETA_SET'] = {None: non_zero_indices('theta')}
+        data['BETA_SET'] = {None: non_zero_indices('beta')}
+        data['KAPPA_UT_SET'] = {None: non_zero_indices('kappa_1_ut')}
 
     def __prepare_capexEquations(self):
         """
@@ -1187,9 +1847,13 @@ class Superstructure:
 
         """
 
+        # the adaptive linearization sets the number of points, so it is calculated before the intervals
+        self.__calc_capexLinearizationParameters()
+
         self.add_linearisationIntervals()
 
-        self.__calc_capexLinearizationParameters()
+        if self.linearizationDetail == "adaptive":
+            self.__pad_capexLinearizationParameters()
 
         self.__calc_accFactorParameter()
 
@@ -1207,6 +1871,7 @@ class Superstructure:
         Heat intervals by calling:
 
             - add_ProcessTemperatures()
+            - __aggregate_heatTemperatures()  (only if set_heatIntervalAggregation is used)
             - __add_temperatureIntervals()
             - __set_deltaQ()
 
@@ -1216,6 +1881,8 @@ class Superstructure:
 
         self.__set_processTemperatures()
 
+        self.__aggregate_heatTemperatures()
+
         self.__add_temperatureIntervals()
 
         self.__calc_heatPump()
@@ -1271,6 +1938,8 @@ class Superstructure:
 
         """
 
+        # start from an empty Data_File, so calling this method again gives the same result
+        self.Data_File = {None: {}}
         self.load_data_from_txt(self.Database)
 
         # heat balances
@@ -1279,10 +1948,146 @@ class Superstructure:
         self.__prepare_capexEquations()
 
         # mass balance equations
+        self.__set_distributorSets()
         self.__fill_nonIndexedParameters()
         self.__fill_indexedParameters()
         self.__fill_processParameterList()
 
+        # remove the units, connections and components which can not carry flow
+        if getattr(self, 'presolve', False):
+            self.presolve_DataFile(removeDeadEnds=getattr(self, 'presolveDeadEnds', False))
+
+        # index sets of the sparse model formulation
+        if getattr(self, 'sparseModel', False):
+            self.__fill_sparseIndexSets()
+
+        return self.Data_File
+
+    def update_DataFile_unit(self, unit):
+        """
+        Description
+        -----------
+        Updates the Data_File after the data of a single Process Unit changed (e.g. new split factors, costs or
+        reaction data), without rebuilding the complete Data_File:
+
+            - recalculates the CAPEX linearization, cost factors and heat data (beta) of the unit
+            - overwrites the Parameter values of the unit in the Data_File and removes the old values which are not
+              used anymore
+            - rescans the connections
+
+        The unit should keep its type (i.e. the sets it belongs to). If the temperatures of the unit are not yet
+        part of the temperature grid, the heat intervals of all units change and the complete Data_File is
+        rebuilt with create_DataFile() instead. The same holds for distributors, as their binary variables are
+        part of the non-indexed sets.
+
+        Parameters
+        ----------
+        unit : Process object or unit number of the changed unit
+
+        Returns
+        -------
+        Data_File:   File with Superstructure Model ready Data
+
+        """
+
+        if not self.Data_File[None] or not hasattr(self, '_unitDataIndices') or getattr(self, 'presolve', False):
+            # nothing to update yet, or the presolved Data_File has to be reduced again from the complete data
+            return self.create_DataFile()
+
+        if not hasattr(unit, 'Number'):
+            units = {u.Number: u for u in self.UnitsList}
+            if unit not in units:
+                raise ValueError("The unit {} is not part of the superstructure".format(unit))
+            unit = units[unit]
+
+        if unit.Number in self.CostUnitsList['U_C']:
+            temperatures = [t for T in (unit.T_IN, unit.T_OUT) for t in T.values() if t != {} and t is not None]
+            if any(t not in self.Heat_Temperatures for t in temperatures):
+                return self.create_DataFile()
+
+        if unit.Type == 'Distributor':
+            # the binary variables of the distributor are part of the non-indexed sets
+            return self.create_DataFile()
+
+        units = [unit]
+        oldIndices = self._unitDataIndices.get(unit.Number, {})
+
+        self.__calc_capexLinearizationParameters(units)
+        if self.linearizationDetail == "adaptive" and unit.Number in self.CostUnitsList['U_C']:
+            if len(unit.lin_CAPEX_x['lin_CAPEX_x']) > len(self.LinPointsList['J']):
+                # the unit needs more points than the set J has
+                return self.create_DataFile()
+            self.__pad_capexLinearizationParameters(units)
+        self.__calc_accFactorParameter(units)
+        self.__set_optionalFLH(units)
+        self.__set_optionalKOM(units)
+        self.__set_turnoverParameter(units)
+        self.__fill_betaParameters(units)
+
+        self.UnitNames['Names'][unit.Number] = unit.Name
+        self.Data_File[None]['Names'][unit.Number] = unit.Name
+
+        self.__add_unitParameters(unit)
+        self.__remove_unitParameters(unit, oldIndices)
+        self.__set_connectionParameters()
+
+        if getattr(self, 'sparseModel', False):
+            self.__fill_sparseIndexSets()
+
+        return self.Data_File
+
+    def presolve_DataFile(self, removeDeadEnds=False, printReport=True):
+        """
+        Description
+        -----------
+        Reduces the Data_File before the model is built (see utils.presolve):
+
+            - removes units which can not receive flow from a source
+            - removes dead end units (no path to a product pool or energy producing unit), if removeDeadEnds
+            - removes zero split factors and connections
+            - removes components which can not be present in any flow
+
+        The Data_File is created first if it is still empty. The removed units, connections and components are
+        saved in presolveReport.
+
+        Parameters
+        ----------
+        removeDeadEnds : Boolean
+            If True also the dead end units are removed
+        printReport : Boolean
+            Prints what was removed
+
+        Returns
+        -------
+        Data_File:   Reduced File with Superstructure Model ready Data
+
+        """
+        if not self.Data_File[None] or not hasattr(self, '_unitDataIndices'):
+            presolve = self.presolve
+            self.presolve = False
+            self.create_DataFile()
+            self.presolve = presolve
+
+        loadID = None
+        for unit in self.UnitsList:
+            if self.loadType and unit.Name == self.loadName:
+                loadID = unit.Number
+
+        self.Data_File, self.presolveReport = presolve_data_file(self.Data_File,
+                                                                 self._unitDataIndices,
+                                                                 groups=self.groups,
+                                                                 connections=self.connections,
+                                                                 loadID=loadID,
+                                                                 loadType=self.loadType,
+                                                                 removeDeadEnds=removeDeadEnds)
+
+        # sparse index sets of a Data_File which was already complete are derived again from the reduced data
+        if 'U_CONNECTORS_I' in self.Data_File[None]:
+            self.__fill_sparseIndexSets()
+
+        if printReport:
+            print_presolve_report(self.presolveReport, self.UnitNames['Names'])
+
         return self.Data_File
 
     def set_unit_uncertainty(self, uncertaintyObject, parameterName, oldDict):
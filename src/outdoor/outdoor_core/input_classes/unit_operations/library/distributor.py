@@ -35,17 +35,27 @@ class Distributor (VirtualProcess):
     a trade-off between accuracy and calcuation performance should be used. Often
     decimal numbers of 4 are sufficient.
 
+    Two formulations of the split are available (see set_formulation):
+        - decimal : every decimal place is expanded into 4 binary variables
+                    (1, 2, 4, 8 * 10^-n) for every target (default)
+        - compact : the split fraction is a binary number on the same grid
+                    of 10^-decimal_place, which needs ceil(log2(10^n + 1))
+                    binary variables per target instead of 4 * n. The last
+                    target gets the remainder of the flow and needs no binary
+                    variables at all.
+
     """
 
     def __init__(self, Name, UnitNumber, Decimal_place= 3, Targets= None,
-                 Parent= None, *args, **kwargs):
+                 Parent= None, Formulation= 'decimal', *args, **kwargs):
 
         super().__init__(Name, UnitNumber,  Parent)
 
         self.Type = "Distributor"
+        self.formulation = Formulation
         self.decimal_numbers = {'Decimal_numbers': {}}
         self.decimal_set = []
-        self.decimal_place = self.set_decimalPlace(Decimal_place)
+        self.set_decimalPlace(Decimal_place)
         self.targets = []
 
 
@@ -57,8 +67,38 @@ class Distributor (VirtualProcess):
         self.decimal_place = decimal_place
         self.calc_decimalNumbers()
 
+    def set_formulation(self, formulation='decimal'):
+        """
+        Parameters
+        ----------
+        formulation : String
+            Use: "decimal" or "compact"
+
+        """
+        if formulation not in ('decimal', 'compact'):
+            raise ValueError("The distributor formulation {} is not supported, choose from 'decimal' and 'compact'"
+                             .format(formulation))
+
+        if self.decimal_place is None:
+            # older distributors lost their decimal place, it follows from the 4 numbers per place
+            self.decimal_place = (len(self.decimal_set) - 1) // 4
+
+        self.formulation = formulation
+        self.calc_decimalNumbers()
+
 
     def calc_decimalNumbers(self):
+        self.decimal_numbers = {'Decimal_numbers': {}}
+        self.decimal_set = []
+
+        if getattr(self, 'formulation', 'decimal') == 'compact':
+            # binary number with the resolution 10^-decimal_place, 2^bits has to be larger than 10^decimal_place
+            resolution = 10 ** self.decimal_place
+            for idx in range(1, resolution.bit_length() + 1):
+                self.decimal_numbers['Decimal_numbers'][self.Number, idx] = 2 ** (idx - 1) / resolution
+                self.decimal_set.append((self.Number, idx))
+            return
+
         X = [1, 2, 4 ,8]
         XO = 0
         self.decimal_numbers['Decimal_numbers'][self.Number,0] = XO
@@ -88,16 +128,33 @@ class Distributor (VirtualProcess):
 
 
         superstructure.distributor_list['U_DIST'].append(self.Number)
-        superstructure.decimal_set['DC_SET'].extend(self.decimal_set)
-
 
         for i in self.targets:
             combi = (self.Number,i)
 
-            if i not in superstructure.distributor_subset['U_DIST_SUB']:
+            if combi not in superstructure.distributor_subset['U_DIST_SUB']:
                 superstructure.distributor_subset['U_DIST_SUB'].append(combi)
 
-        for i in self.targets:
+        self.fill_distributorSets(superstructure)
+
+    def fill_distributorSets(self, superstructure):
+        """
+        Adds the decimal numbers (DC_SET), the binary variables of the
+        targets (U_DIST_SUB2) and for the compact formulation the target which
+        gets the remainder of the flow (U_DIST_REST) to the superstructure
+        """
+
+        if not hasattr(superstructure, 'distributor_rest'):
+            setattr(superstructure, 'distributor_rest', {'U_DIST_REST': []})
+
+        superstructure.decimal_set['DC_SET'].extend(self.decimal_set)
+
+        targets = self.targets
+        if getattr(self, 'formulation', 'decimal') == 'compact' and targets:
+            superstructure.distributor_rest['U_DIST_REST'].append((self.Number, targets[-1]))
+            targets = targets[:-1]
+
+        for i in targets:
             for j in self.decimal_numbers['Decimal_numbers'].keys():
                 combi2 = (self.Number,i,self.Number,j[1])
 
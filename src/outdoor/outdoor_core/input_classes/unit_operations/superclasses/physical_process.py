@@ -416,4 +416,5 @@ class PhysicalProcess(Process):
         self.ParameterList.append(self.em_fac_unit)
         self.ParameterList.append(self.K_OM)
         self.ParameterList.append(self.turn_over_acc)
+        self.ParameterList.append(self.beta)
 
@@ -272,11 +272,11 @@ class Process():
     def fill_parameterList(self):
         """
         Fills ParameterList of Process Unit u which is used to fill Data_File
-        In Superstructure Class
+        In Superstructure Class. The list is rebuilt on every call.
 
         """
 
-
+        self.ParameterList = []
         self.ParameterList.append(self.conc)
         self.ParameterList.append(self.myu)
         self.ParameterList.append(self.kappa_1_lhs_conc)
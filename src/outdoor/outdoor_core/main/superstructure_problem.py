@@ -9,7 +9,8 @@ from ..optimizers.customs.change_params import prepare_mutable_parameters
 from ..optimizers.customs.custom_optimizer import (MCDAOptimizer, MultiObjectiveOptimizer, SensitivityOptimizer,
                                                    TwoWaySensitivityOptimizer, StochasticRecourseOptimizer,
                                                    WaitAndSeeOptimizer, StochasticRecourseOptimizer_mpi_sppy,
-                                                   HereAndNowOptimizer,)
+                                                   HereAndNowOptimizer, DesignScreeningOptimizer,)
+from ..optimizers.customs.solver_tuning import has_tuned_options, load_tuned_options, tune_solver_options
 from ..optimizers.main_optimizer import SingleOptimizer
 from ..utils.timer import time_printer
 
@@ -18,6 +19,22 @@ from ..utils.timer import time_printer
 #
 # import logging
 
+# options of solve_optimization_problem(performance_options=...) and the setters of the Superstructure they call
+PERFORMANCE_OPTIONS = {
+    'sparse_model': 'set_sparseModel',
+    'presolve': 'set_presolve',
+    'capex_encoding': 'set_capexEncoding',
+    'model_blocks': 'set_modelBlocks',
+    'auto_scaling': 'set_autoScaling',
+    'parametric_sensitivity': 'set_parametricSensitivity',
+    'solve_cache': 'set_solveCache',
+    'feasibility_screen': 'set_feasibilityScreen',
+    'deduplicate_scenarios': 'set_scenarioDeduplication',
+    'solve_schedule': 'set_solveSchedule',
+    'solver_telemetry': 'set_solverTelemetry',
+    'solver_tuning': 'set_solverTuning',
+}
+
 
 class SuperstructureProblem:
     """
@@ -76,6 +93,10 @@ class SuperstructureProblem:
         mpi_sppy_options=None,
         outputFileDesignSpace=None,
         multi_objective_options=None,
+        screening_designs=None,
+        output_memory_limit=None,
+        enumerate_designs=None,
+        performance_options=None,
     ):
         """
 
@@ -102,6 +123,20 @@ class SuperstructureProblem:
                 Keys are options, values are values. Keys have to be permitted by
                 chosen solver.
         stochastic_mode : string, optional (only for 2-stage-recourse) defines if you want to use mpi-sspy
+        screening_designs : Dictionary or list, optional (only for design screening)
+            DESCRIPTION. The designs to evaluate against all scenarios, either as return_chosen-style
+                dictionaries, Y vectors or {'Y': ..., 'Y_DIST': ...} dictionaries.
+        output_memory_limit : Float, optional (only for multi-run modes)
+            DESCRIPTION. Memory ceiling in MB for the single-run results of the MultiModelOutput. Data shared by
+                all runs is kept once and the least recently used runs are spilled to disk above the limit.
+        enumerate_designs : Integer, optional (only for single)
+            DESCRIPTION. Number of best distinct flowsheets to return as MultiModelOutput with the objective gaps
+                to the optimum (see SingleOptimizer.run_enumeration). The default returns the optimum only.
+        performance_options : Dictionary, optional
+            DESCRIPTION. Settings of the model formulation and the solves as {option: value}, every option calls
+                its setter of the Superstructure (see PERFORMANCE_OPTIONS, e.g. 'sparse_model' -> set_sparseModel).
+                A dictionary value gives the keyword arguments of the setter, any other value its first argument.
+                Options which are not given keep the setting of the superstructure.
 
 
         Returns
@@ -129,6 +164,18 @@ class SuperstructureProblem:
         if outputFileDesignSpace is not None:
             input_data.outputFileDesignSpace = outputFileDesignSpace
 
+        # memory ceiling of the results of multi-run optimizations
+        if output_memory_limit is not None:
+            input_data.outputMemoryLimit = output_memory_limit
+
+        # settings of the model formulation and the solves
+        if performance_options is not None:
+            self.apply_performance_options(input_data, performance_options)
+
+        # give the designs to screen to the superstructure object
+        if screening_designs is not None:
+            input_data.screeningDesigns = screening_designs
+
         # what are the permitted optimization modes
         OptimisationPermissionList = ["single",
                                       "multi-objective",
@@ -137,7 +184,8 @@ class SuperstructureProblem:
                                       "cross-parameter sensitivity",
                                       "2-stage-recourse",
                                       "wait and see",
-                                      "here and now"]
+                                      "here and now",
+                                      "design screening"]
 
         if optimization_mode is None:
             optimization_mode = input_data.optimization_mode
@@ -160,8 +208,8 @@ class SuperstructureProblem:
 
             if optimization_mode == "2-stage-recourse" and self.stochastic_mode == "mpi-sppy":
                 model_instance = None  # we do not need to create a model instance for the mpi-sppy mode
-            elif optimization_mode == "wait and see" or optimization_mode == "here and now":
-                model_instance = None  # we do not need to create a model instance for the wait and see mode
+            elif optimization_mode in ("wait and see", "here and now", "design screening"):
+                model_instance = None  # the model instances are created per scenario by the optimizer
             else:
                 # populate the model instance with the input data
                 model_instance = self.setup_model_instance(input_data, optimization_mode)
@@ -171,6 +219,9 @@ class SuperstructureProblem:
             # check for nan Values
             # check_nan = self.find_nan_parameters_in_model_instance(model_instance)
             # self.CheckNoneVariables = check_nan
+            # use the solver options which were tuned for this superstructure
+            options = self.apply_tuned_options(input_data, solver, options)
+
             # set model options
             mode_options = self.set_mode_options(optimization_mode, input_data, multi_objective_options)
             # pass on stochastic optimization options dictionary
@@ -183,7 +234,12 @@ class SuperstructureProblem:
                                              input_data, stochastic_options,
                                              mpi_sppy_options=mpi_sppy_options) #add options for mpi-sppy None if not mpi-sppy
             # run the optimization
-            model_output = optimizer.run_optimization(model_instance)
+            if enumerate_designs is not None:
+                if optimization_mode != "single":
+                    raise ValueError("The enumeration of flowsheets is only available for the single optimization mode")
+                model_output = optimizer.run_enumeration(model_instance, numberOfDesigns=enumerate_designs)
+            else:
+                model_output = optimizer.run_optimization(model_instance)
 
             # for the stochastic recourse model, we need to run the model again if infeasible scenarios were found
             # the model_output is a dictionary with the infeasible scenarios
@@ -207,6 +263,98 @@ class SuperstructureProblem:
             raise Exception("Currently there is no routine for external data parsing implemented")
 
 
+    def tune_solver_options(self, input_data, solver="gurobi", interface="local", solver_path=None,
+                            optimization_mode=None, scenarios=None, points=None, **tunerOptions):
+        """
+        Parameters
+        ----------
+        input_data : Superstructure Object
+        solver : String
+        interface : String
+        solver_path : String, optional
+        optimization_mode : String, optional
+            Mode of the runs the options are tuned for, default is the mode of the superstructure
+        scenarios : Integer, list or Dictionary, optional
+            Sample of the scenarios: a number of scenarios drawn from input_data.scenarioDataFiles, their names or
+            {name: Data_File}
+        points : list, optional
+            Sample of sweep points as changes of the nominal Data_File, e.g. [{'ProductPrice': {unit: 3000}}]
+        tunerOptions :
+            Keyword arguments of SolverTuner, e.g. trials, method ('random' or 'grid'), workers, timeLimit, space
+
+        Returns
+        -------
+        result : Dictionary
+            Best options, their score, the score of the default options and the table of all candidates
+
+        Description
+        -----------
+        Searches the solver options on the sample (see optimizers.customs.solver_tuning) and stores the best set
+        in the cache of input_data.solverTuningDirectory, solve_optimization_problem uses it for later runs of the
+        superstructure if the tuned options are switched on (see Superstructure.set_solverTuning).
+
+        """
+        if optimization_mode is None:
+            optimization_mode = input_data.optimization_mode
+
+        return tune_solver_options(input_data, solver, interface, solver_path, optimization_mode=optimization_mode,
+                                   scenarios=scenarios, points=points,
+                                   directory=getattr(input_data, 'solverTuningDirectory', None), **tunerOptions)
+
+    def apply_performance_options(self, input_data, performance_options):
+        """
+        Parameters
+        ----------
+        input_data : Superstructure Object
+        performance_options : Dictionary
+            {option: value} with the options of PERFORMANCE_OPTIONS. A dictionary as value gives the keyword
+            arguments of the setter, any other value its first argument.
+
+        """
+        unknown = [option for option in performance_options if option not in PERFORMANCE_OPTIONS]
+        if unknown:
+            raise ValueError('The performance options {} are not supported, choose from {}'.format(
+                unknown, list(PERFORMANCE_OPTIONS)))
+
+        for option, value in performance_options.items():
+            setter = getattr(input_data, PERFORMANCE_OPTIONS[option])
+            if isinstance(value, dict):
+                setter(**value)
+            else:
+                setter(value)
+
+    def apply_tuned_options(self, input_data, solver, options):
+        """
+        Parameters
+        ----------
+        input_data : Superstructure Object
+        solver : String
+        options : Dictionary or None
+            Solver options passed to the run
+
+        Returns
+        -------
+        options : Dictionary or None
+            The tuned options of the superstructure updated by the passed options if the tuned options are switched
+            on (see Superstructure.set_solverTuning), else or if the superstructure was not tuned for the solver the
+            passed options
+
+        """
+        if not getattr(input_data, 'solverTuning', False):
+            return options
+
+        directory = getattr(input_data, 'solverTuningDirectory', None)
+        if not has_tuned_options(solver, directory):
+            return options
+
+        # the key of the superstructure does not depend on the optimization mode (see solver_tuning.tuning_key)
+        tuned = load_tuned_options(input_data, solver, directory)
+        if tuned is None:
+            return options
+
+        print("\033[1;32m" + "Solver options tuned for this superstructure are used: {}".format(tuned) + "\033[0m")
+        return {**tuned, **(options or {})}
+
     def setup_model_instance(self, input_data, optimization_mode, infeasibleScenarios=None, printTimer=True):
         """
 
@@ -247,6 +395,8 @@ class SuperstructureProblem:
             model = SuperstructureModel_2_Stage_recourse(input_data)
         else: # single, multi or sensitivity optimisation or mpi-sspy mode for 2-stage-recourse
             model = SuperstructureModel(input_data)
+            # output blocks which are part of the optimization in this mode
+            model.modelBlocks = input_data.get_modelBlocks(optimization_mode)
 
         model.create_ModelEquations()
 
@@ -316,7 +466,8 @@ class SuperstructureProblem:
                         "cross-parameter sensitivity",
                         "2-stage-recourse",
                         "wait and see",
-                        "here and now"
+                        "here and now",
+                        "design screening"
                         }
 
         if optimization_mode not in MODE_LIBRARY:
@@ -355,16 +506,20 @@ class SuperstructureProblem:
             optimizer = HereAndNowOptimizer(solver_name=solver, solver_interface=interface,
                                             solver_options=options, inputObject=superstructure)
 
+        elif optimization_mode == "design screening":
+            optimizer = DesignScreeningOptimizer(solver_name=solver, solver_interface=interface,
+                                                 solver_options=options, inputObject=superstructure)
+
         elif optimization_mode == "single":
             optimizer = SingleOptimizer(solver_name=solver, solver_interface=interface,
                                         optimization_mode=optimization_mode, solver_path=solver_path,
                                         solver_options=options)
 
         elif optimization_mode == "multi-objective MCDA":
-            optimizer = MCDAOptimizer(solver, interface, options, mode_options)
+            optimizer = MCDAOptimizer(solver, interface, options, mode_options, superstructure)
 
         elif optimization_mode == "multi-objective":
-            optimizer = MultiObjectiveOptimizer(solver, interface, options, mode_options)
+            optimizer = MultiObjectiveOptimizer(solver, interface, options, mode_options, superstructure)
 
         elif optimization_mode == "sensitivity":
             optimizer = SensitivityOptimizer(solver, interface, options,
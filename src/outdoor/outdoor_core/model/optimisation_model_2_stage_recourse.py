@@ -175,15 +175,12 @@ class SuperstructureModel_2_Stage_recourse(AbstractModel):
 
         # Distributor Set for decimal numbers
 
-        def iterator(x):
-            nlist = []
-            for i in range(x):
-                nlist.append(i)
-            return nlist
+        self.DC_SET = Set(within=self.U_DIST * NonNegativeIntegers)
 
-        self.DC_SET = Set(within=self.U_DIST * iterator(100))
+        self.U_DIST_SUB2 = Set(within=self.U_DIST_SUB * self.U_DIST * NonNegativeIntegers)
 
-        self.U_DIST_SUB2 = Set(within=self.U_DIST_SUB * self.U_DIST * iterator(100))
+        # targets which get the remainder of the flow of a distributor (compact formulation, no binary variables)
+        self.U_DIST_REST = Set(within=self.U_DIST_SUB)
 
 
         # Set to describe the scenarios of the 2 stage linear recourse problems
@@ -411,6 +408,9 @@ class SuperstructureModel_2_Stage_recourse(AbstractModel):
                     else:
                         return Constraint.Skip
 
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i, sc] <= sum(
                     self.FLOW_DIST[u, uu, uk, k, i, sc]
@@ -433,6 +433,9 @@ class SuperstructureModel_2_Stage_recourse(AbstractModel):
                         ] - self.alpha[u] * (1 - self.Y[uu])
                 else:
                     return Constraint.Skip
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i, sc] >= sum(
                     self.FLOW_DIST[u, uu, uk, k, i, sc]
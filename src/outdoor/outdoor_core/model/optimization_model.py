@@ -1,5 +1,9 @@
+from collections import defaultdict
+
 from pyomo.environ import *
 
+from ..utils.kpi_calculator import KPICalculator
+from ..utils.scaling import set_scaling_factors
 
 
 class SuperstructureModel(AbstractModel):
@@ -19,9 +23,33 @@ class SuperstructureModel(AbstractModel):
 
     """
 
+    # methods which build the output blocks (see Superstructure.set_modelBlocks)
+    MODEL_BLOCK_METHODS = {'GWP': 'create_EnvironmentalEvaluation',
+                           'FWD': 'create_FreshwaterEvaluation',
+                           'LCA': 'create_LCAEquations'}
+
     def __init__(self, superstructure_input=None, fixedDesign=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # if True, parameters and constraints are only declared on the index sets derived in the Data_File
+        # (see Superstructure.set_sparseModel)
+        self.sparse = False
+
+        # formulation of the piece-wise linear CAPEX: 'binary', 'log' or 'sos2' (see Superstructure.set_capexEncoding)
+        self.capexEncoding = 'binary'
+
+        # output blocks which are part of the optimization, the other blocks are calculated after the solve
+        # (see Superstructure.set_modelBlocks and calculate_omitted_blocks)
+        self.modelBlocks = list(self.MODEL_BLOCK_METHODS)
+
+        # if True, the scaling factors of the model instance are calculated in populateModel
+        # (see Superstructure.set_autoScaling)
+        self.autoScaling = False
+        self.autoScalingVariables = False
+
+        # if True, the solves of the model instance record their telemetry (see Superstructure.set_solverTelemetry)
+        self.solverTelemetry = False
+
         if superstructure_input is not None:
             self._set_optionals_from_superstructure(superstructure_input)
         else:
@@ -64,6 +92,12 @@ class SuperstructureModel(AbstractModel):
                 "t_out": 0}
 
         self.objective_name = superstructure_input.objective
+        self.sparse = getattr(superstructure_input, 'sparseModel', False)
+        self.capexEncoding = getattr(superstructure_input, 'capexEncoding', 'binary')
+        self.modelBlocks = superstructure_input.get_modelBlocks()
+        self.autoScaling = getattr(superstructure_input, 'autoScaling', False)
+        self.autoScalingVariables = getattr(superstructure_input, 'autoScalingVariables', False)
+        self.solverTelemetry = getattr(superstructure_input, 'solverTelemetry', False)
         self.groups = superstructure_input.groups
         self.connections = superstructure_input.connections
 
@@ -110,8 +144,11 @@ class SuperstructureModel(AbstractModel):
             - Economic functions
             - GWP functions
             - FWD functions
+            - LCA functions
             - Logics
             - Objective function
+
+        The GWP, FWD and LCA functions are only built if they are in self.modelBlocks.
         """
 
         self.create_Sets()
@@ -119,9 +156,9 @@ class SuperstructureModel(AbstractModel):
         self.create_EnergyBalances()
         self.create_WasteCosts()
         self.create_EconomicEvaluation()
-        self.create_EnvironmentalEvaluation()
-        self.create_FreshwaterEvaluation()
-        self.create_LCAEquations()
+        for block, method in self.MODEL_BLOCK_METHODS.items():
+            if block in self.modelBlocks:
+                getattr(self, method)()
         self.create_DecisionMaking()
         self.create_ObjectiveFunction()
 
@@ -139,9 +176,110 @@ class SuperstructureModel(AbstractModel):
             data from Data_file.
 
         """
+        if self.sparse:
+            Data_file = self._filter_sparse_parameters(Data_file)
+
         self.ModelInstance = self.create_instance(Data_file)
+
+        # data of the output blocks which are calculated after the solve (the parameters which are not in the model)
+        self.ModelInstance._omittedBlocksData = {None: {name: values for name, values in Data_file[None].items()
+                                                        if self.ModelInstance.component(name) is None}}
+        self.ModelInstance._kpiCalculator = None
+        self.ModelInstance._solverTelemetry = self.solverTelemetry
+
+        if self.autoScaling:
+            set_scaling_factors(self.ModelInstance, variables=self.autoScalingVariables)
+
         return self.ModelInstance
 
+    # Sparse formulation
+    # --------------------
+
+    # parameters of the sparse formulation and their index sets
+    SPARSE_PARAMETERS = {'myu': 'U_CONNECTORS_I',
+                         'gamma': 'GAMMA_SET',
+                         'theta': 'THETA_SET',
+                         'beta': 'BETA_SET',
+                         'kappa_1_ut': 'KAPPA_UT_SET'}
+
+    @staticmethod
+    def _filter_sparse_parameters(Data_file):
+        """
+        Parameters
+        ----------
+        Data_file : Dictionary
+            Model data including the sparse index sets (see Superstructure.set_sparseModel)
+
+        Returns
+        -------
+        Dictionary
+            Shallow copy of the Data_file, where the sparse parameters only hold the values of their index set
+            (the zero values which are not part of the sparse model are removed)
+
+        """
+        data = Data_file[None]
+        missingSets = [i for i in SuperstructureModel.SPARSE_PARAMETERS.values() if i not in data]
+        if missingSets:
+            raise ValueError('The Data_File does not hold the sparse index sets {}, create the Data_File after '
+                             'selecting the sparse formulation (Superstructure.set_sparseModel)'.format(missingSets))
+
+        filteredData = dict(data)
+        for parameter, indexSet in SuperstructureModel.SPARSE_PARAMETERS.items():
+            if parameter not in data:
+                continue
+            indices = set(data[indexSet][None])
+            filteredData[parameter] = {}
+            for index, value in data[parameter].items():
+                flatIndex = tuple(j for k in index for j in (k if isinstance(k, tuple) else (k,)))
+                if flatIndex in indices:
+                    filteredData[parameter][index] = value
+
+        return {None: filteredData}
+
+    def _get_sparse_maps(self):
+        """
+        Returns
+        -------
+        Dictionary
+            Lookup dictionaries of the sparse index sets, which are used in the constraint rules instead of
+            looping over full sets. They are created once per model instance.
+
+        """
+        if getattr(self, '_sparseMaps', None) is None:
+            maps = {'predecessors': defaultdict(list),  # (uu, i): [u, ...]
+                    'successors': defaultdict(list),  # (u, i): [uu, ...]
+                    'connection_components': defaultdict(list),  # (u, uu): [i, ...]
+                    'sources': defaultdict(list),  # u: [u_s, ...]
+                    'source_targets': defaultdict(list),  # u_s: [u, ...]
+                    'reaction_terms': defaultdict(list),  # (u, i): [(r, m), ...]
+                    'beta_utilities': defaultdict(list),  # (u, hi): [ut, ...]
+                    'kappa_ut_components': defaultdict(list)}  # (u, ut): [i, ...]
+
+            for u, uu, i in self.U_CONNECTORS_I:
+                maps['predecessors'][uu, i].append(u)
+                maps['successors'][u, i].append(uu)
+                maps['connection_components'][u, uu].append(i)
+
+            for u_s, u in self.U_SU:
+                maps['sources'][u].append(u_s)
+                maps['source_targets'][u_s].append(u)
+
+            conversions = defaultdict(list)
+            for u, r, m in self.THETA_SET:
+                conversions[u, r].append(m)
+            for u, i, r in self.GAMMA_SET:
+                maps['reaction_terms'][u, i].extend((r, m) for m in conversions[u, r])
+
+            for u, ut, hi in self.BETA_SET:
+                maps['beta_utilities'][u, hi].append(ut)
+
+            for u, ut, i in self.KAPPA_UT_SET:
+                maps['kappa_ut_components'][u, ut].append(i)
+
+            self._sparseMaps = maps
+
+        return self._sparseMaps
+
     # Pyomo Model Methods
     # --------------------
 
@@ -201,15 +339,21 @@ class SuperstructureModel(AbstractModel):
 
         # Distributor Set for decimal numbers
 
-        def iterator(x):
-            nlist = []
-            for i in range(x):
-                nlist.append(i)
-            return nlist
+        self.DC_SET = Set(within=self.U_DIST * NonNegativeIntegers)
+
+        self.U_DIST_SUB2 = Set(within=self.U_DIST_SUB * self.U_DIST * NonNegativeIntegers)
 
-        self.DC_SET = Set(within=self.U_DIST * iterator(100))
+        # targets which get the remainder of the flow of a distributor (compact formulation, no binary variables)
+        self.U_DIST_REST = Set(within=self.U_DIST_SUB)
 
-        self.U_DIST_SUB2 = Set(within=self.U_DIST_SUB * self.U_DIST * iterator(100))
+        # Sparse index sets (existing connections and non-zero coefficients only)
+        # ------------------------------------------------------------------------
+        if self.sparse:
+            self.U_CONNECTORS_I = Set(within=self.U_CONNECTORS * self.I)
+            self.GAMMA_SET = Set(within=self.U_STOICH_REACTOR * self.I * self.R)
+            self.THETA_SET = Set(within=self.U_STOICH_REACTOR * self.R * self.M)
+            self.BETA_SET = Set(within=self.U * self.H_UT * self.HI)
+            self.KAPPA_UT_SET = Set(within=self.U * self.UT * self.I)
 
     # **** MASS BALANCES *****
     # -------------------------
@@ -231,7 +375,10 @@ class SuperstructureModel(AbstractModel):
         self.sourceOrProductLoad = Param(initialize=1, mutable=True)
 
         # Flow parameters (Split factor, concentrations, full load hours)
-        self.myu = Param(self.U_CONNECTORS, self.I, initialize=0, mutable=True)
+        if self.sparse:
+            self.myu = Param(self.U_CONNECTORS_I, initialize=0, mutable=True)
+        else:
+            self.myu = Param(self.U_CONNECTORS, self.I, initialize=0, mutable=True)
         self.conc = Param(self.U, initialize=0, within=Any, mutable=True)
         self.flh = Param(self.U, mutable=True)
         self.MinProduction = Param(self.U_PP, initialize=0, mutable=True)
@@ -239,8 +386,12 @@ class SuperstructureModel(AbstractModel):
 
 
         # Reaction parameters(Stoich. / Yield Coefficients)
-        self.gamma = Param(self.U_STOICH_REACTOR, self.I, self.R, initialize=0, mutable=True)
-        self.theta = Param(self.U_STOICH_REACTOR, self.R, self.M, initialize=0, mutable=True)
+        if self.sparse:
+            self.gamma = Param(self.GAMMA_SET, initialize=0, mutable=True)
+            self.theta = Param(self.THETA_SET, initialize=0, mutable=True)
+        else:
+            self.gamma = Param(self.U_STOICH_REACTOR, self.I, self.R, initialize=0, mutable=True)
+            self.theta = Param(self.U_STOICH_REACTOR, self.R, self.M, initialize=0, mutable=True)
         self.xi = Param(self.U_YIELD_REACTOR, self.I, initialize=0, mutable=True)
         self.ic_on = Param(self.U_YIELD_REACTOR, initialize=0)
 
@@ -269,7 +420,10 @@ class SuperstructureModel(AbstractModel):
         # Variables
         # --------
 
-        self.FLOW = Var(self.U_CONNECTORS, self.I, within=NonNegativeReals)
+        if self.sparse:
+            self.FLOW = Var(self.U_CONNECTORS_I, within=NonNegativeReals)
+        else:
+            self.FLOW = Var(self.U_CONNECTORS, self.I, within=NonNegativeReals)
         self.FLOW_IN = Var(self.U, self.I, within=NonNegativeReals)
         self.FLOW_OUT = Var(self.U, self.I, within=NonNegativeReals)
         self.FLOW_WASTE = Var(self.U, self.I, within=NonNegativeReals)
@@ -300,9 +454,19 @@ class SuperstructureModel(AbstractModel):
         # -----------
 
         def MassBalance_1_rule(self, u, i):
+            if self.sparse:
+                return self.FLOW_IN[u, i] == self.FLOW_ADD_TOT[u, i] + sum(
+                    self.flh[uu] / self.flh[u] * self.FLOW[uu, u, i]
+                    for uu in self._get_sparse_maps()['predecessors'][u, i]
+                )
             return self.FLOW_IN[u, i] == self.FLOW_ADD_TOT[u, i] + sum(self.flh[uu] / self.flh[u] * self.FLOW[uu, u, i] for uu in self.UU if (uu,u) in self.U_CONNECTORS)
 
         def MassBalance_2_rule(self, u, i):
+            if self.sparse:
+                return self.FLOW_ADD_TOT[u, i] == sum(
+                    self.FLOW_ADD[u_s, u] * self.phi[u_s, i]
+                    for u_s in self._get_sparse_maps()['sources'][u]
+                )
             return self.FLOW_ADD_TOT[u, i] == sum(
                 self.FLOW_ADD[u_s, u] * self.phi[u_s, i]
                 for u_s in self.U_S
@@ -313,6 +477,11 @@ class SuperstructureModel(AbstractModel):
             return self.FLOW_ADD[u_s, u] <= self.alpha[u] * self.Y[u]  # Big M constraint
 
         def MassBalance_4_rule(self, u_s):
+            if self.sparse:
+                return self.FLOW_SOURCE[u_s] == sum(
+                    self.FLOW_ADD[u_s, u] * self.flh[u] / self.flh[u_s]
+                    for u in self._get_sparse_maps()['source_targets'][u_s]
+                )
             return self.FLOW_SOURCE[u_s] == sum(
                 self.FLOW_ADD[u_s, u] * self.flh[u] / self.flh[u_s]
                 for u in self.U
@@ -370,6 +539,11 @@ class SuperstructureModel(AbstractModel):
                         self.FLOW_OUT[u, i]
                         == sum(self.FLOW_IN[u, i] for i in self.I) * self.xi[u, i]
                     )
+            elif u in self.U_STOICH_REACTOR and self.sparse:
+                return self.FLOW_OUT[u, i] == self.FLOW_IN[u, i] + sum(
+                    self.gamma[u, i, r] * self.theta[u, r, m] * self.FLOW_IN[u, m]
+                    for r, m in self._get_sparse_maps()['reaction_terms'][u, i]
+                )
             elif u in self.U_STOICH_REACTOR:
                 return self.FLOW_OUT[u, i] == self.FLOW_IN[u, i] + sum(
                     self.gamma[u, i, r] * self.theta[u, r, m] * self.FLOW_IN[u, m]
@@ -380,6 +554,10 @@ class SuperstructureModel(AbstractModel):
                 return self.FLOW_OUT[u, i] == self.FLOW_IN[u, i]
 
         def MassBalance_9_rule(self, u, i):
+            if self.sparse:
+                return self.FLOW_WASTE[u, i] == self.FLOW_OUT[u, i] - sum(
+                    self.FLOW[u, uu, i] for uu in self._get_sparse_maps()['successors'][u, i]
+                )
             return self.FLOW_WASTE[u, i] == self.FLOW_OUT[u, i] - sum(
                 self.FLOW[u, uu, i] for uu in self.UU if (u,uu) in self.U_CONNECTORS
             )
@@ -435,6 +613,9 @@ class SuperstructureModel(AbstractModel):
                     else:
                         return Constraint.Skip
 
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i] <= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
@@ -457,6 +638,9 @@ class SuperstructureModel(AbstractModel):
                         ] - self.alpha[u] * (1 - self.Y[uu])
                 else:
                     return Constraint.Skip
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i] >= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
@@ -488,10 +672,17 @@ class SuperstructureModel(AbstractModel):
             )
 
         def MassBalance_17_rule(self, u, uu):
+            if self.sparse:
+                return self.FLOW_FT[u, uu] == sum(
+                    self.FLOW[u, uu, i] for i in self._get_sparse_maps()['connection_components'][u, uu]
+                )
             return self.FLOW_FT[u, uu] == sum(self.FLOW[u, uu, i] for i in self.I)
 
 
         def MassBalance_Distribution_Factor(self, u, uu):
+            if (u, uu) in self.U_DIST_REST:
+                return self.DistFraction[u, uu] == 1 - sum(self.DistFraction[u1, uu1] for u1, uu1 in self.U_DIST_SUB
+                                                           if u1 == u and (u1, uu1) not in self.U_DIST_REST)
             return self.DistFraction[u, uu] == sum(self.Decimal_numbers[u, k] * self.Y_DIST[u, uu, u, k]
                                                    for u1, k in self.DC_SET if u == u1)
 
@@ -505,9 +696,14 @@ class SuperstructureModel(AbstractModel):
         #self.MassBalance_15 = Constraint(rule=MassBalance_15_rule)
 
         self.MassBalance_5 = Constraint(self.U, self.I, rule=MassBalance_5_rule)
-        self.MassBalance_6 = Constraint(self.U, self.UU, self.I, rule=MassBalance_6_rule)
-        self.MassBalance_7 = Constraint(self.U, self.UU, self.I, rule=MassBalance_7_rule)
-        self.MassBalance_8 = Constraint(self.U, self.UU, self.I, rule=MassBalance_8_rule)
+        if self.sparse:
+            self.MassBalance_6 = Constraint(self.U_CONNECTORS_I, rule=MassBalance_6_rule)
+            self.MassBalance_7 = Constraint(self.U_CONNECTORS_I, rule=MassBalance_7_rule)
+            self.MassBalance_8 = Constraint(self.U_CONNECTORS_I, rule=MassBalance_8_rule)
+        else:
+            self.MassBalance_6 = Constraint(self.U, self.UU, self.I, rule=MassBalance_6_rule)
+            self.MassBalance_7 = Constraint(self.U, self.UU, self.I, rule=MassBalance_7_rule)
+            self.MassBalance_8 = Constraint(self.U, self.UU, self.I, rule=MassBalance_8_rule)
         self.MassBalance_9 = Constraint(self.U, self.I, rule=MassBalance_9_rule)
         self.MassBalance_10 = Constraint(self.I, rule=MassBalance_10_rule)
         self.MassBalance_11 = Constraint(self.U, rule=MassBalance_11_rule)
@@ -550,10 +746,16 @@ class SuperstructureModel(AbstractModel):
         self.tau = Param(self.U, self.UT, initialize=0, within=Any, mutable=True)
         self.tau_h = Param(self.H_UT, self.U, initialize=0, mutable=True)
         self.tau_c = Param(self.H_UT, self.U, initialize=0, mutable=True)
-        self.beta = Param(self.U, self.H_UT, self.HI, initialize=0, mutable=True)
+        if self.sparse:
+            self.beta = Param(self.BETA_SET, initialize=0, mutable=True)
+        else:
+            self.beta = Param(self.U, self.H_UT, self.HI, initialize=0, mutable=True)
 
         # Slack Parameters (Flow Choice, HEN, Upper bounds)
-        self.kappa_1_ut = Param(self.U, self.UT, self.I, initialize=0)
+        if self.sparse:
+            self.kappa_1_ut = Param(self.KAPPA_UT_SET, initialize=0)
+        else:
+            self.kappa_1_ut = Param(self.U, self.UT, self.I, initialize=0)
         self.kappa_2_ut = Param(self.U, self.UT, initialize=3)
         self.kappa_3_heat = Param(self.U, self.HI, initialize=0)
         self.kappa_3_heat2 = Param(self.U, self.HI, initialize=0)
@@ -606,23 +808,28 @@ class SuperstructureModel(AbstractModel):
         # Utilities other than heating and cooling
 
         def UtilityBalance_1_rule(self, u, ut):
+            if self.sparse:
+                components = self._get_sparse_maps()['kappa_ut_components'][u, ut]
+            else:
+                components = self.I
+
             if self.kappa_2_ut[u, ut] == 1:
                 return self.REF_FLOW_UT[u, ut] == sum(
-                    self.FLOW_IN[u, i] * self.kappa_1_ut[u, ut, i] for i in self.I
+                    self.FLOW_IN[u, i] * self.kappa_1_ut[u, ut, i] for i in components
                 )
             elif self.kappa_2_ut[u, ut] == 0:
                 return self.REF_FLOW_UT[u, ut] == sum(
-                    self.FLOW_OUT[u, i] * self.kappa_1_ut[u, ut, i] for i in self.I
+                    self.FLOW_OUT[u, i] * self.kappa_1_ut[u, ut, i] for i in components
                 )
             elif self.kappa_2_ut[u, ut] == 4:
                 return self.REF_FLOW_UT[u, ut] == sum(
                     self.FLOW_OUT[u, i] / self.MW[i] * self.kappa_1_ut[u, ut, i]
-                    for i in self.I
+                    for i in components
                 )
             elif self.kappa_2_ut[u, ut] == 2:
                 return self.REF_FLOW_UT[u, ut] == sum(
                     self.FLOW_IN[u, i] / self.MW[i] * self.kappa_1_ut[u, ut, i]
-                    for i in self.I
+                    for i in components
                 )
             elif self.kappa_2_ut[u, ut] == 5:
                 return self.REF_FLOW_UT[u, ut] == sum(
@@ -630,7 +837,7 @@ class SuperstructureModel(AbstractModel):
                     * self.CP[i]
                     * self.FLOW_IN[u, i]
                     * self.kappa_1_ut[u, ut, i]
-                    for i in self.I
+                    for i in components
                 )
             elif self.kappa_2_ut[u, ut] == 6:
                 return self.REF_FLOW_UT[u, ut] == sum(
@@ -638,7 +845,7 @@ class SuperstructureModel(AbstractModel):
                     * self.CP[i]
                     * self.FLOW_OUT[u, i]
                     * self.kappa_1_ut[u, ut, i]
-                    for i in self.I
+                    for i in components
                 )
             else:
                 return self.REF_FLOW_UT[u, ut] == 0
@@ -675,15 +882,17 @@ class SuperstructureModel(AbstractModel):
         # fixme: Energy and cooling demand got mixed up, but are correctly implemented in the code
         #  (where heat should be, cooling is used and visa versa. Not great for readability!! sloppy
         def HeatBalance_1_rule(self, u, hi):
+            utilities = self._get_sparse_maps()['beta_utilities'][u, hi] if self.sparse else self.H_UT
             return self.ENERGY_DEMAND_HEAT[u, hi] == sum(
                 self.beta[u, ut, hi] * self.tau_c[ut, u] * self.REF_FLOW_UT[u, ut]
-                for ut in self.H_UT
+                for ut in utilities
             )
 
         def HeatBalance_2_rule(self, u, hi):
+            utilities = self._get_sparse_maps()['beta_utilities'][u, hi] if self.sparse else self.H_UT
             return self.ENERGY_DEMAND_COOL[u, hi] == sum(
                 self.beta[u, ut, hi] * self.tau_h[ut, u] * self.REF_FLOW_UT[u, ut]
-                for ut in self.H_UT
+                for ut in utilities
             )
 
         # Heating anc Cooling Balance (Either with or without Heat pump)
@@ -902,8 +1111,13 @@ class SuperstructureModel(AbstractModel):
 
         self.HeatBalance_1 = Constraint(self.U, self.HI, rule=HeatBalance_1_rule)
         self.HeatBalance_2 = Constraint(self.U, self.HI, rule=HeatBalance_2_rule)
-        self.HeatBalance_3 = Constraint(self.U, self.HI, rule=HeatBalance_3_rule)
-        self.HeatBalance_4 = Constraint(self.U, self.HI, rule=HeatBalance_4_rule)
+        if self.sparse:
+            # the interval balances sum over all units, so the constraints are the same for every unit u
+            self.HeatBalance_3 = Constraint(self.HI, rule=lambda m, hi: HeatBalance_3_rule(m, None, hi))
+            self.HeatBalance_4 = Constraint(self.HI, rule=lambda m, hi: HeatBalance_4_rule(m, None, hi))
+        else:
+            self.HeatBalance_3 = Constraint(self.U, self.HI, rule=HeatBalance_3_rule)
+            self.HeatBalance_4 = Constraint(self.U, self.HI, rule=HeatBalance_4_rule)
         self.HeatBalance_5 = Constraint(self.HI, rule=HeatBalance_5_rule)
         self.HeatBalance_6 = Constraint(self.HI, rule=HeatBalance_6_rule)
         self.HeatBalance_7 = Constraint(rule=HeatBalance_7_rule)
@@ -1041,8 +1255,16 @@ class SuperstructureModel(AbstractModel):
         self.UtCosts = Var()
 
         # Piece-Wise Linear CAPEX
-        self.lin_CAPEX_s = Var(self.U_C, self.JI, bounds=(0, 1))
-        self.lin_CAPEX_z = Var(self.U_C, self.JI, within=Binary)
+        if self.capexEncoding == 'binary':
+            self.lin_CAPEX_s = Var(self.U_C, self.JI, bounds=(0, 1))
+            self.lin_CAPEX_z = Var(self.U_C, self.JI, within=Binary)
+        elif self.capexEncoding == 'log':
+            # Gray code of the interval, one binary per bit
+            def capex_log_bits(self):
+                return list(range(1, max((len(self.JI) - 1).bit_length(), 1) + 1))
+
+            self.LOG_K = Set(initialize=capex_log_bits)
+            self.lin_CAPEX_log = Var(self.U_C, self.LOG_K, within=Binary)
         self.lin_CAPEX_lambda = Var(self.U_C, self.J, bounds=(0, 1))
         self.REF_FLOW_CAPEX = Var(self.U_C, within=NonNegativeReals)
 
@@ -1129,6 +1351,41 @@ class SuperstructureModel(AbstractModel):
                     + self.lin_CAPEX_s[u, j - 1]
                 )
 
+        # logarithmic and SOS2 formulation of the lambda constraints
+
+        def CapexEquation_4_sum_rule(self, u):
+            return sum(self.lin_CAPEX_lambda[u, j] for j in self.J) == 1
+
+        def capex_log_points(self, k, bit):
+            # points of which all neighbouring intervals have the given bit k in their Gray code
+            def gray(interval):
+                return ((interval - 1) ^ ((interval - 1) >> 1)) >> (k - 1) & 1
+
+            points = []
+            for j in self.J:
+                intervals = [ji for ji in (j - 1, j) if ji in self.JI]
+                if all(gray(ji) == bit for ji in intervals):
+                    points.append(j)
+            return points
+
+        def CapexEquation_5_log_rule(self, u, k):
+            return sum(self.lin_CAPEX_lambda[u, j] for j in capex_log_points(self, k, 1)) <= self.lin_CAPEX_log[u, k]
+
+        def CapexEquation_6_log_rule(self, u, k):
+            return (sum(self.lin_CAPEX_lambda[u, j] for j in capex_log_points(self, k, 0))
+                    <= 1 - self.lin_CAPEX_log[u, k])
+
+        def CapexEquation_sos2_rule(self, u):
+            return [self.lin_CAPEX_lambda[u, j] for j in self.J]
+
+        def CapexEquation_intervals_rule(self):
+            # intervals of length zero (padded points of the adaptive linearization) are never chosen
+            for u in self.U_C:
+                for j in self.JI:
+                    if j > 1 and self.lin_CAPEX_x[u, j + 1] == self.lin_CAPEX_x[u, j]:
+                        self.lin_CAPEX_z[u, j].fix(0)
+                        self.lin_CAPEX_s[u, j].fix(0)
+
         # Fixed Capital investment, Annual capital costs, Heat Pump, Returning costs, Total
         def CapexEquation_7_rule(self, u):
             return self.FCI[u] == self.EC[u] * (1 + self.DC[u] + self.IDC[u])
@@ -1185,9 +1442,18 @@ class SuperstructureModel(AbstractModel):
         self.CapexEquation_1 = Constraint(self.U_C, rule=CapexEquation_1_rule)
         self.CapexEquation_2 = Constraint(self.U_C, rule=CapexEquation_2_rule)
         self.CapexEquation_3 = Constraint(self.U_C, rule=CapexEquation_3_rule)
-        self.CapexEquation_4 = Constraint(self.U_C, rule=CapexEquation_4_rule)
-        self.CapexEquation_5 = Constraint(self.U_C, self.JI, rule=CapexEquation_5_rule)
-        self.CapexEquation_6 = Constraint(self.U_C, self.J, rule=CapexEquation_6_rule)
+        if self.capexEncoding == 'log':
+            self.CapexEquation_4 = Constraint(self.U_C, rule=CapexEquation_4_sum_rule)
+            self.CapexEquation_5 = Constraint(self.U_C, self.LOG_K, rule=CapexEquation_5_log_rule)
+            self.CapexEquation_6 = Constraint(self.U_C, self.LOG_K, rule=CapexEquation_6_log_rule)
+        elif self.capexEncoding == 'sos2':
+            self.CapexEquation_4 = Constraint(self.U_C, rule=CapexEquation_4_sum_rule)
+            self.CapexEquation_5 = SOSConstraint(self.U_C, rule=CapexEquation_sos2_rule, sos=2)
+        else:
+            self.CapexEquation_4 = Constraint(self.U_C, rule=CapexEquation_4_rule)
+            self.CapexEquation_5 = Constraint(self.U_C, self.JI, rule=CapexEquation_5_rule)
+            self.CapexEquation_6 = Constraint(self.U_C, self.J, rule=CapexEquation_6_rule)
+            self.CapexEquation_intervals = BuildAction(rule=CapexEquation_intervals_rule)
         self.CapexEquation_7 = Constraint(self.U_C, rule=CapexEquation_7_rule)
         self.CapexEquation_8 = Constraint(self.U_C, rule=CapexEquation_8_rule)
         self.CapexEquation_9 = Constraint(rule=CapexEquation_9_rule)
@@ -1397,6 +1663,15 @@ class SuperstructureModel(AbstractModel):
         self.EnvironmentalEquation7 = Constraint(self.U_PP, rule=GWP_7_rule)
         self.EnvironmentalEquation8 = Constraint(rule=GWP_8_rule)
 
+        # specific GWP (objective NPE)
+        self.NPE = Var()
+
+        def Specific_GWP_rule(self):
+            return self.NPE == self.GWP_TOT / self.sourceOrProductLoad
+            #return self.NPE == self.GWP_TOT
+
+        self.Specific_GWP_rule = Constraint(rule=Specific_GWP_rule)
+
     # **** FRESH WATER DEMAND EQUATIONS
     # --------------------------------------
 
@@ -1460,6 +1735,15 @@ class SuperstructureModel(AbstractModel):
         self.FreshWaterEquation4 = Constraint(rule=FWD_4_rule)
         self.FreshWaterEquation5 = Constraint(rule=FWD_5_rule)
 
+        # specific FWD (objective FWD)
+        self.NPFWD = Var()
+
+        def Specific_FWD_rule(self):
+            return self.NPFWD == self.FWD_TOT / self.sourceOrProductLoad
+            #return self.NPFWD == self.FWD_TOT
+
+        self.Specific_FWD_rule = Constraint(rule=Specific_FWD_rule)
+
     # *** LCA EQUATIONS ***
     # ------------------------
     def create_LCAEquations(self):
@@ -1605,7 +1889,18 @@ class SuperstructureModel(AbstractModel):
             if ind == False:
                 return Constraint.Skip
 
-        self.ProcessGroup_logic_1 = Constraint(self.U, self.UU, rule=ProcessGroup_logic_1_rule)
+        if self.sparse:
+            # only the unit pairs which are in the same group get a constraint
+            def ProcessGroup_pairs(self):
+                pairs = dict()
+                for j in self.groups.values():
+                    pairs.update(dict.fromkeys((u, uu) for u in j for uu in j if u in self.U and uu in self.UU))
+                return list(pairs)
+
+            self.GROUP_PAIRS = Set(dimen=2, initialize=ProcessGroup_pairs)
+            self.ProcessGroup_logic_1 = Constraint(self.GROUP_PAIRS, rule=ProcessGroup_logic_1_rule)
+        else:
+            self.ProcessGroup_logic_1 = Constraint(self.U, self.UU, rule=ProcessGroup_logic_1_rule)
 
         self.ProcessGroup_logic_2 = Constraint(self.U, numbers, rule=ProcessGroup_logic_2_rule)
 
@@ -1635,8 +1930,6 @@ class SuperstructureModel(AbstractModel):
         self.MainProductFlow = Var(initialize=0)
 
         self.NPC = Var()
-        self.NPFWD = Var()
-        self.NPE = Var()
         self.EBIT = Var()
         self.SumOfProductFlows = Var()
 
@@ -1679,14 +1972,6 @@ class SuperstructureModel(AbstractModel):
             return self.NPC == (self.TAC * 1000)/self.sourceOrProductLoad # in € per tonne of product per year (so your target production)
 
 
-        def Specific_GWP_rule(self):
-            return self.NPE == self.GWP_TOT / self.sourceOrProductLoad
-            #return self.NPE == self.GWP_TOT
-
-        def Specific_FWD_rule(self):
-            return self.NPFWD == self.FWD_TOT / self.sourceOrProductLoad
-            #return self.NPFWD == self.FWD_TOT
-
         def Specific_EBIT_rule(self):
             if self.loadType:  # in €/ton
                 return self.EBIT == (-self.TAC * 1000) / self.sourceOrProductLoad # in M€ (million euro)
@@ -1694,8 +1979,6 @@ class SuperstructureModel(AbstractModel):
                 return self.EBIT == (self.PROFITS_TOT - self.CAPEX - self.OPEX)
 
         self.Specific_NPC_rule = Constraint(rule=Specific_NPC_rule)
-        self.Specific_GWP_rule = Constraint(rule=Specific_GWP_rule)
-        self.Specific_FWD_rule = Constraint(rule=Specific_FWD_rule)
         self.Specific_EBIT_rule = Constraint(rule=Specific_EBIT_rule)
 
         # Definition of the used Objective Function
@@ -1745,3 +2028,44 @@ class SuperstructureModel(AbstractModel):
                 return self.objective_sense == 0  # 0 for minimizing
 
         self.objective_sense_rule = Constraint(rule=objective_sense_rule1)
+
+
+def calculate_omitted_blocks(model_instance):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+        Solved instance of the SuperstructureModel (see populateModel)
+
+    Description
+    -----------
+    Calculates the output blocks which are not part of the optimization (see Superstructure.set_modelBlocks)
+    from the solution of the model instance. At the first call the blocks are added to the instance with the
+    parameters of the Data_File and deactivated, so they are not part of the following solves. Their variables
+    are then calculated with the vectorized KPICalculator (see utils.kpi_calculator) after every solve.
+
+    """
+    omitted = [block for block in SuperstructureModel.MODEL_BLOCK_METHODS
+               if block not in getattr(model_instance, 'modelBlocks', SuperstructureModel.MODEL_BLOCK_METHODS)]
+    if not omitted or not hasattr(model_instance, '_omittedBlocksData'):
+        return
+
+    if getattr(model_instance, '_kpiCalculator', None) is None:
+        data = model_instance._omittedBlocksData[None]
+        constraints = []
+        for block in omitted:
+            existing = set(model_instance.component_map())
+            getattr(SuperstructureModel, SuperstructureModel.MODEL_BLOCK_METHODS[block])(model_instance)
+
+            for name, component in model_instance.component_map().items():
+                if name in existing:
+                    continue
+                if isinstance(component, Param) and name in data:
+                    component.store_values(data[name])
+                elif isinstance(component, Constraint):
+                    component.deactivate()
+                    constraints.extend(component.values())
+
+        model_instance._kpiCalculator = KPICalculator(constraints)
+
+    model_instance._kpiCalculator.evaluate()
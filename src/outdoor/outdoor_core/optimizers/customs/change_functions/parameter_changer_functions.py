@@ -30,6 +30,101 @@ elif parameterName == 'ProductPrice' or parameterName == 'materialcosts' or para
     nrComponentTuple = (unitNr)
 
 '''
+def parameter_index(parameter, metadata):
+    """
+    Returns the name and the index of the model parameter which is changed by a sensitivity / uncertainty parameter
+    with a single index
+    :param parameter: String, name of the sensitivity / uncertainty parameter (e.g. 'Split factors (myu)')
+    :param metadata: pd.Series
+    :return: (componentName, index)
+    """
+    if parameter == 'Split factors (myu)':
+        # nrComponentTuple = (unitNr, (targetUnit, component))
+        return 'myu', (metadata['Unit_Number'], int(metadata['Target_Unit']), metadata['Component'])
+    elif parameter == 'Conversion factor (theta)':
+        # nrComponentTuple = (unitNr, (reactionNr, component))
+        return 'theta', (metadata['Unit_Number'], metadata['Reaction_Number'], metadata['Component'])
+    elif parameter == 'Stoichiometric factor (gamma)':
+        # nrComponentTuple = (unitNr, (component, reactionNr))
+        return 'gamma', (metadata['Unit_Number'], (metadata['Component'], metadata['Reaction_Number']))
+    elif parameter == 'Yield factor (xi)':
+        # nrComponentTuple = (unitNr, component)
+        return 'xi', (metadata['Unit_Number'], metadata['Component'])
+    elif parameter == 'Costs (materialcosts)':
+        return 'materialcosts', metadata['Unit_Number']
+    elif parameter == 'Price (ProductPrice)':
+        return 'ProductPrice', metadata['Unit_Number']
+    elif parameter == 'Electricity price (delta_ut)':
+        return 'delta_ut', 'Electricity'
+    elif parameter == 'Chilling price (delta_ut)':
+        return 'delta_ut', 'Chilling'
+    elif parameter == 'Electricity demand (tau)':
+        return 'tau', (metadata['Unit_Number'], 'Electricity')
+    elif parameter == 'Chilling demand (tau)':
+        return 'tau', (metadata['Unit_Number'], 'Chilling')
+    elif parameter == 'Component concentration (conc)':
+        return 'conc', metadata['Unit_Number']
+    elif parameter == 'Operating and maintenance (K_OM)':
+        return 'K_OM', metadata['Unit_Number']
+    else:
+        raise ValueError('Parameter {} is not a parameter with a single index'.format(parameter))
+
+
+def feed_composition_indices(Instance, metadata):
+    """
+    Returns the index of the feed composition (phi) of the changed component and the indices of the other components
+    in the feed. The change of the component is subtracted equally from the other components, so the feed
+    composition still sums to 1.
+    :param Instance: model instance
+    :param metadata: pd.Series
+    :return: (index, otherIndices)
+    """
+    # get the set of components in the feed from the model instance
+    componentsList = []
+    for i in Instance.I:
+        if Instance.phi[metadata['Unit_Number'], i].value > 0:
+            componentsList.append(i)
+
+    if metadata['Component'] not in componentsList:
+        raise ValueError('Component {} is not part of the feed of unit {}, its feed composition (phi) can not be '
+                         'changed'.format(metadata['Component'], metadata['Unit_Number']))
+    # the change is divided over the len(componentsList) - 1 other components of the feed
+    componentsList.remove(metadata['Component'])
+
+    index = (metadata['Unit_Number'], metadata['Component'])
+    return index, [(metadata['Unit_Number'], i) for i in componentsList]
+
+
+def heating_demand_indices(parameter, metadata):
+    """
+    Returns the indices of the heating demand of the unit in the parameters tau, tau_h and tau_c
+    :param parameter: String, 'Heating demand 1 (tau_h)' or 'Heating demand 2 (tau_h)'
+    :param metadata: pd.Series
+    :return: dictionary {componentName: index}
+    """
+    heat = 'Heat' if parameter == 'Heating demand 1 (tau_h)' else 'Heat2'
+    return {'tau': (metadata['Unit_Number'], heat),
+            'tau_h': (heat, metadata['Unit_Number']),
+            'tau_c': (heat, metadata['Unit_Number'])}
+
+
+def heat_price_intervals(Instance, superstructure, parameter):
+    """
+    Returns the heat intervals whose heat price (delta_q) is the price of the temperature level of the parameter
+    :param Instance: model instance
+    :param superstructure: Superstructure object
+    :param parameter: String, e.g. 'Heating price high (delta_q)'
+    :return: list of heat intervals
+    """
+    levels = {'Heating price super (delta_q)': 'super', 'Heating price high (delta_q)': 'high',
+              'Heating price medium (delta_q)': 'medium', 'Heating price low (delta_q)': 'low'}
+    if parameter not in levels:
+        raise ValueError('Parameter Name {} not correct for heat costs change'.format(parameter))
+
+    price = superstructure.temperaturePricesDict[levels[parameter]]
+    return [i for i in Instance.HI.value if Instance.delta_q[i].value == price]
+
+
 def change_myu_parameter(Instance, Value, metadata, *args):
     """
     changes the split factors in the model instance to the given value of a specific component in a specific unit
@@ -39,8 +134,7 @@ def change_myu_parameter(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr, (targetUnit, component))
-    index = (metadata['Unit_Number'], int(metadata['Target_Unit']), metadata['Component'])
+    _, index = parameter_index('Split factors (myu)', metadata)
     try :
         Instance.myu[index] = Value
     except KeyError:
@@ -60,39 +154,23 @@ def change_phi_parameter(Instance, Value, metadata, *args):
     :return: model instance
     """
     # nrComponentTuple = (unitNr, component)
-    # get the set of components from the model instance
-    components = Instance.I.value
-    componentsList = []
-    for i in components:
-        index = (metadata['Unit_Number'], i)
-        if Instance.phi[index].value > 0:
-            componentsList.append(i)
-
-    # index of the component parameter to change
-    index = (metadata['Unit_Number'], metadata['Component'])
-    originalValue = Instance.phi[index]
-    delta = Value - originalValue
-
-    # percent to change equally over the other components is:
-    toSubtract = delta / (len(componentsList)-1)
-
-    # change the value of the component parameters
     try:
-        index = (metadata['Unit_Number'], metadata['Component'])
-        Instance.phi[index] = Value
-    except:
-        raise ValueError('Index {} is not a valid set of the Parameter phi (Feed Composition)'.format(index))
-
-    # pop metadata['Component'] from the list
-    componentsList.remove(metadata['Component'])
+        index, otherIndices = feed_composition_indices(Instance, metadata)
+    except KeyError:
+        raise ValueError('Index {} is not a valid set of the Parameter phi (Feed Composition)'.format(
+            (metadata['Unit_Number'], metadata['Component'])))
 
-    # change the value of the component parameters which have to be changed equally so the sum of the feed composition
-    # remains 1
+    originalValue = Instance.phi[index].value
+    delta = Value - originalValue
 
+    # change the value of the component parameter
+    Instance.phi[index] = Value
 
-    for i in componentsList:
-        indexB = (metadata['Unit_Number'], i)
-        Instance.phi[indexB] = Instance.phi[indexB].value - toSubtract
+    # change the value of the other components equally so the sum of the feed composition remains 1
+    if otherIndices:
+        toSubtract = delta / len(otherIndices)
+        for indexB in otherIndices:
+            Instance.phi[indexB] = Instance.phi[indexB].value - toSubtract
 
     # test if the sum of the feed composition is 1 after the change
     # # add the original value of the component to the list again
@@ -116,8 +194,7 @@ def change_theta_parameter(Instance, Value, metadata, *args):
     :return: model instance
     """
 
-    # nrComponentTuple = (unitNr, (reactionNr, component))
-    index = (metadata['Unit_Number'], metadata['Reaction_Number'], metadata['Component'])
+    _, index = parameter_index('Conversion factor (theta)', metadata)
     try:
         Instance.theta[index] = Value
     except KeyError:
@@ -135,8 +212,7 @@ def change_stoich_parameter(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr, (component, reactionNr))
-    index = (metadata['Unit_Number'], (metadata['Component'], metadata['Reaction_Number']))
+    _, index = parameter_index('Stoichiometric factor (gamma)', metadata)
     try:
         Instance.gamma[index] = Value
     except KeyError:
@@ -153,8 +229,7 @@ def change_xi_parameter(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr, component)
-    index = (metadata['Unit_Number'], metadata['Component'])
+    _, index = parameter_index('Yield factor (xi)', metadata)
     try:
         Instance.xi[index] = Value
     except KeyError:
@@ -170,8 +245,7 @@ def change_material_costs(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr)
-    index = (metadata['Unit_Number'])
+    _, index = parameter_index('Costs (materialcosts)', metadata)
     try:
         Instance.materialcosts[index] = Value
     except KeyError:
@@ -187,8 +261,7 @@ def change_product_price(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr)
-    index = (metadata['Unit_Number'])
+    _, index = parameter_index('Price (ProductPrice)', metadata)
     Instance.ProductPrice[index] = Value
     # don't need to check if the index is valid because the their is a general error function in the change_params.py
     # which is called if the parameter is not in the variation parameter set
@@ -198,13 +271,12 @@ def change_utility_costs(Instance, Value, metadata, *args):
 
     Parameter = args[1]
 
-    if Parameter =='Electricity price (delta_ut)':
-        Instance.delta_ut['Electricity'] = Value
-    elif Parameter =='Chilling price (delta_ut)':
-        Instance.delta_ut['Chilling'] = Value
-    else:
+    if Parameter not in ('Electricity price (delta_ut)', 'Chilling price (delta_ut)'):
         raise ValueError('Parameter Name not correct for utility costs change')
 
+    _, index = parameter_index(Parameter, metadata)
+    Instance.delta_ut[index] = Value
+
     return Instance
 
 def change_heat_costs(Instance, Value, metadata, *args):
@@ -220,32 +292,9 @@ def change_heat_costs(Instance, Value, metadata, *args):
     param = args[1]
 
     superstructureData = args[0] # superstructure data
-    priceDict = superstructureData.temperaturePricesDict
-
-
-    heatIntervalSet = Instance.HI.value
-    #priceSet = Instance.delta_q.value
-
-    if param == 'Heating price super (delta_q)': # super
-        for i in heatIntervalSet:
-            if Instance.delta_q[i].value == priceDict['super']:
-                Instance.delta_q[i] = Value # change the value of the parameter to the new value
-    elif param == 'Heating price high (delta_q)': # high
-        for i in heatIntervalSet:
-            if Instance.delta_q[i].value == priceDict['high']:
-                Instance.delta_q[i] = Value
-
-    elif param == 'Heating price medium (delta_q)': # medium
-        for i in heatIntervalSet:
-            if Instance.delta_q[i].value == priceDict['medium']:
-                Instance.delta_q[i] = Value
-
-    elif param == 'Heating price low (delta_q)': # low
-        for i in heatIntervalSet:
-            if Instance.delta_q[i].value == priceDict['low']:
-                Instance.delta_q[i] = Value
-    else:
-        raise ValueError('Parameter Name {} not correct for heat costs change'.format(param))
+
+    for i in heat_price_intervals(Instance, superstructureData, param):
+        Instance.delta_q[i] = Value # change the value of the parameter to the new value
 
     return Instance
 
@@ -259,14 +308,10 @@ def change_heating_demand(Instance, Value, metadata, *args):
     :return: model instance
     """
 
-    # nrComponentTuple = (unitNr)
     param = args[1]
-    if param == 'Heating demand 1 (tau_h)':
-        index = ('Heat',metadata['Unit_Number'])
-        index2 = (metadata['Unit_Number'],'Heat')
-    else:
-        index = ('Heat2',metadata['Unit_Number'])
-        index2 = (metadata['Unit_Number'], 'Heat2')
+    indices = heating_demand_indices(param, metadata)
+    index = indices['tau_h']
+    index2 = indices['tau']
 
     if Value > 0:
         try:
@@ -276,7 +321,7 @@ def change_heating_demand(Instance, Value, metadata, *args):
             raise ValueError('Index {} is not a valid set of the Parameter heat_demand (Heat Demand)'.format(index))
     else:
         try:
-            Instance.tau_c[index] = Value
+            Instance.tau_c[indices['tau_c']] = Value
             Instance.tau[index2] = Value
         except:
             raise ValueError('Index {} is not a valid set of the Parameter heat_demand (Heat Demand)'.format(index))
@@ -293,12 +338,9 @@ def change_utility_demand(Instance, Value, metadata, *args):
     :return: model instance
     """
     param = args[1]
-    if param == 'Electricity demand (tau)':
-        index = (metadata['Unit_Number'], 'Electricity')
-        #index2 = (metadata['Unit_Number'],'Electricity')
-    else:
-        index = (metadata['Unit_Number'], 'Chilling')
-        #index2 = (metadata['Unit_Number'],'Chilling')
+    if param != 'Electricity demand (tau)':
+        param = 'Chilling demand (tau)'
+    _, index = parameter_index(param, metadata)
 
     try:
         Instance.tau[index] = Value
@@ -315,8 +357,7 @@ def change_concentration_demand(Instance, Value, metadata, *args):
     :param args: list
     :return: model instance
     """
-    # nrComponentTuple = (unitNr, component)
-    index = (metadata['Unit_Number'])
+    _, index = parameter_index('Component concentration (conc)', metadata)
     try:
         Instance.conc[index] = Value
     except KeyError:
@@ -352,7 +393,7 @@ def change_capital_costs(Instance, Value, metadata, *args):
 
 def change_opex_factor(Instance, Value, metadata, *args):
 
-        Index = metadata['Unit_Number']
+        _, Index = parameter_index('Operating and maintenance (K_OM)', metadata)
 
         Instance.K_OM[Index] = Value
 
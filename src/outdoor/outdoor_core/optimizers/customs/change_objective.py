@@ -6,6 +6,7 @@ Created on Tue Jun 15 11:54:16 2021
 @author: philippkenkel
 """
 
+import numpy as np
 from pyomo.environ import *
 
 from ...utils.timer import time_printer
@@ -46,15 +47,23 @@ def change_objective_function(Instance, Obj, results=None, MultiObjectives=None)
         npfwd = [MultiObjectives["FWD"][1]]
 
 
-        # Add values from all preceding single-criterion runs
-        for k, v in results._results_data.items():
-            npc_temp = v._data["NPC"]
-            npe_temp = v._data["NPE"]
-            npfwd_temp = v._data["NPFWD"]
-
-            npc.append(npc_temp)
-            npe.append(npe_temp)
-            npfwd.append(npfwd_temp)
+        # Add values from all preceding single-criterion runs, or the columns of their payoff table
+        if isinstance(results, dict) and 'payoff' in results:
+            # rows of the payoff table which were not solved are NaN and left out
+            columns = {objective: column[~np.isnan(column)]
+                       for objective, column in zip(results['objectives'], results['payoff'].T)}
+            npc.extend(columns["NPC"])
+            npe.extend(columns["NPE"])
+            npfwd.extend(columns["FWD"])
+        else:
+            for k, v in results._results_data.items():
+                npc_temp = v._data["NPC"]
+                npe_temp = v._data["NPE"]
+                npfwd_temp = v._data["NPFWD"]
+
+                npc.append(npc_temp)
+                npe.append(npe_temp)
+                npfwd.append(npfwd_temp)
 
         # Check for best and worst values
 
@@ -6,15 +6,11 @@ Created on Tue Jun 15 11:54:16 2021
 @author: philippkenkel
 """
 
-from ...utils.timer import time_printer
-#from pyomo.environ import *
-from numpy import linspace
-
-from .change_functions.parameter_changer_functions import * # contains all funcitions to change the parameters in the model instance called in change_parameter
 # from pyomo.environ import *
 from numpy import linspace
 
 from .change_functions.parameter_changer_functions import *  # contains all funcitions to change the parameters in the model instance called in change_parameter
+from ...utils.linearizer import capex_calculator
 from ...utils.timer import time_printer
 
 
@@ -66,10 +62,51 @@ def error_func(*args):
     raise ValueError("Parameter {} not in Variation Parameter set deffining all changer functions".format(args[-1]))
 
 
-def change_parameter(Instance, parameter, value, metadata=None, superstructure=None, printTimer=True):
+# maps the parameter names of the sensitivity / uncertainty input to the functions changing them in the model instance
+PARAMETER_CHANGER_FUNCTIONS = {
+    # these are also parameters that can be changed in the stochastic mode
+    'Split factors (myu)': change_myu_parameter,
+    'Feed Composition (phi)': change_phi_parameter,
+    'Conversion factor (theta)': change_theta_parameter,
+    'Stoichiometric factor (gamma)': change_stoich_parameter,
+    'Yield factor (xi)': change_xi_parameter,
+    'Costs (materialcosts)': change_material_costs,
+    'Price (ProductPrice)': change_product_price,
+
+    "Electricity price (delta_ut)": change_utility_costs,
+    "Chilling price (delta_ut)": change_utility_costs,
+
+    "Heating price super (delta_q)": change_heat_costs,
+    "Heating price high (delta_q)": change_heat_costs,
+    "Heating price medium (delta_q)": change_heat_costs,
+    "Heating price low (delta_q)": change_heat_costs,
+
+    'Heating demand 1 (tau_h)': change_heating_demand,
+    'Heating demand 2 (tau_h)': change_heating_demand,
+    'Electricity demand (tau)': change_utility_demand,
+    'Chilling demand (tau)': change_utility_demand,
+
+    'Component concentration (conc)': change_concentration_demand,
+    'Reference Capital costs (C_Ref)': change_capital_costs,
+    'Operating and maintenance (K_OM)': change_opex_factor,
+
+
+    # "component_concentration": change_concentration_demand,
+    # "heating_demand": change_heat_demand,
+    # "opex": change_opex_factor,
+    # "simple_capex": change_simple_capex,
+    # "product_price": change_product_price,
+}
 
-    timer = time_printer(programm_step = 'Changing parameter {}'.format(parameter), printTimer=printTimer)
 
+def strip_unit_number(parameter):
+    """
+    Removes the unit number which calculate_sensitive_parameters adds to the parameter name,
+    e.g. 'Split factors (myu)_5' becomes 'Split factors (myu)'
+
+    :param parameter: String
+    :return: String
+    """
     if '_' in parameter:
         #parameter = '_'.join(parameter.rsplit('_', 1)[:-1])
         # This will give you the whole string except the last split-off fraction which is the unit number.
@@ -78,55 +115,249 @@ def change_parameter(Instance, parameter, value, metadata=None, superstructure=N
         # if the second part of the parameter name is a number, parameter becomes parameterN
         if parameterSuffix.isnumeric():
             parameter = '_'.join(parameter.rsplit('_', 1)[:-1]) # remove the number from the parameter name
+    return parameter
 
 
-    function_dictionary = {
-        # these are also parameters that can be changed in the stochastic mode
-        'Split factors (myu)': change_myu_parameter,
-        'Feed Composition (phi)': change_phi_parameter,
-        'Conversion factor (theta)': change_theta_parameter,
-        'Stoichiometric factor (gamma)': change_stoich_parameter,
-        'Yield factor (xi)': change_xi_parameter,
-        'Costs (materialcosts)': change_material_costs,
-        'Price (ProductPrice)': change_product_price,
-
-        "Electricity price (delta_ut)": change_utility_costs,
-        "Chilling price (delta_ut)": change_utility_costs,
-
-        "Heating price super (delta_q)": change_heat_costs,
-        "Heating price high (delta_q)": change_heat_costs,
-        "Heating price medium (delta_q)": change_heat_costs,
-        "Heating price low (delta_q)": change_heat_costs,
-
-        'Heating demand 1 (tau_h)': change_heating_demand,
-        'Heating demand 2 (tau_h)': change_heating_demand,
-        'Electricity demand (tau)': change_utility_demand,
-        'Chilling demand (tau)': change_utility_demand,
-
-        'Component concentration (conc)': change_concentration_demand,
-        'Reference Capital costs (C_Ref)': change_capital_costs,
-        'Operating and maintenance (K_OM)': change_opex_factor,
+def change_parameter(Instance, parameter, value, metadata=None, superstructure=None, printTimer=True):
 
+    if printTimer:
+        timer = time_printer(programm_step = 'Changing parameter {}'.format(parameter), printTimer=printTimer)
 
-        # "component_concentration": change_concentration_demand,
-        # "heating_demand": change_heat_demand,
-        # "opex": change_opex_factor,
-        # "simple_capex": change_simple_capex,
-        # "product_price": change_product_price,
-    }
+    parameter = strip_unit_number(parameter)
 
-    function_dictionary.get(parameter, error_func)(Instance, value, metadata, superstructure, parameter)
+    PARAMETER_CHANGER_FUNCTIONS.get(parameter, error_func)(Instance, value, metadata, superstructure, parameter)
     #timer = time_printer(timer, 'Change parameter')
     return Instance
 
 
+class ParameterUpdatePlan:
+    """
+    Class Description
+    -----------------
+    Compiled version of change_parameter for sweeps. The parameter names are parsed, the indices of the model
+    parameters are looked up and the affected parameter data objects are collected once when the plan is created.
+    Afterwards a full vector of values (one value per parameter of the plan) is written to the model instance in
+    one pass with apply(), which makes it suitable for one-way sensitivity, cross-sensitivity and scenario runs.
+
+    The plan remembers the values of the model instance at creation time, which are used as the base for the
+    feed composition (phi) and can be restored with reset().
+
+    The parameters of the plan have to be mutable in the model instance (see prepare_mutable_parameters).
+
+    Example:
+        plan = ParameterUpdatePlan(modelInstance, [(name1, metadata1), (name2, metadata2)], superstructure)
+        for point in points:
+            plan.apply(point)
+            ...
+        plan.reset()
+    """
+
+    def __init__(self, Instance, parameters, superstructure=None):
+        """
+        :param Instance: populated model instance
+        :param parameters: list of (parameterName, metadata) tuples or the dictionary
+            {parameterName: (values, metadata)} returned by calculate_sensitive_parameters
+        :param superstructure: Superstructure object, needed for the heat prices and capital costs
+        """
+        if isinstance(parameters, dict):
+            parameters = [(name, valuesMetadata[1]) for name, valuesMetadata in parameters.items()]
+
+        self.Instance = Instance
+        self.superstructure = superstructure
+        self.parameterNames = [name for name, _ in parameters]
+
+        self._baseValues = dict()  # {id(paramData): (paramData, value)} to reset the model instance
+        self._baseCapexReferences = dict()  # {unitObject: C_Ref} to reset the capital costs
+        self._baseParameterValues = dict()  # {parameterName: value at creation time} (see base_value)
+        self._setters = []
+        for name, metadata in parameters:
+            self._compiling = name
+            self._setters.append(self._compile(name, metadata))
+
+    def __len__(self):
+        return len(self._setters)
+
+    def apply(self, values):
+        """
+        Writes one value per parameter of the plan to the model instance
+
+        :param values: list / array with the values in the order of self.parameterNames or a dictionary
+            {parameterName: value}, parameters missing from the dictionary are left untouched
+        :return: model instance
+        """
+        if isinstance(values, dict):
+            for name, setter in zip(self.parameterNames, self._setters):
+                if name in values:
+                    setter(values[name])
+        else:
+            if len(values) != len(self._setters):
+                raise ValueError('Expected {} values, got {}'.format(len(self._setters), len(values)))
+            for setter, value in zip(self._setters, values):
+                setter(value)
+
+        return self.Instance
+
+    def reset(self):
+        """
+        Restores the values of the model instance (and the reference capital costs of the units) from the
+        moment the plan was created
+        """
+        for paramData, value in self._baseValues.values():
+            paramData.value = value
+
+        for unit, C_Ref in self._baseCapexReferences.items():
+            unit.CAPEX_factors['C_Ref'][unit.Number] = C_Ref
+
+        return self.Instance
+
+    def base_value(self, parameterName):
+        """
+        :param parameterName: name of a parameter of the plan
+        :return: value of the parameter in the model instance when the plan was created (the nominal value of a
+            sweep), None if the plan does not know it
+        """
+        return self._baseParameterValues.get(parameterName)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # compilation of the single parameters
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def _get_param_data(self, componentName, index, parameter):
+        """
+        Returns the parameter data object of component[index] and stores its current value to reset it later
+        """
+        component = getattr(self.Instance, componentName)
+        if not component.mutable:
+            raise ValueError('Parameter {} is not mutable, use prepare_mutable_parameters before populating the '
+                             'model to change {}'.format(componentName, parameter))
+        try:
+            paramData = component[index]
+        except KeyError:
+            raise ValueError('Index {} is not a valid set of the Parameter {}'.format(index, componentName))
+
+        # only the first (original) value of an entry is stored
+        self._baseValues.setdefault(id(paramData), (paramData, paramData.value))
+        # the first entry of a parameter is its target (e.g. phi of the changed component)
+        self._baseParameterValues.setdefault(self._compiling, self._baseValues[id(paramData)][1])
+        return paramData
+
+    def _compile(self, parameterName, metadata):
+        """
+        Returns a function setter(value) which writes the value of the parameter into the model instance
+        """
+        parameter = strip_unit_number(parameterName)
+
+        if parameter not in PARAMETER_CHANGER_FUNCTIONS:
+            error_func(parameter)
+
+        if parameter == 'Feed Composition (phi)':
+            return self._compile_phi(metadata)
+
+        elif parameter in ("Heating price super (delta_q)", "Heating price high (delta_q)",
+                           "Heating price medium (delta_q)", "Heating price low (delta_q)"):
+            targets = [self._get_param_data('delta_q', i, parameter)
+                       for i in heat_price_intervals(self.Instance, self.superstructure, parameter)]
+            return self._setter(targets)
+
+        elif parameter in ('Heating demand 1 (tau_h)', 'Heating demand 2 (tau_h)'):
+            indices = heating_demand_indices(parameter, metadata)
+            tau = self._get_param_data('tau', indices['tau'], parameter)
+            tau_h = self._get_param_data('tau_h', indices['tau_h'], parameter)
+            tau_c = self._get_param_data('tau_c', indices['tau_c'], parameter)
+
+            def setter(value):
+                tau.value = value
+                if value > 0:
+                    tau_h.value = value
+                else:
+                    tau_c.value = value
+
+            return setter
+
+        elif parameter == 'Reference Capital costs (C_Ref)':
+            return self._compile_capital_costs(metadata)
+
+        # parameters with a single index
+        componentName, index = parameter_index(parameter, metadata)
+        return self._setter([self._get_param_data(componentName, index, parameter)])
+
+    @staticmethod
+    def _setter(targets):
+        if len(targets) == 1:
+            paramData = targets[0]
+
+            def setter(value):
+                paramData.value = value
+        else:
+            def setter(value):
+                for paramData in targets:
+                    paramData.value = value
+        return setter
+
+    def _compile_phi(self, metadata):
+        """
+        The feed composition is changed such that the sum of the composition stays 1, the difference is subtracted
+        equally from the other components of the feed (see change_phi_parameter). The components present in the
+        feed and their base values are only determined once.
+        """
+        parameter = 'Feed Composition (phi)'
+        index, otherIndices = feed_composition_indices(self.Instance, metadata)
+        target = self._get_param_data('phi', index, parameter)
+        baseTarget = target.value
+
+        others = [self._get_param_data('phi', indexB, parameter) for indexB in otherIndices]
+        baseOthers = [paramData.value for paramData in others]
+        nOthers = len(others)
+
+        def setter(value):
+            target.value = value
+            if nOthers:
+                toSubtract = (value - baseTarget) / nOthers
+                for paramData, base in zip(others, baseOthers):
+                    paramData.value = base - toSubtract
+
+        return setter
+
+    def _compile_capital_costs(self, metadata):
+        """
+        The piece-wise linear capital costs have to be recalculated for every value, only the unit object and the
+        parameter data of the linearisation points are looked up once.
+        """
+        parameter = 'Reference Capital costs (C_Ref)'
+        unitNr = metadata['Unit_Number']
+        superstructure = self.superstructure
+
+        unit = None
+        for i in superstructure.UnitsList:
+            if i.Number == unitNr:
+                unit = i
+                break
+        if unit is None:
+            raise ValueError('Unit {} not found in the superstructure to change {}'.format(unitNr, parameter))
+
+        self._baseCapexReferences.setdefault(unit, unit.CAPEX_factors['C_Ref'][unitNr])
+        self._baseParameterValues.setdefault(self._compiling, self._baseCapexReferences[unit])
+        points = [j for (u, j) in self.Instance.lin_CAPEX_x.keys() if u == unitNr]
+        x_data = {j: self._get_param_data('lin_CAPEX_x', (unitNr, j), parameter) for j in points}
+        y_data = {j: self._get_param_data('lin_CAPEX_y', (unitNr, j), parameter) for j in points}
+
+        def setter(value):
+            unit.CAPEX_factors['C_Ref'][unitNr] = value
+            (x_vals, y_vals) = capex_calculator(unit, superstructure.CECPI, superstructure.linearizationDetail)
+            for j in points:
+                x_data[j].value = x_vals['lin_CAPEX_x'][unitNr, j]
+                y_data[j].value = y_vals['lin_CAPEX_y'][unitNr, j]
+
+        return setter
+
+
 def prepare_mutable_parameters(ModelInstance, input_data):
     def set_mutable(instance, parameter):
         # for parameters where more than 1 model.parameter is changed at the same time
         if parameter == "Reference Capital costs (C_Ref)":
             instance.lin_CAPEX_x._mutable = True
             instance.lin_CAPEX_y._mutable = True
-        elif parameter == "Heating demand (tau_h)":
+        elif parameter.startswith("Heating demand"):
             instance.tau_h._mutable = True
             instance.tau_c._mutable = True
             instance.tau._mutable = True
@@ -134,7 +365,7 @@ def prepare_mutable_parameters(ModelInstance, input_data):
 
     for i in input_data:
         param_name = i.iloc[0]
-        if param_name == "Reference Capital costs (C_Ref)" or param_name == "Heating demand (tau_h)":
+        if param_name == "Reference Capital costs (C_Ref)" or param_name.startswith("Heating demand"):
             # if more than one parameter is changed at the same time, we need to set them mutable using the
             # set_mutable function
             set_mutable(ModelInstance, param_name)
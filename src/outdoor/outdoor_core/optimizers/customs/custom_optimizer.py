@@ -9,31 +9,44 @@ Created on Tue Jun 15 12:19:19 2021
 
 import copy
 import logging
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
+import pandas as pd
 import pyomo.environ as pyo
 from pyomo.environ import *
+from pyomo.opt import TerminationCondition
 from shapely.geometry import MultiPoint, Point
 import random
 
 from .change_objective import change_objective_function
+from .payoff_table import objective_expression, payoff_settings, payoff_table
 from .change_params import (
     calculate_sensitive_parameters,
     change_parameter,
+    ParameterUpdatePlan,
 )
+from .solve_scheduler import SolveScheduler
 from ..main_optimizer import SingleOptimizer
-from ...model.optimization_model import SuperstructureModel
+from ...model.optimization_model import SuperstructureModel, calculate_omitted_blocks
+from ...output_classes.model_output import ModelOutput
 from ...output_classes.multi_model_output import MultiModelOutput
 from ...output_classes.stochastic_model_output import StochasticModelOutput_mpi_sppy
+from ...utils.feasibility_screen import load_unit, print_screen_report, screen_scenarios
+from ...utils.parametric_lp import fix_binaries, parametric_analysis, release_binaries, solve_fixed_design
 from ...utils.progress_bar import print_progress_bar
+from ...utils.scaling import scale_and_solve
+from ...utils.scenario_reduction import fan_out, group_scenarios, print_reduction_report, scenario_reduction_settings
+from ...utils.solve_cache import get_solve_cache, load_solution
+from ...utils.solver_status import has_solution
 from ...utils.timer import time_printer
 
 
 class MCDAOptimizer(SingleOptimizer):
-    def __init__(self, solver_name, solver_interface, solver_options=None, mcda_data=None):
-        super().__init__(solver_name, solver_interface, solver_options)
+    def __init__(self, solver_name, solver_interface, solver_options=None, mcda_data=None, superstructure=None):
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
         self.mcda_data = mcda_data
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.superstructure = superstructure
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
 
     def run_optimization(self,
                          model_instance,
@@ -50,14 +63,15 @@ class MCDAOptimizer(SingleOptimizer):
 
         model_output = MultiModelOutput(optimization_mode="multi-objective")
 
-        for k, v in self.mcda_data.items():
-            change_objective_function(model_instance, k)
-            single_solved = self.single_optimizer.run_optimization(model_instance)
-            single_solved._tidy_data()
-            model_output.add_process(k, single_solved)
+        # the optima of the single criteria are the rows of the (shared) payoff table
+        payoff = payoff_table(self.single_optimizer, model_instance, list(self.mcda_data),
+                              **payoff_settings(self.superstructure))
+        for k in self.mcda_data:
+            if payoff['anchors'][k] is not None:
+                model_output.add_process(k, payoff['anchors'][k])
 
         print("MCDA reformulation")
-        change_objective_function(model_instance, "MCDA", model_output, self.mcda_data)
+        change_objective_function(model_instance, "MCDA", payoff, self.mcda_data)
         single_solved = self.single_optimizer.run_optimization(model_instance)
         single_solved._tidy_data()
         model_output.add_process("MCDA", single_solved)
@@ -71,11 +85,15 @@ class MultiObjectiveOptimizer(SingleOptimizer):
     """
     This class is used to solve a multi-objective optimization problem between two objectives
     with the goal of finding the pareto front
+
+    With multi_data['method'] = 'augmecon2' (or more than two multi_data['objectives']) the front is calculated with
+    the augmented epsilon-constraint method for two or more objectives (see run_augmecon).
     """
-    def __init__(self, solver_name, solver_interface, solver_options=None, multi_data=None):
-        super().__init__(solver_name, solver_interface, solver_options)
+    def __init__(self, solver_name, solver_interface, solver_options=None, multi_data=None, superstructure=None):
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
         self.multi_data = multi_data
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.superstructure = superstructure
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
 
     def run_optimization(self,
                          model_instance,
@@ -87,6 +105,9 @@ class MultiObjectiveOptimizer(SingleOptimizer):
                          count_variables_constraints=False,
                          ):
 
+        if self.multi_data.get('method', 'epsilon') == 'augmecon2' or len(self.multi_data.get('objectives', ())) > 2:
+            return self.run_augmecon(model_instance)
+
         # set up:
         model_instance_original = copy.deepcopy(model_instance)
         model_output = MultiModelOutput(optimization_mode="multi-objective")
@@ -110,17 +131,14 @@ class MultiObjectiveOptimizer(SingleOptimizer):
             self.bound_region_objective(model_instance, objective1, upperBound, "upper")
 
 
-        # run the optimization for the first objective
-        self.change_model_objective(model_instance, objective1)
-        single_solved_obj1 = self.single_optimizer.run_optimization(model_instance)
-        single_solved_obj1._tidy_data()
-        # model_output.add_process("maxObjective1", single_solved_obj1)
-
-        # run the optimization for the second objective
-        self.change_model_objective(model_instance, objective2)
-        single_solved_obj2 = self.single_optimizer.run_optimization(model_instance)
-        single_solved_obj2._tidy_data()
-        # model_output.add_process("maxObjective2", single_solved_obj2)
+        # the optima of the first and second objective (anchors of the front) from the shared payoff table
+        payoff = payoff_table(self.single_optimizer, model_instance, [objective1, objective2],
+                              **payoff_settings(self.superstructure))
+        single_solved_obj1 = payoff['anchors'][objective1]
+        single_solved_obj2 = payoff['anchors'][objective2]
+        if single_solved_obj1 is None or single_solved_obj2 is None:
+            raise Exception("The optima of {} and {} are the anchors of the front, they were not found within the "
+                            "limits of the solver".format(objective1, objective2))
 
         # get the result of the first objective from the second optimization problem
         if objective1 in single_solved_obj1._data["IMPACT_CATEGORIES"]:
@@ -189,22 +207,18 @@ class MultiObjectiveOptimizer(SingleOptimizer):
             # create an instance that is bound by the design space options
             bound_instance = self.create_bounded_design_space(model_instance_original, design_space_bounds)
 
-            # get the 4 corners of the trapezoid
-            self.change_model_objective(bound_instance, objective1)
-            opt_1 = self.single_optimizer.run_optimization(bound_instance)
-            opt_1._tidy_data()
-
-            self.change_model_objective(bound_instance, objective1, flipSense=True)
-            opt_2 = self.single_optimizer.run_optimization(bound_instance)
-            opt_2._tidy_data()
-
-            self.change_model_objective(bound_instance, objective2)
-            opt_3 = self.single_optimizer.run_optimization(bound_instance)
-            opt_3._tidy_data()
-
-            self.change_model_objective(bound_instance, objective2, flipSense=True)
-            opt_4 = self.single_optimizer.run_optimization(bound_instance)
-            opt_4._tidy_data()
+            # get the 4 corners of the trapezoid, the best and worst value of both objectives
+            best = payoff_table(self.single_optimizer, bound_instance, [objective1, objective2],
+                                **payoff_settings(self.superstructure))
+            worst = payoff_table(self.single_optimizer, bound_instance, [objective1, objective2], flipSense=True,
+                                 **payoff_settings(self.superstructure))
+            opt_1 = best['anchors'][objective1]
+            opt_2 = worst['anchors'][objective1]
+            opt_3 = best['anchors'][objective2]
+            opt_4 = worst['anchors'][objective2]
+            if None in (opt_1, opt_2, opt_3, opt_4):
+                raise Exception("The corners of the design space of {} and {} were not found within the limits of "
+                                "the solver".format(objective1, objective2))
 
             # Determine the x points for objective1
             x_points_obj_1 = [
@@ -286,6 +300,141 @@ class MultiObjectiveOptimizer(SingleOptimizer):
 
         return model_output
 
+    def run_augmecon(self, model_instance):
+        """
+        Parameters
+        ----------
+        model_instance : PYOMO ConcreteModel
+
+        Returns
+        -------
+        model_output : MultiModelOutput
+            The efficient solutions (named pareto_bound_<n>) and the table of the front (see get_pareto_table)
+
+        Description
+        -----------
+        Augmented epsilon-constraint method (AUGMECON2, Mavrotas & Florios 2013) for two or more objectives
+        (multi_data['objectives'], default objective1 and objective2). The first objective is optimized, the others
+        are constrained to a grid of paretoPoints values between the worst and best value of the payoff table
+        (lexicographic optima of the objectives):
+
+            max  g_1 + eps * r_1 * (S_2 / r_2 + 1e-1 * S_3 / r_3 + ...)
+            s.t. g_k - S_k = e_k,  S_k >= 0
+
+        with g the objectives in maximization sense and r their ranges. The slack terms make every solution
+        efficient instead of weakly efficient. The slack S_2 of a solution tells how many grid points of the
+        innermost objective give the same solution, these points are skipped (jump-ahead). Once a grid point is
+        infeasible, all tighter points of the same loop are infeasible as well and are skipped (early exit). A grid
+        point which stops at a limit of the solver without a solution says nothing about the tighter points, it is
+        reported (model_output.unsolvedPoints) and the loop continues with the next point.
+
+        """
+        timer = time_printer(programm_step="Multi-objective optimization (AUGMECON2)")
+
+        objectives = list(self.multi_data.get('objectives') or
+                          (self.multi_data['objective1'], self.multi_data['objective2']))
+        if len(objectives) < 2:
+            raise ValueError('AUGMECON2 needs at least two objectives, got {}'.format(objectives))
+        gridPoints = max(int(self.multi_data.get('paretoPoints', 10)), 2)
+        eps = self.multi_data.get('augmecon_eps', 1e-3)
+
+        model_output = MultiModelOutput(optimization_mode="multi-objective")
+        model_output.multi_data = dict(self.multi_data, objective1=objectives[0], objective2=objectives[1])
+
+        lowerBound, upperBound = self.multi_data.get('bounds_objective1', (None, None))
+        if lowerBound is not None:
+            self.bound_region_objective(model_instance, objectives[0], lowerBound, "lower")
+        if upperBound is not None:
+            self.bound_region_objective(model_instance, objectives[0], upperBound, "upper")
+
+        # payoff table in maximization sense (row: optimized objective, column: value of each objective)
+        directions = [1.0 if objective == 'EBIT' else -1.0 for objective in objectives]
+        payoff = payoff_table(self.single_optimizer, model_instance, objectives, lexicographic=True,
+                              **payoff_settings(self.superstructure))['payoff'] * np.array(directions)
+        # rows which were not solved (NaN) are left out
+        best = np.nanmax(payoff, axis=0)
+        worst = np.nanmin(payoff, axis=0)
+        ranges = best - worst
+        constrained = list(range(1, len(objectives)))
+        steps = ranges[1:] / (gridPoints - 1)
+        gridSizes = [gridPoints if ranges[k] > 1e-9 * max(1.0, abs(best[k])) else 1 for k in constrained]
+        nominalRanges = [ranges[k] if ranges[k] > 0 else 1.0 for k in constrained]
+
+        expressions = [objective_expression(model_instance, objective) for objective in objectives]
+        K = range(len(constrained))
+        model_instance.augmecon_rhs = Param(K, mutable=True, initialize=0)
+        model_instance.augmecon_slack = Var(K, within=NonNegativeReals)
+        model_instance.augmecon_bound = Constraint(
+            K, rule=lambda m, k: directions[k + 1] * expressions[k + 1] - m.augmecon_slack[k] == m.augmecon_rhs[k])
+        model_instance.del_component(model_instance.Objective)
+        model_instance.Objective = Objective(
+            expr=directions[0] * expressions[0]
+                 + eps * float(max(ranges[0], 1.0)) * sum(10.0 ** -k * model_instance.augmecon_slack[k]
+                                                          / float(nominalRanges[k]) for k in K),
+            sense=maximize)
+
+        rows = []
+        unsolvedPoints = []
+        indices = [0] * len(constrained)
+        solves = 0
+        try:
+            while True:
+                for k in K:
+                    model_instance.augmecon_rhs[k] = float(worst[k + 1] + indices[k] * steps[k])
+
+                solves += 1
+                single_solved = self.single_optimizer.run_optimization(model_instance, tee=False, printTimer=False,
+                                                                       runFeasibilityAnalysis=False,
+                                                                       VSS_EVPI_mode=True)
+                if single_solved == 'infeasible':
+                    # every tighter point of the first loop which is not at its start is infeasible as well
+                    loop = next((k for k in K if indices[k] != 0), None)
+                    if loop is None:
+                        break
+                    indices[loop] = gridSizes[loop]
+                elif isinstance(single_solved, str):
+                    # stopped at a limit without a solution, the tighter points can still be feasible
+                    unsolvedPoints.append(tuple(indices))
+                    indices[0] += 1
+                else:
+                    values = [pyo.value(expression) for expression in expressions]
+                    single_solved._tidy_data()
+                    name = "pareto_bound_" + str(len(rows) + 1)
+                    model_output.add_process(name, single_solved)
+                    rows.append(dict({'name': name}, **{'grid ' + objectives[k + 1]: indices[k] for k in K},
+                                     **dict(zip(objectives, values))))
+
+                    # jump-ahead: the grid points of the innermost objective within the slack give the same solution
+                    slack = max(model_instance.augmecon_slack[0].value or 0, 0)
+                    if steps[0] > 0:
+                        indices[0] += int(np.floor(slack / steps[0] + 1e-9))
+                    indices[0] += 1
+
+                # carry over to the outer loops
+                for k in K:
+                    if indices[k] >= gridSizes[k] and k < K[-1]:
+                        indices[k] = 0
+                        indices[k + 1] += 1
+                if indices[-1] >= gridSizes[-1]:
+                    break
+        finally:
+            for name in ('augmecon_bound', 'augmecon_slack', 'augmecon_rhs'):
+                model_instance.del_component(name)
+            self.change_model_objective(model_instance, objectives[0])
+
+        print('AUGMECON2: {} solves for {} grid points, {} efficient solutions'.format(
+            solves, int(np.prod(gridSizes)), len(rows)))
+        report_unsolved_scenarios(['grid {}'.format(point) for point in unsolvedPoints], 'Pareto front')
+        model_output.unsolvedPoints = unsolvedPoints
+
+        front = pd.DataFrame(rows)
+        if not front.empty:
+            front = front.drop_duplicates(subset=objectives)
+        model_output.set_pareto_data(front)
+        timer = time_printer(timer, "Multi-objective optimization (AUGMECON2)")
+        model_output.fill_information(timer)
+        return model_output
+
     def change_model_objective(self, model_instance, objective, flipSense=False):
         """
         This function is used to change the objective function of the model instance
@@ -587,6 +736,34 @@ class MultiObjectiveOptimizer(SingleOptimizer):
 
         return optimized_instance
 
+def continuation_order(values, base=None):
+    """
+    Parameters
+    ----------
+    values : list
+        Values of a one-way sweep
+    base : Float, optional
+        Nominal value of the parameter, the path starts at the value closest to it (default is the smallest value)
+
+    Returns
+    -------
+    path : list
+        (value, neighbour) of the distinct values in the order of a continuation path from the nominal value, first
+        upwards then downwards. The neighbour is the value solved before whose solution is the start of the solve
+        (None for the first value)
+
+    """
+    ordered = sorted(set(values))
+    start = 0
+    if base is not None and ordered:
+        start = min(range(len(ordered)), key=lambda k: abs(ordered[k] - base))
+
+    path = [(ordered[start], None)] if ordered else []
+    path += [(ordered[k], ordered[k - 1]) for k in range(start + 1, len(ordered))]
+    path += [(ordered[k], ordered[k + 1]) for k in range(start - 1, -1, -1)]
+    return path
+
+
 class SensitivityOptimizer(SingleOptimizer):
     def __init__(
         self,
@@ -596,12 +773,12 @@ class SensitivityOptimizer(SingleOptimizer):
         sensi_data=None,
         superstructure=None,
     ):
-        super().__init__(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
 
         self.sensi_data = sensi_data
         self.superstructure = superstructure
 
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
 
     def run_optimization(self, model_instance,
                          optimization_mode = None,
@@ -611,32 +788,218 @@ class SensitivityOptimizer(SingleOptimizer):
                          options = None,
                          count_variables_constraints = False):
 
+        if getattr(self.superstructure, 'parametricSensitivity', False):
+            return self.run_parametric_optimization(model_instance)
+
         timer1 = time_printer(programm_step="Sensitivity optimization")
         sensi_data_Dict_lists = calculate_sensitive_parameters(self.sensi_data)
 
-        initial_model_instance = model_instance.clone()
-        time_printer(passed_time=timer1, programm_step="Create initial ModelInstance copy")
-        model_output = MultiModelOutput(optimization_mode="sensitivity")
+        model_output = MultiModelOutput(optimization_mode="sensitivity",
+                                        memory_limit=getattr(self.superstructure, 'outputMemoryLimit', None))
 
         superstructureData = self.superstructure
 
-
+        # the indices of all sensitive parameters are looked up once, the plan also remembers the original values
+        # so the model instance can be reset after each parameter instead of cloning it
+        plan = ParameterUpdatePlan(model_instance, sensi_data_Dict_lists, superstructureData)
+        time_printer(passed_time=timer1, programm_step="Compile parameter update plan")
+
+        # points which were solved before (in this run or an earlier one) are taken from the cache
+        cache = None
+        if getattr(superstructureData, 'solveCache', False):
+            cache = get_solve_cache(getattr(superstructureData, 'solveCacheDirectory', None),
+                                    getattr(superstructureData, 'solveCacheMemoryLimit', None))
+            cacheCounts = (cache.hits, cache.misses)
+        solverSettings = (self.single_optimizer.solver_name, dict(self.single_optimizer.solver.options))
+
+        # time limits of the solves within the budget of the sweep (see solve_scheduler)
+        scheduler = SolveScheduler.from_superstructure(superstructureData, self.single_optimizer.solver_name)
+        if scheduler is not None:
+            scheduler.start(self.single_optimizer.solver,
+                            sum(len(value_list) for value_list, _ in sensi_data_Dict_lists.values()))
+
+        # every sweep is a continuation path from the nominal value outwards, each solve is warm started with the
+        # solution of its neighbour. The first point of a sweep starts from the point closest to the base case.
+        baseSolution = None
+        loaded = None  # the solution whose values are in the model instance
         for parameterName, (value_list, metadata) in sensi_data_Dict_lists.items():
+            solutions = dict()
+            for val, neighbour in continuation_order(value_list, plan.base_value(parameterName)):
+                model_instance = plan.apply({parameterName: val})
+
+                key = cache.key(model_instance, *solverSettings) if cache is not None else None
+                single_solved = cache.get(key) if cache is not None else None
+                if single_solved is None:
+                    seed = solutions.get(neighbour) if neighbour is not None else baseSolution
+                    if seed is not None and seed is not loaded:
+                        load_solution(model_instance, seed)
+
+                    def solve():
+                        return self.single_optimizer.run_optimization(model_instance, warmstart=True)
+
+                    if scheduler is None:
+                        single_solved = solve()
+                    else:
+                        single_solved = scheduler.solve((parameterName, val), solve)
+                    if isinstance(single_solved, str):
+                        # skipped or stopped without incumbent, the point has no result
+                        solutions[val] = None
+                        loaded = None
+                        continue
+
+                    single_solved._tidy_data()
+                    loaded = single_solved
+                    # only proven solves are memoized, time limited solves depend on the schedule
+                    if cache is not None and single_solved._termination_condition in (None, 'optimal'):
+                        cache.put(key, single_solved)
+                elif scheduler is not None:
+                    scheduler.solve((parameterName, val), lambda: single_solved)
+
+                solutions[val] = single_solved
+                if baseSolution is None:
+                    baseSolution = single_solved
+
             for val in value_list:
-                model_instance = change_parameter(Instance=model_instance,
-                                                  parameter=parameterName,
-                                                  value=val, metadata=metadata,
-                                                  superstructure= superstructureData)
+                if solutions[val] is not None:
+                    model_output.add_process((parameterName, val), solutions[val])
+
+            model_instance = plan.reset()
+
+        if scheduler is not None:
+            # the points with the largest gaps are solved again with their first solution as MIP start
+            for parameterName, val in scheduler.refinement_queue():
+                model_instance = plan.apply({parameterName: val})
+                if (parameterName, val) in model_output._results_data:
+                    load_solution(model_instance, model_output._results_data[(parameterName, val)])
+
+                single_solved = scheduler.solve((parameterName, val),
+                                                lambda: self.single_optimizer.run_optimization(model_instance,
+                                                                                               warmstart=True),
+                                                refine=True)
+                if single_solved is not None and not isinstance(single_solved, str):
+                    single_solved._tidy_data()
+                    model_output.add_process((parameterName, val), single_solved)
+                model_instance = plan.reset()
+
+            scheduler.print_summary()
+            model_output.set_schedule_data(scheduler.report())
+
+        if cache is not None:
+            print('Solve cache: {} points reused, {} solved'.format(cache.hits - cacheCounts[0],
+                                                                    cache.misses - cacheCounts[1]))
 
-                single_solved = self.single_optimizer.run_optimization(model_instance)
+        model_output.set_sensitivity_data(self.sensi_data)
+        timer = time_printer(timer1, "Sensitivity optimization")
+        model_output.fill_information(timer)
+        return model_output
 
-                single_solved._tidy_data()
-                model_output.add_process((parameterName, val), single_solved)
+    def run_parametric_optimization(self, model_instance):
+        """
+        Parameters
+        ----------
+        model_instance : PYOMO ConcreteModel
+
+        Returns
+        -------
+        model_output : MultiModelOutput
+            A run for every value of the grid and the segment table (see get_parametric_table). The runs at the start
+            of a segment are MILP solutions, the runs of the other grid values in the segment follow the slopes of
+            the LP of the design (their termination condition is 'parametric estimate').
+
+        Description
+        -----------
+        Parametric sensitivity: the MILP is solved at the lower end of the parameter range, the design (binary and
+        integer variables) is fixed and the LP of the design is solved to get the duals. The parametric analysis
+        of the LP (see utils.parametric_lp) gives the interval of the parameter in which the design and active set
+        stay optimal and the slopes of the KPIs. The next MILP is only solved at the first value of the sensitivity
+        grid behind this interval, so a parameter never needs more solves than grid values and the results keep the
+        (parameter, value) keys of the grid. If the MILP has no solution (the point is reported and skipped) or the
+        LP of the design is not solved to optimality, the interval ends at the value and the next grid value is
+        solved.
+
+        """
+        timer1 = time_printer(programm_step="Parametric sensitivity optimization")
+        sensi_data_Dict_lists = calculate_sensitive_parameters(self.sensi_data)
 
-            model_instance = initial_model_instance
+        model_output = MultiModelOutput(optimization_mode="sensitivity",
+                                        memory_limit=getattr(self.superstructure, 'outputMemoryLimit', None))
+        plan = ParameterUpdatePlan(model_instance, sensi_data_Dict_lists, self.superstructure)
+
+        segments = []
+        for parameterName, (value_list, metadata) in sensi_data_Dict_lists.items():
+            grid = sorted(value_list)
+            tolerance = 1e-9 * max(1.0, grid[-1] - grid[0])
+            value = grid[0]
+            while True:
+                model_instance = plan.apply({parameterName: value})
+                single_solved = self.single_optimizer.run_optimization(model_instance, VSS_EVPI_mode=True,
+                                                                       runFeasibilityAnalysis=False)
+
+                end = value
+                if isinstance(single_solved, str):
+                    print("\033[1;31m" + "No solution of {} at {} ({})".format(parameterName, value, single_solved)
+                          + "\033[0m")
+                else:
+                    fixed = fix_binaries(model_instance)
+                    try:
+                        results, duals = solve_fixed_design(self.solver, model_instance)
+                        condition = results.solver.termination_condition
+                        analysis = None
+                        if condition == TerminationCondition.optimal:
+                            analysis = parametric_analysis(model_instance,
+                                                           lambda v: plan.apply({parameterName: v}),
+                                                           value, duals=duals)
+                    finally:
+                        release_binaries(fixed)
+
+                    single_solved._tidy_data()
+                    model_output.add_process((parameterName, value), single_solved)
+
+                    data = single_solved._data
+                    segment = {'parameter': parameterName,
+                               'start': value,
+                               'end': value,
+                               'units': ', '.join(str(data.get('Names', {}).get(u, u))
+                                                  for u, y in data.get('Y', {}).items() if round(y or 0) == 1),
+                               'objective': data.get(single_solved._objective_function, 0),
+                               'objective slope': None,
+                               'limit': 'fixed design LP: {}'.format(condition)}
+                    if analysis is not None:
+                        end = min(analysis['upper'], grid[-1])
+                        segment.update({'end': end,
+                                        'objective slope': analysis['objective slope'],
+                                        'limit': analysis['limit upper']})
+                        segment.update({'slope ' + kpi: slope for kpi, slope in analysis['slopes'].items()})
+                    segments.append(segment)
+
+                    if analysis is not None:
+                        # the other grid values of the segment have the same design, their solution follows the
+                        # slopes of the LP
+                        slopes = analysis['variable slopes']
+                        start = pyo.ComponentMap((var, var.value or 0.0) for var in slopes)
+                        for val in [v for v in grid if value < v <= end + tolerance]:
+                            model_instance = plan.apply({parameterName: val})
+                            for var, slope in slopes.items():
+                                var.set_value(start[var] + slope * (val - value), skip_validation=True)
+                            calculate_omitted_blocks(model_instance)
+                            estimate = ModelOutput(model_instance=model_instance, optimization_mode='single',
+                                                   solver_name=self.single_optimizer.solver_name, run_time=0,
+                                                   gap=single_solved._optimality_gap)
+                            estimate._termination_condition = 'parametric estimate'
+                            estimate._tidy_data()
+                            model_output.add_process((parameterName, val), estimate)
+
+                # the next solve is at the first grid value behind the interval
+                following = [v for v in grid if v > end + tolerance and v > value]
+                if not following:
+                    break
+                value = following[0]
+
+            model_instance = plan.reset()
 
         model_output.set_sensitivity_data(self.sensi_data)
-        timer = time_printer(timer1, "Sensitivity optimization")
+        model_output.set_parametric_data(pd.DataFrame(segments))
+        timer = time_printer(timer1, "Parametric sensitivity optimization")
         model_output.fill_information(timer)
         return model_output
 
@@ -681,7 +1044,7 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         superstructure=None,
     ):
 
-        super().__init__(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
 
         self.cross_parameters = two_way_data
         self.superstructure = superstructure
@@ -689,6 +1052,7 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         self.single_optimizer = SingleOptimizer(
             solver_name, solver_interface, solver_options
         )
+        self.update_plan = None
 
     def run_optimization(self,
                          model_instance,
@@ -704,7 +1068,8 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         timer1 = time_printer(programm_step="Two-way sensitivity optimimization")
         self.cross_parameters = calculate_sensitive_parameters(self.cross_parameters)
 
-        model_output = MultiModelOutput(optimization_mode="cross-parameter sensitivity")
+        model_output = MultiModelOutput(optimization_mode="cross-parameter sensitivity",
+                                        memory_limit=getattr(self.superstructure, 'outputMemoryLimit', None))
 
         index_names = list()
         dic_1 = dict()
@@ -728,6 +1093,11 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         metadata1 = list(dic_1.values())[0][1]
         metadata2 = list(dic_2.values())[0][1]
 
+        # look up the indices of both parameters once, each point then only writes the values
+        self.update_plan = ParameterUpdatePlan(model_instance,
+                                               [(paramName1, metadata1), (paramName2, metadata2)],
+                                               self.superstructure)
+
         if parralellComputing:
             # todo make parallel computing work
             # Using ProcessPoolExecutor to solve models in parallel
@@ -770,19 +1140,22 @@ class TwoWaySensitivityOptimizer(SingleOptimizer):
         :return:
 
         """
-        superstructure = self.superstructure
+        if getattr(self, 'update_plan', None) is not None and self.update_plan.Instance is model_instance:
+            model_instance = self.update_plan.apply([paramVal1, paramVal2])
+        else:
+            superstructure = self.superstructure
 
-        model_instance = change_parameter(Instance=model_instance,
-                                          parameter=paramName1,
-                                          value=paramVal1, metadata=metadata1,
-                                          superstructure=superstructure,
-                                          printTimer=False)
+            model_instance = change_parameter(Instance=model_instance,
+                                              parameter=paramName1,
+                                              value=paramVal1, metadata=metadata1,
+                                              superstructure=superstructure,
+                                              printTimer=False)
 
-        model_instance = change_parameter(Instance=model_instance,
-                                          parameter=paramName2,
-                                          value=paramVal2, metadata=metadata2,
-                                          superstructure=superstructure,
-                                          printTimer=False)
+            model_instance = change_parameter(Instance=model_instance,
+                                              parameter=paramName2,
+                                              value=paramVal2, metadata=metadata2,
+                                              superstructure=superstructure,
+                                              printTimer=False)
 
         single_solved = self.single_optimizer.run_optimization(model_instance,
                                                                tee=False,
@@ -807,8 +1180,8 @@ class StochasticRecourseOptimizer(SingleOptimizer):
         remakeMetadata = None
     ):
 
-        super().__init__(solver_name, solver_interface, solver_options)
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
         self.input_data = input_data
         self.single_model_instance_4_EVPI = single_model_instance.clone()
         self.single_model_instance_4_VSS = single_model_instance.clone()
@@ -980,17 +1353,28 @@ class StochasticRecourseOptimizer(SingleOptimizer):
         WaitAndSeeDict = {}
         objectiveValueList_EVPI = []
         infeasibleScenarios = []
+        unsolvedScenarios = []
         selectedTechnologies = []
 
         # Green and bold text
         print("\033[1;32m" + "Calculating the objective values for each scenario to calculate the EVPI\n"
                              "Please be patient, this might take a while" + "\033[0m")
 
+        # scenarios which are infeasible for every design by bound propagation are not solved
+        screenedScenarios = set()
+        if getattr(self.input_data, 'feasibilityScreen', False):
+            scenarioDataFiles = self.get_scenario_data_files(scenarios, singleInput, input_data)
+            _, screenedScenarios = screen_infeasible_scenarios(self.input_data, scenarioDataFiles)
+
         # Suppress the specific warning if model is infeasible
         logging.getLogger('pyomo.core').setLevel(logging.ERROR)
         total_scenarios = len(scenarios)
 
         for index, sc in enumerate(scenarios):
+            if sc in screenedScenarios:
+                infeasibleScenarios.append(sc)
+                print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
+                continue
 
             # model for EVPI calculation, the only difference is that the boolean variables are not fixed
             # i.e. all model variables are optimised according to the scenario parameters
@@ -1003,6 +1387,9 @@ class StochasticRecourseOptimizer(SingleOptimizer):
 
             if modelOutputScenario_EVPI == 'infeasible':
                 infeasibleScenarios.append(sc)
+            elif isinstance(modelOutputScenario_EVPI, str):
+                # stopped at the time limit of the solver without a solution
+                unsolvedScenarios.append(sc)
             else: # save the results
                 objectiveName = modelOutputScenario_EVPI._objective_function
                 objectiveValueList_EVPI.append(modelOutputScenario_EVPI._data[objectiveName])
@@ -1028,6 +1415,7 @@ class StochasticRecourseOptimizer(SingleOptimizer):
 
         # make a set of infeasible scenarios to get rid of duplicates
         infeasibleScenarios = set(infeasibleScenarios)
+        report_unsolved_scenarios(unsolvedScenarios, 'EVPI')
 
         return WaitAndSeeDict, infeasibleScenarios
 
@@ -1056,6 +1444,9 @@ class StochasticRecourseOptimizer(SingleOptimizer):
                     else:
                         return Constraint.Skip
 
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i] <= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
@@ -1077,6 +1468,9 @@ class StochasticRecourseOptimizer(SingleOptimizer):
                         ] - self.alpha[u] * (1 - self.Y[uu])
                 else:
                     return Constraint.Skip
+            elif (u, uu) in self.U_DIST_REST:
+                # the remainder of the distributor flow, given by MassBalance_16
+                return Constraint.Skip
             else:
                 return self.FLOW[u, uu, i] >= sum(
                     self.FLOW_DIST[u, uu, uk, k, i]
@@ -1188,6 +1582,7 @@ class StochasticRecourseOptimizer(SingleOptimizer):
         EEVDict = {} # dictionary of the EEV for each scenario EEV = Expected results of the Expected Value problem
         objectiveValueList_VSS = []
         infeasibleScenarios = []
+        unsolvedScenarios = []
 
         # Green and bold text, warning this might take a while
         print("\033[1;32m" + "Calculating the objective values for each scenario to calculate the VSS\n"
@@ -1210,6 +1605,9 @@ class StochasticRecourseOptimizer(SingleOptimizer):
 
             if modelOutputScenario_VSS == 'infeasible':
                 infeasibleScenarios.append(sc)
+            elif isinstance(modelOutputScenario_VSS, str):
+                # stopped at the time limit of the solver without a solution
+                unsolvedScenarios.append(sc)
             else:
                 objectiveName = modelOutputScenario_VSS._objective_function
                 objectiveValueList_VSS.append(modelOutputScenario_VSS._data[objectiveName])
@@ -1231,6 +1629,7 @@ class StochasticRecourseOptimizer(SingleOptimizer):
             # print a warning in red and bold text
             print("\033[1;31m" + "The following scenarios during VSS calculations are infeasible:", infeasibleScenarios, "\n"
              " please check the optimization problem or report the problem to github \033[0m")
+        report_unsolved_scenarios(unsolvedScenarios, 'VSS')
 
         return EEVDict
 
@@ -1293,6 +1692,31 @@ class StochasticRecourseOptimizer(SingleOptimizer):
 
         return model
 
+    def get_scenario_data_files(self, scenarios, singleInput, stochasticInput):
+        """
+        This function is used to make a Data_File of the single run for every scenario, with the same parameters
+        as set_parameters_of_scenario (e.g. for the feasibility screen).
+
+        :param scenarios: list of the scenarios
+        :param singleInput:
+        :param stochasticInput:
+        :return: dictionary {scenario: Data_File}
+        """
+        singleData = singleInput.Data_File[None]
+        stochasticData = stochasticInput.Data_File[None]
+        parameterList = [parameter for parameter in ['phi', 'myu', 'xi', 'materialcosts', 'ProductPrice', 'gamma',
+                                                     'theta'] if parameter in singleData]
+
+        dataFiles = {}
+        for scenario in scenarios:
+            data = dict(singleData)
+            for parameter in parameterList:
+                data[parameter] = {index: stochasticData[parameter][tuple(list(index) + [scenario])
+                                   if isinstance(index, tuple) else (index, scenario)]
+                                   for index in singleData[parameter]}
+            dataFiles[scenario] = {None: data}
+        return dataFiles
+
     def count_unique_sets(self, list_of_dicts):
         """
         This function is used to count the number of unique sets in a list of dictionaries
@@ -1320,6 +1744,159 @@ class StochasticRecourseOptimizer(SingleOptimizer):
             percent = round((count / total_sets) * 100, 1)
             print("\033[95m\033[1mDictionary:", dict(unique_dict), "percent (%):", percent, "\033[0m")
 
+
+def screen_infeasible_scenarios(inputObject, scenarioDataFiles, design=None):
+    """
+    Parameters
+    ----------
+    inputObject : Superstructure
+    scenarioDataFiles : Dictionary
+        {scenario: Data_File}
+    design : Dictionary, optional
+        {unit: 0 or 1} fixed design of the scenarios
+
+    Returns
+    -------
+    (screen, infeasible) : pd.DataFrame of the feasibility screen (None if the screen is off, see
+        Superstructure.set_feasibilityScreen) and the set of scenarios which do not need to be solved
+
+    """
+    if not getattr(inputObject, 'feasibilityScreen', False):
+        return None, set()
+
+    loadID, loadType = load_unit(inputObject)
+    screen = screen_scenarios(scenarioDataFiles, loadID=loadID, loadType=loadType, design=design)
+    print_screen_report(screen)
+    return screen, set(screen.index[screen['infeasible']])
+
+
+def deduplicate_scenarios(inputObject, scenarioDataFiles):
+    """
+    Parameters
+    ----------
+    inputObject : Superstructure
+    scenarioDataFiles : Dictionary
+        {scenario: Data_File}
+
+    Returns
+    -------
+    groups : Dictionary
+        {representative: [scenarios of the group]}, every scenario is its own group if the deduplication is off
+        (see Superstructure.set_scenarioDeduplication)
+
+    """
+    tolerance = scenario_reduction_settings(inputObject)
+    if tolerance is None or len(scenarioDataFiles) < 2:
+        return {scenario: [scenario] for scenario in scenarioDataFiles}
+
+    groups, _ = group_scenarios(scenarioDataFiles, tolerance=tolerance)
+    print_reduction_report(groups)
+    return groups
+
+
+def solve_scenario(single_optimizer, model_instance, cache=None, scheduler=None, point=None, refine=False):
+    """
+    Parameters
+    ----------
+    single_optimizer : SingleOptimizer
+    model_instance : PYOMO ConcreteModel
+        Populated model instance of the scenario
+    cache : SolveCache, optional
+        Solves of earlier runs (see utils.solve_cache)
+    scheduler : SolveScheduler, optional
+        Time limit and gap target of the solve (see solve_scheduler)
+    point : hashable, optional
+        Scenario of the solve in the schedule
+    refine : Boolean
+        True for the second solve of a scenario which stopped at its time limit, with the values of the model
+        instance as MIP start
+
+    Returns
+    -------
+    single_solved : ModelOutput, 'infeasible', 'time limit' or 'skipped' (see SolveScheduler.solve), None if a
+        refinement did not improve the first solve
+
+    """
+    key = None
+    if cache is not None and not refine:
+        key = cache.key(model_instance, single_optimizer.solver_name, dict(single_optimizer.solver.options))
+
+    def solve():
+        single_solved = cache.get(key) if key is not None else None
+        if single_solved is None:
+            single_solved = single_optimizer.run_optimization(model_instance=model_instance, tee=False,
+                                                              keepfiles=False, printTimer=False, VSS_EVPI_mode=True,
+                                                              warmstart=refine)
+        return single_solved
+
+    if scheduler is None:
+        single_solved = solve()
+    else:
+        single_solved = scheduler.solve(point, solve, refine=refine)
+
+    # only proven solves are memoized, time limited solves depend on the schedule
+    if key is not None and not isinstance(single_solved, str) and single_solved is not None and \
+            getattr(single_solved, '_termination_condition', None) in (None, 'optimal'):
+        cache.put(key, single_solved)
+    return single_solved
+
+
+def refine_scenarios(scheduler, single_optimizer, build_instance, scenarioDataFiles, scenarioGroups, model_output):
+    """
+    Parameters
+    ----------
+    scheduler : SolveScheduler
+    single_optimizer : SingleOptimizer
+    build_instance : callable
+        build_instance(dataFile) returns the populated model instance of a scenario
+    scenarioDataFiles : Dictionary
+        {scenario: Data_File}
+    scenarioGroups : Dictionary
+        {representative: [scenarios of the group]}
+    model_output : MultiModelOutput
+        Results of the sweep, the refined scenarios are replaced
+
+    Description
+    -----------
+    Solves the scenarios which stopped at their time limit again, worst gap first, with the first solution as MIP
+    start and the budget which is left (see SolveScheduler.refinement_queue).
+
+    """
+    for scenario in scheduler.refinement_queue():
+        modelInstance = build_instance(scenarioDataFiles[scenario])
+        if scenario in model_output._results_data:
+            load_solution(modelInstance, model_output._results_data[scenario])
+
+        single_solved = solve_scenario(single_optimizer, modelInstance, scheduler=scheduler, point=scenario,
+                                       refine=True)
+        if single_solved is None or isinstance(single_solved, str):
+            continue
+
+        single_solved._tidy_data()
+        for member in scenarioGroups[scenario]:
+            model_output.add_process(member, single_solved)
+
+
+def report_unsolved_scenarios(unsolvedScenarios, calculation):
+    """
+    Parameters
+    ----------
+    unsolvedScenarios : list
+        Scenarios which were skipped or stopped at their time limit without a solution
+    calculation : String
+        Name of the calculation which misses the scenarios (e.g. 'EVPI')
+
+    Description
+    -----------
+    Prints a warning with the scenarios, the calculation is done over the solved scenarios only.
+
+    """
+    if unsolvedScenarios:
+        print("\033[1;31m" + "The following scenarios have no solution within the time limits of the solver and are "
+              "not part of the {}: {}\n please increase the time limit (or the budget of the solve "
+              "schedule)\033[0m".format(calculation, sorted(unsolvedScenarios, key=str)))
+
+
 class HereAndNowOptimizer(SingleOptimizer):
     def __init__(
         self,
@@ -1330,10 +1907,10 @@ class HereAndNowOptimizer(SingleOptimizer):
         scenarioDataFiles=None,
         *args,
     ):
-        super().__init__(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
 
         self.inputObject = inputObject  # superstructure object
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
         if hasattr(inputObject, 'outputFileDesignSpace'):
             self.designSpaceFile = inputObject.outputFileDesignSpace
         self.scenarioDataFiles = scenarioDataFiles
@@ -1363,21 +1940,32 @@ class HereAndNowOptimizer(SingleOptimizer):
                                         solver_name=self.solver_name,
                                         run_time=None,
                                         gap=None,
-                                        dataFiles=scenarioDataFiles)
+                                        dataFiles=scenarioDataFiles,
+                                        memory_limit=getattr(self.inputObject, 'outputMemoryLimit', None))
 
 
-        # preallocate the list of infeasible scenarios
+        # preallocate the lists of infeasible scenarios and of scenarios without solution
         infeasibleScenarios = []
-
-        # Green and bold text
-        print("\033[1;32m" + "Calculating the objective values for each scenario and each passed on design\n"
-                             "Please be patient, this might take a while" + "\033[0m")
-
-        # Suppress the specific warning if model is infeasible
-        logging.getLogger('pyomo.core').setLevel(logging.ERROR)
-        total_scenarios = len(scenarioDataFiles)
-
-        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
+        unsolvedScenarios = []
+
+        # scenarios which are infeasible for the design by bound propagation are not solved
+        screen, screenedScenarios = screen_infeasible_scenarios(self.inputObject, scenarioDataFiles,
+                                                                design=self.designSpaceFile['Y'])
+
+        # scenarios with the same data are only solved once, solves of earlier runs are taken from the cache
+        scenarioGroups = deduplicate_scenarios(self.inputObject, scenarioDataFiles)
+        cache = None
+        if getattr(self.inputObject, 'solveCache', False):
+            cache = get_solve_cache(getattr(self.inputObject, 'solveCacheDirectory', None),
+                                    getattr(self.inputObject, 'solveCacheMemoryLimit', None))
+
+        # time limits of the solves within the budget of the run (see solve_scheduler)
+        scheduler = SolveScheduler.from_superstructure(self.inputObject, self.single_optimizer.solver_name)
+        if scheduler is not None:
+            scheduler.start(self.single_optimizer.solver,
+                            len([scenario for scenario in scenarioGroups if scenario not in screenedScenarios]))
+
+        def build_instance(dataFile):
             # create a model instance for the scenario
             # initialize the model
             model = SuperstructureModel(self.inputObject, fixedDesign=True)
@@ -1390,26 +1978,58 @@ class HereAndNowOptimizer(SingleOptimizer):
             dataFile[None]['Y_DIST'] = self.designSpaceFile['Y_DIST']
 
             # populate the model instance
-            modelInstance = model.populateModel(dataFile)
+            return model.populateModel(dataFile)
+
+        # Green and bold text
+        print("\033[1;32m" + "Calculating the objective values for each scenario and each passed on design\n"
+                             "Please be patient, this might take a while" + "\033[0m")
+
+        # Suppress the specific warning if model is infeasible
+        logging.getLogger('pyomo.core').setLevel(logging.ERROR)
+        total_scenarios = len(scenarioDataFiles)
+
+        for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
+            if scenario not in scenarioGroups:
+                # solved with the representative of its group
+                print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
+                continue
+
+            if scenario in screenedScenarios:
+                infeasibleScenarios.extend(scenarioGroups[scenario])
+                print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
+                continue
+
+            modelInstance = build_instance(dataFile)
 
             # run the optimization problem for the scenario
-            single_solved = self.single_optimizer.run_optimization(model_instance=modelInstance,
-                                                                   tee=False,
-                                                                   keepfiles=False,
-                                                                   printTimer=False,
-                                                                   VSS_EVPI_mode=True)
+            single_solved = solve_scenario(self.single_optimizer, modelInstance, cache, scheduler, scenario)
 
             if single_solved == 'infeasible':
-                infeasibleScenarios.append(scenario)
+                infeasibleScenarios.extend(scenarioGroups[scenario])
+            elif isinstance(single_solved, str):
+                # stopped at the time limit without a solution or skipped when the budget was used up
+                unsolvedScenarios.extend(scenarioGroups[scenario])
             else:
                 # tidy the data, i.e., delete variables and constraints that are 0
                 single_solved._tidy_data()
-                # add the results to the model output
-                model_output.add_process(scenario, single_solved)
+                # add the results to the model output, once for every scenario of the group
+                for member in scenarioGroups[scenario]:
+                    model_output.add_process(member, single_solved)
 
             # print the progress bar
             print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
 
+        if scheduler is not None:
+            refine_scenarios(scheduler, self.single_optimizer, build_instance, scenarioDataFiles, scenarioGroups,
+                             model_output)
+            print()
+            scheduler.print_summary()
+            model_output.set_schedule_data(scheduler.report())
+
+        # scenarios which were solved in the refinement have a result
+        unsolvedScenarios = [scenario for scenario in unsolvedScenarios if scenario not in model_output._results_data]
+        report_unsolved_scenarios(unsolvedScenarios, 'results of the designs')
+
         timer = time_printer(timer1, printTimer=False, programm_step="Ending wait and see")
         model_output.fill_information(timer)
 
@@ -1420,6 +2040,10 @@ class HereAndNowOptimizer(SingleOptimizer):
 
         # add the uncertainty matrix to the model output
         model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+        model_output.feasibilityScreen = screen
+        model_output.unsolvedScenarios = set(unsolvedScenarios)
+        model_output.scenarioGroups = {representative: members for representative, members in scenarioGroups.items()
+                                       if len(members) > 1}
 
         return model_output
 
@@ -1431,10 +2055,10 @@ class WaitAndSeeOptimizer(SingleOptimizer):
         inputObject,
         solver_options=None,
     ):
-        super().__init__(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
 
         self.inputObject = inputObject # superstructure object
-        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options)
+        self.single_optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=solver_options)
 
     def run_optimization(self,
                          optimization_mode = None,
@@ -1453,13 +2077,42 @@ class WaitAndSeeOptimizer(SingleOptimizer):
                                         solver_name = self.solver_name,
                                         run_time = None,
                                         gap = None,
-                                        dataFiles=self.inputObject.scenarioDataFiles)
+                                        dataFiles=self.inputObject.scenarioDataFiles,
+                                        memory_limit=getattr(self.inputObject, 'outputMemoryLimit', None))
 
         # get the scenario data files
         scenarioDataFiles = self.inputObject.scenarioDataFiles
 
-        # preallocate the list of infeasible scenarios
+        # preallocate the lists of infeasible scenarios and of scenarios without solution
         infeasibleScenarios = []
+        unsolvedScenarios = []
+
+        # scenarios which are infeasible for every design by bound propagation are not solved
+        screen, screenedScenarios = screen_infeasible_scenarios(self.inputObject, scenarioDataFiles)
+
+        # scenarios with the same data are only solved once, solves of earlier runs are taken from the cache
+        scenarioGroups = deduplicate_scenarios(self.inputObject, scenarioDataFiles)
+        cache = None
+        if getattr(self.inputObject, 'solveCache', False):
+            cache = get_solve_cache(getattr(self.inputObject, 'solveCacheDirectory', None),
+                                    getattr(self.inputObject, 'solveCacheMemoryLimit', None))
+
+        # time limits of the solves within the budget of the run (see solve_scheduler)
+        scheduler = SolveScheduler.from_superstructure(self.inputObject, self.single_optimizer.solver_name)
+        if scheduler is not None:
+            scheduler.start(self.single_optimizer.solver,
+                            len([scenario for scenario in scenarioGroups if scenario not in screenedScenarios]))
+
+        def build_instance(dataFile):
+            # create a model instance for the scenario
+            # initialize the model
+            model = SuperstructureModel(self.inputObject)
+
+            # create the model equations
+            model.create_ModelEquations()
+
+            # populate the model instance
+            return model.populateModel(dataFile)
 
         # Green and bold text
         print("\033[1;32m" + "Calculating the objective values for each scenario to calculate the EVPI\n"
@@ -1470,34 +2123,46 @@ class WaitAndSeeOptimizer(SingleOptimizer):
         total_scenarios = len(scenarioDataFiles)
 
         for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
-            # create a model instance for the scenario
-            # initialize the model
-            model = SuperstructureModel(self.inputObject)
+            if scenario not in scenarioGroups:
+                # solved with the representative of its group
+                print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
+                continue
 
-            # create the model equations
-            model.create_ModelEquations()
+            if scenario in screenedScenarios:
+                infeasibleScenarios.extend(scenarioGroups[scenario])
+                print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
+                continue
 
-            # populate the model instance
-            modelInstance = model.populateModel(dataFile)
+            modelInstance = build_instance(dataFile)
 
             # run the optimization problem for the scenario
-            single_solved = self.single_optimizer.run_optimization(model_instance=modelInstance,
-                                                                   tee=False,
-                                                                   keepfiles=False,
-                                                                   printTimer=False,
-                                                                   VSS_EVPI_mode=True)
+            single_solved = solve_scenario(self.single_optimizer, modelInstance, cache, scheduler, scenario)
 
             if single_solved == 'infeasible':
-                infeasibleScenarios.append(scenario)
+                infeasibleScenarios.extend(scenarioGroups[scenario])
+            elif isinstance(single_solved, str):
+                # stopped at the time limit without a solution or skipped when the budget was used up
+                unsolvedScenarios.extend(scenarioGroups[scenario])
             else:
                 # tidy the data, i.e., delete variables and constraints that are 0
                 single_solved._tidy_data()
-                # add the results to the model output
-                model_output.add_process(scenario, single_solved)
+                # add the results to the model output, once for every scenario of the group
+                for member in scenarioGroups[scenario]:
+                    model_output.add_process(member, single_solved)
 
             # print the progress bar
             print_progress_bar(iteration=index, total=total_scenarios, prefix='EVPI', suffix='')
 
+        if scheduler is not None:
+            refine_scenarios(scheduler, self.single_optimizer, build_instance, scenarioDataFiles, scenarioGroups,
+                             model_output)
+            print()
+            scheduler.print_summary()
+            model_output.set_schedule_data(scheduler.report())
+
+        # scenarios which were solved in the refinement have a result
+        unsolvedScenarios = [scenario for scenario in unsolvedScenarios if scenario not in model_output._results_data]
+        report_unsolved_scenarios(unsolvedScenarios, 'EVPI')
 
         timer = time_printer(timer1, printTimer=False, programm_step="Ending wait and see")
         model_output.fill_information(timer)
@@ -1509,6 +2174,10 @@ class WaitAndSeeOptimizer(SingleOptimizer):
 
         # add the uncertainty matrix to the model output
         model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+        model_output.feasibilityScreen = screen
+        model_output.unsolvedScenarios = set(unsolvedScenarios)
+        model_output.scenarioGroups = {representative: members for representative, members in scenarioGroups.items()
+                                       if len(members) > 1}
 
         return model_output
 
@@ -1523,7 +2192,7 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         solver_options=None,
     ):
         # initialize the single optimizer
-        super().__init__(solver_name, solver_interface, solver_options)
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
 
         # set the optimization mode
         # todo find where the optimisation mode is passed on, this is not the right place to define it but ok for now
@@ -1540,6 +2209,10 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         else:
             self.options = mpiOptions
 
+        # groups of scenarios with the same data and their summed probabilities (see get_scenario_names)
+        self.scenarioGroups = None
+        self.scenarioProbabilities = {}
+
 
     def run_optimization(self,*args, **kwargs):
 
@@ -1598,10 +2271,27 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
                                  # for the selection of the technology
                                  [modelInstance.Y, modelInstance.DistFraction])  # todo add?  ,modelInstance.Y_DIST OR modelInstance.DistFraction
 
-        modelInstance._mpisppy_probability = 1.0 / len(scenarioDataFile)
+        modelInstance._mpisppy_probability = self.scenarioProbabilities.get(scenarioName,
+                                                                            1.0 / len(scenarioDataFile))
 
         return modelInstance
 
+    def get_scenario_names(self, inputObject):
+        """
+        This function returns the names of the scenarios which are solved. If the scenarios are deduplicated
+        (see Superstructure.set_scenarioDeduplication) only one scenario of each group with the same data is
+        solved, with the summed probability of the group.
+
+        :param inputObject: superstructure object with the scenario data files
+        :return: list of the scenario names
+        """
+        scenarioDataFiles = inputObject.scenarioDataFiles
+        self.scenarioGroups = deduplicate_scenarios(inputObject, scenarioDataFiles)
+        probability = 1.0 / len(scenarioDataFiles)
+        self.scenarioProbabilities = {representative: probability * len(members)
+                                      for representative, members in self.scenarioGroups.items()}
+        return list(self.scenarioGroups)
+
     def run_extensive_form(self, options, allScenarioNames):
         """
         This function runs the extensive form of the optimization problem. The extensive form is a deterministic
@@ -1635,8 +2325,8 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
         # takes long to load these modules, so only load them if needed
         from mpisppy.opt.ph import PH
 
-        allScenarioNames = list(inputObject.scenarioDataFiles.keys())
         self.inputObject = inputObject
+        allScenarioNames = self.get_scenario_names(inputObject)
 
         ph = PH(options,
                 allScenarioNames,
@@ -1668,6 +2358,10 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
                     # print(f"Variable {var_object} is not calculated!!")
                     continue
 
+        # the scenarios of a group share the solution of their representative
+        allVariables = fan_out(allVariables, self.scenarioGroups)
+        VariableWarningDict = fan_out(VariableWarningDict, self.scenarioGroups)
+
         return variablesR0, allVariables, VariableWarningDict, ph
 
 
@@ -1675,3 +2369,254 @@ class StochasticRecourseOptimizer_mpi_sppy(SingleOptimizer):
 
 
 
+
+
+def _screen_designs_in_scenario(inputObject, scenario, dataFile, designs, solver_name, solver_interface,
+                                solver_options=None, kpis=None):
+    """
+    Evaluates all designs for a single scenario. The model instance of the scenario is only built once, afterwards
+    the binary variables of each design are fixed, the instance is solved and the binaries are freed again.
+    This function lives on module level so it can be sent to the worker processes of the DesignScreeningOptimizer.
+
+    :param inputObject: Superstructure object
+    :param scenario: name of the scenario
+    :param dataFile: Data_File of the scenario
+    :param designs: dictionary {designName: {'Y': {...}, 'Y_DIST': {...} or None}}
+    :param solver_name: name of the solver
+    :param solver_interface: solver interface
+    :param solver_options: dictionary with solver options
+    :param kpis: list of (scalar) model variables that are reported next to the objective
+    :return: list of dictionaries, one row per design
+    """
+
+    # Suppress the specific warning if model is infeasible (this also runs in the worker processes)
+    logging.getLogger('pyomo.core').setLevel(logging.ERROR)
+
+    model = SuperstructureModel(inputObject)
+    model.create_ModelEquations()
+    modelInstance = model.populateModel(dataFile)
+
+    optimizer = SingleOptimizer(solver_name, solver_interface, solver_options=copy.deepcopy(solver_options))
+
+    rows = []
+    for designName, design in designs.items():
+        row = {'design': designName, 'scenario': scenario}
+
+        fixedVariables = []
+        for varName in ('Y', 'Y_DIST'):
+            if design.get(varName) is None:
+                continue
+            variable = getattr(modelInstance, varName)
+            for index, value in design[varName].items():
+                if index in variable and value is not None:
+                    variable[index].fix(round(value))
+                    fixedVariables.append(variable[index])
+
+        try:
+            if modelInstance.component('scaling_factor') is not None:
+                results = scale_and_solve(optimizer.solver, modelInstance, tee=False, keepfiles=False)
+            else:
+                results = optimizer.solver.solve(modelInstance, tee=False, keepfiles=False)
+            termination = results.solver.termination_condition
+            # time-limited solves with an incumbent are reported with their incumbent
+            feasible = has_solution(results, modelInstance)
+        except Exception as exception:
+            termination = 'error: {}'.format(exception)
+            feasible = False
+
+        row['feasible'] = feasible
+        row['termination'] = str(termination)
+        if feasible:
+            calculate_omitted_blocks(modelInstance)
+            row['objective'] = pyo.value(list(modelInstance.Objective.values())[0])
+            for kpi in kpis:
+                row[kpi] = pyo.value(getattr(modelInstance, kpi), exception=False)
+        else:
+            row['objective'] = np.nan
+            for kpi in kpis:
+                row[kpi] = np.nan
+
+        rows.append(row)
+
+        # free the binaries again so the instance can be reused for the next design
+        for variable in fixedVariables:
+            variable.unfix()
+
+    logging.getLogger('pyomo.core').setLevel(logging.WARNING)
+    return rows
+
+
+class DesignScreeningOptimizer(SingleOptimizer):
+    """
+    Class Description
+    -----------------
+    Evaluates N candidate flowsheet designs against M scenarios in one batched run. In contrast to the
+    HereAndNowOptimizer, which rebuilds every scenario instance for a single design, the model instance of each
+    scenario is built once and reused for all designs by fixing and freeing the binary variables (Y and
+    optionally Y_DIST). Scenarios are distributed over worker processes.
+
+    Designs can be passed on as:
+        - return_chosen-style dictionaries {unitNumber: unitName} (or the tuple keys of
+          AdvancedMultiModelAnalyzer._get_flow_sheet_designs)
+        - Y vectors {unitNumber: 0/1}
+        - full design space dictionaries {'Y': {...}, 'Y_DIST': {...}} (e.g. the _data of a ModelOutput)
+    """
+
+    # scalar KPIs reported next to the objective for each design and scenario
+    DEFAULT_KPIS = ['NPC', 'EBIT', 'NPE', 'NPFWD', 'TAC', 'CAPEX', 'OPEX', 'PROFITS_TOT', 'GWP_TOT',
+                    'FWD_TOT', 'MainProductFlow']
+
+    def __init__(
+        self,
+        solver_name,
+        solver_interface,
+        inputObject,
+        solver_options=None,
+        designs=None,
+        scenarioDataFiles=None,
+        kpis=None,
+        max_workers=None,
+    ):
+        super().__init__(solver_name, solver_interface, solver_options=solver_options)
+
+        self.inputObject = inputObject  # superstructure object
+        self.solver_options = solver_options
+
+        if designs is None:
+            if hasattr(inputObject, 'screeningDesigns'):
+                designs = inputObject.screeningDesigns
+            else:
+                raise Exception("No designs are provided for the design screening")
+        self.designs = designs
+
+        self.scenarioDataFiles = scenarioDataFiles
+        self.kpis = kpis if kpis is not None else self.DEFAULT_KPIS
+        self.max_workers = max_workers
+
+    def run_optimization(self, model_instance=None, *args, **kwargs):
+        """
+        Runs the batched design screening.
+
+        :return: MultiModelOutput, the N x M result table is stored in model_output._screening_data and can be
+            retrieved with model_output.get_screening_table()
+        """
+        timer1 = time_printer(programm_step="Start design screening", printTimer=False)
+
+        scenarioDataFiles = self.get_scenario_data_files()
+        dataFile = scenarioDataFiles[next(iter(scenarioDataFiles))][None]
+        units = dataFile['U'][None]
+        designs = self.normalize_designs(self.designs, units, names=dataFile.get('Names'))
+
+        model_output = MultiModelOutput(model_instance=None,
+                                        optimization_mode='design screening',
+                                        solver_name=self.solver_name,
+                                        run_time=None,
+                                        gap=None,
+                                        dataFiles=scenarioDataFiles,
+                                        memory_limit=getattr(self.inputObject, 'outputMemoryLimit', None))
+
+        # Green and bold text
+        print("\033[1;32m" + "Evaluating {} designs in {} scenarios\n"
+                             "Please be patient, this might take a while".format(len(designs),
+                                                                                len(scenarioDataFiles)) + "\033[0m")
+
+        rows = []
+        total_scenarios = len(scenarioDataFiles)
+        if self.max_workers == 1 or total_scenarios == 1:
+            for index, (scenario, dataFile) in enumerate(scenarioDataFiles.items()):
+                rows += _screen_designs_in_scenario(self.inputObject, scenario, dataFile, designs,
+                                                    self.solver_name, self.solver_interface,
+                                                    self.solver_options, self.kpis)
+                print_progress_bar(iteration=index + 1, total=total_scenarios, prefix='Design screening', suffix='')
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(_screen_designs_in_scenario, self.inputObject, scenario, dataFile,
+                                           designs, self.solver_name, self.solver_interface,
+                                           self.solver_options, self.kpis)
+                           for scenario, dataFile in scenarioDataFiles.items()]
+
+                for index, future in enumerate(as_completed(futures)):
+                    rows += future.result()
+                    print_progress_bar(iteration=index + 1, total=total_scenarios, prefix='Design screening',
+                                       suffix='')
+        # Print a newline character to ensure the next console output is on a new line.
+        print()
+
+        screeningData = pd.DataFrame(rows)
+        # keep the order of the designs and scenarios as they were given
+        screeningData['design'] = pd.Categorical(screeningData['design'], categories=list(designs.keys()))
+        screeningData['scenario'] = pd.Categorical(screeningData['scenario'],
+                                                   categories=list(scenarioDataFiles.keys()))
+        screeningData = screeningData.sort_values(['design', 'scenario']).reset_index(drop=True)
+
+        model_output.set_screening_data(screeningData, designs)
+        timer = time_printer(timer1, printTimer=False, programm_step="Ending design screening")
+        model_output.fill_information(timer)
+
+        if hasattr(self.inputObject, 'uncertaintyMatrix'):
+            model_output.uncertaintyMatrix = self.inputObject.uncertaintyMatrix
+
+        return model_output
+
+    def get_scenario_data_files(self):
+        """
+        Returns the scenario data files to screen the designs against. If no scenarios are given or defined in the
+        superstructure object, the deterministic data file is used as a single scenario.
+        """
+        if self.scenarioDataFiles is not None:
+            return self.scenarioDataFiles
+        elif getattr(self.inputObject, 'scenarioDataFiles', None):
+            return self.inputObject.scenarioDataFiles
+        else:
+            if not self.inputObject.Data_File[None]:
+                self.inputObject.create_DataFile()
+            return {'deterministic': self.inputObject.Data_File}
+
+    @staticmethod
+    def normalize_designs(designs, units, names=None):
+        """
+        Translates the different ways a design can be passed on to {designName: {'Y': {...}, 'Y_DIST': {...}}}.
+        Units that are not mentioned in a Y vector stay free; for return_chosen-style dictionaries and tuples of
+        chosen unit names (or numbers) all units that are not chosen are switched off.
+
+        :param designs: dictionary {designName: design} or list of designs
+        :param units: list of all unit numbers of the superstructure
+        :param names: dictionary {unitNumber: unitName}, needed if the designs are given by unit names
+        :return: dictionary {designName: {'Y': dict, 'Y_DIST': dict or None}}
+        """
+        names = names if names is not None else {}
+        if isinstance(designs, dict) and all(isinstance(key, tuple) for key in designs):
+            # keys of the flowsheet dictionary of the AdvancedMultiModelAnalyzer, the keys are the designs
+            designs = list(designs.keys())
+
+        if not isinstance(designs, dict):
+            designs = {'design_{}'.format(nr + 1): design for nr, design in enumerate(designs)}
+
+        normalizedDesigns = {}
+        for designName, design in designs.items():
+            if isinstance(design, (tuple, list)):
+                if all(isinstance(item, (tuple, list)) and len(item) == 2 for item in design):
+                    # items of a return_chosen-style dictionary
+                    design = dict(design)
+                else:
+                    # chosen unit names or numbers
+                    unknown = [item for item in design if item not in units and item not in names.values()]
+                    if unknown:
+                        raise ValueError("The units {} of the design '{}' are not in the superstructure"
+                                         .format(unknown, designName))
+                    design = {u: names.get(u, str(u)) for u in units if u in design or names.get(u) in design}
+
+            if 'Y' in design:
+                Y = design['Y']
+                Y_DIST = design.get('Y_DIST')
+            elif all(isinstance(value, str) for value in design.values()):
+                # return_chosen-style dictionary
+                Y = {u: 1 if u in design else 0 for u in units}
+                Y_DIST = None
+            else:
+                Y = design
+                Y_DIST = None
+
+            normalizedDesigns[designName] = {'Y': Y, 'Y_DIST': Y_DIST}
+
+        return normalizedDesigns
@@ -0,0 +1,165 @@
+"""
+Payoff table of the objectives, shared by the multi-criteria optimizers.
+
+The payoff table holds the optimum of every objective and the values of all other objectives at that optimum. The
+MCDA normalisation, the anchor points of the epsilon-constraint methods and the corners of the design space
+exploration are all rows of such a table. The table is calculated once per model structure and data (the key of
+utils.solve_cache plus the objectives and options) and kept for the session, with a directory also between sessions.
+
+A row whose optimization stops at a limit without a solution is reported and left out: its values are NaN, its
+anchor is None and the incomplete table is not cached.
+
+The rows are independent, so they can be solved in parallel threads, every thread on its own copy of the model
+instance with its own solver object. This needs a solver interface which can run several solves at the same time
+(e.g. the executable interfaces), so the rows are solved one after the other by default.
+"""
+
+import copy
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyomo.environ as pyo
+
+from ...utils.solve_cache import get_solve_cache
+
+
+def objective_expression(model_instance, objective):
+    """
+    Returns
+    -------
+    expression : the variable of the model instance which is the objective (NPC, EBIT, NPE, FWD or an impact
+        category)
+    """
+    if objective in ('NPC', 'EBIT', 'NPE'):
+        return getattr(model_instance, objective)
+    elif objective == 'FWD':
+        return model_instance.NPFWD
+    elif objective in list(model_instance.IMPACT_CATEGORIES):
+        return model_instance.IMPACT_TOT[objective]
+    else:
+        raise Exception("The objective function {} is not defined in the model instance".format(objective))
+
+
+def objective_sense(objective, flipSense=False):
+    """
+    Returns
+    -------
+    sense : pyo.maximize for EBIT, pyo.minimize for all other objectives (the other way round if flipSense)
+    """
+    if (objective == 'EBIT') != flipSense:
+        return pyo.maximize
+    return pyo.minimize
+
+
+def _solve_row(single_optimizer, model_instance, objective, objectives, lexicographic, flipSense):
+    """
+    Optimizes the objective (lexicographic: then the other objectives in their order, each with the optima of
+    the preceding ones as bounds) and returns the values of all objectives and the solved run. If the objective
+    is not solved (run_optimization returns a string, e.g. 'time limit') the values are NaN and the run is None,
+    if a later lexicographic step is not solved the row of the preceding step is returned.
+    """
+    order = [objective] + ([o for o in objectives if o != objective] if lexicographic else [])
+
+    values, solved = [np.nan] * len(objectives), None
+    model_instance.payoff_bounds = pyo.ConstraintList()
+    try:
+        for objective2 in order:
+            expression = objective_expression(model_instance, objective2)
+            sense = objective_sense(objective2, flipSense)
+            model_instance.del_component('Objective')
+            model_instance.Objective = pyo.Objective(expr=expression, sense=sense)
+
+            single_solved = single_optimizer.run_optimization(model_instance, tee=False, printTimer=False)
+            if isinstance(single_solved, str):
+                print('Payoff table: optimization of {} for the row of {} stopped without a solution ({})'
+                      .format(objective2, objective, single_solved))
+                break
+            values = [pyo.value(objective_expression(model_instance, o)) for o in objectives]
+            solved = single_solved
+
+            optimum = pyo.value(expression)
+            tolerance = 1e-6 * max(1.0, abs(optimum))
+            if sense == pyo.maximize:
+                model_instance.payoff_bounds.add(expression >= optimum - tolerance)
+            else:
+                model_instance.payoff_bounds.add(expression <= optimum + tolerance)
+    finally:
+        model_instance.del_component('payoff_bounds')
+
+    if solved is not None:
+        solved._tidy_data()
+    return values, solved
+
+
+def payoff_table(single_optimizer, model_instance, objectives, lexicographic=False, flipSense=False, workers=None,
+                 directory=None):
+    """
+    Parameters
+    ----------
+    single_optimizer : SingleOptimizer
+    model_instance : PYOMO ConcreteModel
+    objectives : list
+        Names of the objectives (NPC, EBIT, NPE, FWD or an impact category)
+    lexicographic : Boolean
+        If True every row is the lexicographic optimum (the other objectives are optimized in their order with
+        the preceding optima as bounds), so the anchors are efficient solutions
+    flipSense : Boolean
+        If True the objectives are optimized in the opposite sense (e.g. the worst NPC)
+    workers : Integer, optional
+        Number of rows solved in parallel threads, default is one row after the other
+    directory : String, optional
+        Directory of the solve cache to keep the table between sessions (see utils.solve_cache)
+
+    Returns
+    -------
+    table : Dictionary
+        objectives: the objectives, payoff: np.ndarray with payoff[k, j] the value of objective j at the optimum
+        of objective k (NaN if objective k was not solved), anchors: {objective: ModelOutput of its optimum or None}
+
+    Description
+    -----------
+    The objective of the model instance is changed, the callers set their own objective afterwards.
+
+    """
+    objectives = list(objectives)
+    cache = get_solve_cache(directory)
+    instanceKey = cache.key(model_instance, single_optimizer.solver_name, dict(single_optimizer.solver.options))
+    key = hashlib.sha1('{}:payoff:{}:{}:{}'.format(instanceKey, objectives, lexicographic,
+                                                   flipSense).encode()).hexdigest()
+
+    table = cache.get(key)
+    if table is not None:
+        print('Payoff table of {} taken from the cache'.format(', '.join(objectives)))
+        return table
+
+    if workers is not None and workers > 1 and len(objectives) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_solve_row, single_optimizer.copy(), copy.deepcopy(model_instance), objective,
+                                       objectives, lexicographic, flipSense) for objective in objectives]
+            rows = [future.result() for future in futures]
+    else:
+        rows = [_solve_row(single_optimizer, model_instance, objective, objectives, lexicographic, flipSense)
+                for objective in objectives]
+
+    table = {'objectives': objectives,
+             'payoff': np.array([values for values, _ in rows], dtype=float),
+             'anchors': {objective: solved for objective, (_, solved) in zip(objectives, rows)}}
+    unsolved = [objective for objective, solved in table['anchors'].items() if solved is None]
+    if unsolved:
+        # the table depends on the limits of the solver, it is not kept
+        print('The payoff table is incomplete, the rows of {} are left out'.format(', '.join(unsolved)))
+    else:
+        cache.put(key, table)
+    return table
+
+
+def payoff_settings(superstructure):
+    """
+    Returns
+    -------
+    settings : Dictionary
+        workers and directory of the payoff table from the superstructure (see Superstructure.set_payoffTable)
+    """
+    return {'workers': getattr(superstructure, 'payoffWorkers', None),
+            'directory': getattr(superstructure, 'payoffDirectory', None)}
@@ -0,0 +1,263 @@
+"""
+Time limit scheduling of the solves of a sweep (sensitivity points or scenarios).
+
+A few hard points can take most of the run time of a large sweep. The scheduler gives every solve a time limit and a
+gap target and keeps the whole sweep within a wall-clock budget:
+
+    - the time limit of a solve is the per-solve limit, but at most an equal share of the remaining budget over the
+      points which are still to be solved, so points which finish early leave their time to the others
+    - a solve which stops at the time limit with an incumbent is accepted, its gap is kept in the ModelOutput
+      (_optimality_gap) and in the schedule table
+    - when all points are solved, the points with the largest gaps above the gap target (and the points without
+      incumbent) are solved again, worst first, with the solution of the first solve as MIP start and an equal share
+      of the remaining budget
+    - points which can not be started within the budget are skipped and reported
+
+The time limit and gap options of the solvers are set on the solver object of the optimizer for each solve and
+reset afterwards. The GAMS interface passes its options to the model writer, so the limits are given to GAMS as
+option statements (add_options).
+"""
+
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# names of the time limit (seconds) and relative gap options of the solvers
+TIME_LIMIT_OPTIONS = {'gurobi': 'TimeLimit', 'cbc': 'sec', 'glpk': 'tmlim', 'scip': 'limits/time', 'gams': 'reslim'}
+GAP_OPTIONS = {'gurobi': 'MIPGap', 'cbc': 'ratio', 'glpk': 'mipgap', 'scip': 'limits/gap', 'gams': 'optcr'}
+
+
+def limit_options(solver, solver_name, timeLimit=None, gap=None):
+    """
+    Parameters
+    ----------
+    solver : pyomo solver object, its current options are kept
+    solver_name : String
+    timeLimit : Float, optional
+        Time limit in seconds, None or inf for no limit
+    gap : Float, optional
+        Relative gap target
+
+    Returns
+    -------
+    options : Dictionary
+        Options to set on solver.options for the limits, for GAMS the add_options of the solver extended by the
+        option statements of the limits
+
+    """
+    options = {}
+    if timeLimit is not None and timeLimit != float('inf'):
+        options[TIME_LIMIT_OPTIONS[solver_name]] = timeLimit
+    if gap is not None:
+        options[GAP_OPTIONS[solver_name]] = gap
+
+    if solver_name == 'gams' and options:
+        statements = ['option {}={};'.format(option, value) for option, value in options.items()]
+        current = solver.options['add_options'] if 'add_options' in solver.options else []
+        options = {'add_options': list(current) + statements}
+    return options
+
+
+@contextmanager
+def solver_limits(solver, solver_name, timeLimit=None, gap=None):
+    """
+    Sets the time limit and the gap target (see limit_options) on the solver object for the solves within the
+    context and restores the options of the solver afterwards
+    """
+    options = limit_options(solver, solver_name, timeLimit, gap)
+    previous = {option: solver.options[option] for option in options if option in solver.options}
+    for option, value in options.items():
+        solver.options[option] = value
+    try:
+        yield
+    finally:
+        for option in options:
+            if option in previous:
+                solver.options[option] = previous[option]
+            else:
+                del solver.options[option]
+
+
+class SolveScheduler:
+    """
+    Class Description
+    -----------------
+    Sets the time limits and gap targets of the solves of a sweep and decides which points are refined (see module
+    description).
+    """
+
+    def __init__(self, solver_name, timeLimit=None, gap=None, budget=None, refine=True, minTimeLimit=1.0):
+        """
+        Parameters
+        ----------
+        solver_name : String
+        timeLimit : Float, optional
+            Time limit of a single solve in seconds
+        gap : Float, optional
+            Relative gap target of the solves (e.g. 0.01), points above it are refined
+        budget : Float, optional
+            Wall-clock budget of the whole sweep in seconds
+        refine : Boolean
+            If True the points with the largest gaps are solved again with the remaining budget
+        minTimeLimit : Float
+            Smallest time limit of a solve in seconds, a point is skipped if less budget is left
+
+        """
+        if solver_name not in TIME_LIMIT_OPTIONS:
+            raise ValueError("The solve schedule does not know the options of the solver '{}', choose from "
+                             "{}".format(solver_name, ', '.join(TIME_LIMIT_OPTIONS)))
+
+        self.solver_name = solver_name
+        self.timeLimit = timeLimit
+        self.gap = gap
+        self.budget = budget
+        self.refine = refine
+        self.minTimeLimit = minTimeLimit
+
+        self.records = {}
+        self._solver = None
+        self._start = None
+        self._pending = 0
+
+    @classmethod
+    def from_superstructure(cls, superstructure, solver_name):
+        """
+        Returns
+        -------
+        scheduler : SolveScheduler or None if the superstructure has no solve schedule (see
+            Superstructure.set_solveSchedule)
+        """
+        settings = getattr(superstructure, 'solveSchedule', None)
+        if not settings:
+            return None
+        return cls(solver_name, **settings)
+
+    def start(self, solver, numberOfPoints):
+        """
+        Starts the wall clock of the sweep with the solver object whose options are set (the solver of the single
+        optimizer of the sweep) and the number of points to solve
+        """
+        self._solver = solver
+        self._start = time.perf_counter()
+        self._pending = numberOfPoints
+        self.records = {}
+
+    def remaining(self):
+        """
+        Returns
+        -------
+        remaining : Float, seconds of the budget which are left (inf without budget)
+        """
+        if self.budget is None:
+            return float('inf')
+        return self.budget - (time.perf_counter() - self._start)
+
+    def time_limit(self, pending=None):
+        """
+        Returns
+        -------
+        timeLimit : Float or None
+            Time limit of the next solve, None if the budget is used up (the point is skipped) and inf if
+            there is no limit
+        """
+        pending = max(self._pending if pending is None else pending, 1)
+        limit = self.timeLimit if self.timeLimit is not None else float('inf')
+        remaining = self.remaining()
+        if remaining < self.minTimeLimit:
+            return None
+        return min(limit, max(remaining / pending, self.minTimeLimit))
+
+    def limits(self, solver, timeLimit):
+        """
+        Sets the time limit and the gap target on the solver object for the solves within the context
+        """
+        return solver_limits(solver, self.solver_name, timeLimit, self.gap)
+
+    def solve(self, point, solve, refine=False):
+        """
+        Parameters
+        ----------
+        point : hashable
+            Identifier of the point (e.g. the scenario or (parameter, value))
+        solve : callable
+            solve() solves the point with the options of the solver and returns the ModelOutput, 'infeasible' or
+            'time limit' (see SingleOptimizer.run_optimization)
+        refine : Boolean
+            True for the second solve of a point
+
+        Returns
+        -------
+        single_solved : ModelOutput, 'infeasible', 'time limit' or 'skipped' if the budget is used up, None if a
+            refinement did not improve the gap of the first solve (the first solution is kept)
+
+        """
+        timeLimit = self.time_limit()
+        self._pending = max(self._pending - 1, 0)
+        if timeLimit is None:
+            if not refine:
+                self.records[point] = {'status': 'skipped', 'gap [%]': None, 'time [s]': 0.0, 'time limit [s]': 0.0,
+                                       'refined': False}
+            return 'skipped'
+
+        start = time.perf_counter()
+        with self.limits(self._solver, timeLimit):
+            single_solved = solve()
+        runTime = time.perf_counter() - start
+
+        if isinstance(single_solved, str):
+            status, gap = single_solved, None
+        else:
+            gap = single_solved._optimality_gap
+            condition = getattr(single_solved, '_termination_condition', None)
+            status = 'optimal' if condition in (None, 'optimal') else 'time limit'
+
+        record = self.records.get(point, {'time [s]': 0.0})
+        if refine and record.get('gap [%]') is not None and (gap is None or gap >= record['gap [%]']):
+            # the refinement did not improve the point, the first solution is kept
+            record.update({'time [s]': record['time [s]'] + runTime, 'refined': True})
+            return None
+
+        self.records[point] = {'status': status, 'gap [%]': gap, 'time [s]': record['time [s]'] + runTime,
+                               'time limit [s]': timeLimit, 'refined': refine}
+        return single_solved
+
+    def refinement_queue(self):
+        """
+        Returns
+        -------
+        points : list
+            Points with a gap above the target or without incumbent, worst first, if refinement is on and budget
+            is left
+        """
+        if not self.refine or self.remaining() < self.minTimeLimit:
+            return []
+
+        target = (self.gap or 0.0) * 100
+        queue = [(float('inf') if record['gap [%]'] is None else record['gap [%]'], point)
+                 for point, record in self.records.items()
+                 if record['status'] == 'time limit' and (record['gap [%]'] is None or record['gap [%]'] > target)]
+        queue.sort(key=lambda item: -item[0])
+        self._pending = len(queue)
+        return [point for _, point in queue]
+
+    def report(self):
+        """
+        Returns
+        -------
+        table : pd.DataFrame
+            One row per point with the status (optimal, time limit, infeasible or skipped), the gap in %, the solve
+            time, the time limit of the last solve and whether the point was refined
+        """
+        return pd.DataFrame.from_dict(self.records, orient='index',
+                                      columns=['status', 'gap [%]', 'time [s]', 'time limit [s]', 'refined'])
+
+    def print_summary(self):
+        """
+        Prints the number of points per status and the used time
+        """
+        table = self.report()
+        counts = table['status'].value_counts().to_dict() if len(table) else {}
+        print("\033[1;32m" + "Solve schedule: {} in {:.1f} s".format(
+            ', '.join('{} {}'.format(count, status) for status, count in counts.items()),
+            time.perf_counter() - self._start) + "\033[0m")
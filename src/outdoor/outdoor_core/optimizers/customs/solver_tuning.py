@@ -0,0 +1,415 @@
+"""
+Tuning of the solver options per superstructure.
+
+The default options of a MILP solver are a compromise over all problems. For one superstructure a few options
+(e.g. the MIP focus, the cut and heuristic effort or the presolve) can make the solves of a sweep several times
+faster. The tuner solves a sample of representative scenarios or sweep points with candidate option sets drawn
+from a search space:
+
+    - the first candidate is the baseline (the options of the run without tuned options), its solve times cap the
+      solves of the other candidates (capFactor times the baseline time, at most the time limit)
+    - a candidate is scored by the shifted geometric mean of its solve times, solves which stop at the cap count
+      twice the time limit (PAR2)
+    - candidates which give another objective than the baseline on a proven optimal point are rejected
+    - the best candidate is kept if it is at least minImprovement better than the baseline, else the baseline
+      (no tuned options) is kept
+
+The candidates are independent, so they can be solved in parallel threads, every thread on its own copies of the
+model instances with its own solver object. This needs a solver interface which can run several solves at the same
+time (e.g. the executable interfaces), so the candidates are solved one after the other by default.
+
+The best option set is stored in a local cache (a JSON file per solver and superstructure) keyed by the structure
+fingerprint without the parameter values (see utils.solve_cache.structure_fingerprint) of the single optimization
+instance of the nominal Data_File. The key only depends on the superstructure, so all scenarios, sweep points and
+optimization modes share the tuned options. If the tuned options are switched on (see
+Superstructure.set_solverTuning), SuperstructureProblem applies them on later runs of the same superstructure,
+options which are passed to the run explicitly take precedence.
+"""
+
+import copy
+import datetime
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+from .change_params import prepare_mutable_parameters
+from .solve_scheduler import TIME_LIMIT_OPTIONS, solver_limits
+from ..main_optimizer import SingleOptimizer
+from ...model.optimization_model import SuperstructureModel
+from ...utils.solve_cache import structure_fingerprint
+
+# search spaces of the tuner, {solver: {option: candidate values}}
+TUNING_SPACES = {
+    'gurobi': {'MIPFocus': [0, 1, 2, 3],
+               'Heuristics': [0.0, 0.05, 0.2],
+               'Cuts': [-1, 0, 1, 2],
+               'Presolve': [-1, 0, 2],
+               'Method': [-1, 1, 2],
+               'Symmetry': [-1, 0, 2]},
+    'cbc': {'cutsOnOff': ['on', 'off', 'root'],
+            'heuristicsOnOff': ['on', 'off'],
+            'preprocess': ['on', 'off', 'sos', 'equal'],
+            'strategy': [0, 1, 2]},
+}
+
+# local cache of the tuned options
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.outdoor', 'solver_tuning')
+
+
+def tuning_key(superstructure, solver_name):
+    """
+    Returns
+    -------
+    key : String
+        Structure fingerprint without the parameter values of the single optimization instance of the nominal
+        Data_File of the superstructure and the solver, the same for every run of the superstructure
+    """
+    model_instance = build_instances(superstructure, {'nominal': superstructure.create_DataFile()})['nominal']
+    return structure_fingerprint(model_instance, solver_name, values=False)
+
+
+def _tuning_path(solver_name, key, directory=None):
+    return os.path.join(directory or DEFAULT_DIRECTORY, '{}_{}.json'.format(solver_name, key))
+
+
+def has_tuned_options(solver_name, directory=None):
+    """
+    Returns
+    -------
+    tuned : Boolean
+        True if the cache holds tuned options of the solver for any superstructure, so the fingerprint of a model
+        instance only has to be calculated if there is something to find
+    """
+    directory = directory or DEFAULT_DIRECTORY
+    if not os.path.isdir(directory):
+        return False
+    return any(name.startswith(solver_name + '_') and name.endswith('.json') for name in os.listdir(directory))
+
+
+def load_tuned_options(superstructure, solver_name, directory=None):
+    """
+    Returns
+    -------
+    options : Dictionary or None if the superstructure was not tuned for the solver
+    """
+    path = _tuning_path(solver_name, tuning_key(superstructure, solver_name), directory)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)['options']
+
+
+def save_tuned_options(key, solver_name, result, directory=None):
+    """
+    Stores the options of the tuning result (see SolverTuner.tune) under the tuning key of the superstructure
+    """
+    directory = directory or DEFAULT_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    entry = {'solver': solver_name,
+             'options': result['options'],
+             'score [s]': result['score'],
+             'baseline score [s]': result['baseline score'],
+             'improvement [%]': result['improvement [%]'],
+             'points': result['points'],
+             'candidates': len(result['table']),
+             'date': datetime.datetime.now().isoformat(timespec='seconds')}
+    with open(_tuning_path(solver_name, key, directory), 'w') as file:
+        json.dump(entry, file, indent=2)
+
+
+def sample_data_files(superstructure, scenarios=None, points=None, seed=0):
+    """
+    Parameters
+    ----------
+    superstructure : Superstructure
+    scenarios : Integer, list or Dictionary, optional
+        Number of scenarios drawn from superstructure.scenarioDataFiles, the names of the scenarios or
+        {name: Data_File}
+    points : list, optional
+        Sweep points as changes of the nominal Data_File, e.g. [{'ProductPrice': {unit: 3000}}, ...]. Scalar
+        parameters are given as value.
+    seed : Integer
+        Seed of the random draw of the scenarios
+
+    Returns
+    -------
+    dataFiles : Dictionary
+        {name: Data_File} of the sample, the nominal Data_File if neither scenarios nor points are given
+
+    """
+    if scenarios is not None:
+        if isinstance(scenarios, dict):
+            return scenarios
+        dataFiles = superstructure.scenarioDataFiles
+        if isinstance(scenarios, int):
+            names = random.Random(seed).sample(list(dataFiles), min(scenarios, len(dataFiles)))
+        else:
+            names = list(scenarios)
+        return {name: dataFiles[name] for name in names}
+
+    nominal = superstructure.create_DataFile()
+    if points is None:
+        return {'nominal': nominal}
+
+    dataFiles = {}
+    for number, point in enumerate(points):
+        dataFile = copy.deepcopy(nominal)
+        for name, values in point.items():
+            if isinstance(values, dict):
+                dataFile[None][name].update(values)
+            else:
+                dataFile[None][name] = {None: values}
+        dataFiles['point {}'.format(number + 1)] = dataFile
+    return dataFiles
+
+
+def build_instances(superstructure, dataFiles, optimization_mode='single'):
+    """
+    Returns
+    -------
+    instances : Dictionary
+        {name: populated model instance} of the Data_Files, built like the model instances of the optimization
+        mode (the output blocks of the mode are part of the model, the sensitive parameters of the sensitivity
+        modes are mutable)
+    """
+    model = SuperstructureModel(superstructure)
+    model.modelBlocks = superstructure.get_modelBlocks(optimization_mode)
+    model.create_ModelEquations()
+    if optimization_mode in ('sensitivity', 'cross-parameter sensitivity'):
+        prepare_mutable_parameters(model, superstructure.sensitive_parameters)
+    return {name: model.populateModel(dataFile) for name, dataFile in dataFiles.items()}
+
+
+def shifted_geometric_mean(times, shift=1.0):
+    """
+    Returns
+    -------
+    mean : Float, geometric mean of the times shifted by shift seconds (small times do not dominate the score)
+    """
+    times = np.asarray(times, dtype=float)
+    return float(np.exp(np.mean(np.log(times + shift))) - shift)
+
+
+class SolverTuner:
+    """
+    Class Description
+    -----------------
+    Search over solver options on a sample of model instances (see module description).
+    """
+
+    def __init__(self, solver_name, solver_interface='local', solver_path=None, space=None, method='random',
+                 trials=20, workers=None, timeLimit=60.0, capFactor=2.0, minImprovement=0.05, seed=0,
+                 baseOptions=None):
+        """
+        Parameters
+        ----------
+        solver_name : String
+        solver_interface : String
+        solver_path : String, optional
+            Path of the solver executable for the executable interface
+        space : Dictionary, optional
+            {option: candidate values}, default is the search space of the solver in TUNING_SPACES
+        method : String
+            'random': trials option sets drawn from the space, 'grid': the combinations of the space in order
+            (at most trials)
+        trials : Integer
+            Number of candidates besides the baseline
+        workers : Integer, optional
+            Number of candidates solved in parallel threads, default is one candidate after the other
+        timeLimit : Float
+            Time limit of a single solve in seconds
+        capFactor : Float
+            Solves of the candidates are stopped at capFactor times the solve time of the baseline
+        minImprovement : Float
+            Relative improvement of the score the best candidate needs to replace the baseline
+        seed : Integer
+            Seed of the random search
+        baseOptions : Dictionary, optional
+            Options of all solves (e.g. the options passed to the runs), the candidates are added to them
+
+        """
+        if space is None:
+            if solver_name not in TUNING_SPACES:
+                raise ValueError("There is no search space for the solver '{}', pass one as space or choose from "
+                                 "{}".format(solver_name, ', '.join(TUNING_SPACES)))
+            space = TUNING_SPACES[solver_name]
+        if solver_name not in TIME_LIMIT_OPTIONS:
+            raise ValueError("The time limit option of the solver '{}' is not known".format(solver_name))
+        if method not in ('random', 'grid'):
+            raise ValueError("The tuning method has to be 'random' or 'grid', not '{}'".format(method))
+
+        self.solver_name = solver_name
+        self.solver_interface = solver_interface
+        self.solver_path = solver_path
+        self.space = space
+        self.method = method
+        self.trials = trials
+        self.workers = workers
+        self.timeLimit = timeLimit
+        self.capFactor = capFactor
+        self.minImprovement = minImprovement
+        self.seed = seed
+        self.baseOptions = dict(baseOptions or {})
+
+    def candidates(self):
+        """
+        Returns
+        -------
+        candidates : list
+            Option sets to evaluate, the first is the baseline (no options)
+        """
+        names = list(self.space)
+        combinations = list(itertools.product(*(self.space[name] for name in names)))
+        if self.method == 'random':
+            combinations = random.Random(self.seed).sample(combinations, min(self.trials, len(combinations)))
+        else:
+            combinations = combinations[:self.trials]
+        return [{}] + [dict(zip(names, values)) for values in combinations]
+
+    def _solve(self, options, instances, caps):
+        """
+        Returns
+        -------
+        rows : Dictionary
+            {point: {'status', 'time [s]', 'objective'}} of the solves of the instances with the options
+        """
+        optimizer = SingleOptimizer(self.solver_name, self.solver_interface, solver_path=self.solver_path,
+                                    solver_options={**self.baseOptions, **options})
+        rows = {}
+        for name, instance in instances.items():
+            start = time.perf_counter()
+            with solver_limits(optimizer.solver, self.solver_name, caps[name]):
+                single_solved = optimizer.run_optimization(instance, tee=False, keepfiles=False, printTimer=False,
+                                                           VSS_EVPI_mode=True)
+            runTime = time.perf_counter() - start
+
+            if isinstance(single_solved, str):
+                status, objective = single_solved, None
+            else:
+                condition = getattr(single_solved, '_termination_condition', None)
+                status = 'optimal' if condition in (None, 'optimal') else 'time limit'
+                objective = pyo.value(instance.Objective, exception=False)
+            rows[name] = {'status': status, 'time [s]': runTime, 'objective': objective}
+        return rows
+
+    def _score(self, rows, baseline=None):
+        """
+        Returns
+        -------
+        (score, rejected) : PAR2 shifted geometric mean of the solve times and whether the candidate gave another
+            objective than the baseline
+        """
+        times = [row['time [s]'] if row['status'] == 'optimal' else 2 * self.timeLimit for row in rows.values()]
+        rejected = False
+        if baseline is not None:
+            for name, row in rows.items():
+                reference = baseline[name]
+                if row['status'] == reference['status'] == 'optimal' and None not in (row['objective'],
+                                                                                      reference['objective']):
+                    tolerance = 1e-4 * max(1.0, abs(reference['objective']))
+                    rejected = rejected or abs(row['objective'] - reference['objective']) > tolerance
+        return (float('inf') if rejected else shifted_geometric_mean(times)), rejected
+
+    def tune(self, instances):
+        """
+        Parameters
+        ----------
+        instances : Dictionary
+            {point: populated model instance} of the sample (see build_instances)
+
+        Returns
+        -------
+        result : Dictionary
+            options: best option set ({} if no candidate beats the baseline), score and baseline score in
+            seconds, improvement [%], points: names of the sample points and table: pd.DataFrame with one row per
+            candidate (options, score, number of solved points and whether it was rejected)
+
+        """
+        candidates = self.candidates()
+        baseline = self._solve(candidates[0], instances, {name: self.timeLimit for name in instances})
+
+        # infeasible points do not tell anything about the options
+        infeasible = [name for name, row in baseline.items() if row['status'] == 'infeasible']
+        if infeasible:
+            print('Infeasible points are not used for the tuning: {}'.format(', '.join(map(str, infeasible))))
+        instances = {name: instance for name, instance in instances.items() if name not in infeasible}
+        baseline = {name: row for name, row in baseline.items() if name not in infeasible}
+        if not instances:
+            raise ValueError("All points of the tuning sample are infeasible")
+
+        caps = {name: self.timeLimit if row['status'] != 'optimal'
+                else min(self.timeLimit, max(self.capFactor * row['time [s]'], 1.0)) for name, row in baseline.items()}
+
+        if self.workers is not None and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self._solve, options, copy.deepcopy(instances), caps)
+                           for options in candidates[1:]]
+                results = [baseline] + [future.result() for future in futures]
+        else:
+            results = [baseline] + [self._solve(options, instances, caps) for options in candidates[1:]]
+
+        rows = []
+        for options, result in zip(candidates, results):
+            score, rejected = self._score(result, None if result is baseline else baseline)
+            rows.append({'options': options, 'score [s]': score,
+                         'solved': sum(row['status'] == 'optimal' for row in result.values()), 'rejected': rejected})
+        table = pd.DataFrame(rows).sort_values('score [s]', kind='stable').reset_index(drop=True)
+
+        baselineScore = rows[0]['score [s]']
+        best = table.iloc[0]
+        if best['score [s]'] > baselineScore * (1 - self.minImprovement):
+            best = table[table['options'].apply(len) == 0].iloc[0]
+
+        return {'options': dict(best['options']),
+                'score': float(best['score [s]']),
+                'baseline score': float(baselineScore),
+                'improvement [%]': float((1 - best['score [s]'] / baselineScore) * 100) if baselineScore > 0 else 0.0,
+                'points': [str(name) for name in instances],
+                'table': table}
+
+
+def tune_solver_options(superstructure, solver_name='gurobi', solver_interface='local', solver_path=None,
+                        optimization_mode='single', scenarios=None, points=None, directory=None, **tunerOptions):
+    """
+    Parameters
+    ----------
+    superstructure : Superstructure
+    solver_name : String
+    solver_interface : String
+    solver_path : String, optional
+    optimization_mode : String
+        Mode of the runs the options are tuned for, the model instances are built like the instances of the mode
+    scenarios : Integer, list or Dictionary, optional
+        Scenarios of the sample (see sample_data_files)
+    points : list, optional
+        Sweep points of the sample (see sample_data_files)
+    directory : String, optional
+        Directory of the cache of the tuned options, default is DEFAULT_DIRECTORY
+    tunerOptions :
+        Keyword arguments of SolverTuner (space, method, trials, workers, timeLimit, ...)
+
+    Returns
+    -------
+    result : Dictionary
+        See SolverTuner.tune, the options are stored in the cache for the superstructure
+
+    """
+    dataFiles = sample_data_files(superstructure, scenarios, points, seed=tunerOptions.get('seed', 0))
+    instances = build_instances(superstructure, dataFiles, optimization_mode)
+    key = tuning_key(superstructure, solver_name)
+
+    tuner = SolverTuner(solver_name, solver_interface, solver_path, **tunerOptions)
+    result = tuner.tune(instances)
+    save_tuned_options(key, solver_name, result, directory)
+
+    print("\033[1;32m" + "Solver tuning of {} on {} points: {} ({:.1f} % faster than the default options)".format(
+        solver_name, len(result['points']), result['options'] or 'default options', result['improvement [%]'])
+        + "\033[0m")
+    return result
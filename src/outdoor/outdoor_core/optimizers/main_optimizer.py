@@ -6,13 +6,21 @@ Created on Tue Jun 15 12:19:19 2021
 @author: philippkenkel
 """
 
+import contextlib
+
+import pandas as pd
 import pyomo.environ as pyo
 from pyomo.opt import TerminationCondition
 from pyomo.util.infeasible import log_infeasible_constraints
 import logging
 
+from ..model.optimization_model import calculate_omitted_blocks
 from ..output_classes.model_output import ModelOutput
+from ..output_classes.multi_model_output import MultiModelOutput
 from ..output_classes.stochastic_model_output import StochasticModelOutput
+from ..utils.scaling import scale_and_solve
+from ..utils.solver_status import LIMIT_CONDITIONS, best_bound, incumbent_objective
+from ..utils.solver_telemetry import TelemetryCapture
 from ..utils.timer import time_printer
 
 
@@ -84,6 +92,20 @@ class SingleOptimizer:
 
         # save optimisation mode
         self.optimization_mode = optimization_mode
+        self.solver_path = solver_path
+        # telemetry record of the last solve (see utils.solver_telemetry)
+        self.telemetry = None
+
+    def copy(self):
+        """
+        Returns
+        -------
+        optimizer : SingleOptimizer
+            New optimizer with its own solver object and the same solver and options, e.g. for parallel solves
+
+        """
+        return SingleOptimizer(self.solver_name, self.solver_interface, solver_path=getattr(self, 'solver_path', None),
+                               solver_options=dict(self.solver.options))
 
     def run_optimization(self,
                          model_instance,
@@ -92,17 +114,24 @@ class SingleOptimizer:
                          printTimer=True,
                          VSS_EVPI_mode=False,
                          stochastic_optimisation=False,
-                         runFeasibilityAnalysis=True):
+                         runFeasibilityAnalysis=True,
+                         warmstart=False):
 
 
         """
         Parameters
         ----------
         model_instance : PYOMO Concrete Model
+        warmstart : Boolean
+            If True the current values of the model instance are given to the solver as MIP start (only if the
+            solver interface supports it)
 
         Returns
         -------
         model_output : ModelOutput
+            'infeasible' for infeasible models in the VSS_EVPI_mode, 'time limit' if the solver stopped at a limit
+            without incumbent. If the telemetry is switched on (see Superstructure.set_solverTelemetry) the
+            telemetry record of the solve is also kept in self.telemetry, so it is available for these runs as well
 
         Description
         -----------
@@ -114,8 +143,27 @@ class SingleOptimizer:
 
         timer = time_printer(programm_step='Superstructure optimization run', printTimer=printTimer)
 
-        # Solve the model
-        results = self.solver.solve(model_instance, keepfiles=keepfiles, tee=tee)
+        # Solve the model, scaled if the instance has scaling factors (see Superstructure.set_autoScaling)
+        solveOptions = {'keepfiles': keepfiles, 'tee': tee}
+        if warmstart and self.solver.warm_start_capable():
+            solveOptions['warmstart'] = True
+
+        # if switched on, the log of the solve is parsed into the telemetry record of the run
+        # (see Superstructure.set_solverTelemetry and utils.solver_telemetry)
+        capture = None
+        if getattr(model_instance, '_solverTelemetry', False):
+            capture = TelemetryCapture(self.solver, self.solver_name)
+        with capture if capture is not None else contextlib.nullcontext():
+            if capture is not None:
+                solveOptions.update(capture.solve_options())
+            if model_instance.component('scaling_factor') is not None:
+                results = scale_and_solve(self.solver, model_instance, **solveOptions)
+            else:
+                results = self.solver.solve(model_instance, **solveOptions)
+        self.telemetry = None
+        if capture is not None:
+            self.telemetry = capture.record(results, incumbent_objective(results, model_instance),
+                                            best_bound(results, model_instance))
 
 
         # Check if the model is infeasible
@@ -156,9 +204,16 @@ class SingleOptimizer:
             elif results.solver.termination_condition == TerminationCondition.licensingProblems:
                 raise Exception('There seems to be a problem with the licencing of your solver\n'
                                 ' please check that the solver is correctly installed on choose another')
+            elif results.solver.termination_condition in LIMIT_CONDITIONS:
+                # a time limited solve is accepted with its incumbent and gap (see SolveScheduler)
+                if incumbent_objective(results, model_instance) is None:
+                    return 'time limit'
             else:
                 print("The solver terminated with a different condition.: ", results.solver.termination_condition)
 
+        # output blocks which are not part of the optimization are calculated from the solution
+        calculate_omitted_blocks(model_instance)
+
         gap = (
             (results["Problem"][0]["Upper bound"] - results["Problem"][0]["Lower bound"])
             / (results["Problem"][0]["Upper bound"] + 1e-9)) * 100
@@ -177,9 +232,209 @@ class SingleOptimizer:
                                        run_time=timer,
                                        gap=gap)
 
+        model_output._termination_condition = str(results.solver.termination_condition)
+        model_output._telemetry = self.telemetry
         return model_output
 
 
+    def run_enumeration(self, model_instance, numberOfDesigns=5, maxGap=None, useSolutionPool=True, tee=False,
+                        printTimer=True, minFlow=1e-4):
+        """
+        Parameters
+        ----------
+        model_instance : PYOMO Concrete Model
+        numberOfDesigns : Integer
+            Number of distinct flowsheets (patterns of the binaries Y of the process units) which are returned
+        maxGap : Float, optional
+            Largest objective gap in % to the optimum, the enumeration stops at the first worse flowsheet
+        useSolutionPool : Boolean
+            Use the solution pool of the solver where available (Gurobi) before adding no-good cuts
+        tee : Boolean
+            Show the solver output
+        minFlow : Float
+            Smallest inflow of a process unit with Y = 1 during the enumeration, so a switched on unit always
+            carries flow
+
+        Returns
+        -------
+        model_output : MultiModelOutput
+            One single-run ModelOutput per flowsheet with the rank (1 = optimum) as index. The objective gaps are
+            saved in the enumeration data (see MultiModelOutput.get_enumeration_table).
+
+        Description
+        -----------
+        Finds the best flowsheets in the order of their objective. A flowsheet is the set of process units with
+        Y = 1 and an inflow. During the enumeration the binaries of the free process units are linked to their flow
+        (FLOW_SUM >= minFlow * Y), so the solver cannot switch on units without flow and every binary pattern is a
+        distinct flowsheet. If the solver has a solution pool (Gurobi), the pool of the first solve gives the best
+        flowsheets directly: the first pool solution of every new flowsheet is its best solution. Afterwards, or for
+        other solvers, the found flowsheets are excluded with integer no-good cuts and the model is solved again,
+        with a persistent solver interface the cuts are added incrementally. If a solve still repeats a known
+        flowsheet (e.g. within the tolerances of the solver), only its binary pattern is excluded and the model is
+        solved again. The cuts and the flow links are removed from the instance at the end.
+
+        """
+        timer = time_printer(programm_step='Enumeration of the best flowsheets', printTimer=printTimer)
+
+        model_output = MultiModelOutput(optimization_mode='design enumeration')
+        # a flowsheet is the choice of the process units, the binaries of the sources and product pools only follow
+        designUnits = [u for u in model_instance.UU if u not in model_instance.U_PP and u not in model_instance.U_S]
+        freeY = [u for u in designUnits if not model_instance.Y[u].fixed] \
+            if isinstance(model_instance.Y, pyo.Var) else []
+
+        rows = []
+        patterns = []
+        # binary patterns of the free Y of the solutions which are excluded by the next cuts, and of all cut ones
+        pendingCuts = []
+        cutPatterns = set()
+
+        def exclude(binaries):
+            if binaries not in cutPatterns:
+                cutPatterns.add(binaries)
+                pendingCuts.append(binaries)
+
+        def add_design(objective, gap):
+            calculate_omitted_blocks(model_instance)
+            binaries = tuple(int(round(model_instance.Y[u].value or 0)) for u in freeY)
+            exclude(binaries)
+            # units without inflow cost nothing, a binary of 1 without flow is not part of the flowsheet
+            pattern = tuple(int(round(model_instance.Y[u].value or 0) == 1
+                                and (model_instance.FLOW_SUM[u].value or 0) > 1e-6) for u in designUnits)
+            if pattern in patterns:
+                # the solver switched on units without flow in a known flowsheet, only its binaries are excluded
+                return False
+
+            objectiveGap = 0.0 if not rows else abs(objective - rows[0]['objective']) / (
+                abs(rows[0]['objective']) + 1e-9) * 100
+            if maxGap is not None and objectiveGap > maxGap:
+                return None
+
+            patterns.append(pattern)
+            rank = len(rows) + 1
+            output = ModelOutput(model_instance=model_instance, optimization_mode='single',
+                                 solver_name=self.solver_name, run_time=time_printer(timer, printTimer=False),
+                                 gap=gap)
+            output._tidy_data()
+            model_output.add_process(rank, output)
+            rows.append({'rank': rank, 'objective': objective, 'gap [%]': objectiveGap,
+                         'units': ', '.join(str(model_instance.Names[u]) for u, value in zip(designUnits, pattern)
+                                            if value == 1)})
+            return True
+
+        # units which are switched on carry flow, otherwise several binary patterns give the same flowsheet
+        flowLinks = pyo.Constraint(freeY, rule=lambda m, u: m.FLOW_SUM[u] >= minFlow * m.Y[u])
+        model_instance.add_component(model_instance.Y.local_name + '_FlowLinks', flowLinks)
+
+        cuts = pyo.ConstraintList()
+        model_instance.add_component(model_instance.Y.local_name + '_NoGoodCuts', cuts)
+
+        persistent = None
+        try:
+            if model_instance.component('scaling_factor') is None:
+                persistent = self._persistent_solver(model_instance)
+
+            if persistent is not None and useSolutionPool and self.solver_name == 'gurobi' and freeY:
+                for objective in self._pool_solutions(persistent, model_instance, numberOfDesigns, tee):
+                    if add_design(objective, None) is None or len(rows) >= numberOfDesigns:
+                        break
+
+            # exclude the found flowsheets with no-good cuts and solve again
+            while len(rows) < numberOfDesigns and (freeY or not rows):
+                for binaries in pendingCuts:
+                    terms = [1 - model_instance.Y[u] if value == 1 else model_instance.Y[u]
+                             for u, value in zip(freeY, binaries)]
+                    if not terms:
+                        break
+                    cut = cuts.add(sum(terms) >= 1)
+                    if persistent is not None:
+                        persistent.add_constraint(cut)
+                else:
+                    pendingCuts.clear()
+                if pendingCuts:
+                    break
+
+                if persistent is not None:
+                    results = persistent.solve(tee=tee)
+                elif model_instance.component('scaling_factor') is not None:
+                    results = scale_and_solve(self.solver, model_instance, tee=tee)
+                else:
+                    results = self.solver.solve(model_instance, tee=tee)
+
+                if results.solver.termination_condition not in (TerminationCondition.optimal,
+                                                                TerminationCondition.feasible):
+                    break
+
+                gap = ((results["Problem"][0]["Upper bound"] - results["Problem"][0]["Lower bound"])
+                       / (results["Problem"][0]["Upper bound"] + 1e-9)) * 100
+                if add_design(pyo.value(model_instance.Objective), gap) is None:
+                    break
+        finally:
+            if persistent is not None:
+                for constraint in list(cuts.values()) + list(flowLinks.values()):
+                    persistent.remove_constraint(constraint)
+            model_instance.del_component(cuts)
+            model_instance.del_component(flowLinks)
+
+        if not rows:
+            raise Exception('No feasible flowsheet was found, please check the input data')
+
+        model_output.set_enumeration_data(pd.DataFrame(rows).set_index('rank'))
+        timer = time_printer(timer, 'Enumeration of the best flowsheets', printTimer=printTimer)
+        model_output.fill_information(timer)
+
+        return model_output
+
+    def _persistent_solver(self, model_instance):
+        """
+        Returns the persistent interface of the solver (e.g. gurobi_persistent) with the options of self.solver and
+        the model instance loaded, or None if the solver has no persistent interface
+        """
+        if self.solver_name + '_persistent' not in pyo.SolverFactory:
+            return None
+        try:
+            persistent = pyo.SolverFactory(self.solver_name + '_persistent')
+            if not persistent.available(exception_flag=False):
+                return None
+        except Exception:
+            return None
+
+        for option, value in self.solver.options.items():
+            persistent.options[option] = value
+        persistent.set_instance(model_instance)
+        return persistent
+
+    @staticmethod
+    def _pool_solutions(persistent, model_instance, numberOfDesigns, tee):
+        """
+        Solves the instance with the Gurobi solution pool and loads the pool solutions one after the other into the
+        instance (best first), yields the objective value of each loaded solution. The pool parameters of the
+        Gurobi model are restored after the solve.
+        """
+        poolParameters = {'PoolSearchMode': 2, 'PoolSolutions': 10 * numberOfDesigns}
+        # get_gurobi_param_info returns (name, type, current value, min, max, default)
+        previous = {name: persistent.get_gurobi_param_info(name)[2] for name in poolParameters}
+        for name, value in poolParameters.items():
+            persistent.options[name] = value
+        try:
+            results = persistent.solve(tee=tee, load_solutions=False)
+        finally:
+            for name, value in previous.items():
+                persistent.options.pop(name, None)
+                persistent.set_gurobi_param(name, value)
+        if results.solver.termination_condition not in (TerminationCondition.optimal, TerminationCondition.feasible):
+            return
+
+        variables = list(model_instance.component_data_objects(pyo.Var, descend_into=True))
+        try:
+            for k in range(persistent.get_model_attr('SolCount')):
+                persistent.set_gurobi_param('SolutionNumber', k)
+                for var in variables:
+                    if not var.fixed:
+                        var.set_value(persistent.get_var_attr(var, 'Xn'), skip_validation=True)
+                yield persistent.get_model_attr('PoolObjVal')
+        finally:
+            persistent.set_gurobi_param('SolutionNumber', 0)
+
     def set_solver_options(self, solver, options):
         """
         Parameters
@@ -1044,14 +1044,10 @@ class AdvancedMultiModelAnalyzer(BasicModelAnalyzer):
         :param flowsheetDict: dict
         :return: productsPerFlowsheet: list
         """
-        if hasattr(self.model_output._results_data['sc1'], '_data'):
-            productIDs = self.model_output._results_data['sc1']._data['U_PP']
-            generatorIDs = tuple(set(self.model_output._results_data['sc1']._data['U_TUR'] +
-                                    self.model_output._results_data['sc1']._data['U_FUR']))
-        else:
-            productIDs = self.model_output._results_data['sc1']['U_PP']
-            generatorIDs = tuple(set(self.model_output._results_data['sc1']['U_TUR'] +
-                                    self.model_output._results_data['sc1']['U_FUR']))
+        # the sets are the same for all scenarios, read them from the shared structure
+        structure = self.model_output.get_structure()
+        productIDs = structure['U_PP']
+        generatorIDs = tuple(set(structure['U_TUR'] + structure['U_FUR']))
 
         # productIDs = self.model_output._results_data['sc1']._data['U_PP']
         # generatorIDs = tuple(set(self.model_output._results_data['sc1']._data['U_TUR'] +
@@ -49,12 +49,18 @@ class ModelOutput:
 
     def __init__(self, model_instance=None, optimization_mode = None, solver_name=None, run_time=None, gap = None):
         self._data = {}
+        # names of the sets and parameters in _data, i.e., the data describing the structure of the model
+        self._structure_keys = set()
         self._solver = None
         self._run_time = None
         self._case_time = None
         self._objective_function = None
         self._product_load = None
         self._optimality_gap = None
+        # termination condition of the solver, e.g. maxTimeLimit for an accepted incumbent (see SolveScheduler)
+        self._termination_condition = None
+        # nodes, presolve, root relaxation and incumbent trajectory of the solve (see utils.solver_telemetry)
+        self._telemetry = None
         self._case_numner = None
         self._meta_data = dict()
 
@@ -65,7 +71,9 @@ class ModelOutput:
             "single",
             "wait and see",
             "here and now",
-            "multi-objective"
+            "multi-objective",
+            "design screening",
+            "design enumeration",
         }
 
         if optimization_mode in self._optimization_mode_set:
@@ -151,6 +159,11 @@ class ModelOutput:
         """
 
         for i in instance.component_objects():
+            # remember which entries are sets and parameters so they can be shared between runs
+            if ("pyomo.core.base.param." in str(type(i)) or "pyomo.core.base.set." in str(type(i))
+                    or "pyomo.core.base.sets." in str(type(i))):
+                self._structure_keys.add(i.local_name)
+
             if "pyomo.core.base.var.SimpleVar" in str(type(i)):
                 self._data[i.local_name] = i.value
             elif "pyomo.core.base.var.ScalarVar" in str(type(i)):
@@ -180,6 +193,100 @@ class ModelOutput:
 
         return self._data
 
+    def get_data(self):
+        """
+        Returns
+        -------
+        data : Dictionary
+            The full data of the run (sets, parameters and variables)
+        """
+        return dict(self._data)
+
+    def get_telemetry(self, trajectory=False):
+        """
+        Parameters
+        ----------
+        trajectory : Boolean
+            If True the incumbent and bound trajectory is returned as DataFrame instead of the record
+
+        Returns
+        -------
+        telemetry : Dictionary or pandas DataFrame
+            The telemetry record of the solve (see utils.solver_telemetry) or its trajectory with the columns
+            time [s], incumbent and bound
+        """
+        telemetry = getattr(self, '_telemetry', None)
+        if telemetry is None:
+            raise Exception("No telemetry available, switch it on with Superstructure.set_solverTelemetry")
+
+        if trajectory:
+            return pd.DataFrame(telemetry['trajectory'], columns=['time [s]', 'incumbent', 'bound'])
+        return telemetry
+
+    def get_structure(self):
+        """
+        Returns
+        -------
+        structure : Dictionary
+            The sets and parameters of the run
+        """
+        structureKeys = getattr(self, '_structure_keys', set())
+        return {key: value for key, value in self._data.items() if key in structureKeys}
+
+    def get_values(self):
+        """
+        Returns
+        -------
+        values : Dictionary
+            The data specific to this run, i.e., the variables and, if the structure is shared with other runs,
+            the parameters which differ from the shared structure.
+        """
+        excluded = getattr(self, '_shared_keys', None)
+        if excluded is None:
+            excluded = getattr(self, '_structure_keys', set())
+        return {key: value for key, value in self._data.items() if key not in excluded}
+
+    def split_structure(self, structure=None):
+        """
+        Parameters
+        ----------
+        structure : Dictionary, optional
+            Structure (sets and parameters) shared by several runs. If None, the structure of this run is used.
+
+        Returns
+        -------
+        structure : Dictionary
+            The structure the run refers to, hand it on to the next run to share it.
+
+        Description
+        -----------
+        The entries of the run which are equal to the structure are replaced by the objects of the structure, so
+        the runs share them by reference and they are kept in memory once. _data stays a plain dictionary with
+        all entries of the run: deleting or changing an entry only changes this run. The shared objects must not
+        be changed in place.
+        """
+        data = dict(self._data)
+
+        structureKeys = getattr(self, '_structure_keys', set())
+
+        if structure is None:
+            structure = {key: value for key, value in data.items() if key in structureKeys}
+
+        sharedKeys = set()
+        for key, value in data.items():
+            if key in structure:
+                try:
+                    equal = structure[key] is value or bool(structure[key] == value)
+                except Exception:
+                    equal = False
+                if equal:
+                    data[key] = structure[key]
+                    sharedKeys.add(key)
+
+        self._data = data
+        self._shared_keys = sharedKeys
+        return structure
+
     def _fill_information(self, solver_name, run_time, gap):
         """
         Parameters
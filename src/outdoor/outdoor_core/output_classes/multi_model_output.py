@@ -10,12 +10,15 @@ import datetime
 import os
 
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
+import pandas as pd
 from tabulate import tabulate
 import matplotlib.pyplot as plt
 
 from outdoor.outdoor_core.output_classes.model_output import ModelOutput
+from outdoor.outdoor_core.output_classes.scenario_result_store import ScenarioResultStore
+from outdoor.outdoor_core.utils.global_sensitivity import global_sensitivity_analysis
+from outdoor.outdoor_core.utils.price_rescoring import PriceRescorer
+from outdoor.outdoor_core.utils.solver_telemetry import print_telemetry_report, summarize_telemetry, telemetry_table
 
 
 class MultiModelOutput(ModelOutput):
@@ -42,7 +45,9 @@ class MultiModelOutput(ModelOutput):
                 solver_name = None,
                 run_time = None,
                 gap = None,
-                dataFiles = None,):
+                dataFiles = None,
+                memory_limit = None,
+                spill_directory = None,):
 
         # initiate the parent class
         super().__init__(model_instance, optimization_mode, solver_name, run_time, gap)
@@ -50,6 +55,11 @@ class MultiModelOutput(ModelOutput):
         self._total_run_time = None
         self._case_time = None
         self._results_data = {}
+        # sets and parameters shared by all single runs, written once per run (see add_process)
+        self._structure = None
+        if memory_limit is not None:
+            # keeps the shared data once and spills scenarios to disk if the memory limit (MB) is exceeded
+            self._results_data = ScenarioResultStore(memory_limit, spill_directory)
         self._multi_criteria_data = None
         self._sensitivity_data = None
         self._optimization_mode_set = {
@@ -58,6 +68,8 @@ class MultiModelOutput(ModelOutput):
             "multi-objective MCDA",
             "cross-parameter sensitivity",
             "wait and see",
+            "design screening",
+            "design enumeration",
         }
 
         if optimization_mode in self._optimization_mode_set:
@@ -77,6 +89,19 @@ class MultiModelOutput(ModelOutput):
         # pass on the multi-objective settings
         self.multi_data = None
 
+        # results of the design screening (designs x scenarios)
+        self._screening_data = None
+        self._screening_designs = None
+
+        # ranking of the enumerated flowsheets (see SingleOptimizer.run_enumeration)
+        self._enumeration_data = None
+
+        # efficient solutions of the AUGMECON2 run (see MultiObjectiveOptimizer.run_augmecon)
+        self._pareto_data = None
+
+        # segments of the parametric sensitivity (see SensitivityOptimizer.run_parametric_optimization)
+        self._parametric_data = None
+
 
     def add_process(self, index, process_results):
         """
@@ -89,11 +114,67 @@ class MultiModelOutput(ModelOutput):
 
         Description
         -------
-        Adds a single-run ModelOutput to the MultiModelOutput data-file
+        Adds a single-run ModelOutput to the MultiModelOutput data-file. The sets and parameters of the
+        first run are kept once as the shared structure, the single-runs only keep their variables and the
+        parameters which differ from the shared structure (e.g. the uncertain parameters of a scenario).
 
         """
+        if hasattr(process_results, 'split_structure'):
+            self._structure = process_results.split_structure(self._structure)
         self._results_data[index] = process_results
 
+    def get_structure(self):
+        """
+        Returns
+        -------
+        structure : Dictionary
+            The sets and parameters shared by all single runs. For outputs saved before the structure was
+            shared, the data of the first single run is returned.
+        """
+        if getattr(self, '_structure', None) is not None:
+            return self._structure
+
+        firstRun = self._results_data[next(iter(self._results_data))]
+        if hasattr(firstRun, '_data'):
+            return firstRun._data
+        return firstRun
+
+    def get_run_data(self, index):
+        """
+        Parameters
+        ----------
+        index : String or value
+            Identifier of the single-run
+
+        Returns
+        -------
+        data : Dictionary
+            Full data (structure and values) of the single-run
+        """
+        results = self._results_data[index]
+        if hasattr(results, 'get_data'):
+            return results.get_data()
+        return dict(results)
+
+    def set_memory_limit(self, memory_limit, spill_directory=None):
+        """
+        Parameters
+        ----------
+        memory_limit : Float
+            Memory ceiling in MB for the single-run results kept in RAM
+        spill_directory : String, optional
+            Directory to spill the least recently used single-run results to, a temporary directory is used if None
+
+        Description
+        -------
+        Moves the single-run results into a ScenarioResultStore, which stores the data shared by all runs once
+        and spills runs to disk if the memory limit is exceeded. Access via self._results_data[index] stays the same.
+        """
+        resultsData = ScenarioResultStore(memory_limit, spill_directory)
+        for index, process_results in self._results_data.items():
+            resultsData[index] = process_results
+        self._results_data = resultsData
+
     def set_multi_criteria_data(self, data):
         """
         Parameters
@@ -115,6 +196,160 @@ class MultiModelOutput(ModelOutput):
         """
         self._sensitivity_data = data
 
+    def set_screening_data(self, data, designs=None):
+        """
+        Parameters
+        ----------
+        data : pandas DataFrame
+            One row per design and scenario with the columns design, scenario, feasible, termination,
+            objective and the screened KPIs
+        designs : DICT, optional
+            The screened designs {designName: {'Y': {...}, 'Y_DIST': {...}}}
+        """
+        self._screening_data = data
+        self._screening_designs = designs
+
+    def get_screening_table(self, kpi='objective'):
+        """
+        Parameters
+        ----------
+        kpi : String
+            Column of the screening data to return, e.g. 'objective', 'feasible', 'NPC' or 'GWP_TOT'
+
+        Returns
+        -------
+        table : pandas DataFrame
+            N x M table with the designs as rows and the scenarios as columns
+        """
+        if self._screening_data is None:
+            raise Exception("No design screening data available, run the 'design screening' mode first")
+
+        return self._screening_data.pivot(index='design', columns='scenario', values=kpi)
+
+    def set_enumeration_data(self, data):
+        """
+        Parameters
+        ----------
+        data : pandas DataFrame
+            One row per enumerated flowsheet (index rank) with the columns objective, gap [%] and units
+        """
+        self._enumeration_data = data
+
+    def get_enumeration_table(self):
+        """
+        Returns
+        -------
+        table : pandas DataFrame
+            The enumerated flowsheets ordered by their objective with the objective gap in % to the optimum
+        """
+        if getattr(self, '_enumeration_data', None) is None:
+            raise Exception("No enumeration data available, run SingleOptimizer.run_enumeration first")
+
+        return self._enumeration_data
+
+    def set_pareto_data(self, data):
+        """
+        Parameters
+        ----------
+        data : pandas DataFrame
+            One row per efficient solution with the run name, the grid indices of the constrained objectives and
+            the values of all objectives
+        """
+        self._pareto_data = data
+
+    def get_pareto_table(self):
+        """
+        Returns
+        -------
+        table : pandas DataFrame
+            The efficient solutions of the AUGMECON2 run with the values of all objectives
+        """
+        if getattr(self, '_pareto_data', None) is None:
+            raise Exception("No pareto data available, run the multi-objective mode with the method 'augmecon2'")
+
+        return self._pareto_data
+
+    def set_parametric_data(self, data):
+        """
+        Parameters
+        ----------
+        data : pandas DataFrame
+            One row per segment of the parametric sensitivity with the columns parameter, start, end, units,
+            objective, objective slope, limit and the slopes of the KPIs
+        """
+        self._parametric_data = data
+
+    def get_parametric_table(self):
+        """
+        Returns
+        -------
+        table : pandas DataFrame
+            The parameter intervals in which the design of the MILP solve at the start of the interval stays optimal,
+            with the slopes of the KPIs within the interval and the constraint or variable which ends it
+        """
+        if getattr(self, '_parametric_data', None) is None:
+            raise Exception("No parametric data available, run the sensitivity mode with set_parametricSensitivity")
+
+        return self._parametric_data
+
+    def set_schedule_data(self, data):
+        """
+        Parameters
+        ----------
+        data : pandas DataFrame
+            One row per point of the sweep with the status, gap, solve time and time limit (see SolveScheduler.report)
+        """
+        self._schedule_data = data
+
+    def get_schedule_table(self):
+        """
+        Returns
+        -------
+        table : pandas DataFrame
+            The points of the sweep with their status (optimal, time limit, infeasible or skipped), gap in %, solve
+            time, time limit and whether they were refined
+        """
+        if getattr(self, '_schedule_data', None) is None:
+            raise Exception("No schedule data available, set a solve schedule with set_solveSchedule")
+
+        return self._schedule_data
+
+    def get_telemetry_table(self):
+        """
+        Returns
+        -------
+        table : pandas DataFrame
+            One row per run with the telemetry of its solve: status, time, nodes, iterations, size before and
+            after presolve, root relaxation, first incumbent and its time, number of incumbents, objective, bound
+            and gap (see utils.solver_telemetry)
+        """
+        records = {index: getattr(results, '_telemetry', None) for index, results in self._results_data.items()}
+        if all(record is None for record in records.values()):
+            raise Exception("No telemetry data available, switch it on with Superstructure.set_solverTelemetry")
+
+        return telemetry_table(records)
+
+    def get_telemetry_summary(self, groupBy=None):
+        """
+        Parameters
+        ----------
+        groupBy : Integer or String, optional
+            Index level of the runs to aggregate over, e.g. 0 for the parameters of a sensitivity analysis
+
+        Returns
+        -------
+        summary : pandas DataFrame
+            Number of runs, mean, median and maximum of the solve time, nodes, gap and time to the first incumbent
+            and the number of runs per status, to find the hard scenarios or parameter regions
+        """
+        return summarize_telemetry(self.get_telemetry_table(), groupBy=groupBy)
+
+    def print_telemetry_report(self, top=5):
+        """
+        Prints the telemetry summary of all runs and the runs with the longest solve times
+        """
+        print_telemetry_report(self.get_telemetry_table(), top=top)
+
     def fill_information(self, total_run_time):
         """
         Parameters
@@ -244,91 +479,21 @@ class MultiModelOutput(ModelOutput):
     # ----------------------------------------------------------------------------------------------
     def calculate_SRC(self):
         """
-        Calculates the standerdized regression coefficients SRC of the wait and see analysis
+        Calculates the standerdized regression coefficients SRC of the wait and see analysis for the objective
+        function. The scenarios of the uncertainty matrix and the results are matched by scenario name, so
+        infeasible scenarios which are missing in the results are left out.
         :return:
         """
 
-
         if self._optimization_mode != "wait and see":
-            ValueError("Scenario analysis methode is only available for 'wait and see' analysis.")
-
-        # return the objective function name of the simulations, depends on the formmat of the data
-        try:
-            objectiveFunctionName = self._results_data['sc1']._data['ObjectiveFunctionName']
-            flagDataFormat = 'object'
-        except:
-            objectiveFunctionName = self._results_data['sc1']['ObjectiveFunctionName']
-            flagDataFormat = 'dictionary'
-
-        # objectiveFunctionName2 = self._objective_function
-
-        # retrive uncetainty matrix
-        uncertaintyMatrix = self.uncertaintyMatrix
-
-        # turn uncertainty matrix into numpy array
-        parameterArray = np.array(uncertaintyMatrix)
-
-
-        # get the results of the wait and see analysis
-        objectiveFunctionList = []
-        scenarioControl = []
-        if flagDataFormat == 'object':
-            for i, j in self._results_data.items():
-                objectiveFunctionList.append(j._data[objectiveFunctionName])
-                # todo really bad what I'm doing now but it's a patch
-                # Need to find wich scenarios were not run and delleet from the parameterArray
-                scenarioControl.append(i)
-        elif flagDataFormat == 'dictionary':
-            for i, j in self._results_data.items():
-                objectiveFunctionList.append(j[objectiveFunctionName])
-                # todo really bad what I'm doing now but it's a patch
-                # Need to find wich scenarios were not run and delleet from the parameterArray
-                scenarioControl.append(i)
-
-        # turn into numpy array
-        results = np.array(objectiveFunctionList)
-        results = results.reshape(-1, 1)
-
-        if len(parameterArray[:, 1]) != len(results):
-            allScenarioNames = ['sc{}'.format(i) for i in range(1, len(parameterArray[:, 1]))]
-            # find the scenarios that were not run
-            notRunScenarios = list(set(allScenarioNames) - set(scenarioControl))
-
-            indicesRows = []
-            for sc in notRunScenarios:
-                indicesRows.append(int(sc[2:]) - 1)
-
-            # delete the rows that were not run in the parameterArray
-            parameterArray = np.delete(parameterArray, indicesRows, axis=0)
-
-        # Standardize data using sklearn (so-called mean-centred sigma-scaling)
-        scaler = StandardScaler()
-        parametersStandardized = scaler.fit_transform(parameterArray)
-        resultsStandardized = scaler.fit_transform(results)
-
-        # Perform regression analysis
-        reg = LinearRegression()
-        reg.fit(parametersStandardized, resultsStandardized)
-        #reg.fit(parameterArray, results)
-
-        # Obtain SRCs
-        srcs = reg.coef_
-
-        srcDict = {}
-        squareSumSRC = 0
-        for i, parameterName in enumerate(uncertaintyMatrix.columns):
-            # standerdiseCoef = np.std(parameterArray[:, i]) / np.std(results)
-            standerdiseCoef = 1
-            src = srcs[0, i] * standerdiseCoef
-            srcDict[parameterName] = src
-            squareSumSRC += src**2
-            #print(f"SRC for parameter {parameterName}: {src}")
-
-
-        # Obtain R-squared value
-        RSquared = reg.score(parametersStandardized, resultsStandardized)
+            raise ValueError("Scenario analysis methode is only available for 'wait and see' analysis.")
 
+        objectiveFunctionName = self.get_structure()['ObjectiveFunctionName']
+        results = self.calculate_global_sensitivity(outputs=[objectiveFunctionName], methods=('SRC',))
 
+        srcDict = results['SRC'][objectiveFunctionName].to_dict()
+        squareSumSRC = sum(src ** 2 for src in srcDict.values())
+        RSquared = results['R squared'][objectiveFunctionName]
 
         print('')
         print('-----------------------------------')
@@ -341,6 +506,101 @@ class MultiModelOutput(ModelOutput):
         for key, value in sorted_src.items():
             print(f"SCR, {key}: {value}")
 
+    def get_parameter_matrix(self):
+        """
+        Returns
+        -------
+        parameterMatrix : pd.DataFrame
+            The uncertainty matrix (scenario x parameter) indexed by scenario name. The rows of the uncertainty
+            matrix are in the order of the scenario data files.
+        """
+        parameterMatrix = self.uncertaintyMatrix.copy()
+
+        if not set(parameterMatrix.index).issubset(set(self._results_data.keys())):
+            if self._dataFiles is not None and len(self._dataFiles) == len(parameterMatrix):
+                scenarioNames = list(self._dataFiles.keys())
+            else:
+                scenarioNames = ['sc{}'.format(i + 1) for i in range(len(parameterMatrix))]
+            parameterMatrix.index = scenarioNames
+
+        return parameterMatrix
+
+    def get_output_matrix(self, outputs=None):
+        """
+        Parameters
+        ----------
+        outputs : list, optional
+            Names of scalar results (e.g. 'NPC', 'EBIT', 'GWP_TOT'), default is the objective function
+
+        Returns
+        -------
+        outputMatrix : pd.DataFrame
+            The results (scenario x output) indexed by scenario name
+        """
+        if outputs is None:
+            outputs = [self.get_structure()['ObjectiveFunctionName']]
+
+        rows = {}
+        for scenario, results in self._results_data.items():
+            data = results._data if hasattr(results, '_data') else results
+            rows[scenario] = [data.get(output, np.nan) for output in outputs]
+
+        return pd.DataFrame.from_dict(rows, orient='index', columns=outputs, dtype=float)
+
+    def calculate_global_sensitivity(self, outputs=None, methods=('SRC', 'spearman', 'sobol'), nBins=None):
+        """
+        Parameters
+        ----------
+        outputs : list, optional
+            Names of scalar results to analyse, default is the objective function
+        methods : tuple
+            Any of 'SRC' (standardized regression coefficients), 'spearman' (rank correlations) and 'sobol'
+            (variance-based first order indices)
+        nBins : int, optional
+            Number of bins used to estimate the first order indices
+
+        Returns
+        -------
+        results : Dictionary
+            {method: pd.DataFrame (parameter x output)}, see utils.global_sensitivity
+
+        Description
+        -----------
+        Global sensitivity analysis of many outputs at once on the columnar scenario x parameter and
+        scenario x output matrices. Scenarios are aligned by name.
+        """
+        results = global_sensitivity_analysis(self.get_parameter_matrix(),
+                                              self.get_output_matrix(outputs),
+                                              methods=methods, nBins=nBins)
+        self.global_sensitivity = results
+        return results
+
+    def rescore_prices(self, scenarios, objective=None, tolerance=0.01, reducedCosts=None, priceRange=None):
+        """
+        Parameters
+        ----------
+        scenarios : pd.DataFrame
+            Scenario x (parameter, index) table of prices, see utils.price_rescoring.price_scenarios
+        objective : String, optional
+            EBIT, NPC or TAC, default is the objective of the runs
+        tolerance, reducedCosts, priceRange :
+            Settings of the re-solve flags, see PriceRescorer.flag_resolves
+
+        Returns
+        -------
+        (results, flags) : results is {kpi: pd.DataFrame (scenario x run)} with the economic KPIs of every run under
+            every price scenario, flags gives the best run per scenario and whether the scenario needs a re-solve
+
+        Description
+        -----------
+        Re-scores the designs of all single runs for new prices with fixed flows instead of solving the model for
+        every price scenario.
+        """
+        rescorer = PriceRescorer(self)
+        results = rescorer.rescore(scenarios)
+        flags = rescorer.flag_resolves(scenarios, objective=objective, tolerance=tolerance,
+                                       reducedCosts=reducedCosts, priceRange=priceRange)
+        return results, flags
 
     def calculate_parameter_ranges(self, objectiveValue, listKeys, objectiveFunctionName='EBIT'):
         """
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory bounded storage of the single-run results of a MultiModelOutput.
+
+Function list:
+    - add scenario results (shared data is kept once, only the differing data per scenario is stored)
+    - reconstruct scenario results on access
+    - spill least recently used scenarios to disk if the memory limit is exceeded
+"""
+
+import copy
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+class ScenarioData(MutableMapping):
+    """
+    Class description
+    -----------------
+
+    Data dictionary of a scenario returned by the ScenarioResultStore. The entries which differ from the shared
+    data are copied when the scenario is reconstructed, the entries of the shared data are only copied when they are
+    accessed. Reading a few values of a scenario therefore does not copy the full data and changes to the returned
+    data (also to nested values) never reach the store.
+    """
+
+    def __init__(self, shared, data, missing=()):
+        self._shared = shared
+        self._own = data  # copied entries of the scenario
+        self._missing = set(missing)  # keys of the shared data which are not part of the scenario
+
+    def __getitem__(self, key):
+        if key in self._own:
+            return self._own[key]
+        if key in self._missing or key not in self._shared:
+            raise KeyError(key)
+        value = self._own[key] = copy.deepcopy(self._shared[key])
+        return value
+
+    def __setitem__(self, key, value):
+        self._own[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._own.pop(key, None)
+        self._missing.add(key)
+
+    def __iter__(self):
+        for key in self._shared:
+            if key in self._own or key not in self._missing:
+                yield key
+        for key in list(self._own):
+            if key not in self._shared:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self._own or (key in self._shared and key not in self._missing)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        # pickled and deep-copied as a plain dictionary, without the shared data of the other scenarios
+        return dict, (dict(self.items()),)
+
+    def copy(self):
+        return dict(self.items())
+
+
+class ScenarioResultStore(MutableMapping):
+    """
+    Class description
+    -----------------
+
+    Drop-in replacement for the _results_data dictionary of the MultiModelOutput for runs with many scenarios.
+    It behaves like a dictionary {scenario: ModelOutput (or data dictionary)}, but internally:
+        - the data of the first added scenario is kept once as shared data (sets, parameters ...)
+        - for every other scenario only the entries of _data which differ from the shared data are stored
+        - if the estimated memory of the stored scenarios exceeds the memory limit, the least recently used
+          scenarios are pickled to the spill directory and loaded again when they are accessed
+
+    Objects returned by store[scenario] are reconstructed on access, their data is a ScenarioData which copies the
+    entries of the shared data only when they are read. Changes made to them (also to nested values) do not change
+    the stored data and are only kept if they are assigned again with store[scenario] = object.
+    """
+
+    def __init__(self, memory_limit=None, spill_directory=None):
+        """
+        Parameters
+        ----------
+        memory_limit : Float, optional
+            Memory ceiling in MB for the per-scenario data kept in RAM. None means no limit (nothing is spilled).
+        spill_directory : String, optional
+            Directory where the spilled scenarios are saved. If None a temporary directory is created (and
+            removed again when the store is garbage collected).
+        """
+        self.memory_limit = memory_limit
+        self._memory_limit_bytes = memory_limit * 1024 ** 2 if memory_limit is not None else None
+
+        self._shared = None  # data of the first scenario, shared by all scenarios
+        self._keys = dict()  # scenario names in insertion order
+        self._records = OrderedDict()  # scenarios in RAM, ordered from least to most recently used
+        self._sizes = dict()  # estimated size in bytes of the scenarios in RAM
+        self._spilled = dict()  # {scenario: file path} of the scenarios on disk
+        self._memory_used = 0
+        self._spill_counter = 0
+
+        self._spill_directory = spill_directory
+        self._finalizer = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # dictionary interface
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __setitem__(self, scenario, results):
+        if scenario in self._keys:
+            del self[scenario]
+
+        if hasattr(results, '_data'):
+            data = results._data
+            attributes = {key: value for key, value in results.__dict__.items() if key != '_data'}
+            record = {'class': results.__class__, 'attributes': attributes}
+        else:
+            data = results
+            record = {'class': None, 'attributes': None}
+
+        if self._shared is None:
+            self._shared = data
+            record['data'] = {}
+        else:
+            record['data'] = {key: value for key, value in data.items()
+                              if key not in self._shared or not self._is_equal(self._shared[key], value)}
+            # keys which are not present in this scenario but are in the shared data
+            record['missing'] = [key for key in self._shared if key not in data]
+
+        self._keys[scenario] = None
+        self._add_to_memory(scenario, record)
+
+    def __getitem__(self, scenario):
+        if scenario not in self._keys:
+            raise KeyError(scenario)
+
+        if scenario in self._records:
+            self._records.move_to_end(scenario)
+            record = self._records[scenario]
+        else:
+            record = self._load(scenario)
+
+        return self._reconstruct(record)
+
+    def __delitem__(self, scenario):
+        if scenario not in self._keys:
+            raise KeyError(scenario)
+
+        del self._keys[scenario]
+        if scenario in self._records:
+            del self._records[scenario]
+            self._memory_used -= self._sizes.pop(scenario)
+        else:
+            os.remove(self._spilled.pop(scenario))
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, scenario):
+        return scenario in self._keys
+
+    def __repr__(self):
+        return ('ScenarioResultStore({} scenarios, {} in memory, {} on disk, {:.1f} MB used)'
+                .format(len(self), len(self._records), len(self._spilled), self._memory_used / 1024 ** 2))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # pickling: the spilled scenarios are saved as their pickled bytes, they are not loaded into RAM as objects
+    # and are spilled to disk again when the store is loaded
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __getstate__(self):
+        records = OrderedDict()
+        for scenario in self._keys:
+            if scenario in self._records:
+                records[scenario] = self._records[scenario]
+            else:
+                with open(self._spilled[scenario], 'rb') as file:
+                    records[scenario] = file.read()
+
+        return {'memory_limit': self.memory_limit,
+                'shared': self._shared,
+                'keys': list(self._keys),
+                'records': records}
+
+    def __setstate__(self, state):
+        self.__init__(memory_limit=state['memory_limit'])
+        self._shared = state['shared']
+        for scenario in state['keys']:
+            self._keys[scenario] = None
+            record = state['records'][scenario]
+            if isinstance(record, bytes):
+                path = self._new_spill_file()
+                with open(path, 'wb') as file:
+                    file.write(record)
+                self._spilled[scenario] = path
+            else:
+                self._add_to_memory(scenario, record)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # public methods
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def get_shared_data(self):
+        """
+        Returns the data dictionary shared by all scenarios (the data of the first added scenario)
+        """
+        return self._shared
+
+    def memory_usage(self):
+        """
+        Returns
+        -------
+        usage : Dictionary
+            Estimated memory in MB of the scenarios in RAM (their data and attributes) and of the shared data and
+            the number of scenarios in RAM and on disk
+        """
+        return {'memory used (MB)': self._memory_used / 1024 ** 2,
+                'memory limit (MB)': self.memory_limit,
+                'shared data (MB)': self._estimate_size(self._shared or {}) / 1024 ** 2,
+                'scenarios in memory': len(self._records),
+                'scenarios on disk': len(self._spilled)}
+
+    def close(self):
+        """
+        Deletes all spilled scenario files (and the temporary spill directory if it was created by the store).
+        The spilled scenarios are removed from the store, the scenarios in memory are kept.
+        """
+        for path in self._spilled.values():
+            if os.path.exists(path):
+                os.remove(path)
+        for scenario in list(self._spilled):
+            del self._keys[scenario]
+        self._spilled = dict()
+
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._spill_directory = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # private methods
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def _reconstruct(self, record):
+        # only the entries of the scenario are copied here, the shared data is copied on access by the ScenarioData
+        data = ScenarioData(self._shared, copy.deepcopy(record['data']), record.get('missing', []))
+
+        if record['class'] is None:
+            return data
+
+        results = record['class'].__new__(record['class'])
+        results.__dict__.update(copy.deepcopy(record['attributes']))
+        results._data = data
+        return results
+
+    def _record_size(self, record):
+        """
+        Rough estimate of the memory in bytes of a stored scenario: its data, its attributes and its missing keys
+        """
+        size = self._estimate_size(record['data'])
+        if record.get('attributes'):
+            size += self._estimate_size(record['attributes'])
+        size += sum(sys.getsizeof(key) for key in record.get('missing', []))
+        return size
+
+    def _add_to_memory(self, scenario, record):
+        size = self._record_size(record)
+        self._records[scenario] = record
+        self._sizes[scenario] = size
+        self._memory_used += size
+
+        if self._memory_limit_bytes is not None:
+            # always keep the most recent scenario in memory
+            while self._memory_used > self._memory_limit_bytes and len(self._records) > 1:
+                self._spill(next(iter(self._records)))
+
+    def _new_spill_file(self):
+        if self._spill_directory is None:
+            self._spill_directory = tempfile.mkdtemp(prefix='outdoor_results_')
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_directory, True)
+        elif not os.path.exists(self._spill_directory):
+            os.makedirs(self._spill_directory)
+
+        self._spill_counter += 1
+        return os.path.join(self._spill_directory, 'scenario_{}.pkl'.format(self._spill_counter))
+
+    def _spill(self, scenario):
+        path = self._new_spill_file()
+        record = self._records.pop(scenario)
+        with open(path, 'wb') as file:
+            pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._spilled[scenario] = path
+        self._memory_used -= self._sizes.pop(scenario)
+
+    def _load(self, scenario):
+        path = self._spilled.pop(scenario)
+        with open(path, 'rb') as file:
+            record = pickle.load(file)
+        os.remove(path)
+
+        self._add_to_memory(scenario, record)
+        return record
+
+    @staticmethod
+    def _is_equal(value1, value2):
+        try:
+            return bool(value1 == value2)
+        except Exception:
+            # e.g. numpy arrays or pandas objects
+            return value1 is value2
+
+    @staticmethod
+    def _estimate_size(data):
+        """
+        Rough estimate of the memory in bytes of a data dictionary {name: value or {index: value}}
+        """
+        size = sys.getsizeof(data)
+        for key, value in data.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+            if isinstance(value, dict):
+                for index, entry in value.items():
+                    size += sys.getsizeof(index) + sys.getsizeof(entry)
+            elif isinstance(value, (list, tuple)):
+                size += sum(sys.getsizeof(entry) for entry in value)
+        return size
@@ -0,0 +1,313 @@
+"""
+Scaling benchmarks for the model set up of OUTDOOR.
+
+Large superstructures are generated by replicating an existing superstructure (e.g. one of the case studies made with
+the user interface) several times. Every copy is an independent process network with its own unit numbers, so the
+number of units, connections and parameters grows linearly with the number of copies.
+
+Example:
+    with open('Tomato_Superstructure_superstructure.pkl', 'rb') as file:
+        superstructure = pickle.load(file)
+    benchmark_create_DataFile(superstructure, copies=(1, 5, 10, 20))
+    benchmark_model_build(superstructure, copies=(1, 5, 10))
+    benchmark_distributor_formulations(superstructure, copies=(1, 5), solver='gurobi')
+    benchmark_scaling(superstructure, copies=(1, 5), solver='gurobi')
+"""
+
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _rename(obj, names):
+    """
+    Replaces all unit numbers (strings) in keys, values, lists and tuples of obj by the new unit numbers in names
+    """
+    if isinstance(obj, str):
+        return names.get(obj, obj)
+    elif isinstance(obj, tuple):
+        return tuple(_rename(i, names) for i in obj)
+    elif isinstance(obj, list):
+        return [_rename(i, names) for i in obj]
+    elif isinstance(obj, set):
+        return {_rename(i, names) for i in obj}
+    elif isinstance(obj, dict):
+        return {_rename(key, names): _rename(value, names) for key, value in obj.items()}
+    else:
+        return obj
+
+
+def _merge(base, new):
+    """
+    Merges the (renamed) attribute of a superstructure copy into the attribute of the base superstructure
+    """
+    if isinstance(base, list):
+        return list(dict.fromkeys(base + new))
+    elif isinstance(base, dict):
+        for key, value in new.items():
+            if key in base and isinstance(base[key], (list, dict)):
+                base[key] = _merge(base[key], value)
+            else:
+                base[key] = value
+        return base
+    else:
+        return base
+
+
+def replicate_superstructure(superstructure, copies):
+    """
+    Creates a superstructure which holds several independent copies of the process network of the given
+    superstructure. The units of copy n get the unit number '{number}_{n}' and the name '{name} ({n})'.
+
+    :param superstructure: Superstructure object with string unit numbers (e.g. made with the user interface)
+    :param copies: number of copies of the process network in the new superstructure
+    :return: new Superstructure object (the given object is not changed)
+    """
+    numbers = [unit.Number for unit in superstructure.UnitsList]
+    if not all(isinstance(number, str) for number in numbers):
+        raise ValueError('Replicating a superstructure needs string unit numbers, '
+                         'e.g. a superstructure made with the user interface')
+
+    skipAttributes = ('UnitsList', 'Data_File', 'NI_ParameterList', 'I_ParameterList')
+
+    replicated = copy.deepcopy(superstructure)
+    replicated.Data_File = {None: {}}
+
+    for n in range(1, copies):
+        names = {number: '{}_{}'.format(number, n) for number in numbers}
+        duplicate = copy.deepcopy(superstructure)
+
+        for unit in duplicate.UnitsList:
+            unit.__dict__.update({key: _rename(value, names) for key, value in unit.__dict__.items()})
+            unit.Name = '{} ({})'.format(unit.Name, n)
+            replicated.UnitsList.append(unit)
+
+        for key, value in duplicate.__dict__.items():
+            if key not in skipAttributes and isinstance(value, (list, dict)):
+                setattr(replicated, key, _merge(getattr(replicated, key), _rename(value, names)))
+
+    return replicated
+
+
+def benchmark_create_DataFile(superstructure, copies=(1, 5, 10, 20), repeats=3, printTable=True):
+    """
+    Measures the time to build the Data_File (Superstructure.create_DataFile) and to update it after a change of a
+    single unit (Superstructure.update_DataFile_unit) for replicated superstructures of increasing size.
+
+    :param superstructure: Superstructure object with string unit numbers
+    :param copies: list with the number of copies of the process network which are benchmarked
+    :param repeats: the fastest of repeats builds is reported
+    :param printTable: prints the results
+    :return: pd.DataFrame with one row per number of copies
+    """
+    rows = []
+    for n in copies:
+        replicated = replicate_superstructure(superstructure, n)
+
+        buildTimes = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            dataFile = replicated.create_DataFile()
+            buildTimes.append(time.perf_counter() - start)
+
+        unit = replicated.UnitsList[-1]
+        updateTimes = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            replicated.update_DataFile_unit(unit)
+            updateTimes.append(time.perf_counter() - start)
+
+        entries = sum(len(value) if isinstance(value, dict) else 1 for value in dataFile[None].values())
+        rows.append({'copies': n,
+                     'units': len(replicated.UnitsList),
+                     'connections': len(replicated.connections_set['U_CONNECTORS']),
+                     'parameter entries': entries,
+                     'create_DataFile [s]': min(buildTimes),
+                     'time per unit [ms]': 1000 * min(buildTimes) / len(replicated.UnitsList),
+                     'update_DataFile_unit [s]': min(updateTimes)})
+
+    results = pd.DataFrame(rows).set_index('copies')
+    if printTable:
+        print(results.to_string(float_format=lambda x: '{:.4f}'.format(x)))
+
+    return results
+
+
+def benchmark_model_build(superstructure, copies=(1, 5, 10), formulations=('dense', 'sparse'), printTable=True):
+    """
+    Measures the time to build the model instance (SuperstructureModel.create_ModelEquations and populateModel)
+    and the model size for the dense and the sparse formulation (see Superstructure.set_sparseModel) of replicated
+    superstructures of increasing size.
+
+    :param superstructure: Superstructure object with string unit numbers
+    :param copies: list with the number of copies of the process network which are benchmarked
+    :param formulations: 'dense' and/or 'sparse'
+    :param printTable: prints the results
+    :return: pd.DataFrame with one row per number of copies and formulation
+    """
+    from pyomo.environ import Constraint, Var
+    from ..model.optimization_model import SuperstructureModel
+
+    sparseModel = getattr(superstructure, 'sparseModel', False)
+    rows = []
+    for n in copies:
+        replicated = replicate_superstructure(superstructure, n)
+        for formulation in formulations:
+            replicated.set_sparseModel(formulation == 'sparse')
+            dataFile = replicated.create_DataFile()
+
+            start = time.perf_counter()
+            model = SuperstructureModel(replicated)
+            model.create_ModelEquations()
+            instance = model.populateModel(dataFile)
+            buildTime = time.perf_counter() - start
+
+            rows.append({'copies': n,
+                         'formulation': formulation,
+                         'units': len(replicated.UnitsList),
+                         'constraints': sum(len(c) for c in instance.component_objects(Constraint, active=True)),
+                         'variables': sum(len(v) for v in instance.component_objects(Var)),
+                         'build time [s]': buildTime})
+
+    superstructure.sparseModel = sparseModel
+
+    results = pd.DataFrame(rows).set_index(['copies', 'formulation'])
+    if printTable:
+        print(results.to_string(float_format=lambda x: '{:.3f}'.format(x)))
+
+    return results
+
+
+def benchmark_distributor_formulations(superstructure, copies=(1,), formulations=('decimal', 'compact'), solver=None,
+                                       solverOptions=None, printTable=True):
+    """
+    Compares the model size and optionally the solve time of the distributor formulations (see
+    Superstructure.set_distributorFormulation) for replicated superstructures of increasing size.
+
+    :param superstructure: Superstructure object with string unit numbers
+    :param copies: list with the number of copies of the process network which are benchmarked
+    :param formulations: 'decimal' and/or 'compact'
+    :param solver: name of a solver for pyomo.SolverFactory, if None the models are only built
+    :param solverOptions: dictionary with solver options
+    :param printTable: prints the results
+    :return: pd.DataFrame with one row per number of copies and formulation
+    """
+    from pyomo.environ import Constraint, SolverFactory, Var, value
+    from ..model.optimization_model import SuperstructureModel
+
+    distributors = [unit for unit in superstructure.UnitsList if unit.Type == 'Distributor']
+    originalFormulations = {unit.Number: getattr(unit, 'formulation', 'decimal') for unit in distributors}
+
+    rows = []
+    for n in copies:
+        replicated = replicate_superstructure(superstructure, n)
+        for formulation in formulations:
+            replicated.set_distributorFormulation(formulation)
+            dataFile = replicated.create_DataFile()
+
+            start = time.perf_counter()
+            model = SuperstructureModel(replicated)
+            model.create_ModelEquations()
+            instance = model.populateModel(dataFile)
+            buildTime = time.perf_counter() - start
+
+            row = {'copies': n,
+                   'formulation': formulation,
+                   'distributors': len(dataFile[None]['U_DIST'][None]),
+                   'distributor binaries': len(dataFile[None]['U_DIST_SUB2'][None]),
+                   'binaries': sum(1 for v in instance.component_data_objects(Var) if v.is_binary()),
+                   'constraints': sum(len(c) for c in instance.component_objects(Constraint, active=True)),
+                   'build time [s]': buildTime}
+
+            if solver is not None:
+                optimizer = SolverFactory(solver)
+                for option, optionValue in (solverOptions or {}).items():
+                    optimizer.options[option] = optionValue
+                start = time.perf_counter()
+                results = optimizer.solve(instance)
+                row['solve time [s]'] = time.perf_counter() - start
+                row['termination'] = str(results.solver.termination_condition)
+                row['objective'] = value(instance.Objective)
+
+            rows.append(row)
+
+    for unit in distributors:
+        unit.set_formulation(originalFormulations[unit.Number])
+
+    results = pd.DataFrame(rows).set_index(['copies', 'formulation'])
+    if printTable:
+        print(results.to_string(float_format=lambda x: '{:.3f}'.format(x)))
+
+    return results
+
+
+def benchmark_scaling(superstructure, copies=(1,), scalings=('unscaled', 'constraints', 'variables'), solver=None,
+                      solverOptions=None, printTable=True):
+    """
+    Compares the unscaled and the automatically scaled model (see Superstructure.set_autoScaling) of replicated
+    superstructures of increasing size: the range of the constraint coefficients and optionally the solve time,
+    the objective and the largest constraint violation of the (unscaled) solution in the original model.
+
+    :param superstructure: Superstructure object with string unit numbers
+    :param copies: list with the number of copies of the process network which are benchmarked
+    :param scalings: 'unscaled', 'constraints' (only the constraints are scaled) and/or 'variables' (constraints and
+        continuous variables are scaled)
+    :param solver: name of a solver for pyomo.SolverFactory, if None the models are only built and scaled
+    :param solverOptions: dictionary with solver options, e.g. {'IntFeasTol': 1e-8} to compare the scaled model with
+        the default integer feasibility tolerance against the unscaled model with a tight tolerance
+    :param printTable: prints the results
+    :return: pd.DataFrame with one row per number of copies and scaling
+    """
+    from pyomo.environ import SolverFactory, value
+    from ..model.optimization_model import SuperstructureModel
+    from .scaling import coefficient_matrix, coefficient_range, max_violation, scale_and_solve, set_scaling_factors
+
+    rows = []
+    for n in copies:
+        replicated = replicate_superstructure(superstructure, n)
+        replicated.set_autoScaling(False)
+        dataFile = replicated.create_DataFile()
+
+        for scaling in scalings:
+            model = SuperstructureModel(replicated)
+            model.create_ModelEquations()
+            instance = model.populateModel(dataFile)
+
+            start = time.perf_counter()
+            if scaling == 'unscaled':
+                smallest, largest = coefficient_range(coefficient_matrix(instance)[0])
+            else:
+                report = set_scaling_factors(instance, variables=scaling == 'variables')
+                smallest, largest = report['scaled coefficient range']
+            scalingTime = time.perf_counter() - start
+
+            row = {'copies': n,
+                   'scaling': scaling,
+                   'smallest coefficient': smallest,
+                   'largest coefficient': largest,
+                   'coefficient range [log10]': np.log10(largest / smallest) if smallest else np.nan,
+                   'scaling time [s]': scalingTime}
+
+            if solver is not None:
+                optimizer = SolverFactory(solver)
+                for option, optionValue in (solverOptions or {}).items():
+                    optimizer.options[option] = optionValue
+                start = time.perf_counter()
+                if scaling == 'unscaled':
+                    results = optimizer.solve(instance)
+                else:
+                    results = scale_and_solve(optimizer, instance)
+                row['solve time [s]'] = time.perf_counter() - start
+                row['termination'] = str(results.solver.termination_condition)
+                row['objective'] = value(instance.Objective, exception=False)
+                row['max violation'] = max_violation(instance)
+
+            rows.append(row)
+
+    results = pd.DataFrame(rows).set_index(['copies', 'scaling'])
+    if printTable:
+        print(results.to_string(float_format=lambda x: '{:.3g}'.format(x)))
+
+    return results
@@ -0,0 +1,324 @@
+"""
+Screening of scenario data files for infeasibility before the MILP solves.
+
+The mass balances give cheap necessary conditions for a feasible scenario. The screen propagates upper bounds of the
+annual component flows (flow times full load hours, which is conserved between units with different full load
+hours) from the source limits ul (or the substrate load) through the split factors myu, the distributors and the
+yields xi and stoichiometric conversions gamma * theta of the reactors to the product pools. All scenarios are
+propagated at once as arrays of shape (scenario x unit x component). Recycle loops are iterated until the bounds do
+not change any more, bounds which still grow after the iteration limit are set to infinity.
+
+The constraint families which are checked:
+    - source bounds: lower limit ll above the upper limit ul of a source, or a source which has to deliver flow
+      (ll or the substrate load) without any unit to deliver it to (MassBalance_13, 14 and 15)
+    - substrate load: negative substrate load
+    - min production: MinProduction of a product pool above its MaxProduction or above the largest flow which can
+      reach the pool (MassBalance_14a and 14b)
+    - product load: the product load of the main product above its MaxProduction or above the largest flow which
+      can reach the pool (MainProduct_Equation_1 and 2)
+
+A flagged scenario is infeasible for every design. A scenario which passes can still be infeasible (e.g. through
+the concentration constraints, the logic constraints or a combination of bounds which are only reached one at a
+time), these scenarios are found by the solver as before.
+"""
+
+import numpy as np
+import pandas as pd
+
+FAMILIES = ('source bounds', 'substrate load', 'min production', 'product load')
+
+
+def _set(data, name):
+    return data.get(name, {None: []})[None]
+
+
+def _values(dataFiles, name, indices, default):
+    """
+    Returns
+    -------
+    values : np.ndarray of shape (scenario x index) of the parameter, default for missing or None values
+    """
+    rows = []
+    for dataFile in dataFiles:
+        parameter = dataFile[None].get(name, {})
+        rows.append([default if parameter.get(index) is None else parameter.get(index) for index in indices])
+    return np.array(rows, dtype=float).reshape(len(dataFiles), len(indices))
+
+
+def load_unit(superstructure):
+    """
+    Returns
+    -------
+    (loadID, loadType) : number of the unit with the substrate or product load and the load type (both None if the
+        superstructure has no load)
+    """
+    loadType = getattr(superstructure, 'loadType', None)
+    if not loadType:
+        return None, None
+    for unit in superstructure.UnitsList:
+        if unit.Name == superstructure.loadName:
+            return unit.Number, loadType
+    return None, None
+
+
+class _FlowNetwork:
+    """
+    Index arrays of the connections and reactor conversions of the superstructure (the sets are the same in all
+    scenarios, only the parameters change)
+    """
+
+    def __init__(self, data):
+        self.units = list(_set(data, 'U'))
+        self.components = list(_set(data, 'I'))
+        self.sources = list(_set(data, 'U_S'))
+        self.pools = list(_set(data, 'U_PP'))
+        unitIndex = {u: k for k, u in enumerate(self.units)}
+        componentIndex = {i: k for k, i in enumerate(self.components)}
+        self.unitIndex = unitIndex
+
+        # sources -> units: (source position, unit, component)
+        sourcePosition = {u_s: k for k, u_s in enumerate(self.sources)}
+        self.supplyEdges = [(sourcePosition[u_s], u_s, u, i) for u_s, u in _set(data, 'U_SU')
+                            for i in self.components]
+        self.targets = {u_s: [u for u_s2, u in _set(data, 'U_SU') if u_s2 == u_s] for u_s in self.sources}
+
+        # units -> units: myu for split connections, 1 for the distributor outlets and rests
+        distributed = set(_set(data, 'U_DIST_SUB')) | set(_set(data, 'U_DIST_REST'))
+        self.flowEdges = []
+        for u, uu in _set(data, 'U_CONNECTORS') or {(u, uu) for u, (uu, i) in data.get('myu', {})}:
+            for i in self.components:
+                split = None if (u, uu) in distributed else (u, (uu, i))
+                self.flowEdges.append((u, uu, i, split))
+        self.flowEdges = [edge for edge in self.flowEdges if edge[0] in unitIndex and edge[1] in unitIndex]
+
+        # reactor conversions out[u, i] += c * in[u, m] and the components which pass unchanged
+        self.passThrough = np.ones((len(self.units), len(self.components)))
+        self.conversions = []
+        yieldComponents = set(_set(data, 'YC'))
+        for u in _set(data, 'U_YIELD_REACTOR'):
+            keep = data.get('ic_on', {}).get(u) == 1
+            for i in self.components:
+                self.passThrough[unitIndex[u], componentIndex[i]] = keep and (u, i) in yieldComponents
+                for m in self.components:
+                    if not keep or (u, m) not in yieldComponents:
+                        self.conversions.append(('xi', u, i, m, None))
+        reactions = {}
+        for (u, (r, m)) in data.get('theta', {}):
+            reactions.setdefault((u, r), []).append(m)
+        stoichReactors = set(_set(data, 'U_STOICH_REACTOR'))
+        for (u, (i, r)) in data.get('gamma', {}):
+            if u in stoichReactors:
+                for m in reactions.get((u, r), ()):
+                    self.conversions.append(('stoich', u, i, m, r))
+
+        self.supplyIndex = (np.array([unitIndex[u] for _, _, u, _ in self.supplyEdges], dtype=int),
+                            np.array([componentIndex[i] for _, _, _, i in self.supplyEdges], dtype=int))
+        self.flowIndex = (np.array([unitIndex[u] for u, _, _, _ in self.flowEdges], dtype=int),
+                          np.array([unitIndex[uu] for _, uu, _, _ in self.flowEdges], dtype=int),
+                          np.array([componentIndex[i] for _, _, i, _ in self.flowEdges], dtype=int))
+
+        # conversions of the same (unit, component, educt) are summed before their positive part is taken
+        keys = [(unitIndex[u], componentIndex[i], componentIndex[m]) for _, u, i, m, _ in self.conversions]
+        unique = {key: n for n, key in enumerate(dict.fromkeys(keys))}
+        self.conversionPosition = np.array([unique[key] for key in keys], dtype=int)
+        self.conversionIndex = tuple(np.array([key[n] for key in unique], dtype=int) for n in range(3))
+
+    def coefficients(self, dataFiles):
+        """
+        Returns
+        -------
+        (supply, split, conversion) : np.ndarray of shape (scenario x edge) with phi of the source edges, the split
+            factors of the unit edges and the (positive part of the) conversion factors
+        """
+        supply = _values(dataFiles, 'phi', [(u_s, i) for _, u_s, _, i in self.supplyEdges], 0.0)
+
+        splitIndices = [split for _, _, _, split in self.flowEdges]
+        split = np.ones((len(dataFiles), len(splitIndices)))
+        mask = np.array([index is not None for index in splitIndices], dtype=bool)
+        if mask.any():
+            split[:, mask] = _values(dataFiles, 'myu', [index for index in splitIndices if index is not None], 0.0)
+
+        conversion = np.zeros((len(dataFiles), len(self.conversions)))
+        for s, dataFile in enumerate(dataFiles):
+            data = dataFile[None]
+            xi, gamma, theta = data.get('xi', {}), data.get('gamma', {}), data.get('theta', {})
+            for k, (kind, u, i, m, r) in enumerate(self.conversions):
+                if kind == 'xi':
+                    conversion[s, k] = xi.get((u, i)) or 0.0
+                else:
+                    conversion[s, k] = (gamma.get((u, (i, r))) or 0.0) * (theta.get((u, (r, m))) or 0.0)
+
+        summed = np.zeros((len(dataFiles), len(self.conversionIndex[0])))
+        np.add.at(summed, (slice(None), self.conversionPosition), conversion)
+        conversion = np.clip(summed, 0, None)
+
+        return supply, split, conversion
+
+
+def _propagate(network, supplyFlow, supply, split, conversion, available, maxIterations=None):
+    """
+    Returns
+    -------
+    inflow : np.ndarray of shape (scenario x unit x component), upper bounds of the annual inflows (t/a)
+    """
+    nScenarios = supplyFlow.shape[0]
+    nUnits, nComponents = len(network.units), len(network.components)
+    sourceUnit, sourceComponent = network.supplyIndex
+    fromUnit, toUnit, component = network.flowIndex
+    reactor, product, educt = network.conversionIndex
+
+    base = np.zeros((nScenarios, nUnits, nComponents))
+    sourcePosition = np.array([position for position, _, _, _ in network.supplyEdges], dtype=int)
+    np.add.at(base, (slice(None), sourceUnit, sourceComponent), supply * supplyFlow[:, sourcePosition])
+    base *= available[:, :, None]
+
+    def step(inflow):
+        outflow = inflow * network.passThrough
+        if len(reactor):
+            terms = np.where(conversion > 0, conversion * inflow[:, reactor, educt], 0.0)
+            np.add.at(outflow, (slice(None), reactor, product), terms)
+        newInflow = base.copy()
+        if len(fromUnit):
+            flows = np.where(split > 0, split * outflow[:, fromUnit, component], 0.0)
+            np.add.at(newInflow, (slice(None), toUnit, component), flows)
+        return newInflow * available[:, :, None]
+
+    maxIterations = maxIterations or 2 * nUnits + 10
+    inflow = base
+    for _ in range(maxIterations):
+        newInflow = step(inflow)
+        if np.allclose(newInflow, inflow, rtol=1e-9, atol=1e-9):
+            return newInflow
+        inflow = newInflow
+
+    # recycle loops which still grow: unbounded, the infinite bounds are carried to the units downstream
+    growing = step(inflow) > inflow * (1 + 1e-9) + 1e-9
+    inflow = np.where(growing, np.inf, inflow)
+    for _ in range(nUnits):
+        inflow = np.maximum(inflow, step(inflow))
+    return inflow
+
+
+def screen_scenarios(dataFiles, loadID=None, loadType=None, design=None, tolerance=1e-6):
+    """
+    Parameters
+    ----------
+    dataFiles : Dictionary
+        {scenario: Data_File} e.g. Superstructure.scenarioDataFiles
+    loadID : String, optional
+        Number of the unit with the substrate or product load (see load_unit)
+    loadType : String, optional
+        'Substrate' or 'Product'
+    design : Dictionary, optional
+        {unit: 0 or 1} fixed design (e.g. the Y of a here and now run), units with 0 can not receive any flow
+    tolerance : Float
+        Relative tolerance of the comparisons
+
+    Returns
+    -------
+    screen : pd.DataFrame
+        One row per scenario with a boolean column per constraint family (FAMILIES), the reasons and a boolean
+        column 'infeasible'
+
+    """
+    scenarios = list(dataFiles)
+    files = [dataFiles[scenario] for scenario in scenarios]
+    if not files:
+        return pd.DataFrame(columns=list(FAMILIES) + ['reasons', 'infeasible'])
+
+    first = files[0][None]
+    network = _FlowNetwork(first)
+    for dataFile in files[1:]:
+        if list(_set(dataFile[None], 'U')) != network.units:
+            raise ValueError('All scenario data files need the same units to be screened together')
+
+    S = len(files)
+    names = first.get('Names', {})
+    H = np.array([dataFile[None]['H'][None] for dataFile in files], dtype=float)
+    load = np.array([dataFile[None].get('sourceOrProductLoad', {None: 0})[None] or 0 for dataFile in files],
+                    dtype=float)
+    flh = _values(files, 'flh', network.units, np.nan)
+    flh = np.where(np.isnan(flh) | (flh <= 0), H[:, None], flh)
+    unitIndex = network.unitIndex
+
+    available = np.ones((S, len(network.units)))
+    if design:
+        for u, y in design.items():
+            if u in unitIndex and y is not None and round(y) == 0:
+                available[:, unitIndex[u]] = 0
+
+    reasons = [[] for _ in range(S)]
+    flags = {family: np.zeros(S, dtype=bool) for family in FAMILIES}
+
+    def flag(family, mask, message):
+        for s in np.flatnonzero(mask):
+            flags[family][s] = True
+            reasons[s].append(message(s))
+
+    # source bounds, annual supply of the sources
+    ul = _values(files, 'ul', network.sources, 100000)
+    ll = _values(files, 'll', network.sources, 0)
+    sourceFlh = flh[:, [unitIndex[u_s] for u_s in network.sources]]
+    upper, lower = ul.copy(), ll.copy()
+    for k, u_s in enumerate(network.sources):
+        if u_s == loadID and loadType == 'Substrate':
+            upper[:, k] = lower[:, k] = load / H
+            flag('substrate load', load < 0, lambda s: 'substrate load {} < 0'.format(load[s]))
+        else:
+            flag('source bounds', ll[:, k] > ul[:, k] * (1 + tolerance) + tolerance,
+                 lambda s, k=k, u_s=u_s: 'll > ul of {}: {:.6g} > {:.6g}'.format(names.get(u_s, u_s), ll[s, k],
+                                                                                 ul[s, k]))
+        targets = [u for u in network.targets[u_s] if u in unitIndex]
+        reachable = available[:, [unitIndex[u] for u in targets]].any(axis=1) if targets else np.zeros(S, dtype=bool)
+        flag('source bounds', (lower[:, k] > tolerance) & ~reachable,
+             lambda s, k=k, u_s=u_s: '{} has to deliver {:.6g} but no unit can take it'.format(
+                 names.get(u_s, u_s), lower[s, k]))
+
+    supply, split, conversion = network.coefficients(files)
+    inflow = _propagate(network, np.clip(upper, 0, None) * sourceFlh, supply, split, conversion, available)
+
+    # product pools, FLOW_SUM in t/h
+    pools = [u for u in network.pools if u in unitIndex]
+    poolIndex = [unitIndex[u] for u in pools]
+    reach = inflow[:, poolIndex, :].sum(axis=2) / flh[:, poolIndex]
+    minProduction = _values(files, 'MinProduction', pools, 0)
+    maxProduction = _values(files, 'MaxProduction', pools, 100000)
+
+    for k, up in enumerate(pools):
+        name = names.get(up, up)
+        flag('min production', minProduction[:, k] > maxProduction[:, k] * (1 + tolerance) + tolerance,
+             lambda s, k=k, name=name: 'MinProduction > MaxProduction of {}: {:.6g} > {:.6g}'.format(
+                 name, minProduction[s, k], maxProduction[s, k]))
+        flag('min production', minProduction[:, k] > reach[:, k] * (1 + tolerance) + tolerance,
+             lambda s, k=k, name=name: 'MinProduction of {} not reachable: {:.6g} > {:.6g}'.format(
+                 name, minProduction[s, k], reach[s, k]))
+
+        if up == loadID and loadType == 'Product':
+            required = load / H
+            flag('product load', required < 0, lambda s: 'product load {} < 0'.format(load[s]))
+            flag('product load', required > maxProduction[:, k] * (1 + tolerance) + tolerance,
+                 lambda s, k=k, name=name: 'product load of {} above MaxProduction: {:.6g} > {:.6g}'.format(
+                     name, load[s], maxProduction[s, k] * H[s]))
+            flag('product load', required > reach[:, k] * (1 + tolerance) + tolerance,
+                 lambda s, k=k, name=name: 'product load of {} not reachable: {:.6g} > {:.6g}'.format(
+                     name, load[s], reach[s, k] * H[s]))
+
+    screen = pd.DataFrame(flags, index=scenarios)
+    screen['reasons'] = ['; '.join(reason) for reason in reasons]
+    screen['infeasible'] = screen[list(FAMILIES)].any(axis=1)
+    return screen
+
+
+def print_screen_report(screen):
+    """
+    Prints the number of screened out scenarios per constraint family and their reasons
+    """
+    infeasible = screen[screen['infeasible']]
+    print("\033[1;31m" + "Feasibility screen: {} of {} scenarios are infeasible".format(len(infeasible), len(screen))
+          + "\033[0m")
+    for family in FAMILIES:
+        count = int(screen[family].sum())
+        if count:
+            print("    {}: {} scenarios".format(family, count))
+    for scenario, row in infeasible.iterrows():
+        print("    scenario {}: {}".format(scenario, row['reasons']))
@@ -0,0 +1,197 @@
+"""
+Global sensitivity measures for multi-run results (wait and see, sensitivity, design screening ...).
+
+All functions work on two column-oriented tables which share the scenario names as index:
+    - parameters: scenario x uncertain parameter (e.g. MultiModelOutput.uncertaintyMatrix)
+    - outputs:    scenario x model output (e.g. objective, NPC, GWP_TOT)
+
+The scenarios are aligned by their index (name) and not by their position, so missing (infeasible) scenarios
+are simply not part of the analysis. All outputs are analysed at once with NumPy linear algebra.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def align_scenarios(parameters, outputs):
+    """
+    Parameters
+    ----------
+    parameters : pd.DataFrame
+        Scenario x parameter
+    outputs : pd.DataFrame or pd.Series
+        Scenario x output, a pd.Series for a single output
+
+    Returns
+    -------
+    (X, Y, parameterNames, outputNames, scenarios) : X and Y as float np.arrays of the scenarios which are in both
+        tables and have no missing values
+
+    """
+    if isinstance(outputs, pd.Series):
+        outputs = outputs.to_frame()
+
+    scenarios = [sc for sc in outputs.index if sc in parameters.index]
+    X = parameters.loc[scenarios].to_numpy(dtype=float)
+    Y = outputs.loc[scenarios].to_numpy(dtype=float)
+
+    complete = ~(np.isnan(X).any(axis=1) | np.isnan(Y).any(axis=1))
+    scenarios = [sc for sc, keep in zip(scenarios, complete) if keep]
+
+    return X[complete], Y[complete], list(parameters.columns), list(outputs.columns), scenarios
+
+
+def _standardize(matrix):
+    """
+    Mean-centred sigma-scaling of the columns, columns without variance become 0
+    """
+    std = matrix.std(axis=0, ddof=1)
+    std[std == 0] = np.inf
+    return (matrix - matrix.mean(axis=0)) / std
+
+
+def standardized_regression_coefficients(X, Y):
+    """
+    Parameters
+    ----------
+    X : np.array
+        Scenario x parameter
+    Y : np.array
+        Scenario x output
+
+    Returns
+    -------
+    (SRC, RSquared) : standardized regression coefficients as np.array (parameter x output) and the coefficient of
+        determination as np.array (output), all outputs with one least squares solve
+
+    """
+    Xs = _standardize(X)
+    Ys = _standardize(Y)
+
+    SRC, _, _, _ = np.linalg.lstsq(Xs, Ys, rcond=None)
+
+    residuals = Ys - Xs @ SRC
+    totalSumSquares = (Ys ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        RSquared = np.where(totalSumSquares > 0, 1 - (residuals ** 2).sum(axis=0) / totalSumSquares, np.nan)
+
+    return SRC, RSquared
+
+
+def _rank(matrix):
+    """
+    Column-wise ranks with averaged ties (same as scipy.stats.rankdata)
+    """
+    return pd.DataFrame(matrix).rank(axis=0, method='average').to_numpy()
+
+
+def rank_correlations(X, Y):
+    """
+    Parameters
+    ----------
+    X : np.array
+        Scenario x parameter
+    Y : np.array
+        Scenario x output
+
+    Returns
+    -------
+    correlations : np.array
+        Spearman rank correlation coefficients (parameter x output)
+
+    """
+    n = X.shape[0]
+    Xr = _standardize(_rank(X))
+    Yr = _standardize(_rank(Y))
+    return Xr.T @ Yr / (n - 1)
+
+
+def first_order_indices(X, Y, nBins=None):
+    """
+    Parameters
+    ----------
+    X : np.array
+        Scenario x parameter
+    Y : np.array
+        Scenario x output
+    nBins : Integer, optional
+        Number of bins per parameter, default is sqrt(number of scenarios)
+
+    Returns
+    -------
+    indices : np.array
+        First order indices (parameter x output)
+
+    Description
+    -----------
+    Variance-based (Sobol-style) first order indices S_i = Var(E[Y|X_i]) / Var(Y), estimated from the given
+    (not specially designed) samples by binning each parameter into equally populated bins.
+
+    """
+    n, nParameters = X.shape
+    if nBins is None:
+        nBins = max(int(np.sqrt(n)), 2)
+
+    varianceY = Y.var(axis=0)
+    meanY = Y.mean(axis=0)
+    indices = np.zeros((nParameters, Y.shape[1]))
+
+    for p in range(nParameters):
+        # equally populated bins based on the ranks of the parameter values (ties end up in the same bin)
+        ranks = pd.Series(X[:, p]).rank(method='min').to_numpy() - 1
+        bins = np.minimum((ranks * nBins / n).astype(int), nBins - 1)
+
+        counts = np.bincount(bins, minlength=nBins)
+        sums = np.zeros((nBins, Y.shape[1]))
+        np.add.at(sums, bins, Y)
+
+        filled = counts > 0
+        conditionalMeans = sums[filled] / counts[filled][:, None]
+        indices[p] = (counts[filled][:, None] * (conditionalMeans - meanY) ** 2).sum(axis=0) / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indices = np.where(varianceY > 0, indices / varianceY, np.nan)
+
+    return indices
+
+
+def global_sensitivity_analysis(parameters, outputs, methods=('SRC', 'spearman', 'sobol'), nBins=None):
+    """
+    Parameters
+    ----------
+    parameters : pd.DataFrame
+        Scenario x parameter
+    outputs : pd.DataFrame
+        Scenario x output
+    methods : tuple
+        Any of 'SRC', 'spearman' and 'sobol'
+    nBins : Integer, optional
+        Number of bins for the first order indices
+
+    Returns
+    -------
+    results : Dictionary
+        {method: pd.DataFrame (parameter x output)}, for 'SRC' also 'R squared' (pd.Series), and the list of
+        analysed 'scenarios'. All outputs are analysed at once.
+
+    """
+    X, Y, parameterNames, outputNames, scenarios = align_scenarios(parameters, outputs)
+    if len(scenarios) < 3:
+        raise ValueError('At least 3 complete scenarios are needed for a global sensitivity analysis, '
+                         'got {}'.format(len(scenarios)))
+
+    results = {'scenarios': scenarios}
+    for method in methods:
+        if method == 'SRC':
+            SRC, RSquared = standardized_regression_coefficients(X, Y)
+            results['SRC'] = pd.DataFrame(SRC, index=parameterNames, columns=outputNames)
+            results['R squared'] = pd.Series(RSquared, index=outputNames)
+        elif method == 'spearman':
+            results['spearman'] = pd.DataFrame(rank_correlations(X, Y), index=parameterNames, columns=outputNames)
+        elif method == 'sobol':
+            results['sobol'] = pd.DataFrame(first_order_indices(X, Y, nBins), index=parameterNames,
+                                            columns=outputNames)
+        else:
+            raise ValueError("Method {} not supported, choose from 'SRC', 'spearman' and 'sobol'".format(method))
+
+    return results
@@ -0,0 +1,112 @@
+"""
+Aggregation of the temperature grid of the heat integration.
+
+Every distinct process temperature is a point of the temperature grid, so every new unit temperature adds a heat
+interval (HI) and with it the beta fractions, heating/cooling demands and heat exchanger variables of that interval.
+The aggregation merges neighbouring temperatures into clusters, either all temperatures within a tolerance or the
+closest temperatures until the number of intervals is below a cap. All temperatures of a cluster are replaced by the
+middle of the cluster, so the beta fractions of the aggregated grid are calculated in the same way as for the
+exact grid.
+
+Error bound: every temperature moves by at most half the width of its cluster (maxShift). The heat of a stream is
+therefore placed at most maxShift away from its real temperature, and a heat exchange between two streams which is
+feasible in the aggregated cascade has a real temperature difference of at least -2 * maxShift (and every exchange
+with a real difference of at least 2 * maxShift stays feasible).
+"""
+
+
+def aggregate_temperatures(temperatures, tolerance=None, maxIntervals=None):
+    """
+    Parameters
+    ----------
+    temperatures : list
+        Temperatures of the grid
+    tolerance : Float, optional
+        Temperatures with a distance up to the tolerance to the lowest temperature of their cluster are merged
+    maxIntervals : Integer, optional
+        The closest clusters are merged until the grid has at most maxIntervals heat intervals
+
+    Returns
+    -------
+    temperatureMap : Dictionary
+        {temperature: temperature of the aggregated grid}
+
+    """
+    clusters = [[t] for t in sorted(set(temperatures))]
+
+    if tolerance is not None and clusters:
+        merged = [clusters[0]]
+        for cluster in clusters[1:]:
+            if cluster[0] - merged[-1][0] <= tolerance:
+                merged[-1].extend(cluster)
+            else:
+                merged.append(cluster)
+        clusters = merged
+
+    if maxIntervals is not None:
+        # n temperatures give n - 1 intervals, merge the neighbours which give the narrowest cluster
+        while len(clusters) > maxIntervals + 1:
+            k = min(range(len(clusters) - 1), key=lambda i: clusters[i + 1][-1] - clusters[i][0])
+            clusters[k] = clusters[k] + clusters.pop(k + 1)
+
+    temperatureMap = {}
+    for cluster in clusters:
+        middle = (cluster[0] + cluster[-1]) / 2
+        for t in cluster:
+            temperatureMap[t] = middle
+
+    return temperatureMap
+
+
+def heat_aggregation_report(streams, temperatureMap):
+    """
+    Parameters
+    ----------
+    streams : list
+        (unit name, heat stream, TIN, TOUT) of all heat demands
+    temperatureMap : Dictionary
+        {temperature: aggregated temperature} of aggregate_temperatures
+
+    Returns
+    -------
+    report : Dictionary
+        Error bound of the aggregated grid: the number of grid temperatures and intervals before and after the
+        aggregation, the largest temperature shift and the shift of every stream. The shifted fraction of a stream
+        is the largest part of its heat which can be placed in a different interval than in the exact grid.
+
+    """
+    exact = sorted(temperatureMap)
+    aggregated = sorted(set(temperatureMap.values()))
+
+    streamShifts = []
+    for name, stream, t_in, t_out in streams:
+        grid_in, grid_out = temperatureMap.get(t_in, t_in), temperatureMap.get(t_out, t_out)
+        shift = abs(grid_in - t_in) + abs(grid_out - t_out)
+        if t_in == t_out:
+            fraction = 1.0 if shift else 0.0
+        else:
+            fraction = min(shift / abs(t_out - t_in), 1.0)
+        streamShifts.append({'unit': name, 'stream': stream, 'TIN': t_in, 'TOUT': t_out,
+                             'grid TIN': grid_in, 'grid TOUT': grid_out, 'shifted fraction': fraction})
+
+    return {'temperatures': (len(exact), len(aggregated)),
+            'intervals': (max(len(exact) - 1, 0), max(len(aggregated) - 1, 0)),
+            'max shift': max([abs(v - t) for t, v in temperatureMap.items()] + [0]),
+            'streams': streamShifts}
+
+
+def print_heat_aggregation_report(report):
+    """
+    Prints the results of heat_aggregation_report
+    """
+    print('Aggregation of the heat intervals:')
+    for key in ('temperatures', 'intervals'):
+        before, after = report[key]
+        print('    {:<13} {:>6} -> {:>6}'.format(key, before, after))
+    print('    largest temperature shift: {:.2f} K (heat exchanges are exact up to +- {:.2f} K)'.format(
+        report['max shift'], 2 * report['max shift']))
+
+    for s in report['streams']:
+        if s['shifted fraction'] > 0:
+            print('    {} ({}): {} -> {} placed at {} -> {}, up to {:.0%} of the heat in another interval'.format(
+                s['unit'], s['stream'], s['TIN'], s['TOUT'], s['grid TIN'], s['grid TOUT'], s['shifted fraction']))
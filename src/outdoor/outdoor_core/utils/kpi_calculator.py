@@ -0,0 +1,125 @@
+"""
+Vectorized post-solve evaluation of the accounting variables of a model instance.
+
+Accounting variables (e.g. GWP_TOT, FWD_TOT, IMPACT_TOT, NPE) are defined by equality constraints of the form
+variable == linear expression and do not restrict the flowsheet. The KPICalculator reads these constraints once and
+writes them as the sparse linear system
+
+    y = D y + B x + c
+
+with the accounting variables y, the solved variables x (flows, energy demands, binaries) and the constants c. After
+each solve the accounting variables are calculated with one sparse matrix product and the solution of the
+(triangular) system (I - D) y = B x + c, which is factorized once.
+
+The coefficients are the parameter values when the calculator is created, later changes of the parameters are not
+taken into account.
+"""
+
+import numpy as np
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn import generate_standard_repn
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+
+class KPICalculator:
+    """
+    Class Description
+    -----------------
+    Calculates the variables on the left-hand side of a list of equality constraints from the values of all other
+    variables of the constraints.
+    """
+
+    def __init__(self, constraints):
+        """
+        Parameters
+        ----------
+        constraints : List
+            Constraint data objects of the form variable == linear expression, every variable is defined once
+
+        """
+        self.variables = [constraint.expr.args[0] for constraint in constraints]
+        self.inputs = []
+
+        positions = {id(var): k for k, var in enumerate(self.variables)}
+        if len(positions) != len(self.variables):
+            raise ValueError('Every accounting variable has to be defined by exactly one constraint')
+
+        inputPositions = {}
+        defined = ([], [], [])
+        solved = ([], [], [])
+        self.constants = np.zeros(len(constraints))
+
+        for k, constraint in enumerate(constraints):
+            expression = constraint.expr.args[1]
+
+            # fixed variables (e.g. the binaries of a fixed design) stay inputs of the calculation
+            fixed = [var for var in identify_variables(expression, include_fixed=True) if var.fixed]
+            for var in fixed:
+                var.unfix()
+            try:
+                repn = generate_standard_repn(expression, compute_values=True)
+            finally:
+                for var in fixed:
+                    var.fix()
+
+            if not repn.is_linear():
+                raise ValueError('The constraint {} is not linear and can not be part of the KPI calculation'
+                                 .format(constraint.name))
+
+            self.constants[k] = repn.constant
+            for coefficient, var in zip(repn.linear_coefs, repn.linear_vars):
+                if id(var) in positions:
+                    target, column = defined, positions[id(var)]
+                else:
+                    if id(var) not in inputPositions:
+                        inputPositions[id(var)] = len(self.inputs)
+                        self.inputs.append(var)
+                    target, column = solved, inputPositions[id(var)]
+                target[0].append(k)
+                target[1].append(column)
+                target[2].append(coefficient)
+
+        n = len(self.variables)
+        D = sparse.csc_matrix((defined[2], (defined[0], defined[1])), shape=(n, n))
+        self.B = sparse.csr_matrix((solved[2], (solved[0], solved[1])), shape=(n, len(self.inputs)))
+
+        self.system = (sparse.identity(n, format='csc') - D).tocsc()
+        self.factorization = None
+
+    def __getstate__(self):
+        # the factorization can not be copied, it is made again at the next evaluation (e.g. of a cloned instance)
+        state = self.__dict__.copy()
+        state['factorization'] = None
+        return state
+
+    def evaluate(self):
+        """
+        Returns
+        -------
+        values : np.ndarray
+            Values of the accounting variables, which are also set in the model instance
+
+        Description
+        -----------
+        Reads the values of the solved variables and sets the accounting variables. Variables without a value were
+        not part of the solved model (they carry no flow or energy) and count as zero.
+
+        """
+        if not self.variables:
+            return np.zeros(0)
+
+        if self.factorization is None:
+            try:
+                self.factorization = splu(self.system)
+            except RuntimeError:
+                raise ValueError('The accounting variables can not be calculated, their constraints depend on '
+                                 'each other')
+
+        x = np.array([var.value if var.value is not None else 0.0 for var in self.inputs], dtype=float)
+        values = self.factorization.solve(self.B @ x + self.constants)
+
+        for var, result in zip(self.variables, values):
+            var.set_value(float(result), skip_validation=True)
+
+        return values
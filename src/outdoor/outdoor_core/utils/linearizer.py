@@ -1,7 +1,7 @@
 import numpy as np
 
 
-def capex_calculator(UnitProcess, CECPI, Detail=None):
+def capex_calculator(UnitProcess, CECPI, Detail=None, maxError=0.01, flowBounds=None):
     """
 
     Parameters
@@ -17,6 +17,13 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
         is the default.
         This String decides on how many linearization points for th piece-wise lin.
         of the Unit Capex are defined.
+        With "adaptive" the points are placed by adaptive_capex_points().
+
+    maxError : Float, optional (only for "adaptive")
+        Maximum relative error of the linearization within the flow range of the unit
+
+    flowBounds : Tuple, optional (only for "adaptive")
+        (lower, upper) reference flow range of the unit, upper can be None if unknown
 
 
     Description
@@ -64,7 +71,16 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
     y_vals = {'lin_CAPEX_y': {}}
 
 
-    if Detail == "real":
+    if Detail == "adaptive":
+        C_REF = UnitProcess.CAPEX_factors['C_Ref'][ProcessNumber] * (CECPI/CECPI_REF)
+        points = adaptive_capex_points(C_REF, M_REF, F_REF, maxError, flowBounds)
+        for j, (x, y) in enumerate(points, start=1):
+            x_vals['lin_CAPEX_x'][ProcessNumber, j] = x
+            y_vals['lin_CAPEX_y'][ProcessNumber, j] = y
+
+        return (x_vals, y_vals)
+
+    elif Detail == "real":
 
         x_vals['lin_CAPEX_x'][ProcessNumber ,1] = 0
 
@@ -169,7 +185,107 @@ def capex_calculator(UnitProcess, CECPI, Detail=None):
         return (x_vals, y_vals)
 
 
+# upper end of the linearization, the reference flow of a unit can not be larger
+X_MAX = 1e05
 
 
+def segment_error(ratio, exponent):
+    """
+    Maximum relative error between the power function x**exponent and its chord on the interval [a, ratio * a].
+    The error does not depend on a and the cost factor, so it is the same for every segment of a geometric grid.
+    """
+    if ratio <= 1 or exponent == 1:
+        return 0.0
+    t = np.geomspace(1, ratio, 200)
+    chord = 1 + (ratio ** exponent - 1) / (ratio - 1) * (t - 1)
+    return float(np.max(np.abs(chord / t ** exponent - 1)))
 
 
+def segment_ratio(exponent, maxError):
+    """
+    Largest ratio x_(j+1) / x_j of two breakpoints for which the relative error of the chord stays below maxError
+    (bisection on the logarithm of the ratio)
+    """
+    if exponent == 1 or segment_error(X_MAX, exponent) <= maxError:
+        return X_MAX
+
+    low, high = 0.0, np.log(X_MAX)
+    for _ in range(60):
+        middle = (low + high) / 2
+        if segment_error(np.exp(middle), exponent) <= maxError:
+            low = middle
+        else:
+            high = middle
+    return float(np.exp(low))
+
+
+def adaptive_capex_points(C_REF, M_REF, F_REF, maxError=0.01, flowBounds=None):
+    """
+    Parameters
+    ----------
+    C_REF : Float
+        Reference equipment costs (already updated with the CECPI)
+    M_REF : Float
+        Reference flow
+    F_REF : Float
+        Cost exponent
+    maxError : Float
+        Maximum relative error of the linearization within the flow range
+    flowBounds : Tuple, optional
+        (lower, upper) reference flow range of the unit. Missing values default to 1/5 * M_REF and 5 * M_REF,
+        the range of the "real" linearization.
+
+    Description
+    -----------
+    Places the breakpoints of the piece-wise linear CAPEX function C_REF * (x/M_REF)**F_REF on a geometric grid
+    between the lower and the upper flow. As the relative error of a chord of a power function only depends on
+    the ratio of its end points, the grid ratio is the largest ratio which meets maxError (see segment_ratio). The
+    number of breakpoints therefore follows from the exponent and the flow range of the unit: units with an
+    exponent close to 1 or a narrow flow range need few points.
+
+    The first point is the origin (unit not installed). If the upper flow is below X_MAX, the last segment is
+    extended to X_MAX with the tangent at the upper flow, so larger flows stay feasible (as in the "real"
+    linearization).
+
+    Returns
+    -------
+    points : List
+        [(x, y), ...] breakpoints starting at (0, 0)
+    """
+
+    def costs(x):
+        return C_REF * (x / M_REF) ** F_REF
+
+    lower, upper = flowBounds if flowBounds is not None else (None, None)
+    if upper is None or upper <= 0:
+        upper = 5 * M_REF
+    upper = min(upper, X_MAX)
+    if lower is None or lower <= 0:
+        lower = min(M_REF, upper) / 5
+    lower = min(lower, upper)
+
+    if C_REF == 0:
+        return [(0, 0), (X_MAX, 0)]
+
+    ratio = segment_ratio(F_REF, maxError)
+    intervals = max(int(np.ceil(np.log(upper / lower) / np.log(ratio) - 1e-9)), 1) if upper > lower else 0
+    points = [(0, 0)]
+    points.extend((float(x), costs(x)) for x in np.geomspace(lower, upper, intervals + 1))
+
+    if upper < X_MAX:
+        slope = C_REF * F_REF * upper ** (F_REF - 1) * M_REF ** (-F_REF)
+        points.append((X_MAX, (X_MAX - upper) * slope + costs(upper)))
+
+    return points
+
+
+def pad_capex_points(x_vals, y_vals, ProcessNumber, points):
+    """
+    Repeats the last breakpoint of a unit until it has the given number of points, so all units fit the common
+    set J. The repeated points give segments of length zero, which are switched off in the model.
+    """
+    n = sum(1 for (u, j) in x_vals['lin_CAPEX_x'] if u == ProcessNumber)
+    for j in range(n + 1, points + 1):
+        x_vals['lin_CAPEX_x'][ProcessNumber, j] = x_vals['lin_CAPEX_x'][ProcessNumber, n]
+        y_vals['lin_CAPEX_y'][ProcessNumber, j] = y_vals['lin_CAPEX_y'][ProcessNumber, n]
+    return (x_vals, y_vals)
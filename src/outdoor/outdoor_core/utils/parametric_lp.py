@@ -0,0 +1,293 @@
+"""
+LP-based parametric sensitivity of a solved design.
+
+For a fixed design (all binary and integer variables fixed to their optimal values) the superstructure model is an
+LP. Its optimal solution is determined by the active set: the equality constraints, the active inequality
+constraints with a non-zero dual value and the variables at a bound with a non-zero reduced cost. As long as the
+active set does not change, the solution follows a parameter p along the direction dx/dp which keeps the active
+constraints satisfied:
+
+    A_R(p) x(p) = b_R(p)    ->    A_R dx/dp = db_R/dp - dA_R/dp x
+
+The derivatives of the coefficients and right-hand sides are taken from the standard form of the model at p and
+p + h, so every parameter of ParameterUpdatePlan can be analysed (prices, yields, split factors, capital costs ...).
+
+The active set stays optimal as long as
+    - the inactive constraints and the variable bounds stay satisfied (primal ranging) and
+    - the duals of the active constraints and the reduced costs of the variables at a bound keep their sign
+      (dual ranging, the duals follow A_R^T dy/dp = -dA_R/dp^T y).
+The first parameter value at which one of these conditions fails is the end of the range. Within the range the KPIs
+follow their local slopes (first order for parameters which are coefficients of the model). Outside of the range the
+design can change, so a new MILP solve is needed there.
+
+While the design is fixed the binary and integer variables are relaxed to real variables (fix_binaries), so the LP
+is passed on to the solver as an LP and the solver returns its duals. release_binaries restores them.
+"""
+
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+from scipy import sparse
+from scipy.sparse.linalg import lsmr
+
+KPI_VARIABLES = ('EBIT', 'NPC', 'NPE', 'NPFWD', 'TAC', 'CAPEX', 'OPEX', 'PROFITS_TOT', 'GWP_TOT', 'FWD_TOT')
+
+
+def fix_binaries(model_instance):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel with a solution
+
+    Returns
+    -------
+    fixed : ComponentMap
+        {variable: domain} of the binary and integer variables (Y, Y_DIST, Y_HEX, lin_CAPEX_z ...) which were fixed
+        to their rounded values and relaxed to the real domain, restore them with release_binaries after the analysis
+
+    """
+    fixed = pyo.ComponentMap()
+    for var in model_instance.component_data_objects(pyo.Var, descend_into=True):
+        if not var.fixed and (var.is_binary() or var.is_integer()):
+            fixed[var] = var.domain
+            var.fix(round(var.value or 0))
+            # integer variables make the fixed design a MIP for some interfaces, which return no duals
+            var.domain = pyo.Reals
+    return fixed
+
+
+def release_binaries(fixed):
+    """
+    Restores the domains of the variables fixed by fix_binaries and frees them again
+    """
+    for var, domain in fixed.items():
+        var.domain = domain
+        var.unfix()
+
+
+def _standard_form(model_instance):
+    """
+    Returns the standard form of the model instance with the rows identified by (constraint, sense) and the
+    columns by the variable objects
+    """
+    repn = LinearStandardFormCompiler().write(model_instance, mixed_form=True, set_sense=None)
+    rows = [(id(row[0]), row[1]) for row in repn.rows]
+    return repn, rows
+
+
+def _align(A, rowsFrom, columnsFrom, rowsTo, columnsTo):
+    """
+    Reorders the sparse matrix A with the rows and columns rowsFrom / columnsFrom to the order rowsTo / columnsTo,
+    entries without a counterpart are dropped
+    """
+    rowPosition = {key: k for k, key in enumerate(rowsTo)}
+    columnPosition = {id(var): k for k, var in enumerate(columnsTo)}
+    rowMap = np.array([rowPosition.get(key, -1) for key in rowsFrom])
+    columnMap = np.array([columnPosition.get(id(var), -1) for var in columnsFrom])
+
+    A = A.tocoo()
+    r, c = rowMap[A.row], columnMap[A.col]
+    keep = (r >= 0) & (c >= 0)
+    return sparse.csr_matrix((A.data[keep], (r[keep], c[keep])), shape=(len(rowsTo), len(columnsTo)))
+
+
+def _least_squares(M, rhs, denseLimit=2e7):
+    """
+    Solution of M z = rhs, exact for consistent systems and in the (minimum norm) least squares sense otherwise.
+    Rows and columns without entries are removed first, the remaining system is solved densely up to denseLimit
+    entries and with the equilibrated sparse LSMR method above.
+    """
+    M = sparse.csr_matrix(M)
+    z = np.zeros(M.shape[1])
+    rows = np.flatnonzero(np.diff(M.indptr) > 0)
+    columns = np.flatnonzero(np.diff(M.tocsc().indptr) > 0)
+    if not len(rows) or not len(columns):
+        return z
+    M = M[rows][:, columns]
+    rhs = np.asarray(rhs, dtype=float)[rows]
+
+    if M.shape[0] * M.shape[1] <= denseLimit:
+        z[columns] = np.linalg.lstsq(M.toarray(), rhs, rcond=None)[0]
+        return z
+
+    # the coefficients span many orders of magnitude, LSMR only converges on the equilibrated system
+    rowScale = 1 / np.sqrt(np.asarray(M.multiply(M).sum(axis=1)).ravel())
+    M = sparse.diags(rowScale) @ M
+    columnScale = 1 / np.sqrt(np.asarray(M.multiply(M).sum(axis=0)).ravel())
+    M = M @ sparse.diags(columnScale)
+    z[columns] = lsmr(M, rowScale * rhs, atol=1e-14, btol=1e-14, maxiter=20 * sum(M.shape))[0] * columnScale
+    return z
+
+
+def _step_limit(values, slopes, direction):
+    """
+    Largest step t >= 0 with values + direction * t * slopes >= 0 and the position which limits it
+    """
+    rates = direction * slopes
+    shrinking = rates < -1e-12
+    if not shrinking.any():
+        return np.inf, None
+    steps = np.where(shrinking, np.maximum(values, 0) / np.where(shrinking, -rates, 1), np.inf)
+    k = int(np.argmin(steps))
+    return float(steps[k]), k
+
+
+def solve_fixed_design(solver, model_instance, tee=False):
+    """
+    Parameters
+    ----------
+    solver : Pyomo solver object
+    model_instance : PYOMO ConcreteModel with fixed binaries (see fix_binaries)
+
+    Returns
+    -------
+    (results, duals) : solver results and {constraint: dual value} if the solver returns the duals, else None
+
+    """
+    for suffix in ('dual', 'rc'):
+        if model_instance.component(suffix) is None:
+            model_instance.add_component(suffix, pyo.Suffix(direction=pyo.Suffix.IMPORT))
+    try:
+        results = solver.solve(model_instance, tee=tee)
+        duals = dict(model_instance.dual.items()) or None
+    finally:
+        model_instance.del_component('dual')
+        model_instance.del_component('rc')
+    return results, duals
+
+
+def parametric_analysis(model_instance, apply, value, duals=None, kpis=KPI_VARIABLES, step=None, tolerance=1e-6):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+        Solved LP of the fixed design (see fix_binaries and solve_fixed_design)
+    apply : function
+        apply(value) writes the parameter value to the model instance (e.g. ParameterUpdatePlan.apply)
+    value : Float
+        Current value of the parameter
+    duals : Dictionary, optional
+        {constraint: dual value} of the LP solve, used to separate the active constraints with a dual value from
+        the degenerate ones. Without duals all active constraints are kept active.
+    kpis : tuple
+        Names of the scalar variables whose slopes are reported
+    step : Float, optional
+        Step of the finite difference of the coefficients, default is 1e-4 * max(1, |value|)
+    tolerance : Float
+        Relative tolerance of active constraints, bounds and non-zero duals
+
+    Returns
+    -------
+    analysis : Dictionary
+        lower / upper: range of the parameter in which the active set stays optimal
+        limit lower / limit upper: constraint or variable which ends the range
+        objective slope: derivative of the objective
+        slopes: {kpi: derivative} (above the current value, below if the range is empty above)
+        variable slopes: ComponentMap {variable: derivative} of the variables of the LP which change
+
+    """
+    step = step or 1e-4 * max(1.0, abs(value))
+
+    repn, rows = _standard_form(model_instance)
+    apply(value + step)
+    try:
+        repnStep, rowsStep = _standard_form(model_instance)
+    finally:
+        apply(value)
+
+    columns = repn.columns
+    A = repn.A.tocsr()
+    dA = (_align(repnStep.A, rowsStep, repnStep.columns, rows, columns) - A) / step
+    rhsStep = dict(zip(rowsStep, repnStep.rhs))
+    rhs = np.asarray(repn.rhs, dtype=float)
+    drhs = (np.array([rhsStep.get(key, r) for key, r in zip(rows, rhs)]) - rhs) / step
+    c = np.asarray(repn.c.todense()).ravel() if sparse.issparse(repn.c) else np.asarray(repn.c, dtype=float).ravel()
+
+    x = np.array([var.value if var.value is not None else 0.0 for var in columns], dtype=float)
+    lb = np.array([-np.inf if var.lb is None else var.lb for var in columns], dtype=float)
+    ub = np.array([np.inf if var.ub is None else var.ub for var in columns], dtype=float)
+    sense = np.array([key[1] for key in rows])
+
+    # slack >= 0 of every row (0 for equalities), slacks of >= rows are counted positive as well
+    body = A @ x
+    slack = np.where(sense == 0, 0.0, np.where(sense == 1, rhs - body, body - rhs))
+    active = (sense == 0) | (slack <= tolerance * (1 + np.abs(rhs)))
+    if duals is not None:
+        rowDuals = np.array([duals.get(row[0], 0.0) for row in repn.rows], dtype=float)
+        dualTolerance = tolerance * max(1.0, np.abs(c).max(initial=0))
+        active &= (sense == 0) | (np.abs(rowDuals) > dualTolerance)
+
+    with np.errstate(invalid='ignore'):
+        atBound = (np.isfinite(lb) & (x - lb <= tolerance * (1 + np.abs(lb)))
+                   | np.isfinite(ub) & (ub - x <= tolerance * (1 + np.abs(ub))))
+    F, N = np.flatnonzero(~atBound), np.flatnonzero(atBound)
+    degenerate = ~active & (slack <= tolerance * (1 + np.abs(rhs)))
+
+    # duals of the active rows and reduced costs of the variables at a bound (c = A_R^T y + d), only the duals and
+    # reduced costs which are not zero have to keep their sign
+    R = np.flatnonzero(active)
+    A_RF = A[R][:, F]
+    y = _least_squares(A_RF.T.tocsr(), c[F])
+    d = c[N] - A[R][:, N].T @ y
+    dy = _least_squares(A_RF.T.tocsr(), -(dA[R][:, F].T @ y))
+    dd = -(dA[R][:, N].T @ y) - A[R][:, N].T @ dy
+    dualTolerance = tolerance * max(1.0, np.abs(c).max(initial=0))
+    y = np.where(np.abs(y) > dualTolerance, y, 0.0)
+    d = np.where(np.abs(d) > dualTolerance, d, 0.0)
+
+    def direction_of_change(direction):
+        """
+        dx/dp of the active set, degenerate rows which would be violated in the direction are kept active
+        """
+        rowSet = active.copy()
+        for _ in range(10):
+            R = np.flatnonzero(rowSet)
+            dx = np.zeros(len(x))
+            dx[F] = _least_squares(A[R][:, F], drhs[R] - dA[R] @ x)
+            dbody = dA @ x + A @ dx
+            dslack = np.where(sense == 1, drhs - dbody, dbody - drhs)
+            violated = degenerate & ~rowSet & (direction * dslack < -tolerance)
+            if not violated.any():
+                break
+            rowSet |= violated
+        return dx, dslack, rowSet
+
+    def limit(direction):
+        dx, dslack, rowSet = direction_of_change(direction)
+        inactive = np.flatnonzero(~rowSet)
+        values = np.concatenate([slack[inactive], x[F] - lb[F], ub[F] - x[F], np.abs(y), np.abs(d)])
+        slopes = np.concatenate([dslack[inactive], dx[F], -dx[F], np.sign(y) * dy, np.sign(d) * dd])
+        names = ([repn.rows[k][0].name for k in inactive] + [columns[j].name for j in F] * 2
+                 + [repn.rows[k][0].name for k in R] + [columns[j].name for j in N])
+        t, k = _step_limit(values, slopes, direction)
+        return t, (names[k] if k is not None else None), dx
+
+    stepUp, limitUp, dx = limit(1)
+    stepDown, limitDown, dxDown = limit(-1)
+    if stepUp == 0 and stepDown > 0:
+        dx = dxDown
+
+    kpiColumns = {var.parent_component().local_name: j for j, var in enumerate(columns)
+                  if var.parent_component().local_name in kpis and not var.parent_component().is_indexed()}
+    slopes = {kpi: float(dx[j]) for kpi, j in kpiColumns.items()}
+
+    # accounting variables which are calculated after the solve (see utils.kpi_calculator)
+    calculator = getattr(model_instance, '_kpiCalculator', None)
+    if calculator is not None and calculator.variables:
+        position = {id(var): j for j, var in enumerate(columns)}
+        dInputs = np.array([dx[position[id(var)]] if id(var) in position else 0.0 for var in calculator.inputs])
+        if calculator.factorization is None:
+            calculator.evaluate()
+        dValues = calculator.factorization.solve(calculator.B @ dInputs)
+        for var, slope in zip(calculator.variables, dValues):
+            if var.parent_component().local_name in kpis and not var.parent_component().is_indexed():
+                slopes.setdefault(var.parent_component().local_name, float(slope))
+
+    return {'value': value,
+            'lower': value - stepDown,
+            'upper': value + stepUp,
+            'limit lower': limitDown,
+            'limit upper': limitUp,
+            'objective slope': float(c @ dx),
+            'slopes': slopes,
+            'variable slopes': pyo.ComponentMap((columns[j], float(dx[j])) for j in np.flatnonzero(dx))}
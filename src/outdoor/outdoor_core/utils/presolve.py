@@ -0,0 +1,274 @@
+"""
+Graph based presolve of the Data_File of a superstructure.
+
+The connection data of the Data_File is read as a directed graph (sources -> units via U_SU, units -> units via the
+non-zero split factors myu and the distributor outlets U_DIST_SUB). Before the model is built the presolve removes:
+
+    - units which can not receive any flow from a source
+    - units without a path to a product pool or an energy producing unit (dead ends), if their flow is not forced
+      by a source with a lower bound (or the substrate load), only with removeDeadEnds=True
+    - zero split factors and the connections which only have zero split factors
+    - components which can not be present in any flow (not in a used source and not produced by a reaction)
+
+Units which are linked to a kept unit by the logic constraints (groups and connections) are always kept. Unreachable
+units, zero split connections and absent components carry no flow in any solution, so removing them does not change
+the optimum. Dead ends only receive flow which ends up as waste. Removing them changes the optimum if a dead end
+would be chosen to treat a waste stream before its disposal (e.g. to lower the waste costs), so they are only
+removed with removeDeadEnds=True.
+"""
+
+import copy
+
+
+# positions of the unit numbers in the (flattened) elements of the sets and the indices of the parameters, the other
+# parameters of a removed unit are found with the indices the unit added to the Data_File
+UNIT_POSITIONS = {
+    'U': (0,), 'UU': (0,), 'U_STOICH_REACTOR': (0,), 'U_YIELD_REACTOR': (0,), 'U_SPLITTER': (0,), 'U_FUR': (0,),
+    'U_TUR': (0,), 'U_PP': (0,), 'U_C': (0,), 'U_S': (0,), 'U_DIST': (0,), 'U_SU': (0, 1), 'U_DIST_SUB': (0, 1),
+    'DC_SET': (0,), 'U_DIST_SUB2': (0, 1, 2), 'U_DIST_REST': (0, 1), 'YC': (0,), 'Names': (0,), 'waste_type_U': (0,),
+    'myu': (0, 1),
+}
+
+# positions of the components in the (flattened) elements of the sets and the indices of the parameters
+COMPONENT_POSITIONS = {
+    'I': (0,), 'M': (0,), 'YC': (1,), 'LHV': (0,), 'MW': (0,), 'CP': (0,), 'em_fac_comp': (0,),
+    'impact_inFlow_components': (0,), 'myu': (2,), 'phi': (1,), 'xi': (1,), 'gamma': (1,), 'theta': (2,),
+    'kappa_1_lhs_conc': (1,), 'kappa_1_rhs_conc': (1,), 'kappa_1_capex': (1,), 'kappa_1_ut': (2,),
+}
+
+
+def _flat_index(index):
+    """
+    Flattens nested Data_File indices, e.g. (u, (uu, i)) -> (u, uu, i)
+    """
+    if not isinstance(index, tuple):
+        return (index,)
+    flat = []
+    for j in index:
+        flat.extend(_flat_index(j))
+    return tuple(flat)
+
+
+def _set(data, name):
+    return data.get(name, {None: []})[None]
+
+
+def _reachable(starts, edges):
+    """
+    All nodes which can be reached from the start nodes (including the start nodes)
+    """
+    reached = set(starts)
+    stack = list(starts)
+    while stack:
+        node = stack.pop()
+        for nextNode in edges.get(node, ()):
+            if nextNode not in reached:
+                reached.add(nextNode)
+                stack.append(nextNode)
+    return reached
+
+
+def get_unit_network(data):
+    """
+    Directed graph of the superstructure
+
+    :param data: Data_File[None]
+    :return: dictionary {u: set of units which can receive flow from u}
+    """
+    network = {u: set() for u in _set(data, 'U')}
+    for u_s, u in _set(data, 'U_SU'):
+        network[u_s].add(u)
+    for (u, (uu, i)), value in data.get('myu', {}).items():
+        if value:
+            network[u].add(uu)
+    for u, uu in _set(data, 'U_DIST_SUB'):
+        network[u].add(uu)
+    return network
+
+
+def find_live_units(data, groups=None, connections=None, loadID=None, loadType=None, removeDeadEnds=False):
+    """
+    Finds the units which can be part of a feasible and meaningful flowsheet
+
+    :param data: Data_File[None]
+    :param groups: Superstructure.groups {group: [units]}, units of a group are selected together
+    :param connections: Superstructure.connections {u: {k: [units]}}, if u is selected one of the units is selected
+    :param loadID: unit number of the product pool or source of the load
+    :param loadType: 'Product', 'Substrate' or None
+    :param removeDeadEnds: also remove units without a path to a product pool or energy producing unit
+    :return: set of live unit numbers
+    """
+    network = get_unit_network(data)
+    live = _reachable(_set(data, 'U_S'), network)
+
+    if removeDeadEnds:
+        reverseNetwork = {}
+        for u, successors in network.items():
+            for uu in successors:
+                reverseNetwork.setdefault(uu, set()).add(u)
+
+        sinks = set(_set(data, 'U_PP')) | set(_set(data, 'U_FUR')) | set(_set(data, 'U_TUR'))
+        # the flow of sources with a lower bound has to go somewhere, so everything downstream is kept
+        forcedSources = [u_s for u_s in _set(data, 'U_S') if data.get('ll', {}).get(u_s, 0) > 0]
+        if loadType == 'Substrate' and loadID is not None:
+            forcedSources.append(loadID)
+
+        live &= _reachable(sinks, reverseNetwork) | _reachable(forcedSources, network)
+
+    # keep all units which are linked to a live unit by the logic constraints
+    groups = groups or {}
+    connections = connections or {}
+    changed = True
+    while changed:
+        changed = False
+        for members in groups.values():
+            if live.intersection(members) and not live.issuperset(members):
+                live.update(members)
+                changed = True
+        for u, required in connections.items():
+            if u in live:
+                for members in required.values():
+                    if not live.issuperset(members):
+                        live.update(members)
+                        changed = True
+
+    return live & set(_set(data, 'U'))
+
+
+def find_live_components(data, units):
+    """
+    Finds the components which can be present in a flow of the given units: components of the used sources and
+    the products of the reactions with a present key reactant (repeated until no new component is found)
+
+    :param data: Data_File[None]
+    :param units: set of live unit numbers
+    :return: set of live components
+    """
+    live = {i for (u_s, i), value in data.get('phi', {}).items() if value and u_s in units}
+    live.update(i for (u, i), value in data.get('xi', {}).items() if value and u in units)
+
+    keyReactants = {}
+    for (u, (r, m)), value in data.get('theta', {}).items():
+        if value and u in units:
+            keyReactants.setdefault((u, r), set()).add(m)
+
+    products = {}
+    for (u, (i, r)), value in data.get('gamma', {}).items():
+        if value and u in units:
+            products.setdefault((u, r), set()).add(i)
+
+    changed = True
+    while changed:
+        changed = False
+        for reaction, components in products.items():
+            if not live.issuperset(components) and live.intersection(keyReactants.get(reaction, ())):
+                live.update(components)
+                changed = True
+
+    return live
+
+
+def presolve_data_file(dataFile, unitIndices, groups=None, connections=None, loadID=None, loadType=None,
+                       removeDeadEnds=False):
+    """
+    Creates the reduced Data_File (the given Data_File is not changed)
+
+    :param dataFile: Data_File {None: {...}} from Superstructure.create_DataFile
+    :param unitIndices: {unit number: {parameter: [indices]}} of the indices added to the Data_File by each unit
+        (Superstructure._unitDataIndices)
+    :param groups: Superstructure.groups
+    :param connections: Superstructure.connections
+    :param loadID: unit number of the product pool or source of the load
+    :param loadType: 'Product', 'Substrate' or None
+    :param removeDeadEnds: also remove units without a path to a product pool or energy producing unit
+    :return: (reduced Data_File, report) with the report as dictionary of the removed units, connections,
+        components and the number of removed Data_File entries
+    """
+    data = dataFile[None]
+
+    liveUnits = find_live_units(data, groups, connections, loadID, loadType, removeDeadEnds)
+    removedUnits = [u for u in _set(data, 'U') if u not in liveUnits]
+
+    if loadID is not None and loadID in removedUnits:
+        raise ValueError('The load unit {} can not be part of any flowsheet (no connection from a source or to a '
+                         'product pool), the problem is infeasible'.format(data['Names'].get(loadID, loadID)))
+    for u in removedUnits:
+        if data.get('MinProduction', {}).get(u, 0) > 0:
+            raise ValueError('The product pool {} has a minimum production but can not receive any flow, the problem '
+                             'is infeasible'.format(data['Names'].get(u, u)))
+
+    liveComponents = find_live_components(data, liveUnits)
+    removedComponents = [i for i in _set(data, 'I') if i not in liveComponents]
+    removedUnitsSet = set(removedUnits)
+    removedComponentsSet = set(removedComponents)
+
+    # indices added by the removed units themselves
+    removedIndices = {}
+    for u in removedUnits:
+        for name, indices in unitIndices.get(u, {}).items():
+            removedIndices.setdefault(name, set()).update(indices)
+
+    def is_removed(name, element):
+        flat = _flat_index(element)
+        return (any(flat[p] in removedUnitsSet for p in UNIT_POSITIONS.get(name, ()))
+                or any(flat[p] in removedComponentsSet for p in COMPONENT_POSITIONS.get(name, ())))
+
+    reduced = {}
+    removedEntries = 0
+    for name, value in data.items():
+        if not isinstance(value, dict):
+            reduced[name] = copy.copy(value)
+        elif None in value:
+            if isinstance(value[None], (list, tuple, set)):
+                elements = [e for e in value[None] if not is_removed(name, e)]
+                removedEntries += len(value[None]) - len(elements)
+                reduced[name] = {None: elements}
+            else:
+                reduced[name] = copy.copy(value)
+        else:
+            indices = removedIndices.get(name, ())
+            parameter = {index: v for index, v in value.items()
+                         if index not in indices and not is_removed(name, index)
+                         and not (name == 'myu' and not v)}
+            removedEntries += len(value) - len(parameter)
+            reduced[name] = parameter
+
+    # connections with non-zero split factors and the distributor outlets
+    oldConnections = _set(data, 'U_CONNECTORS')
+    connectors = dict.fromkeys((u, uu) for (u, (uu, i)) in reduced.get('myu', {}))
+    connectors.update(dict.fromkeys(_set(reduced, 'U_DIST_SUB')))
+    reduced['U_CONNECTORS'] = {None: list(connectors)}
+    removedEntries += len(oldConnections) - len(connectors)
+
+    report = {'units': (len(_set(data, 'U')), len(_set(reduced, 'U'))),
+              'connections': (len(oldConnections), len(connectors)),
+              'components': (len(_set(data, 'I')), len(_set(reduced, 'I'))),
+              'removed units': removedUnits,
+              'removed connections': [c for c in oldConnections if c not in connectors],
+              'removed components': removedComponents,
+              'removed entries': removedEntries}
+
+    return {None: reduced}, report
+
+
+def print_presolve_report(report, names=None):
+    """
+    Prints the results of presolve_data_file
+
+    :param report: report dictionary of presolve_data_file
+    :param names: {unit number: unit name} to print the unit names
+    """
+    names = names or {}
+    print('Presolve of the superstructure:')
+    for key in ('units', 'connections', 'components'):
+        before, after = report[key]
+        print('    {:<12} {:>6} -> {:>6}'.format(key, before, after))
+    print('    removed Data_File entries: {}'.format(report['removed entries']))
+
+    if report['removed units']:
+        print('    removed units: {}'.format(', '.join(str(names.get(u, u)) for u in report['removed units'])))
+    if report['removed connections']:
+        print('    removed connections: {}'.format(
+            ', '.join('{} -> {}'.format(names.get(u, u), names.get(uu, uu)) for u, uu in report['removed connections'])))
+    if report['removed components']:
+        print('    removed components: {}'.format(', '.join(str(i) for i in report['removed components'])))
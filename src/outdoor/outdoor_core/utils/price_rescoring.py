@@ -0,0 +1,274 @@
+"""
+Re-scoring of solved designs under new prices without solving the model again.
+
+The prices of the model (materialcosts, ProductPrice, delta_ut, delta_q) only appear in the accounting equations of
+the OPEX and the profits. For a fixed design and fixed flows these are linear in the prices:
+
+    OPEX(p)        = OPEX_0 + g_OPEX . (p - p_0)
+    PROFITS_TOT(p) = PROFITS_0 + g_PROFITS . (p - p_0)
+
+with the gradients g taken from the solved flows and energy demands of the design (e.g. the material costs of a
+source change the OPEX by FLOW_SOURCE * flh / 1e6 M€ per €/t). The CAPEX does not depend on the prices, TAC, NPC and
+EBIT follow from their definitions. All designs are re-scored for all price scenarios with a few matrix products.
+
+The re-scored values are exact for the flows of the design, the real optimum of a scenario can only be better. The
+scenarios in which a re-solve can change the result are flagged (see PriceRescorer.flag_resolves):
+    - close call: the best and second best design are within a tolerance
+    - reduced costs: a price of an option the design does not use (source, product, utility) moves in its
+      favourable direction by more than its reduced cost, so the option can become part of the optimum
+    - price range: a price of an option the design uses moves by more than the allowed relative change, the flows
+      of the design can shift
+"""
+
+import numpy as np
+import pandas as pd
+
+PRICE_PARAMETERS = ('materialcosts', 'ProductPrice', 'delta_ut', 'delta_q')
+
+# +1: a higher price makes the option more attractive, -1: a lower price does
+_FAVOURABLE_DIRECTION = {'materialcosts': -1, 'ProductPrice': 1, 'delta_ut': -1, 'delta_q': -1}
+
+
+def price_gradients(data):
+    """
+    Parameters
+    ----------
+    data : Dictionary
+        Data of a solved single run (ModelOutput.get_data())
+
+    Returns
+    -------
+    gradients : Dictionary
+        {(parameter, index): (dOPEX, dPROFITS_TOT)} change of the OPEX and the profits in M€ per unit of the price
+
+    """
+    H = data['H']
+    flh = data.get('flh', {})
+    gradients = {}
+
+    for u_s, flow in data.get('FLOW_SOURCE', {}).items():
+        gradients[('materialcosts', u_s)] = ((flow or 0) * flh.get(u_s, 0) / 1e6, 0.0)
+
+    productFlows = {u: 0.0 for u in data.get('U_PP', [])}
+    for (u, i), flow in data.get('FLOW_IN', {}).items():
+        if u in productFlows:
+            productFlows[u] += flow or 0
+    for u, flow in productFlows.items():
+        gradients[('ProductPrice', u)] = (0.0, flow * H / 1e6)
+
+    for ut, demand in data.get('ENERGY_DEMAND_TOT', {}).items():
+        gradients[('delta_ut', ut)] = ((demand or 0) / 1e6, 0.0)
+    heatPumpElectricity = (data.get('ENERGY_DEMAND_HP_EL') or 0) * H / 1e6
+    dOPEX, dPROFITS = gradients.get(('delta_ut', 'Electricity'), (0.0, 0.0))
+    gradients[('delta_ut', 'Electricity')] = (dOPEX + heatPumpElectricity, dPROFITS)
+
+    # the sold heat is valued with the price of the first heat interval
+    heatSold = (data.get('ENERGY_DEMAND_HEAT_PROD_SELL') or 0) * H * 0.7 / 1e6
+    for hi in data.get('HI', []):
+        gradients[('delta_q', hi)] = ((data.get('ENERGY_DEMAND_HEAT_DEFI', {}).get(hi) or 0) * H / 1e6
+                                      - (heatSold if hi == 1 else 0), 0.0)
+
+    return gradients
+
+
+def price_scenarios(dataFiles, parameters=PRICE_PARAMETERS):
+    """
+    Parameters
+    ----------
+    dataFiles : Dictionary
+        {scenario: Data_File} e.g. Superstructure.scenarioDataFiles
+    parameters : tuple
+        Names of the price parameters
+
+    Returns
+    -------
+    scenarios : pd.DataFrame
+        Scenario x (parameter, index) table of the prices which are not the same in all scenarios
+
+    """
+    rows = {}
+    for scenario, dataFile in dataFiles.items():
+        data = dataFile[None]
+        rows[scenario] = {(parameter, index): value for parameter in parameters if parameter in data
+                          for index, value in data[parameter].items()}
+
+    scenarios = pd.DataFrame.from_dict(rows, orient='index')
+    return scenarios.loc[:, scenarios.nunique(dropna=False) > 1]
+
+
+class PriceRescorer:
+    """
+    Class Description
+    -----------------
+    Calculates the economic KPIs of solved designs for many price scenarios and flags the scenarios which need a
+    re-solve.
+    """
+
+    KPIS = ('EBIT', 'NPC', 'TAC', 'OPEX', 'PROFITS_TOT')
+
+    def __init__(self, designs):
+        """
+        Parameters
+        ----------
+        designs : ModelOutput, MultiModelOutput or Dictionary
+            Solved single runs, a dictionary {name: ModelOutput or data dictionary} or a MultiModelOutput whose runs
+            are the designs (e.g. of the design enumeration or a wait and see run)
+
+        """
+        if hasattr(designs, '_results_data'):
+            designs = {name: designs.get_run_data(name) for name in designs._results_data}
+        elif not isinstance(designs, dict):
+            designs = {'design': designs}
+        if not designs:
+            raise ValueError('At least one solved design is needed for the re-scoring')
+
+        self.names = list(designs)
+        self.data = [design.get_data() if hasattr(design, 'get_data') else dict(design)
+                     for design in designs.values()]
+        self.gradients = [price_gradients(data) for data in self.data]
+        self.objective = self.data[0].get('ObjectiveFunctionName')
+
+        self.capex = np.array([data['CAPEX'] for data in self.data], dtype=float)
+        self.opex = np.array([data['OPEX'] for data in self.data], dtype=float)
+        self.profits = np.array([data['PROFITS_TOT'] for data in self.data], dtype=float)
+        self.load = np.array([data.get('sourceOrProductLoad', 1) for data in self.data], dtype=float)
+
+        # EBIT is either PROFITS - CAPEX - OPEX (M€) or -NPC for a product or substrate load (€/t)
+        earnings = self.profits - self.capex - self.opex
+        specific = earnings * 1e6 / self.load
+        ebit = np.array([data['EBIT'] for data in self.data], dtype=float)
+        self.ebitFactor = np.where(np.abs(ebit - specific) < np.abs(ebit - earnings), 1e6 / self.load, 1.0)
+
+    def _price_matrices(self, columns):
+        """
+        Returns
+        -------
+        (basePrices, gOPEX, gPROFITS) : np.ndarray of shape (design x price) with the prices of the solved designs
+            and the gradients of OPEX and profits
+
+        """
+        for parameter, index in columns:
+            if parameter not in _FAVOURABLE_DIRECTION:
+                raise ValueError("'{}' is not a price parameter, only {} can be re-scored".format(
+                    parameter, ', '.join(PRICE_PARAMETERS)))
+
+        basePrices = np.array([[data.get(parameter, {}).get(index, 0) for parameter, index in columns]
+                               for data in self.data], dtype=float)
+        gOPEX = np.array([[gradients.get(column, (0.0, 0.0))[0] for column in columns]
+                          for gradients in self.gradients])
+        gPROFITS = np.array([[gradients.get(column, (0.0, 0.0))[1] for column in columns]
+                             for gradients in self.gradients])
+        return basePrices, gOPEX, gPROFITS
+
+    def rescore(self, scenarios, kpis=KPIS):
+        """
+        Parameters
+        ----------
+        scenarios : pd.DataFrame
+            Scenario x (parameter, index) table of prices (see price_scenarios), prices which are not given keep
+            the value of the solved design
+        kpis : tuple
+            Any of EBIT, NPC, TAC, OPEX and PROFITS_TOT
+
+        Returns
+        -------
+        results : Dictionary
+            {kpi: pd.DataFrame (scenario x design)}
+
+        """
+        columns = list(scenarios.columns)
+        basePrices, gOPEX, gPROFITS = self._price_matrices(columns)
+        S = scenarios.to_numpy(dtype=float)
+
+        # (scenario x design): S @ g.T - (p_0 . g) of every design
+        opex = self.opex + S @ gOPEX.T - (basePrices * gOPEX).sum(axis=1)
+        profits = self.profits + S @ gPROFITS.T - (basePrices * gPROFITS).sum(axis=1)
+        tac = (self.capex + opex - profits) * 1000
+
+        values = {'OPEX': opex, 'PROFITS_TOT': profits, 'TAC': tac, 'NPC': tac * 1000 / self.load,
+                  'EBIT': (profits - self.capex - opex) * self.ebitFactor}
+
+        results = {}
+        for kpi in kpis:
+            if kpi not in values:
+                raise ValueError("The KPI '{}' can not be re-scored, choose from {}".format(kpi, ', '.join(self.KPIS)))
+            results[kpi] = pd.DataFrame(values[kpi], index=scenarios.index, columns=self.names)
+        return results
+
+    def flag_resolves(self, scenarios, objective=None, tolerance=0.01, reducedCosts=None, priceRange=None):
+        """
+        Parameters
+        ----------
+        scenarios : pd.DataFrame
+            Scenario x (parameter, index) table of prices (see rescore)
+        objective : String, optional
+            EBIT (maximized), NPC or TAC (minimized), default is the objective of the solved designs
+        tolerance : Float
+            Relative difference below which the second best design is a close call
+        reducedCosts : Dictionary, optional
+            {(parameter, index): price change} favourable price change which an unused option needs to become part
+            of the optimum (e.g. from the reduced costs of an LP solve with fixed binaries). Options which are not
+            given are flagged at any favourable change.
+        priceRange : Float, optional
+            Largest relative change of the price of a used option before the scenario is flagged, default is no
+            limit
+
+        Returns
+        -------
+        flags : pd.DataFrame
+            One row per scenario with the best design, its objective value, the relative margin to the second best
+            design, the reasons and a boolean column 'resolve'
+
+        """
+        objective = objective or self.objective
+        if objective not in ('EBIT', 'NPC', 'TAC'):
+            raise ValueError("The objective '{}' does not depend on prices, choose EBIT, NPC or TAC".format(objective))
+
+        values = self.rescore(scenarios, kpis=(objective,))[objective].to_numpy()
+        if objective != 'EBIT':
+            values = -values
+
+        order = np.argsort(-values, axis=1)
+        best = order[:, 0]
+        rows = np.arange(len(values))
+        bestValues = values[rows, best]
+        if values.shape[1] > 1:
+            margin = (bestValues - values[rows, order[:, 1]]) / np.maximum(np.abs(bestValues), 1e-9)
+        else:
+            margin = np.full(len(values), np.inf)
+        closeCall = margin < tolerance
+
+        columns = list(scenarios.columns)
+        basePrices, gOPEX, gPROFITS = self._price_matrices(columns)
+        S = scenarios.to_numpy(dtype=float)
+        change = S - basePrices[best]
+        unused = ((gOPEX == 0) & (gPROFITS == 0))[best]
+
+        direction = np.array([_FAVOURABLE_DIRECTION[parameter] for parameter, index in columns])
+        reducedCosts = reducedCosts or {}
+        threshold = np.array([reducedCosts.get(column, 0.0) for column in columns], dtype=float)
+        newOptions = unused & (change * direction > threshold)
+
+        if priceRange is not None:
+            relativeChange = np.abs(change) / np.maximum(np.abs(basePrices[best]), 1e-9)
+            shiftedFlows = ~unused & (relativeChange > priceRange)
+        else:
+            shiftedFlows = np.zeros_like(unused)
+
+        unitNames = self.data[0].get('Names', {})
+        labels = ['{} {}'.format(parameter, unitNames.get(index, index)) for parameter, index in columns]
+        reasons = []
+        for s in rows:
+            reason = []
+            if closeCall[s]:
+                reason.append('close call')
+            reason += ['reduced cost ' + labels[k] for k in np.flatnonzero(newOptions[s])]
+            reason += ['price range ' + labels[k] for k in np.flatnonzero(shiftedFlows[s])]
+            reasons.append(', '.join(reason))
+
+        return pd.DataFrame({'design': [self.names[d] for d in best],
+                             objective: bestValues if objective == 'EBIT' else -bestValues,
+                             'margin': margin,
+                             'reasons': reasons,
+                             'resolve': closeCall | newOptions.any(axis=1) | shiftedFlows.any(axis=1)},
+                            index=scenarios.index)
@@ -0,0 +1,318 @@
+"""
+Automatic scaling of the superstructure model.
+
+The coefficients of the model span many orders of magnitude (flows in t/h, big-M parameters of 1e5, CAPEX in M€,
+HEN costs in k€, impacts per kg). The scaling factors are calculated from the coefficient matrix of the populated
+model instance (i.e. from the parameters of the Data_File) with geometric mean scaling: rows (and optionally
+columns) are divided by the geometric mean of their largest and smallest absolute coefficient. The factors are
+rounded to powers of two, so the scaling itself adds no rounding errors.
+
+Binary and integer variables and the variables of SOS constraints are never scaled, so integrality and the SOS
+conditions are the same in the scaled model. The objective is not scaled, so the optimality gap keeps its meaning.
+The big-M constraints (a binary or integer variable with a coefficient of at least bigM, e.g. alpha = 1e5) and the
+variables in them are not scaled either: a scaled big-M row moves the feasibility tolerance of the solver onto the
+big-M, so the binaries switch off flows only approximately. The continuous variables are only scaled on request: a
+scaled variable changes the meaning of the feasibility tolerance of its bounds.
+
+The factors are stored in the scaling_factor suffix of the instance and applied with Pyomo's core.scale_model
+transformation to a copy of the instance, the solution is propagated back to the unscaled instance if the solver
+found one. The scaled copy is kept for the next solve of the same instance: only the values of the mutable
+parameters and the values, bounds and fixing of the variables are copied to it, a new copy is only made if the
+components, the active constraints, the fixed variables or the scaling factors of the instance change.
+
+The tolerances of the solver apply to the scaled model, so the propagated solution is checked in the original
+instance. If a constraint or bound is violated by more than maxViolation, the instance is solved again without
+scaling and the following solves of the same instance are not scaled anymore.
+"""
+
+import hashlib
+import weakref
+
+import numpy as np
+from pyomo.environ import Constraint, Param, SOSConstraint, Suffix, TransformationFactory, Var, value
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+from .solve_cache import _hash_values, structure_fingerprint
+from .solver_status import has_solution
+
+# scaled copies of the model instances, {model_instance: (fingerprint, scaled instance or None if the scaled
+# solution violated the original constraints)}
+_SCALED_INSTANCES = weakref.WeakKeyDictionary()
+
+
+def coefficient_matrix(model_instance):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+
+    Returns
+    -------
+    (A, rows, columns) : sparse coefficient matrix (csr) of the active constraints, the constraint data objects of
+        the rows and the variable data objects of the columns
+
+    """
+    # the standard form compiler does not support SOS constraints, their variables are found separately
+    sosConstraints = [sos for sos in model_instance.component_data_objects(SOSConstraint, active=True)]
+    for sos in sosConstraints:
+        sos.deactivate()
+    try:
+        repn = LinearStandardFormCompiler().write(model_instance, mixed_form=True, set_sense=None)
+    finally:
+        for sos in sosConstraints:
+            sos.activate()
+
+    rows = [row.constraint if hasattr(row, 'constraint') else row[0] for row in repn.rows]
+    return repn.A.tocsr(), rows, list(repn.columns)
+
+
+def coefficient_range(A):
+    """
+    Returns
+    -------
+    (smallest, largest) absolute non-zero coefficient of the sparse matrix A
+    """
+    data = np.abs(A.data)
+    data = data[data > 0]
+    if not data.size:
+        return 0.0, 0.0
+    return float(data.min()), float(data.max())
+
+
+def _row_extremes(A):
+    """
+    Largest and smallest absolute non-zero coefficient of every row of the csr matrix A (1 for empty rows)
+    """
+    largest = np.ones(A.shape[0])
+    smallest = np.ones(A.shape[0])
+    filled = np.diff(A.indptr) > 0
+    if filled.any():
+        starts = A.indptr[:-1][filled]
+        largest[filled] = np.maximum.reduceat(A.data, starts)
+        smallest[filled] = np.minimum.reduceat(A.data, starts)
+    return largest, smallest
+
+
+def geometric_scaling(A, fixedColumns=None, passes=4, fixedRows=None):
+    """
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        Coefficient matrix
+    fixedColumns : np.ndarray, optional
+        Boolean mask of the columns which are not scaled
+    passes : Integer
+        Number of alternating row and column passes
+    fixedRows : np.ndarray, optional
+        Boolean mask of the rows which are not scaled
+
+    Returns
+    -------
+    (rowFactors, columnFactors) : the scaled matrix is diag(rowFactors) A diag(columnFactors), both rounded to
+        powers of two
+
+    """
+    A = abs(A.tocsr())
+    A.eliminate_zeros()
+    rowFactors = np.ones(A.shape[0])
+    columnFactors = np.ones(A.shape[1])
+    if fixedColumns is None:
+        fixedColumns = np.zeros(A.shape[1], dtype=bool)
+    if fixedRows is None:
+        fixedRows = np.zeros(A.shape[0], dtype=bool)
+
+    for _ in range(passes):
+        scaled = A.multiply(rowFactors[:, None]).multiply(columnFactors[None, :]).tocsr()
+        largest, smallest = _row_extremes(scaled)
+        rowFactors = np.where(fixedRows, rowFactors, rowFactors / np.sqrt(largest * smallest))
+
+        scaled = A.multiply(rowFactors[:, None]).multiply(columnFactors[None, :]).tocsc()
+        largest, smallest = _row_extremes(scaled.T.tocsr())
+        columnFactors = np.where(fixedColumns, columnFactors, columnFactors / np.sqrt(largest * smallest))
+
+    return 2.0 ** np.round(np.log2(rowFactors)), 2.0 ** np.round(np.log2(columnFactors))
+
+
+def set_scaling_factors(model_instance, variables=False, passes=4, bigM=1e5):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+    variables : Boolean
+        If True the continuous variables are scaled as well, otherwise only the constraints
+    passes : Integer
+        Number of alternating row and column passes of the geometric scaling
+    bigM : Float
+        Constraints with a binary or integer variable with an absolute coefficient of at least bigM are big-M
+        constraints, they and their variables are not scaled
+
+    Returns
+    -------
+    report : Dictionary
+        Coefficient range of the model before and after the scaling
+
+    Description
+    -----------
+    Calculates the scaling factors of the constraints (and continuous variables) and stores them in the
+    scaling_factor suffix of the instance (see scale_and_solve).
+
+    """
+    A, rows, columns = coefficient_matrix(model_instance)
+
+    sosVariables = set()
+    for sos in model_instance.component_data_objects(SOSConstraint):
+        sosVariables.update(id(var) for var in sos.get_variables())
+    integer = np.array([var.is_integer() or var.is_binary() for var in columns], dtype=bool)
+
+    # big-M rows and the columns in them keep their scale
+    absolute = abs(A)
+    bigMRows = np.asarray((absolute[:, np.flatnonzero(integer)] >= bigM).sum(axis=1)).ravel() > 0
+    bigMColumns = np.asarray(absolute[np.flatnonzero(bigMRows)].sum(axis=0)).ravel() > 0
+
+    fixedColumns = np.array([not variables or integer[j] or bigMColumns[j] or id(var) in sosVariables
+                             for j, var in enumerate(columns)], dtype=bool)
+
+    rowFactors, columnFactors = geometric_scaling(A, fixedColumns, passes, fixedRows=bigMRows)
+
+    if model_instance.component('scaling_factor') is None:
+        model_instance.scaling_factor = Suffix(direction=Suffix.EXPORT)
+    suffix = model_instance.scaling_factor
+    suffix.clear()
+
+    # the constraint is multiplied by its factor, the scaled variable is the variable divided by its column factor
+    for constraint, factor in zip(rows, rowFactors):
+        if factor != 1:
+            suffix[constraint] = factor
+    for var, factor in zip(columns, columnFactors):
+        if factor != 1:
+            suffix[var] = 1 / factor
+
+    scaled = A.multiply(rowFactors[:, None]).multiply(columnFactors[None, :]).tocsr()
+    return {'coefficient range': coefficient_range(A),
+            'scaled coefficient range': coefficient_range(scaled),
+            'scaled constraints': int(np.sum(rowFactors != 1)),
+            'scaled variables': int(np.sum(columnFactors != 1)),
+            'big-M constraints': int(np.sum(bigMRows))}
+
+
+def _scaling_fingerprint(model_instance):
+    """
+    Fingerprint of the structure of the instance and of its scaling factors, the scaled copy of the instance is
+    reused as long as it does not change
+    """
+    hasher = hashlib.sha1(structure_fingerprint(model_instance, values=False).encode())
+    suffix = model_instance.scaling_factor
+    hasher.update(str(len(suffix)).encode())
+    _hash_values(hasher, suffix.values())
+    return hasher.hexdigest()
+
+
+def _update_scaled_instance(model_instance, scaledInstance):
+    """
+    Copies the values of the mutable parameters and the values, bounds and fixing of the variables of the
+    instance to its scaled copy
+    """
+    factors = scaledInstance.component_scaling_factor_map
+
+    def scaled_component(component):
+        return scaledInstance.find_component(component.getname(fully_qualified=True, relative_to=model_instance))
+
+    for param in model_instance.component_objects(Param, descend_into=True):
+        if param.mutable:
+            scaled_component(param).store_values(param.extract_values(), check=False)
+
+    for var in model_instance.component_objects(Var, descend_into=True):
+        if var.is_reference():
+            continue
+        scaledVar = scaled_component(var)
+        for index, data in var.items():
+            scaled = scaledVar[index]
+            factor = factors[scaled]
+            scaled.setlb(None if data.lb is None else data.lb * factor)
+            scaled.setub(None if data.ub is None else data.ub * factor)
+            scaled.set_value(None if data.value is None else data.value * factor, skip_validation=True)
+            scaled.fixed = data.fixed
+
+
+def scaled_instance(model_instance):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel with a scaling_factor suffix (see set_scaling_factors)
+
+    Returns
+    -------
+    scaledInstance : scaled copy of the instance with its current data (see module description), None if the
+        solution of the scaled copy violated the constraints of the instance before
+
+    """
+    fingerprint = _scaling_fingerprint(model_instance)
+    cached = _SCALED_INSTANCES.get(model_instance)
+    if cached is not None and cached[0] == fingerprint:
+        scaledInstance = cached[1]
+        if scaledInstance is not None:
+            _update_scaled_instance(model_instance, scaledInstance)
+    else:
+        scaledInstance = TransformationFactory('core.scale_model').create_using(model_instance, rename=False)
+        _SCALED_INSTANCES[model_instance] = (fingerprint, scaledInstance)
+    return scaledInstance
+
+
+def max_violation(model_instance):
+    """
+    Largest absolute violation of the active constraints and the bounds of the free variables with the current
+    variable values
+    """
+    violation = 0.0
+    for var in model_instance.component_data_objects(Var, descend_into=True):
+        if var.fixed or var.value is None:
+            continue
+        if var.lb is not None:
+            violation = max(violation, var.lb - var.value)
+        if var.ub is not None:
+            violation = max(violation, var.value - var.ub)
+    for constraint in model_instance.component_data_objects(Constraint, active=True):
+        body = value(constraint.body, exception=False)
+        if body is None:
+            continue
+        if constraint.has_lb():
+            violation = max(violation, value(constraint.lower) - body)
+        if constraint.has_ub():
+            violation = max(violation, body - value(constraint.upper))
+    return violation
+
+
+def scale_and_solve(solver, model_instance, maxViolation=1e-6, **kwargs):
+    """
+    Parameters
+    ----------
+    solver : Pyomo solver object
+    model_instance : PYOMO ConcreteModel with a scaling_factor suffix (see set_scaling_factors)
+    maxViolation : Float
+        Largest absolute violation of a constraint of model_instance which is accepted for the solution of the
+        scaled model, above it model_instance is solved without scaling
+    kwargs : arguments of solver.solve
+
+    Returns
+    -------
+    results : solver results of the scaled model (of the unscaled model if the scaled solution was rejected), the
+        (unscaled) solution is loaded into model_instance if the solver found one, otherwise the values of
+        model_instance are not changed
+
+    """
+    scaledInstance = scaled_instance(model_instance)
+    if scaledInstance is None:
+        return solver.solve(model_instance, **kwargs)
+
+    results = solver.solve(scaledInstance, **kwargs)
+    if has_solution(results, model_instance):
+        TransformationFactory('core.scale_model').propagate_solution(scaledInstance, model_instance)
+
+        violation = max_violation(model_instance)
+        if violation > maxViolation:
+            print('The solution of the scaled model violates the constraints by {:.2e}, the model is solved '
+                  'without scaling'.format(violation))
+            _SCALED_INSTANCES[model_instance] = (_SCALED_INSTANCES[model_instance][0], None)
+            results = solver.solve(model_instance, **kwargs)
+
+    return results
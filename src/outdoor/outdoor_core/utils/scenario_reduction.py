@@ -0,0 +1,177 @@
+"""
+Deduplication of the scenario data files of the stochastic modes.
+
+Different rows of the uncertainty matrix can give the same model data: correlated parameters ('equal' and
+'opposite' groups) of the combinatorial sampling and the clamping of myu, theta, gamma, phi and xi to 1 in
+Superstructure.set_uncertainty_data_mpisspy map several level combinations to the same values, LHS with few
+parameters gives scenarios which are almost the same. Such scenarios have the same solution, so only one of them
+has to be solved.
+
+Every scenario is described by its effective parameter delta: the values of the parameters which are not the same
+in all scenario data files (after clamping and the adjustment of the source compositions). The deltas are scaled
+by the largest absolute value of each parameter and rounded, scenarios with the same hash are merged. With a
+tolerance, scenarios whose scaled deltas are within the tolerance of a representative are merged as well (leader
+clustering, the most probable scenarios become the representatives). The representative is solved, its result
+is used for all members of its group and carries the summed probability of the group.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def scenario_deltas(dataFiles, parameters=None):
+    """
+    Parameters
+    ----------
+    dataFiles : Dictionary
+        {scenario: Data_File} e.g. Superstructure.scenarioDataFiles
+    parameters : list, optional
+        Names of the parameters to compare, default are all parameters of the Data_File
+
+    Returns
+    -------
+    deltas : pd.DataFrame
+        Scenario x (parameter, index) table of the parameter values which are not the same in all scenarios
+
+    """
+    scenarios = list(dataFiles)
+    first = dataFiles[scenarios[0]][None]
+    if parameters is None:
+        # the sets are indexed by None, the parameters by their indices
+        parameters = [name for name, value in first.items() if isinstance(value, dict) and None not in value]
+
+    columns = {}
+    for name in parameters:
+        reference = first.get(name)
+        if all(dataFiles[scenario][None].get(name) == reference for scenario in scenarios[1:]):
+            continue
+        indices = list(dict.fromkeys(index for scenario in scenarios for index in dataFiles[scenario][None][name]))
+        for index in indices:
+            columns[(name, index)] = [dataFiles[scenario][None][name].get(index) for scenario in scenarios]
+
+    deltas = pd.DataFrame(columns, index=scenarios)
+    return deltas.loc[:, deltas.nunique(dropna=False) > 1]
+
+
+def group_scenarios(dataFiles, probabilities=None, tolerance=None, parameters=None, digits=10):
+    """
+    Parameters
+    ----------
+    dataFiles : Dictionary
+        {scenario: Data_File}
+    probabilities : Dictionary, optional
+        {scenario: probability}, default is the same probability for all scenarios
+    tolerance : Float, optional
+        Largest difference of a parameter, relative to its largest absolute value in all scenarios, for which
+        scenarios are merged. The default only merges scenarios with the same data.
+    parameters : list, optional
+        Names of the parameters to compare (see scenario_deltas)
+    digits : Integer
+        Number of digits of the scaled deltas which are hashed
+
+    Returns
+    -------
+    (groups, probabilities) : {representative: [scenarios of the group]} and {representative: summed probability}
+
+    """
+    scenarios = list(dataFiles)
+    if probabilities is None:
+        probabilities = {scenario: 1 / len(scenarios) for scenario in scenarios}
+    if len(scenarios) < 2:
+        return {scenario: [scenario] for scenario in scenarios}, {scenario: probabilities[scenario]
+                                                                  for scenario in scenarios}
+
+    deltas = scenario_deltas(dataFiles, parameters)
+    numeric = deltas.apply(pd.to_numeric, errors='coerce')
+    isNumeric = (numeric.notna() | deltas.isna()).all(axis=0).to_numpy()
+    values = numeric.loc[:, isNumeric].to_numpy(dtype=float)
+    scale = np.nanmax(np.abs(values), axis=0, initial=0.0) if values.size else np.zeros(values.shape[1])
+    # missing values get a sentinel far away from the scaled values (which are within [-1, 1])
+    scaled = np.nan_to_num(values / np.where(scale > 0, scale, 1.0), nan=1e300)
+    # parameters which are not numbers are only merged if they are equal
+    labels = [repr(tuple(row)) for row in deltas.loc[:, ~isNumeric].to_numpy(dtype=object)]
+
+    # exact duplicates, the first scenario of a hash represents the group
+    rounded = np.round(scaled, digits) + 0.0
+    groups = {}
+    for position, scenario in enumerate(scenarios):
+        key = hashlib.sha1(rounded[position].tobytes() + labels[position].encode()).hexdigest()
+        groups.setdefault(key, []).append(position)
+    groups = list(groups.values())
+
+    if tolerance:
+        # leader clustering of the representatives, the most probable groups lead
+        groupProbability = [sum(probabilities[scenarios[p]] for p in group) for group in groups]
+        order = sorted(range(len(groups)), key=lambda g: -groupProbability[g])
+        leaders = np.array([groups[g][0] for g in order], dtype=int)
+        unassigned = np.ones(len(order), dtype=bool)
+        clustered = []
+        for k in range(len(order)):
+            if not unassigned[k]:
+                continue
+            distance = np.max(np.abs(scaled[leaders] - scaled[leaders[k]]), axis=1, initial=0.0)
+            sameLabels = np.array([labels[leader] == labels[leaders[k]] for leader in leaders], dtype=bool)
+            members = np.flatnonzero(unassigned & sameLabels & (distance <= tolerance))
+            unassigned[members] = False
+            clustered.append([p for m in members for p in groups[order[m]]])
+        groups = clustered
+
+    groupDict = {scenarios[group[0]]: [scenarios[p] for p in sorted(group)] for group in groups}
+    groupProbabilities = {representative: sum(probabilities[member] for member in members)
+                          for representative, members in groupDict.items()}
+    return groupDict, groupProbabilities
+
+
+def representatives(groups):
+    """
+    Returns
+    -------
+    representatives : Dictionary
+        {scenario: representative of its group}
+    """
+    return {member: representative for representative, members in groups.items() for member in members}
+
+
+def fan_out(results, groups):
+    """
+    Parameters
+    ----------
+    results : Dictionary
+        {representative: result}
+    groups : Dictionary
+        {representative: [scenarios of the group]} (see group_scenarios)
+
+    Returns
+    -------
+    results : Dictionary
+        {scenario: result of its representative} for all scenarios whose representative has a result
+
+    """
+    return {member: results[representative] for representative, members in groups.items()
+            if representative in results for member in members}
+
+
+def scenario_reduction_settings(superstructure):
+    """
+    Returns
+    -------
+    tolerance : Float or None if the scenarios are not deduplicated, 0 for exact duplicates only (see
+        Superstructure.set_scenarioDeduplication)
+    """
+    if not getattr(superstructure, 'scenarioDeduplication', False):
+        return None
+    return getattr(superstructure, 'scenarioTolerance', None) or 0.0
+
+
+def print_reduction_report(groups):
+    """
+    Prints the number of scenarios which are solved and the merged groups
+    """
+    total = sum(len(members) for members in groups.values())
+    print("\033[1;32m" + "Scenario deduplication: {} of {} scenarios are solved".format(len(groups), total)
+          + "\033[0m")
+    for representative, members in groups.items():
+        if len(members) > 1:
+            print("    {} represents {}".format(representative, ', '.join(str(m) for m in members)))
@@ -0,0 +1,253 @@
+"""
+Memoization of solved model instances.
+
+A solve is identified by two parts:
+    - the structure fingerprint of the model instance: the components and their index sets, the values of the
+      immutable parameters, the fixed variables, the active constraints and objective and the solver with its options
+    - the effective parameter vector: the values of the mutable parameters (the parameters a sweep can change, see
+      prepare_mutable_parameters)
+Both parts are calculated for every lookup, so constraints which are added or variables which are fixed on the same
+model instance between two points give another key. The lookup is still cheap compared to a solve. Points which are
+solved twice (e.g. the nominal value of several parameters or the same grid in a second run) are taken from the
+cache.
+
+The solved runs are kept pickled, so every lookup returns a new copy which the caller can change (e.g. with
+ModelOutput._tidy_data or split_structure). The least recently used runs are dropped above the memory limit of the
+cache. The caches live for the Python session (get_solve_cache), only the most recently used ones are kept. With a
+directory the solved ModelOutputs are also pickled to disk and shared between sessions.
+
+load_solution writes a cached solution back to the model instance, so it can serve as MIP start of the next solve.
+"""
+
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pyomo.environ as pyo
+
+# caches shared by all runs of the session, {directory: SolveCache} ordered from least to most recently used
+_SESSION_CACHES = OrderedDict()
+# number of caches kept for the session, the least recently used ones are dropped
+MAX_SESSION_CACHES = 4
+
+
+def _hash_values(hasher, values):
+    """
+    Adds the values of a dictionary to the hash, as float array if they are numeric
+    """
+    try:
+        array = np.fromiter((np.nan if value is None else value for value in values), dtype=float)
+        hasher.update(array.tobytes())
+    except (TypeError, ValueError):
+        hasher.update(repr(list(values)).encode())
+
+
+def structure_fingerprint(model_instance, solver_name=None, solver_options=None, values=True):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+    solver_name : String, optional
+    solver_options : Dictionary, optional
+    values : Boolean
+        If False the data of the parameters and the values of the fixed variables are not hashed, so all instances
+        of a superstructure with other data (scenarios, sweep points) have the same fingerprint (see
+        optimizers.customs.solver_tuning)
+
+    Returns
+    -------
+    fingerprint : String
+        Hash of everything of the model instance which is not changed by a sweep and of the solver settings
+
+    """
+    hasher = hashlib.sha1()
+    hasher.update(repr((solver_name, sorted((str(key), str(value)) for key, value in
+                                            (solver_options or {}).items()))).encode())
+
+    for component in model_instance.component_objects((pyo.Set, pyo.Param, pyo.Var, pyo.Constraint, pyo.Objective),
+                                                      descend_into=True):
+        # names relative to the instance, the name of the instance itself is not part of the structure
+        name = component.getname(fully_qualified=True, relative_to=model_instance)
+        if component.ctype is pyo.Param and not values:
+            # which indices of a parameter are given is part of the data as well
+            hasher.update('{}:{}'.format(name, component.ctype.__name__).encode())
+            continue
+        hasher.update('{}:{}:{}'.format(name, component.ctype.__name__, len(component)).encode())
+
+        if component.ctype is pyo.Param:
+            paramValues = component.extract_values()
+            hasher.update(repr(list(paramValues)).encode())
+            if paramValues and not component.mutable:
+                _hash_values(hasher, paramValues.values())
+        elif component.ctype is pyo.Var:
+            if values:
+                fixed = [(index, var.value) for index, var in component.items() if var.fixed]
+            else:
+                fixed = [index for index, var in component.items() if var.fixed]
+            hasher.update(repr(fixed).encode())
+        elif component.ctype in (pyo.Constraint, pyo.Objective):
+            hasher.update(repr([index for index, data in component.items() if data.active]).encode())
+
+    return hasher.hexdigest()
+
+
+def load_solution(model_instance, model_output):
+    """
+    Parameters
+    ----------
+    model_instance : PYOMO ConcreteModel
+    model_output : ModelOutput
+        Solved run of the same model instance
+
+    Description
+    -----------
+    Writes the variable values of the run to the (not fixed) variables of the model instance, e.g. as MIP start.
+    Values which were removed as zeros by ModelOutput._tidy_data are set to zero.
+
+    """
+    data = model_output.get_data() if hasattr(model_output, 'get_data') else model_output
+    for component in model_instance.component_objects(pyo.Var, descend_into=True):
+        values = data.get(component.local_name)
+        if values is None:
+            continue
+        for index, var in component.items():
+            if var.fixed:
+                continue
+            value = values.get(index, 0) if isinstance(values, dict) else values
+            if value is not None:
+                var.set_value(value, skip_validation=True)
+
+
+class SolveCache:
+    """
+    Class Description
+    -----------------
+    Memoization of solves keyed by the structure fingerprint and the effective parameter vector of the model
+    instance (see module description).
+    """
+
+    def __init__(self, directory=None, memory_limit=256):
+        """
+        Parameters
+        ----------
+        directory : String, optional
+            Directory to store the solved runs in, so they can be reused in another session
+        memory_limit : Float, optional
+            Memory ceiling in MB of the pickled runs kept in RAM, the least recently used runs are dropped above it
+            (they stay on disk if there is a directory). None means no limit
+
+        """
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.memory_limit = memory_limit
+
+        self._results = OrderedDict()  # {key: pickled run}, ordered from least to most recently used
+        self._memory_used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model_instance, solver_name=None, solver_options=None):
+        """
+        Returns
+        -------
+        key : String
+            Fingerprint of the structure and hash of the current values of the mutable parameters, both calculated
+            from the current state of the model instance (no reference to the instance is kept)
+
+        """
+        hasher = hashlib.sha1(structure_fingerprint(model_instance, solver_name, solver_options).encode())
+        for component in model_instance.component_objects(pyo.Param, descend_into=True):
+            if component.mutable:
+                _hash_values(hasher, component.extract_values().values())
+        return hasher.hexdigest()
+
+    def get(self, key):
+        """
+        Returns
+        -------
+        model_output : Copy of the ModelOutput of the key or None if the point was not solved before
+
+        """
+        pickled = self._results.get(key)
+        if pickled is not None:
+            self._results.move_to_end(key)
+        elif self.directory is not None:
+            path = os.path.join(self.directory, key + '.pkl')
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    pickled = file.read()
+                self._keep(key, pickled)
+
+        if pickled is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(pickled)
+
+    def put(self, key, model_output):
+        """
+        Stores a copy of the solved run (only feasible runs should be stored), later changes of the model_output
+        do not change the cache
+        """
+        pickled = pickle.dumps(model_output, protocol=pickle.HIGHEST_PROTOCOL)
+        self._keep(key, pickled)
+        if self.directory is not None:
+            with open(os.path.join(self.directory, key + '.pkl'), 'wb') as file:
+                file.write(pickled)
+
+    def clear(self):
+        self._results.clear()
+        self._memory_used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _keep(self, key, pickled):
+        if key in self._results:
+            self._memory_used -= len(self._results.pop(key))
+        self._results[key] = pickled
+        self._memory_used += len(pickled)
+
+        if self.memory_limit is not None:
+            # always keep the most recent run
+            while self._memory_used > self.memory_limit * 1024 ** 2 and len(self._results) > 1:
+                _, dropped = self._results.popitem(last=False)
+                self._memory_used -= len(dropped)
+
+
+def get_solve_cache(directory=None, memory_limit=None):
+    """
+    Parameters
+    ----------
+    directory : String, optional
+        Directory of the cache on disk, None for a cache which only lives in memory
+    memory_limit : Float, optional
+        Memory ceiling in MB of the cache (see SolveCache), None keeps the limit of the cache
+
+    Returns
+    -------
+    cache : SolveCache shared by all runs of the session with the same directory, only the MAX_SESSION_CACHES
+        most recently used caches are kept for the session
+
+    """
+    if directory is not None:
+        directory = os.path.abspath(directory)
+    if directory not in _SESSION_CACHES:
+        _SESSION_CACHES[directory] = SolveCache(directory)
+        while len(_SESSION_CACHES) > MAX_SESSION_CACHES:
+            _SESSION_CACHES.popitem(last=False)
+    _SESSION_CACHES.move_to_end(directory)
+
+    cache = _SESSION_CACHES[directory]
+    if memory_limit is not None:
+        cache.memory_limit = memory_limit
+    return cache
+
+
+def clear_solve_caches():
+    """
+    Drops all caches of the session (the runs pickled to the cache directories are kept)
+    """
+    _SESSION_CACHES.clear()
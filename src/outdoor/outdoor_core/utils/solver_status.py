@@ -0,0 +1,83 @@
+"""
+Status of a solve from the pyomo results.
+
+The values of the variables of a model instance do not show whether the solver found a solution: after a solve
+which hit a limit without an incumbent they are left from the warm start or from an earlier solve. Whether there is
+a solution and its objective are taken from the results of the solver instead.
+"""
+
+import pyomo.environ as pyo
+from pyomo.opt import TerminationCondition
+
+# terminations of the solver which come with a solution
+SOLUTION_CONDITIONS = (TerminationCondition.optimal, TerminationCondition.locallyOptimal,
+                       TerminationCondition.globallyOptimal, TerminationCondition.feasible)
+
+# terminations at a limit of the solver, the incumbent (if there is one) is accepted
+LIMIT_CONDITIONS = (TerminationCondition.maxTimeLimit, TerminationCondition.maxIterations,
+                    TerminationCondition.maxEvaluations)
+
+
+def _finite(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value != value or abs(value) >= 1e20:
+        return None
+    return value
+
+
+def incumbent_objective(results, model_instance):
+    """
+    Parameters
+    ----------
+    results : SolverResults of the solve
+    model_instance : PYOMO Concrete Model which was solved (only its objective sense is used)
+
+    Returns
+    -------
+    objective : Float
+        Objective of the best solution the solver found (the upper bound of a minimization, the lower bound of a
+        maximization), None if the solver reports no solution. The values of the model instance are not used, they
+        can be left from a warm start or an earlier solve.
+
+    """
+    problem = results.problem
+    if getattr(problem, 'number_of_solutions', None) == 0:
+        return None
+
+    if model_instance.Objective.sense == pyo.maximize:
+        return _finite(problem.lower_bound)
+    return _finite(problem.upper_bound)
+
+
+def best_bound(results, model_instance):
+    """
+    Parameters
+    ----------
+    results : SolverResults of the solve
+    model_instance : PYOMO Concrete Model which was solved (only its objective sense is used)
+
+    Returns
+    -------
+    bound : Float
+        Best bound of the solver (the lower bound of a minimization, the upper bound of a maximization), None if
+        the solver reports no finite bound
+
+    """
+    if model_instance.Objective.sense == pyo.maximize:
+        return _finite(results.problem.upper_bound)
+    return _finite(results.problem.lower_bound)
+
+
+def has_solution(results, model_instance):
+    """
+    Returns
+    -------
+    True if the solver found a solution, i.e., it terminated optimal or feasible or at a limit with an incumbent
+    """
+    condition = results.solver.termination_condition
+    if condition in SOLUTION_CONDITIONS:
+        return True
+    return condition in LIMIT_CONDITIONS and incumbent_objective(results, model_instance) is not None
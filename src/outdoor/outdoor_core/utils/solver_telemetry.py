@@ -0,0 +1,428 @@
+"""
+Telemetry of the solves: progress and statistics of the branch and bound, per solve and aggregated over a sweep.
+
+The ModelOutput of a run only holds the gap and the run time. Which scenarios or parameter regions are hard to solve
+(and why) is in the log of the solver: the number of nodes, the reductions of the presolve, the root relaxation,
+the time to the first incumbent and the trajectory of the incumbent and the best bound. If the telemetry is switched
+on (see Superstructure.set_solverTelemetry), the log of every solve is written to a temporary file (the LogFile
+option of the gurobi python interface, the logfile of the pyomo shell interfaces) and parsed into a compact record:
+
+    - solver, status, time [s], nodes, iterations
+    - rows, columns (of the model), presolved rows, presolved columns
+    - root relaxation, first incumbent, first incumbent time [s], incumbents (number of improving solutions)
+    - objective, bound, gap [%]
+    - trajectory: [(time [s], incumbent, bound)], only the points where the incumbent or the bound changed
+
+The logs of gurobi and cbc are parsed, for the other solvers only the values of the pyomo results are recorded.
+Values which are not in the log are None. The objective values are given in the sense of the model (cbc logs
+maximizations as minimizations of the negative objective).
+"""
+
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# solvers whose logs are parsed
+LOG_SOLVERS = ('gurobi', 'cbc')
+
+# fields of a telemetry record besides the trajectory
+FIELDS = ('solver', 'status', 'time [s]', 'nodes', 'iterations', 'rows', 'columns', 'presolved rows',
+          'presolved columns', 'root relaxation', 'first incumbent', 'first incumbent time [s]', 'incumbents',
+          'objective', 'bound', 'gap [%]')
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+
+def _float(value):
+    """
+    Returns
+    -------
+    value : Float or None if the value is not a number (e.g. '-' in the node table or undefined pyomo results)
+    """
+    try:
+        value = float(getattr(value, 'value', value))
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def _empty_record(solver_name):
+    record = dict.fromkeys(FIELDS)
+    record['solver'] = solver_name
+    record['incumbents'] = 0
+    record['trajectory'] = []
+    return record
+
+
+def _add_point(record, time, incumbent, bound):
+    """
+    Adds a point to the trajectory if the incumbent or the bound changed, counts the incumbents
+    """
+    trajectory = record['trajectory']
+    last = trajectory[-1] if trajectory else (None, None, None)
+    if incumbent is not None and incumbent != last[1]:
+        record['incumbents'] += 1
+        if record['first incumbent'] is None:
+            record['first incumbent'] = incumbent
+            record['first incumbent time [s]'] = time
+    if incumbent is None and last[1] is not None:
+        incumbent = last[1]
+    if bound is None and last[2] is not None:
+        bound = last[2]
+    if (incumbent, bound) != last[1:]:
+        trajectory.append((time, incumbent, bound))
+
+
+def parse_gurobi_log(text):
+    """
+    Parameters
+    ----------
+    text : String
+        Log of a gurobi solve
+
+    Returns
+    -------
+    record : Dictionary
+        Telemetry record (see module description)
+
+    """
+    record = _empty_record('gurobi')
+    clock = 0.0
+    for line in text.splitlines():
+        stripped = line.strip()
+        match = re.match(r'Optimize a model with (\d+) rows, (\d+) columns', stripped)
+        if match:
+            # a log file can hold several solves (e.g. the IIS), the record is of the last one
+            record = _empty_record('gurobi')
+            record['rows'], record['columns'] = int(match.group(1)), int(match.group(2))
+            clock = 0.0
+            continue
+        match = re.match(r'Found heuristic solution: objective (' + _NUMBER + ')', stripped)
+        if match:
+            _add_point(record, clock, float(match.group(1)), None)
+            continue
+        match = re.match(r'Presolve time: (' + _NUMBER + ')s', stripped)
+        if match:
+            clock = float(match.group(1))
+            continue
+        match = re.match(r'Presolved: (\d+) rows, (\d+) columns', stripped)
+        if match:
+            record['presolved rows'], record['presolved columns'] = int(match.group(1)), int(match.group(2))
+            continue
+        if stripped.startswith('Presolve: All rows and columns removed'):
+            record['presolved rows'], record['presolved columns'] = 0, 0
+            continue
+        match = re.match(r'Root relaxation: objective (' + _NUMBER + r'), (\d+) iterations, (' + _NUMBER + ')',
+                         stripped)
+        if match:
+            record['root relaxation'] = float(match.group(1))
+            clock += float(match.group(3))
+            continue
+        match = re.match(r'Explored (\d+) nodes \((\d+) simplex iterations\) in (' + _NUMBER + ') seconds', stripped)
+        if match:
+            record['nodes'], record['iterations'] = int(match.group(1)), int(match.group(2))
+            record['time [s]'] = float(match.group(3))
+            continue
+        match = re.match(r'Best objective ([^,]+), best bound ([^,]+), gap ([^%]+)%', stripped)
+        if match:
+            record['objective'], record['bound'] = _float(match.group(1)), _float(match.group(2))
+            record['gap [%]'] = _float(match.group(3))
+            continue
+        # continuous models are solved without tree
+        match = re.match(r'Solved in (\d+) iterations and (' + _NUMBER + ') seconds', stripped)
+        if match:
+            record['nodes'], record['iterations'] = 0, int(match.group(1))
+            record['time [s]'] = float(match.group(2))
+            continue
+        match = re.match(r'Optimal objective\s+(' + _NUMBER + ')', stripped)
+        if match:
+            record['objective'] = record['bound'] = float(match.group(1))
+            record['gap [%]'] = 0.0
+            continue
+
+        # node table: [H|*] expl unexpl ... incumbent bestbd gap it/node time
+        tokens = stripped.split()
+        if len(tokens) >= 7 and re.fullmatch(r'\d+s', tokens[-1]):
+            nodeTokens = tokens[1:] if tokens[0] in ('H', '*') else tokens
+            if not (nodeTokens[0].isdigit() and nodeTokens[1].isdigit()):
+                continue
+            clock = float(tokens[-1][:-1])
+            _add_point(record, clock, _float(tokens[-5]), _float(tokens[-4]))
+
+    if record['time [s]'] is not None and record['objective'] is not None:
+        _add_point(record, record['time [s]'], record['objective'], record['bound'])
+    return record
+
+
+def parse_cbc_log(text):
+    """
+    Parameters
+    ----------
+    text : String
+        Log of a cbc solve
+
+    Returns
+    -------
+    record : Dictionary
+        Telemetry record (see module description)
+
+    """
+    record = _empty_record('cbc')
+    for line in text.splitlines():
+        stripped = line.strip()
+        match = re.search(r'has (\d+) rows, (\d+) columns', stripped)
+        if match and 'processed model' not in stripped and record['rows'] is None:
+            record['rows'], record['columns'] = int(match.group(1)), int(match.group(2))
+        match = re.search(r'processed model has (\d+) rows, (\d+) columns', stripped)
+        if match:
+            record['presolved rows'], record['presolved columns'] = int(match.group(1)), int(match.group(2))
+            continue
+        match = re.match(r'Continuous objective value is (' + _NUMBER + ')', stripped)
+        if match:
+            record['root relaxation'] = float(match.group(1))
+            continue
+        match = re.search(r'Integer solution of (' + _NUMBER + r') found.* and (\d+) nodes \((' + _NUMBER +
+                          r') seconds\)', stripped)
+        if match:
+            _add_point(record, float(match.group(3)), float(match.group(1)), None)
+            continue
+        match = re.search(r'After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (' + _NUMBER +
+                          r') \((' + _NUMBER + r') seconds\)', stripped)
+        if match:
+            _add_point(record, float(match.group(4)), _float(match.group(2)), float(match.group(3)))
+            continue
+        match = re.search(r'(?:Search completed|Partial search) - best objective (\S+?),?(?: \(best possible (' +
+                          _NUMBER + r')\),)? took (\d+) iterations and (\d+) nodes \((' + _NUMBER + r') seconds\)',
+                          stripped)
+        if match:
+            record['objective'] = _float(match.group(1))
+            # a completed search proves the objective, a partial search gives the best possible value
+            record['bound'] = float(match.group(2)) if match.group(2) is not None else record['objective']
+            record['iterations'], record['nodes'] = int(match.group(3)), int(match.group(4))
+            record['time [s]'] = float(match.group(5))
+            continue
+        match = re.match(r'Enumerated nodes:\s+(\d+)', stripped)
+        if match:
+            record['nodes'] = int(match.group(1))
+            continue
+        match = re.match(r'Total iterations:\s+(\d+)', stripped)
+        if match:
+            record['iterations'] = int(match.group(1))
+            continue
+        match = re.match(r'Time \(Wallclock seconds\):\s+(' + _NUMBER + ')', stripped)
+        if match:
+            record['time [s]'] = float(match.group(1))
+
+    if record['time [s]'] is not None and record['objective'] is not None:
+        _add_point(record, record['time [s]'], record['objective'], record['bound'])
+    return record
+
+
+LOG_PARSERS = {'gurobi': parse_gurobi_log, 'cbc': parse_cbc_log}
+
+
+def _orient(record, objective):
+    """
+    Changes the sign of the logged objective values if the solver logged the negative objective (maximization
+    as minimization)
+    """
+    incumbent = record['objective'] if record['objective'] is not None else \
+        (record['trajectory'][-1][1] if record['trajectory'] else None)
+    if objective is None or incumbent is None or abs(objective) < 1e-9:
+        return record
+    tolerance = 1e-6 * max(1.0, abs(objective))
+    if abs(incumbent - objective) > tolerance and abs(incumbent + objective) <= tolerance:
+        def flip(value):
+            return -value if value is not None else None
+
+        for field in ('root relaxation', 'first incumbent', 'objective', 'bound'):
+            record[field] = flip(record[field])
+        record['trajectory'] = [(time, flip(incumbent), flip(bound))
+                                for time, incumbent, bound in record['trajectory']]
+    return record
+
+
+def _complete(record, results, objective, bound):
+    """
+    Fills the values which are not in the log from the pyomo results and the objective and bound taken from them
+    """
+    try:
+        solver = results.solver
+        if record['status'] is None:
+            record['status'] = str(solver.termination_condition)
+        if record['time [s]'] is None:
+            record['time [s]'] = _float(getattr(solver, 'wallclock_time', None)) or \
+                _float(getattr(solver, 'time', None))
+        if record['nodes'] is None:
+            record['nodes'] = _float(solver.statistics.branch_and_bound.number_of_bounded_subproblems)
+    except AttributeError:
+        pass
+
+    if record['objective'] is None:
+        record['objective'] = objective
+    if record['bound'] is None:
+        record['bound'] = bound
+    if record['gap [%]'] is None and None not in (record['objective'], record['bound']):
+        record['gap [%]'] = abs(record['objective'] - record['bound']) / (abs(record['objective']) + 1e-9) * 100
+    return record
+
+
+class TelemetryCapture:
+    """
+    Class Description
+    -----------------
+    Writes the log of one solve to a temporary file and parses it into a telemetry record (see module
+    description).
+
+    Usage:
+        capture = TelemetryCapture(solver, solver_name)
+        with capture:
+            results = solver.solve(model_instance, **capture.solve_options(), ...)
+        record = capture.record(results, incumbent_objective(results, model_instance),
+                                best_bound(results, model_instance))
+
+    The objective and the bound are taken from the results (see utils.solver_status), the values of the model
+    instance can be left from an earlier solve.
+    """
+
+    def __init__(self, solver, solver_name):
+        self.solver = solver
+        self.solver_name = solver_name
+        self.path = None
+        self._previous = None
+        # the gurobi python interfaces take the log file as option, the shell interfaces as argument of solve
+        self._useOption = solver_name == 'gurobi' and hasattr(solver, '_solver_model')
+
+    def __enter__(self):
+        if self.solver_name in LOG_SOLVERS:
+            handle, self.path = tempfile.mkstemp(suffix='.log', prefix='outdoor_solve_')
+            os.close(handle)
+            if self._useOption:
+                self._previous = self.solver.options.get('LogFile')
+                self.solver.options['LogFile'] = self.path
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if self._useOption and self.path is not None:
+            # gurobi closes the log file when the parameter changes
+            try:
+                self.solver._solver_model.setParam('LogFile', '')
+            except Exception:
+                pass
+            if self._previous is None:
+                del self.solver.options['LogFile']
+            else:
+                self.solver.options['LogFile'] = self._previous
+        return False
+
+    def solve_options(self):
+        """
+        Returns
+        -------
+        options : Dictionary
+            Keyword arguments of solver.solve for the log file
+        """
+        if self.path is None or self._useOption:
+            return {}
+        return {'logfile': self.path}
+
+    def record(self, results, objective=None, bound=None):
+        """
+        Parameters
+        ----------
+        results : pyomo SolverResults
+        objective : Float, optional
+            Objective of the incumbent reported in the results, to orient the logged values and as fallback
+        bound : Float, optional
+            Best bound reported in the results, as fallback
+
+        Returns
+        -------
+        record : Dictionary
+            Telemetry record of the solve, the log file is removed
+
+        """
+        text = ''
+        if self.path is not None:
+            try:
+                with open(self.path, errors='replace') as file:
+                    text = file.read()
+            except OSError:
+                pass
+            finally:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+                self.path = None
+
+        if text and self.solver_name in LOG_PARSERS:
+            record = _orient(LOG_PARSERS[self.solver_name](text), objective)
+        else:
+            record = _empty_record(self.solver_name)
+        return _complete(record, results, objective, bound)
+
+
+def telemetry_table(records):
+    """
+    Parameters
+    ----------
+    records : Dictionary
+        {run: telemetry record}
+
+    Returns
+    -------
+    table : pd.DataFrame
+        One row per run with the fields of the records (without the trajectory), a MultiIndex for tuple keys
+        (e.g. (parameter, value) of the sensitivity)
+
+    """
+    rows = {run: {field: record.get(field) for field in FIELDS} for run, record in records.items()
+            if record is not None}
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=list(FIELDS))
+    if len(table) and all(isinstance(run, tuple) for run in rows):
+        table.index = pd.MultiIndex.from_tuples(list(rows))
+    return table
+
+
+def summarize_telemetry(table, groupBy=None):
+    """
+    Parameters
+    ----------
+    table : pd.DataFrame
+        See telemetry_table
+    groupBy : Integer or String, optional
+        Index level to aggregate over (e.g. 0 for the parameters of a sensitivity), default aggregates all runs
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        Number of runs, mean, median and maximum of the solve time, nodes, gap and time to the first incumbent,
+        the number of runs per status, per group if groupBy is given
+
+    """
+    numeric = ['time [s]', 'nodes', 'iterations', 'gap [%]', 'first incumbent time [s]', 'incumbents']
+    values = table[numeric].apply(pd.to_numeric, errors='coerce')
+    grouped = values.groupby(level=groupBy) if groupBy is not None else values.groupby(lambda run: 'all')
+    summary = grouped.agg(['mean', 'median', 'max'])
+    summary.columns = ['{} {}'.format(column, statistic) for column, statistic in summary.columns]
+    summary.insert(0, 'runs', grouped.size())
+
+    status = table['status'].fillna('unknown')
+    statusGroups = status.groupby(level=groupBy) if groupBy is not None else status.groupby(lambda run: 'all')
+    counts = statusGroups.value_counts().unstack(fill_value=0)
+    return summary.join(counts.add_prefix('status '))
+
+
+def print_telemetry_report(table, top=5):
+    """
+    Prints the summary of the runs and the runs with the longest solve times
+    """
+    print("\033[1;32m" + "Solver telemetry of {} runs".format(len(table)) + "\033[0m")
+    print(summarize_telemetry(table).T.to_string(header=False))
+    hardest = table.sort_values('time [s]', ascending=False).head(top)
+    print("Longest solves:")
+    print(hardest[['status', 'time [s]', 'nodes', 'gap [%]', 'first incumbent time [s]']].to_string())
@@ -0,0 +1,100 @@
+import pyomo.environ as pyo
+from pyomo.opt import SolverResults, TerminationCondition
+
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import MultiObjectiveOptimizer
+
+# design: (EBIT, NPC), every design is an efficient solution
+DESIGNS = {1: (1.0, 1.0), 2: (2.0, 3.0), 3: (3.0, 6.0), 4: (4.0, 10.0)}
+
+
+def build_model():
+    model = pyo.ConcreteModel()
+    model.D = pyo.Set(initialize=list(DESIGNS))
+    model.ObjectiveFunctionName = pyo.Param(initialize='EBIT', within=pyo.Any)
+    model.MainProductFlow = pyo.Param(initialize=1)
+    model.Y = pyo.Var(model.D, within=pyo.Binary)
+    model.EBIT = pyo.Var()
+    model.NPC = pyo.Var()
+    model.one = pyo.Constraint(expr=sum(model.Y[d] for d in model.D) == 1)
+    model.ebit = pyo.Constraint(expr=model.EBIT == sum(DESIGNS[d][0] * model.Y[d] for d in model.D))
+    model.npc = pyo.Constraint(expr=model.NPC == sum(DESIGNS[d][1] * model.Y[d] for d in model.D))
+    model.Objective = pyo.Objective(expr=model.EBIT, sense=pyo.maximize)
+    return model
+
+
+def feasible(model):
+    for constraint in model.component_data_objects(pyo.Constraint, active=True):
+        body = pyo.value(constraint.body)
+        if constraint.lower is not None and body < pyo.value(constraint.lower) - 1e-9:
+            return False
+        if constraint.upper is not None and body > pyo.value(constraint.upper) + 1e-9:
+            return False
+    return all(var.lb is None or var.value >= var.lb - 1e-9 for var in model.component_data_objects(pyo.Var))
+
+
+class DesignSolver:
+    """
+    Solves the model by trying all designs, stops at the time limit without a solution at the NPC bound limitedAt
+    """
+    options = {}
+
+    def __init__(self, limitedAt=None):
+        self.limitedAt = limitedAt
+
+    def warm_start_capable(self):
+        return False
+
+    def solve(self, model, **kwargs):
+        results = SolverResults()
+        if model.component('augmecon_rhs') is not None and pyo.value(model.augmecon_rhs[0]) == self.limitedAt:
+            for var in model.component_data_objects(pyo.Var):
+                var.set_value(0)
+            results.solver.termination_condition = TerminationCondition.maxTimeLimit
+            results.problem.number_of_solutions = 0
+            return results
+
+        best = None
+        for design in DESIGNS:
+            for d in DESIGNS:
+                model.Y[d].set_value(int(d == design))
+            model.EBIT.set_value(DESIGNS[design][0])
+            model.NPC.set_value(DESIGNS[design][1])
+            if model.component('augmecon_rhs') is not None:
+                model.augmecon_slack[0].set_value(-DESIGNS[design][1] - pyo.value(model.augmecon_rhs[0]))
+            objective = pyo.value(model.Objective) * (1 if model.Objective.sense == pyo.maximize else -1)
+            if feasible(model) and (best is None or objective > best[0] + 1e-9):
+                best = (objective, design)
+
+        if best is None:
+            results.solver.termination_condition = TerminationCondition.infeasible
+            return results
+        # load the best design
+        for d in DESIGNS:
+            model.Y[d].set_value(int(d == best[1]))
+        model.EBIT.set_value(DESIGNS[best[1]][0])
+        model.NPC.set_value(DESIGNS[best[1]][1])
+        if model.component('augmecon_rhs') is not None:
+            model.augmecon_slack[0].set_value(-DESIGNS[best[1]][1] - pyo.value(model.augmecon_rhs[0]))
+        results.solver.termination_condition = TerminationCondition.optimal
+        results.problem.upper_bound = results.problem.lower_bound = pyo.value(model.Objective)
+        return results
+
+
+def front(limitedAt=None):
+    optimizer = MultiObjectiveOptimizer('gurobi', 'local', multi_data={'objectives': ['EBIT', 'NPC'],
+                                                                       'paretoPoints': 4, 'method': 'augmecon2'})
+    optimizer.single_optimizer.solver = DesignSolver(limitedAt)
+    return optimizer.run_optimization(build_model())
+
+
+def test_every_efficient_design_is_found():
+    model_output = front()
+    assert sorted(model_output.get_pareto_table()['EBIT']) == [1.0, 2.0, 3.0, 4.0]
+    assert model_output.unsolvedPoints == []
+
+
+def test_time_limit_does_not_end_the_loop():
+    # the second grid point (NPC <= 7) stops at the time limit, the tighter points are still solved
+    model_output = front(limitedAt=-7.0)
+    assert sorted(model_output.get_pareto_table()['EBIT']) == [1.0, 2.0, 4.0]
+    assert model_output.unsolvedPoints == [(1,)]
@@ -0,0 +1,95 @@
+import types
+
+import pandas as pd
+import pyomo.environ as pyo
+import pytest
+
+from outdoor.outdoor_core.optimizers.customs.change_params import ParameterUpdatePlan, change_parameter
+
+
+def build_instance():
+    model = pyo.ConcreteModel()
+    model.add_component('I', pyo.Set(initialize=['A', 'B', 'C', 'D']))
+    model.HI = pyo.Set(initialize=[1, 2, 3])
+    model.phi = pyo.Param([1], model.I, mutable=True, initialize={(1, 'A'): 0.5, (1, 'B'): 0.3, (1, 'C'): 0.2,
+                                                                  (1, 'D'): 0.0})
+    model.myu = pyo.Param([(2, 3, 'A')], mutable=True, initialize=0.4)
+    model.theta = pyo.Param([(2, 'R1', 'A')], mutable=True, initialize=0.9)
+    model.gamma = pyo.Param([(2, ('A', 'R1'))], mutable=True, initialize=-1.0)
+    model.xi = pyo.Param([(2, 'A')], mutable=True, initialize=0.1)
+    model.materialcosts = pyo.Param([1], mutable=True, initialize=100.0)
+    model.ProductPrice = pyo.Param([4], mutable=True, initialize=800.0)
+    model.delta_ut = pyo.Param(['Electricity', 'Chilling'], mutable=True, initialize=50.0)
+    model.tau = pyo.Param([(2, 'Heat'), (2, 'Electricity'), (2, 'Chilling')], mutable=True, initialize=0.2)
+    model.tau_h = pyo.Param([('Heat', 2)], mutable=True, initialize=0.2)
+    model.tau_c = pyo.Param([('Heat', 2)], mutable=True, initialize=0.0)
+    model.conc = pyo.Param([2], mutable=True, initialize=0.5)
+    model.K_OM = pyo.Param([2], mutable=True, initialize=0.04)
+    model.delta_q = pyo.Param(model.HI, mutable=True, initialize={1: 60.0, 2: 40.0, 3: 60.0})
+    return model
+
+
+SUPERSTRUCTURE = types.SimpleNamespace(temperaturePricesDict={'super': 80.0, 'high': 60.0, 'medium': 40.0,
+                                                              'low': 20.0})
+
+# parameter name: (metadata, value)
+PARAMETERS = {
+    'Feed Composition (phi)_1': ({'Unit_Number': 1, 'Component': 'A'}, 0.7),
+    'Split factors (myu)_2': ({'Unit_Number': 2, 'Target_Unit': 3.0, 'Component': 'A'}, 0.6),
+    'Conversion factor (theta)_2': ({'Unit_Number': 2, 'Reaction_Number': 'R1', 'Component': 'A'}, 0.8),
+    'Stoichiometric factor (gamma)_2': ({'Unit_Number': 2, 'Reaction_Number': 'R1', 'Component': 'A'}, -2.0),
+    'Yield factor (xi)_2': ({'Unit_Number': 2, 'Component': 'A'}, 0.2),
+    'Costs (materialcosts)_1': ({'Unit_Number': 1}, 120.0),
+    'Price (ProductPrice)_4': ({'Unit_Number': 4}, 900.0),
+    'Chilling price (delta_ut)': ({'Unit_Number': 'n.a.'}, 70.0),
+    'Heating price high (delta_q)': ({'Unit_Number': 'n.a.'}, 65.0),
+    'Heating demand 1 (tau_h)_2': ({'Unit_Number': 2}, 0.3),
+    'Electricity demand (tau)_2': ({'Unit_Number': 2}, 0.5),
+    'Component concentration (conc)_2': ({'Unit_Number': 2}, 0.6),
+    'Operating and maintenance (K_OM)_2': ({'Unit_Number': 2}, 0.05),
+}
+
+
+def values(instance):
+    return {(param.name, index): pyo.value(data) for param in instance.component_objects(pyo.Param)
+            for index, data in param.items()}
+
+
+@pytest.mark.parametrize('name', list(PARAMETERS))
+def test_plan_changes_the_same_parameters_as_change_parameter(name):
+    metadata, value = PARAMETERS[name]
+    changed = change_parameter(build_instance(), name, value, pd.Series(metadata), SUPERSTRUCTURE, printTimer=False)
+
+    instance = build_instance()
+    plan = ParameterUpdatePlan(instance, [(name, pd.Series(metadata))], SUPERSTRUCTURE)
+    plan.apply([value])
+    assert values(instance) == pytest.approx(values(changed))
+    assert values(instance) != values(build_instance())
+
+    plan.reset()
+    assert values(instance) == values(build_instance())
+
+
+def test_feed_composition_keeps_its_sum():
+    metadata = pd.Series({'Unit_Number': 1, 'Component': 'B'})
+    instance = build_instance()
+    plan = ParameterUpdatePlan(instance, [('Feed Composition (phi)_1', metadata)])
+    for value in (0.1, 0.6, 0.3):
+        plan.apply([value])
+        # the change is divided over the two other components in the feed, D is not in the feed
+        assert sum(pyo.value(instance.phi[1, i]) for i in instance.I) == pytest.approx(1.0)
+        assert pyo.value(instance.phi[1, 'D']) == 0.0
+
+    # the function gives the same values point after point
+    changed = build_instance()
+    for value in (0.1, 0.6, 0.3):
+        change_parameter(changed, 'Feed Composition (phi)_1', value, metadata, printTimer=False)
+    assert values(instance) == pytest.approx(values(changed))
+
+
+def test_component_outside_the_feed_raises():
+    metadata = pd.Series({'Unit_Number': 1, 'Component': 'D'})
+    with pytest.raises(ValueError):
+        change_parameter(build_instance(), 'Feed Composition (phi)_1', 0.1, metadata, printTimer=False)
+    with pytest.raises(ValueError):
+        ParameterUpdatePlan(build_instance(), [('Feed Composition (phi)_1', metadata)])
@@ -0,0 +1,92 @@
+import itertools
+
+import pyomo.environ as pyo
+from pyomo.opt import SolverResults, TerminationCondition
+
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+
+# unit: (price of the flow, fixed costs), unit 4 is switched on by the solver without flow
+UNITS = {1: (2.0, 10.0), 2: (1.5, 10.0), 3: (0.6, 10.0), 4: (0.0, 0.0)}
+
+
+def build_model():
+    model = pyo.ConcreteModel()
+    model.UU = pyo.Set(initialize=list(UNITS) + [5])
+    model.U_PP = pyo.Set(initialize=[5])
+    model.U_S = pyo.Set(initialize=[])
+    model.Names = pyo.Param(model.UU, initialize={u: 'unit {}'.format(u) for u in list(UNITS) + [5]},
+                            within=pyo.Any)
+    model.ObjectiveFunctionName = pyo.Param(initialize='EBIT', within=pyo.Any)
+    model.MainProductFlow = pyo.Param(initialize=5)
+    model.Y = pyo.Var(model.UU, within=pyo.Binary)
+    model.Y[5].fix(1)
+    model.FLOW_SUM = pyo.Var(model.UU, bounds=(0, 10))
+    model.FLOW_SUM[5].fix(0)
+    model.capacity = pyo.Constraint(list(UNITS), rule=lambda m, u: m.FLOW_SUM[u] <= 10 * m.Y[u])
+    model.Objective = pyo.Objective(expr=sum(price * model.FLOW_SUM[u] - costs * model.Y[u]
+                                             for u, (price, costs) in UNITS.items()), sense=pyo.maximize)
+    return model
+
+
+class EnumerationSolver:
+    """
+    Solves the model by trying all binaries, ties are given to the solution with more units switched on
+    """
+    options = {}
+
+    def __init__(self):
+        self.solves = 0
+
+    def solve(self, model, **kwargs):
+        self.solves += 1
+        best = None
+        for binaries in itertools.product([1, 0], repeat=len(UNITS)):
+            for u, value in zip(UNITS, binaries):
+                model.Y[u].set_value(value)
+                model.FLOW_SUM[u].set_value(10.0 * value if UNITS[u][0] > 0 else 0.0)
+            feasible = all(pyo.value(constraint.lower) is None or
+                           pyo.value(constraint.body) >= pyo.value(constraint.lower) - 1e-9
+                           for constraint in model.component_data_objects(pyo.Constraint, active=True)) and \
+                all(pyo.value(constraint.upper) is None or
+                    pyo.value(constraint.body) <= pyo.value(constraint.upper) + 1e-9
+                    for constraint in model.component_data_objects(pyo.Constraint, active=True))
+            if feasible and (best is None or pyo.value(model.Objective) > best[0] + 1e-9):
+                best = (pyo.value(model.Objective), binaries)
+
+        results = SolverResults()
+        if best is None:
+            results.solver.termination_condition = TerminationCondition.infeasible
+            return results
+        for u, value in zip(UNITS, best[1]):
+            model.Y[u].set_value(value)
+            model.FLOW_SUM[u].set_value(10.0 * value if UNITS[u][0] > 0 else 0.0)
+        results.solver.termination_condition = TerminationCondition.optimal
+        results.problem.upper_bound = best[0]
+        results.problem.lower_bound = best[0]
+        return results
+
+
+def enumerate_designs(numberOfDesigns):
+    optimizer = SingleOptimizer('glpk', 'local')
+    optimizer.solver = EnumerationSolver()
+    model = build_model()
+    model_output = optimizer.run_enumeration(model, numberOfDesigns=numberOfDesigns, useSolutionPool=False,
+                                             printTimer=False)
+    return model, model_output.get_enumeration_table(), optimizer.solver.solves
+
+
+def test_designs_in_the_order_of_their_objective():
+    model, table, solves = enumerate_designs(4)
+    assert list(table['units']) == ['unit 1, unit 2', 'unit 1, unit 2, unit 3', 'unit 1', 'unit 1, unit 3']
+    assert list(table['objective']) == [15.0, 11.0, 10.0, 6.0]
+    # the cuts and the flow links are removed from the instance
+    assert model.component('Y_NoGoodCuts') is None and model.component('Y_FlowLinks') is None
+    # unit 4 can only be switched on with flow, so every solve gives a new flowsheet
+    assert solves == 4
+
+
+def test_units_without_flow_do_not_exclude_larger_designs():
+    # the solver switches on unit 4 without flow, the flowsheets with unit 3 are still found
+    _, table, _ = enumerate_designs(8)
+    assert 'unit 1, unit 2, unit 3' in list(table['units'])
+    assert len(table) == len(set(table['units']))
@@ -0,0 +1,68 @@
+import pyomo.environ as pyo
+import pytest
+from pyomo.opt import SolverResults, TerminationCondition
+
+from outdoor.outdoor_core.optimizers.customs import custom_optimizer
+from outdoor.outdoor_core.optimizers.customs.custom_optimizer import (DesignScreeningOptimizer,
+                                                                      _screen_designs_in_scenario)
+
+UNITS = [1, 2, 3]
+NAMES = {1: 'Source', 2: 'Flotation', 3: 'Drying'}
+
+
+def test_designs_by_unit_names():
+    # tuple keys of chosen unit names (AdvancedMultiModelAnalyzer)
+    designs = DesignScreeningOptimizer.normalize_designs({('Flotation', 'Drying'): 1, (1, 'Drying'): 2}, UNITS,
+                                                         names=NAMES)
+    assert designs['design_1']['Y'] == {1: 0, 2: 1, 3: 1}
+    assert designs['design_2']['Y'] == {1: 1, 2: 0, 3: 1}
+
+    with pytest.raises(ValueError):
+        DesignScreeningOptimizer.normalize_designs([('Flotation', 'Milling')], UNITS, names=NAMES)
+
+
+def test_designs_by_return_chosen_items():
+    designs = DesignScreeningOptimizer.normalize_designs({((2, 'Flotation'),): 1}, UNITS, names=NAMES)
+    assert designs['design_1']['Y'] == {1: 0, 2: 1, 3: 0}
+
+
+class Model:
+    def __init__(self, inputObject):
+        pass
+
+    def create_ModelEquations(self):
+        pass
+
+    def populateModel(self, dataFile):
+        model = pyo.ConcreteModel()
+        model.Y = pyo.Var(UNITS, within=pyo.Binary)
+        model.NPC = pyo.Var(initialize=5.0)
+        model.Objective = pyo.Objective(expr=model.NPC)
+        return model
+
+
+class Optimizer:
+    """
+    Stops at the time limit, only the first design has an incumbent
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.solver = self
+
+    def solve(self, model, **kwargs):
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.maxTimeLimit
+        if model.Y[1].value == 1:
+            results.problem.upper_bound = 5.0
+        else:
+            results.problem.number_of_solutions = 0
+        return results
+
+
+def test_time_limited_designs_with_an_incumbent_are_feasible(monkeypatch):
+    monkeypatch.setattr(custom_optimizer, 'SuperstructureModel', Model)
+    monkeypatch.setattr(custom_optimizer, 'SingleOptimizer', Optimizer)
+    designs = {'with': {'Y': {1: 1}, 'Y_DIST': None}, 'without': {'Y': {1: 0}, 'Y_DIST': None}}
+    rows = _screen_designs_in_scenario(None, 'sc1', None, designs, 'gurobi', 'local', kpis=['NPC'])
+    assert [row['feasible'] for row in rows] == [True, False]
+    assert rows[0]['NPC'] == 5.0
@@ -0,0 +1,55 @@
+from outdoor.outdoor_core.utils.feasibility_screen import screen_scenarios
+
+
+def data_file(ll=0.0, ul=10.0, minProduction=0.0, load=0.0, split=0.5):
+    """
+    Source 1 (ul t/h of A) -> reactor 2 (A -> B with yield 0.8) -> splitter to product pool 3 (split) and waste 4
+    """
+    return {None: {
+        'U': {None: [1, 2, 3, 4]},
+        'U_S': {None: [1]},
+        'U_PP': {None: [3, 4]},
+        'I': {None: ['A', 'B']},
+        'U_SU': {None: [(1, 2)]},
+        'U_CONNECTORS': {None: [(2, 3), (2, 4)]},
+        'U_YIELD_REACTOR': {None: [2]},
+        'Names': {1: 'source', 2: 'reactor', 3: 'product', 4: 'waste'},
+        'H': {None: 8000},
+        'sourceOrProductLoad': {None: load},
+        'phi': {(1, 'A'): 1.0, (1, 'B'): 0.0},
+        'xi': {(2, 'B'): 0.8},
+        'myu': {(2, (3, 'A')): split, (2, (3, 'B')): split, (2, (4, 'A')): 1 - split, (2, (4, 'B')): 1 - split},
+        'll': {1: ll},
+        'ul': {1: ul},
+        'MinProduction': {3: minProduction},
+        'MaxProduction': {3: 100.0},
+    }}
+
+
+def test_feasible_scenarios_pass():
+    screen = screen_scenarios({'sc1': data_file(), 'sc2': data_file(minProduction=4.0)})
+    assert not screen['infeasible'].any()
+
+
+def test_source_bounds():
+    screen = screen_scenarios({'sc1': data_file(ll=12.0)})
+    assert screen.loc['sc1', 'source bounds']
+    assert 'll > ul of source' in screen.loc['sc1', 'reasons']
+
+
+def test_unreachable_min_production():
+    # at most 10 * 0.8 * 0.5 = 4 t/h reach the product pool
+    screen = screen_scenarios({'sc1': data_file(minProduction=4.5), 'sc2': data_file(minProduction=4.5, split=0.6)})
+    assert list(screen['min production']) == [True, False]
+
+
+def test_product_load():
+    screen = screen_scenarios({'sc1': data_file(load=4.0 * 8000), 'sc2': data_file(load=5.0 * 8000)},
+                              loadID=3, loadType='Product')
+    assert list(screen['product load']) == [False, True]
+
+
+def test_design_without_the_reactor():
+    screen = screen_scenarios({'sc1': data_file(ll=1.0)}, design={2: 0})
+    assert screen.loc['sc1', 'source bounds']
+    assert screen.loc['sc1', 'infeasible']
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outdoor.outdoor_core.output_classes.multi_model_output import MultiModelOutput
+from outdoor.outdoor_core.utils.global_sensitivity import (align_scenarios, first_order_indices,
+                                                           global_sensitivity_analysis, rank_correlations,
+                                                           standardized_regression_coefficients)
+
+
+def samples(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(size=(n, 3))
+    # the output depends linearly on the first two parameters, not on the third
+    Y = np.column_stack([3 * X[:, 0] + X[:, 1], X[:, 1] ** 3])
+    return X, Y
+
+
+def test_align_scenarios_by_name_and_drop_missing_values():
+    parameters = pd.DataFrame({'price': [1.0, 2.0, 3.0]}, index=['sc1', 'sc2', 'sc3'])
+    outputs = pd.Series([30.0, np.nan, 10.0], index=['sc3', 'sc2', 'sc1'], name='EBIT')
+    X, Y, parameterNames, outputNames, scenarios = align_scenarios(parameters, outputs)
+    assert scenarios == ['sc3', 'sc1']
+    assert X.ravel().tolist() == [3.0, 1.0] and Y.ravel().tolist() == [30.0, 10.0]
+    assert parameterNames == ['price'] and outputNames == ['EBIT']
+
+
+def test_src_of_a_linear_model():
+    X, Y = samples()
+    SRC, RSquared = standardized_regression_coefficients(X, Y[:, :1])
+    assert RSquared[0] == pytest.approx(1.0)
+    # SRC_i = b_i * std(X_i) / std(Y) and the squares sum to R squared for independent parameters
+    expected = np.array([3.0, 1.0, 0.0]) * X.std(axis=0, ddof=1) / Y[:, 0].std(ddof=1)
+    assert SRC[:, 0] == pytest.approx(expected, abs=1e-9)
+
+
+def test_rank_correlation_of_a_monotonic_output_is_one():
+    X, Y = samples()
+    correlations = rank_correlations(X, Y)
+    assert correlations[1, 1] == pytest.approx(1.0)
+    assert abs(correlations[2, 1]) < 0.2
+
+
+def test_first_order_indices_find_the_influential_parameter():
+    X, Y = samples(n=2000)
+    indices = first_order_indices(X, Y)
+    assert indices[0, 0] > 0.8 and indices[2, 0] < 0.05
+    assert indices[1, 1] > 0.9
+
+
+def test_analysis_needs_three_scenarios_and_known_methods():
+    parameters = pd.DataFrame({'price': [1.0, 2.0]}, index=['sc1', 'sc2'])
+    outputs = pd.DataFrame({'EBIT': [1.0, 2.0]}, index=['sc1', 'sc2'])
+    with pytest.raises(ValueError):
+        global_sensitivity_analysis(parameters, outputs)
+
+    X, Y = samples(n=10)
+    parameters = pd.DataFrame(X, columns=['a', 'b', 'c'])
+    outputs = pd.DataFrame(Y, columns=['EBIT', 'NPC'])
+    with pytest.raises(ValueError):
+        global_sensitivity_analysis(parameters, outputs, methods=('morris',))
+    results = global_sensitivity_analysis(parameters, outputs)
+    assert list(results['SRC'].index) == ['a', 'b', 'c'] and list(results['sobol'].columns) == ['EBIT', 'NPC']
+
+
+def test_calculate_src_only_for_wait_and_see():
+    with pytest.raises(ValueError):
+        MultiModelOutput(optimization_mode='sensitivity').calculate_SRC()
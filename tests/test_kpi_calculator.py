@@ -0,0 +1,62 @@
+import copy
+
+import pyomo.environ as pyo
+import pytest
+
+from outdoor.outdoor_core.utils.kpi_calculator import KPICalculator
+
+
+def build_model():
+    model = pyo.ConcreteModel()
+    model.factor = pyo.Param(mutable=True, initialize=2.0)
+    model.x = pyo.Var([1, 2], initialize={1: 3.0, 2: 4.0})
+    model.y = pyo.Var([1, 2])
+    model.unused = pyo.Var()
+    # y[2] depends on y[1], the constraints are given in the reverse order
+    model.total = pyo.Constraint(expr=model.y[2] == model.y[1] + 5 * model.x[2])
+    model.emissions = pyo.Constraint(expr=model.y[1] == model.factor * model.x[1] + 1)
+    return model
+
+
+def test_evaluate_sets_the_accounting_variables():
+    model = build_model()
+    calculator = KPICalculator([model.total, model.emissions])
+    values = calculator.evaluate()
+    assert list(values) == pytest.approx([27.0, 7.0])
+    assert (model.y[1].value, model.y[2].value) == pytest.approx((7.0, 27.0))
+
+    # the calculation is repeated with the new solution
+    model.x[1].set_value(0.0)
+    calculator.evaluate()
+    assert model.y[2].value == pytest.approx(21.0)
+
+
+def test_fixed_and_missing_values_are_inputs():
+    model = build_model()
+    model.x[1].fix(1.0)
+    model.x[2].set_value(None)
+    calculator = KPICalculator([model.total, model.emissions])
+    calculator.evaluate()
+    assert model.y[2].value == pytest.approx(3.0)
+    assert model.x[1].fixed
+
+
+def test_invalid_constraints_raise():
+    model = build_model()
+    model.nonlinear = pyo.Constraint(expr=model.unused == model.x[1] * model.x[2])
+    with pytest.raises(ValueError):
+        KPICalculator([model.nonlinear])
+    model.twice = pyo.Constraint(expr=model.y[1] == model.x[2])
+    with pytest.raises(ValueError):
+        KPICalculator([model.emissions, model.twice])
+
+
+def test_copies_of_the_calculator_evaluate():
+    model = build_model()
+    model._kpiCalculator = KPICalculator([model.total, model.emissions])
+    model._kpiCalculator.evaluate()
+    clone = copy.deepcopy(model)
+    clone.x[2].set_value(0.0)
+    clone._kpiCalculator.evaluate()
+    assert clone.y[2].value == pytest.approx(7.0)
+    assert model.y[2].value == pytest.approx(27.0)
@@ -0,0 +1,57 @@
+import types
+
+import numpy as np
+import pytest
+
+from outdoor.outdoor_core.utils.linearizer import (X_MAX, adaptive_capex_points, capex_calculator, pad_capex_points,
+                                                   segment_error, segment_ratio)
+
+
+def relative_error(points, exponent, lower, upper):
+    """
+    Largest relative error of the piece-wise linear function of the points against x**exponent on [lower, upper]
+    """
+    x = np.geomspace(lower, upper, 2000)
+    xs, ys = zip(*points)
+    return float(np.max(np.abs(np.interp(x, xs, ys) / x ** exponent - 1)))
+
+
+def test_segment_ratio_meets_the_error():
+    ratio = segment_ratio(0.6, 0.01)
+    assert segment_error(ratio, 0.6) == pytest.approx(0.01, rel=1e-3)
+    # linear costs need a single segment
+    assert segment_ratio(1.0, 0.01) == X_MAX
+
+
+@pytest.mark.parametrize('exponent', [0.4, 0.6, 0.8])
+def test_adaptive_points_meet_the_error_within_the_flow_range(exponent):
+    points = adaptive_capex_points(1.0, 1.0, exponent, maxError=0.01, flowBounds=(0.5, 50.0))
+    assert points[0] == (0, 0)
+    assert points[-1][0] == X_MAX
+    assert relative_error(points[1:-1], exponent, 0.5, 50.0) <= 0.01 + 1e-6
+
+
+def test_number_of_points_follows_the_exponent_and_range():
+    wide = adaptive_capex_points(1.0, 1.0, 0.6, flowBounds=(0.1, 100.0))
+    narrow = adaptive_capex_points(1.0, 1.0, 0.6, flowBounds=(1.0, 2.0))
+    nearlyLinear = adaptive_capex_points(1.0, 1.0, 0.95, flowBounds=(0.1, 100.0))
+    assert len(narrow) < len(wide)
+    assert len(nearlyLinear) < len(wide)
+
+
+def test_capex_calculator_adaptive_uses_the_cecpi():
+    unit = types.SimpleNamespace(Number=3, CAPEX_factors={'m_Ref': {3: 10.0}, 'C_Ref': {3: 100.0},
+                                                          'f': {3: 0.6}, 'CECPI_ref': {3: 500.0}})
+    x_vals, y_vals = capex_calculator(unit, {'CECPI': 1000.0}, Detail='adaptive')
+    points = [(x_vals['lin_CAPEX_x'][3, j], y_vals['lin_CAPEX_y'][3, j])
+              for j in range(1, len(x_vals['lin_CAPEX_x']) + 1)]
+    # the reference point costs twice the reference costs at the doubled CECPI
+    assert np.interp(10.0, *zip(*points)) == pytest.approx(200.0, rel=0.01)
+
+
+def test_pad_capex_points_repeats_the_last_point():
+    x_vals = {'lin_CAPEX_x': {(1, 1): 0, (1, 2): 5.0}}
+    y_vals = {'lin_CAPEX_y': {(1, 1): 0, (1, 2): 7.0}}
+    pad_capex_points(x_vals, y_vals, 1, 4)
+    assert x_vals['lin_CAPEX_x'] == {(1, 1): 0, (1, 2): 5.0, (1, 3): 5.0, (1, 4): 5.0}
+    assert y_vals['lin_CAPEX_y'][1, 4] == 7.0
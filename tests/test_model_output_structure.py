@@ -0,0 +1,40 @@
+import pytest
+
+from outdoor.outdoor_core.output_classes.model_output import ModelOutput
+
+
+def run(flow, price=5.0):
+    output = ModelOutput(optimization_mode='wait and see')
+    output._data = {'U': [1, 2, 3], 'ProductPrice': {1: price}, 'FLOW': {1: flow}}
+    output._structure_keys = {'U', 'ProductPrice'}
+    return output
+
+
+def test_equal_structure_is_shared_by_reference():
+    first, second = run(2.0), run(3.0)
+    structure = first.split_structure()
+    assert second.split_structure(structure) is structure
+    assert second._data['U'] is first._data['U']
+    assert second.get_values() == {'FLOW': {1: 3.0}}
+    assert second.get_data() == {'U': [1, 2, 3], 'ProductPrice': {1: 5.0}, 'FLOW': {1: 3.0}}
+
+
+def test_changed_parameters_stay_in_the_run():
+    first, second = run(2.0), run(3.0, price=6.0)
+    structure = first.split_structure()
+    second.split_structure(structure)
+    assert second.get_values() == {'ProductPrice': {1: 6.0}, 'FLOW': {1: 3.0}}
+    assert second.get_structure() == {'U': [1, 2, 3], 'ProductPrice': {1: 6.0}}
+
+
+def test_deleted_and_missing_keys_do_not_fall_back_to_the_structure():
+    first, second = run(2.0), run(3.0)
+    del second._data['ProductPrice']
+    structure = first.split_structure()
+    second.split_structure(structure)
+    with pytest.raises(KeyError):
+        second._data['ProductPrice']
+
+    del first._data['U']
+    assert 'U' not in first.get_data()
+    assert structure['U'] == [1, 2, 3]
@@ -0,0 +1,60 @@
+import pyomo.environ as pyo
+import pytest
+
+from outdoor.outdoor_core.utils.parametric_lp import fix_binaries, parametric_analysis, release_binaries
+
+
+def solved_lp():
+    """
+    max 3 x + y  s.t.  x <= cap, x + y <= 6  with cap = 4, solved at x = 4, y = 2
+    """
+    model = pyo.ConcreteModel()
+    model.cap = pyo.Param(mutable=True, initialize=4.0)
+    model.x = pyo.Var(bounds=(0, None), initialize=4.0)
+    model.y = pyo.Var(bounds=(0, None), initialize=2.0)
+    model.EBIT = pyo.Var(initialize=14.0)
+    model.capacity = pyo.Constraint(expr=model.x <= model.cap)
+    model.total = pyo.Constraint(expr=model.x + model.y <= 6)
+    model.profit = pyo.Constraint(expr=model.EBIT == 3 * model.x + model.y)
+    model.Objective = pyo.Objective(expr=model.EBIT, sense=pyo.maximize)
+    return model
+
+
+def test_range_and_slopes_of_the_active_set():
+    model = solved_lp()
+
+    def apply(value):
+        model.cap = value
+
+    analysis = parametric_analysis(model, apply, 4.0)
+    # x follows cap until y reaches its bound at cap = 6, and x its bound at cap = 0
+    assert analysis['upper'] == pytest.approx(6.0)
+    assert analysis['lower'] == pytest.approx(0.0, abs=1e-9)
+    assert analysis['limit upper'] == 'y'
+    assert analysis['limit lower'] == 'x'
+    assert analysis['objective slope'] == pytest.approx(2.0)
+    assert analysis['slopes']['EBIT'] == pytest.approx(2.0)
+    assert analysis['variable slopes'][model.x] == pytest.approx(1.0)
+    assert analysis['variable slopes'][model.y] == pytest.approx(-1.0)
+    # the parameter is reset to the value
+    assert pyo.value(model.cap) == 4.0
+
+
+def test_fix_binaries_rounds_and_returns_the_fixed_variables():
+    model = pyo.ConcreteModel()
+    model.Y = pyo.Var([1, 2, 3], within=pyo.Binary)
+    model.n = pyo.Var(within=pyo.NonNegativeIntegers, initialize=2.0000001)
+    model.x = pyo.Var(initialize=0.4)
+    model.Y[1].value, model.Y[2].value = 0.9999999, 1e-8
+    model.Y[3].fix(1)
+
+    fixed = fix_binaries(model)
+    assert {var.name for var in fixed} == {'Y[1]', 'Y[2]', 'n'}
+    assert (model.Y[1].value, model.Y[2].value, model.n.value) == (1, 0, 2)
+    assert not model.x.fixed
+    # the fixed design is an LP, so the solver returns duals
+    assert not any(var.is_integer() for var in fixed)
+
+    release_binaries(fixed)
+    assert model.Y[1].is_binary() and model.n.is_integer() and not model.Y[1].fixed
+    assert model.Y[3].fixed
@@ -0,0 +1,118 @@
+import numpy as np
+import pyomo.environ as pyo
+
+from outdoor.outdoor_core.optimizers.customs import payoff_table as payoff
+from outdoor.outdoor_core.optimizers.customs.payoff_table import objective_sense, payoff_table
+from outdoor.outdoor_core.utils.solve_cache import SolveCache
+
+# design: (EBIT, NPC, NPE), designs 2 and 3 have the same EBIT
+DESIGNS = {1: (1.0, 1.0, 5.0), 2: (4.0, 10.0, 3.0), 3: (4.0, 8.0, 4.0)}
+
+
+def build_model():
+    model = pyo.ConcreteModel()
+    model.D = pyo.Set(initialize=list(DESIGNS))
+    model.IMPACT_CATEGORIES = pyo.Set(initialize=[])
+    model.Y = pyo.Var(model.D, within=pyo.Binary)
+    model.EBIT = pyo.Var()
+    model.NPC = pyo.Var()
+    model.NPE = pyo.Var()
+    model.Objective = pyo.Objective(expr=model.EBIT, sense=pyo.maximize)
+    return model
+
+
+class Output:
+    def _tidy_data(self):
+        pass
+
+
+class DesignOptimizer:
+    """
+    Solves the model by trying all designs within the bounds of the payoff table
+    """
+    solver_name = 'gurobi'
+
+    def __init__(self):
+        self.solver = type('Solver', (), {'options': {}})()
+        self.solves = 0
+
+    def run_optimization(self, model, **kwargs):
+        self.solves += 1
+        best = None
+        for design, values in DESIGNS.items():
+            model.EBIT.set_value(values[0])
+            model.NPC.set_value(values[1])
+            model.NPE.set_value(values[2])
+            bounds = model.component('payoff_bounds')
+            if bounds is not None and not all(
+                    (c.lower is None or pyo.value(c.body) >= pyo.value(c.lower)) and
+                    (c.upper is None or pyo.value(c.body) <= pyo.value(c.upper)) for c in bounds.values()):
+                continue
+            objective = pyo.value(model.Objective) * (1 if model.Objective.sense == pyo.maximize else -1)
+            if best is None or objective > best[0]:
+                best = (objective, values)
+        model.EBIT.set_value(best[1][0])
+        model.NPC.set_value(best[1][1])
+        model.NPE.set_value(best[1][2])
+        return Output()
+
+
+def test_objective_sense():
+    assert objective_sense('EBIT') == pyo.maximize and objective_sense('NPC') == pyo.minimize
+    assert objective_sense('EBIT', flipSense=True) == pyo.minimize
+
+
+def test_rows_hold_the_optima(monkeypatch):
+    monkeypatch.setattr(payoff, 'get_solve_cache', lambda directory=None: SolveCache())
+    table = payoff_table(DesignOptimizer(), build_model(), ['EBIT', 'NPC'])
+    # the first design with the largest EBIT is found, it is not the best in NPC
+    assert np.array_equal(table['payoff'], [[4.0, 10.0], [1.0, 1.0]])
+    assert set(table['anchors']) == {'EBIT', 'NPC'}
+
+
+def test_lexicographic_rows_are_efficient(monkeypatch):
+    monkeypatch.setattr(payoff, 'get_solve_cache', lambda directory=None: SolveCache())
+    model = build_model()
+    table = payoff_table(DesignOptimizer(), model, ['EBIT', 'NPC'], lexicographic=True)
+    assert np.array_equal(table['payoff'], [[4.0, 8.0], [1.0, 1.0]])
+    # the bounds of the lexicographic solves are removed
+    assert model.component('payoff_bounds') is None
+
+
+def test_table_is_taken_from_the_cache(monkeypatch):
+    cache = SolveCache()
+    monkeypatch.setattr(payoff, 'get_solve_cache', lambda directory=None: cache)
+    optimizer = DesignOptimizer()
+    first = payoff_table(optimizer, build_model(), ['EBIT', 'NPE'])
+    second = payoff_table(optimizer, build_model(), ['EBIT', 'NPE'])
+    assert optimizer.solves == 2
+    assert np.array_equal(first['payoff'], second['payoff'])
+
+
+class TimeLimitOptimizer(DesignOptimizer):
+    """
+    Stops at the time limit without a solution if NPC is optimized
+    """
+
+    def run_optimization(self, model, **kwargs):
+        if model.Objective.expr is model.NPC:
+            self.solves += 1
+            return 'time limit'
+        return super().run_optimization(model, **kwargs)
+
+
+def test_unsolved_rows_are_left_out(monkeypatch):
+    cache = SolveCache()
+    monkeypatch.setattr(payoff, 'get_solve_cache', lambda directory=None: cache)
+    optimizer = TimeLimitOptimizer()
+    table = payoff_table(optimizer, build_model(), ['EBIT', 'NPC'])
+    assert table['payoff'][0].tolist() == [4.0, 10.0] and np.isnan(table['payoff'][1]).all()
+    assert table['anchors']['NPC'] is None
+
+    # the lexicographic row of EBIT keeps the optimum of EBIT
+    table = payoff_table(optimizer, build_model(), ['EBIT', 'NPC'], lexicographic=True)
+    assert table['payoff'][0].tolist() == [4.0, 10.0]
+
+    # the incomplete table is not cached
+    payoff_table(optimizer, build_model(), ['EBIT', 'NPC'])
+    assert optimizer.solves == 7
@@ -0,0 +1,37 @@
+import pytest
+
+from outdoor.outdoor_core.input_classes.superstructure import Superstructure as OutdoorSuperstructure
+from outdoor.outdoor_core.main.superstructure_problem import PERFORMANCE_OPTIONS, SuperstructureProblem
+
+
+class Superstructure:
+    """
+    Records the calls of the setters
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if not name.startswith('set_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+
+def test_options_call_the_setters():
+    superstructure = Superstructure()
+    SuperstructureProblem().apply_performance_options(superstructure, {'sparse_model': True})
+    SuperstructureProblem().apply_performance_options(superstructure, {'sparse_model': {'sparse': False}})
+    assert superstructure.calls == [('set_sparseModel', (True,), {}), ('set_sparseModel', (), {'sparse': False})]
+
+
+def test_every_option_has_a_setter_of_the_superstructure():
+    assert all(hasattr(OutdoorSuperstructure, setter) for setter in PERFORMANCE_OPTIONS.values())
+
+
+def test_unknown_options_raise():
+    superstructure = Superstructure()
+    with pytest.raises(ValueError):
+        SuperstructureProblem().apply_performance_options(superstructure, {'sparse_model': True, 'warp_speed': True})
+    # nothing is set if an option is unknown
+    assert superstructure.calls == []
@@ -0,0 +1,66 @@
+import copy
+
+import pytest
+
+from outdoor.outdoor_core.utils.presolve import find_live_units, presolve_data_file
+
+
+def data_file(lowerBound=0):
+    """
+    Source 1 -> unit 2 -> unit 3 -> product pool 5, unit 2 -> unit 4 (dead end), unit 2 -> unit 7 with zero split
+    factors, unit 6 without inflow. Unit 3 produces B from A, component C is not in any flow.
+    """
+    return {None: {
+        'U': {None: [1, 2, 3, 4, 5, 6, 7]},
+        'U_S': {None: [1]},
+        'U_PP': {None: [5]},
+        'I': {None: ['A', 'B', 'C']},
+        'U_SU': {None: [(1, 2)]},
+        'U_CONNECTORS': {None: [(2, 3), (2, 4), (2, 7), (3, 5)]},
+        'Names': {u: 'unit {}'.format(u) for u in range(1, 8)},
+        'll': {1: lowerBound},
+        'myu': {(2, (3, 'A')): 0.5, (2, (4, 'A')): 0.5, (2, (7, 'A')): 0.0, (3, (5, 'B')): 1.0},
+        'phi': {(1, 'A'): 1.0, (1, 'C'): 0.0},
+        'theta': {(3, ('r1', 'A')): 1.0},
+        'gamma': {(3, ('B', 'r1')): 1.0},
+        'tau': {2: 1.0, 3: 2.0, 4: 3.0, 6: 4.0, 7: 5.0},
+    }}
+
+
+UNIT_INDICES = {u: {'tau': [u]} for u in range(1, 8)}
+
+
+def test_dead_ends_are_kept_by_default():
+    reduced, report = presolve_data_file(data_file(), UNIT_INDICES)
+    assert report['removed units'] == [6, 7]
+    assert report['removed connections'] == [(2, 7)]
+    assert report['removed components'] == ['C']
+    data = reduced[None]
+    assert data['U'][None] == [1, 2, 3, 4, 5]
+    assert data['tau'] == {2: 1.0, 3: 2.0, 4: 3.0}
+    assert (2, (7, 'A')) not in data['myu'] and (1, 'C') not in data['phi']
+
+
+def test_dead_ends_are_removed_on_request():
+    _, report = presolve_data_file(data_file(), UNIT_INDICES, removeDeadEnds=True)
+    assert report['removed units'] == [4, 6, 7]
+    # the flow of a source with a lower bound has to go somewhere, the dead end is kept
+    _, report = presolve_data_file(data_file(lowerBound=1.0), UNIT_INDICES, removeDeadEnds=True)
+    assert report['removed units'] == [6, 7]
+
+
+def test_units_linked_by_groups_are_kept():
+    assert 6 in find_live_units(data_file()[None], groups={'g': [3, 6]})
+    assert 6 in find_live_units(data_file()[None], connections={3: {1: [6]}})
+
+
+def test_removed_load_unit_raises():
+    with pytest.raises(ValueError):
+        presolve_data_file(data_file(), UNIT_INDICES, loadID=6, loadType='Product')
+
+
+def test_the_data_file_is_not_changed():
+    dataFile = data_file()
+    original = copy.deepcopy(dataFile)
+    presolve_data_file(dataFile, UNIT_INDICES, removeDeadEnds=True)
+    assert dataFile == original
@@ -0,0 +1,150 @@
+import os
+import pickle
+
+import pyomo.environ as pyo
+import pytest
+from pyomo.opt import SolverResults, TerminationCondition
+
+from outdoor.outdoor_core.model.optimization_model import SuperstructureModel
+from outdoor.outdoor_core.utils.scaling import coefficient_matrix, max_violation, scale_and_solve, set_scaling_factors
+
+
+def build_model():
+    model = pyo.ConcreteModel()
+    model.demand = pyo.Param(mutable=True, initialize=2000.0)
+    model.x = pyo.Var(bounds=(0, 1e4), initialize=0.0)
+    model.y = pyo.Var(within=pyo.Binary, initialize=0)
+    model.supply = pyo.Constraint(expr=1000 * model.x >= model.demand)
+    model.bigM = pyo.Constraint(expr=model.x <= 1e4 * model.y)
+    model.Objective = pyo.Objective(expr=model.x + model.y)
+    return model
+
+
+class Solver:
+    """
+    Solves the model in closed form (x = demand / 1000, y = 1) and records the instances it is given
+    """
+
+    def __init__(self, condition=TerminationCondition.optimal):
+        self.condition = condition
+        self.instances = []
+
+    def solve(self, instance, **kwargs):
+        self.instances.append(instance)
+        results = SolverResults()
+        results.solver.termination_condition = self.condition
+        if self.condition == TerminationCondition.optimal:
+            # the variables of the scaled instance are the variables times their scaling factor
+            factors = getattr(instance, 'component_scaling_factor_map', None)
+            factor = factors[instance.x] if factors is not None else 1.0
+            instance.x.set_value(pyo.value(instance.demand) / 1000 * factor)
+            instance.y.set_value(1)
+            results.problem.upper_bound = results.problem.lower_bound = pyo.value(instance.demand) / 1000 + 1
+        else:
+            # values left by the solver without a solution
+            instance.x.set_value(0.0)
+        return results
+
+
+def test_scaling_narrows_the_coefficient_range():
+    report = set_scaling_factors(build_model(), variables=True)
+    smallest, largest = report['scaled coefficient range']
+    assert largest / smallest < report['coefficient range'][1] / report['coefficient range'][0]
+    assert report['scaled constraints'] > 0
+
+
+def test_binaries_are_not_scaled():
+    model = build_model()
+    set_scaling_factors(model, variables=True)
+    assert model.y not in model.scaling_factor
+
+
+def test_solution_is_unscaled_and_the_scaled_instance_reused():
+    model = build_model()
+    set_scaling_factors(model, variables=True)
+    solver = Solver()
+
+    scale_and_solve(solver, model)
+    assert pyo.value(model.x) == 2.0
+
+    # a new value of a mutable parameter is copied to the scaled instance
+    model.demand = 3000.0
+    scale_and_solve(solver, model)
+    assert pyo.value(model.x) == 3.0
+    assert solver.instances[0] is solver.instances[1]
+
+    # a new constraint needs a new scaled instance
+    model.cut = pyo.Constraint(expr=model.x <= 5)
+    scale_and_solve(solver, model)
+    assert solver.instances[2] is not solver.instances[1]
+
+
+def test_fixed_variables_are_copied_to_the_scaled_instance():
+    model = build_model()
+    set_scaling_factors(model, variables=True)
+    solver = Solver()
+    scale_and_solve(solver, model)
+
+    model.y.fix(0)
+    scale_and_solve(solver, model)
+    assert solver.instances[-1].y.fixed
+
+
+def test_no_solution_leaves_the_instance_unchanged():
+    model = build_model()
+    set_scaling_factors(model, variables=True)
+    model.x.set_value(7.0)
+
+    results = scale_and_solve(Solver(TerminationCondition.infeasible), model)
+    assert results.solver.termination_condition == TerminationCondition.infeasible
+    assert pyo.value(model.x) == 7.0
+
+
+def test_violated_scaled_solutions_are_solved_again_without_scaling():
+    model = build_model()
+    set_scaling_factors(model, variables=True)
+    solver = Solver()
+    original = solver.solve
+
+    def solve(instance, **kwargs):
+        results = original(instance, **kwargs)
+        if instance is not model:
+            # the scaled solution misses the demand by 0.1 %
+            instance.x.set_value(instance.x.value * 0.999)
+        return results
+
+    solver.solve = solve
+    scale_and_solve(solver, model)
+    assert solver.instances[-1] is model and pyo.value(model.x) == 2.0
+    assert max_violation(model) == 0
+
+    # the following solves are not scaled
+    scale_and_solve(solver, model)
+    assert len(solver.instances) == 3 and solver.instances[-1] is model
+
+
+def test_big_m_constraints_of_a_superstructure_are_not_scaled():
+    path = os.path.join(os.path.dirname(__file__), '..', 'Classroom', 'exercises', 'Tomato',
+                        'Tomato_Superstructure_superstructure.pkl')
+    with open(path, 'rb') as file:
+        superstructure = pickle.load(file)
+    model = SuperstructureModel(superstructure)
+    model.create_ModelEquations()
+    instance = model.populateModel(superstructure.create_DataFile())
+
+    report = set_scaling_factors(instance, variables=True)
+    assert report['big-M constraints'] > 0 and report['scaled constraints'] > 0
+    A, rows, columns = coefficient_matrix(instance)
+    A = A.tocsr()
+    for k, constraint in enumerate(rows):
+        indices = A.indices[A.indptr[k]:A.indptr[k + 1]]
+        coefficients = A.data[A.indptr[k]:A.indptr[k + 1]]
+        if any(abs(coefficient) >= 1e5 and columns[j].is_integer() for j, coefficient in zip(indices, coefficients)):
+            assert constraint not in instance.scaling_factor
+            assert not any(columns[j] in instance.scaling_factor for j in indices)
+
+    highs = pyo.SolverFactory('appsi_highs')
+    if not highs.available(exception_flag=False):
+        pytest.skip('HiGHS is not installed')
+    scale_and_solve(highs, instance)
+    assert max_violation(instance) <= 1e-6
@@ -0,0 +1,42 @@
+import pytest
+
+from outdoor.outdoor_core.utils.scenario_reduction import (fan_out, group_scenarios, representatives,
+                                                           scenario_deltas)
+
+
+def data_file(price, yieldFactor=0.5, label='a'):
+    return {None: {'U': {None: [1, 2]}, 'ProductPrice': {1: price, 2: 10.0}, 'xi': {(2, 'A'): yieldFactor},
+                   'Label': {1: label}}}
+
+
+def test_deltas_only_hold_the_changed_values():
+    deltas = scenario_deltas({'sc1': data_file(5.0), 'sc2': data_file(6.0)})
+    assert list(deltas.columns) == [('ProductPrice', 1)]
+    assert list(deltas[('ProductPrice', 1)]) == [5.0, 6.0]
+
+
+def test_exact_duplicates_are_merged_with_their_probabilities():
+    dataFiles = {'sc1': data_file(5.0), 'sc2': data_file(6.0), 'sc3': data_file(5.0)}
+    groups, probabilities = group_scenarios(dataFiles, probabilities={'sc1': 0.2, 'sc2': 0.5, 'sc3': 0.3})
+    assert groups == {'sc1': ['sc1', 'sc3'], 'sc2': ['sc2']}
+    assert probabilities == pytest.approx({'sc1': 0.5, 'sc2': 0.5})
+
+
+def test_tolerance_merges_close_scenarios_to_the_most_probable():
+    dataFiles = {'sc1': data_file(5.0), 'sc2': data_file(5.01), 'sc3': data_file(8.0)}
+    assert len(group_scenarios(dataFiles)[0]) == 3
+    groups, _ = group_scenarios(dataFiles, probabilities={'sc1': 0.2, 'sc2': 0.5, 'sc3': 0.3}, tolerance=0.01)
+    assert groups == {'sc2': ['sc1', 'sc2'], 'sc3': ['sc3']}
+
+
+def test_values_which_are_not_numbers_are_only_merged_if_equal():
+    dataFiles = {'sc1': data_file(5.0, label='a'), 'sc2': data_file(5.0, label='b')}
+    groups, _ = group_scenarios(dataFiles, tolerance=0.5)
+    assert len(groups) == 2
+
+
+def test_fan_out_and_representatives():
+    groups = {'sc1': ['sc1', 'sc3'], 'sc2': ['sc2']}
+    assert representatives(groups) == {'sc1': 'sc1', 'sc3': 'sc1', 'sc2': 'sc2'}
+    # the group without a result is left out
+    assert fan_out({'sc1': 'result 1'}, groups) == {'sc1': 'result 1', 'sc3': 'result 1'}
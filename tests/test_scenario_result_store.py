@@ -0,0 +1,100 @@
+import pickle
+
+from outdoor.outdoor_core.output_classes.scenario_result_store import ScenarioResultStore
+
+
+class Results:
+    def __init__(self, data, gap=0.0):
+        self._data = data
+        self._optimality_gap = gap
+        self._meta_data = {'Optimality gap': gap}
+
+
+def scenario(price, flow):
+    return {'U': [1, 2, 3], 'ProductPrice': {1: price, 2: 10.0}, 'FLOW': {1: flow, 2: 0.0}, 'EBIT': price * flow}
+
+
+def test_stores_only_the_differences():
+    store = ScenarioResultStore()
+    store['sc1'] = scenario(5.0, 2.0)
+    store['sc2'] = scenario(5.0, 3.0)
+    assert set(store._records['sc2']['data']) == {'FLOW', 'EBIT'}
+    assert store['sc1'] == scenario(5.0, 2.0)
+    assert store['sc2'] == scenario(5.0, 3.0)
+    assert list(store) == ['sc1', 'sc2'] and 'sc2' in store and len(store) == 2
+
+
+def test_missing_keys_are_not_reconstructed():
+    store = ScenarioResultStore()
+    store['sc1'] = scenario(5.0, 2.0)
+    data = scenario(5.0, 2.0)
+    del data['EBIT']
+    store['sc2'] = data
+    assert 'EBIT' not in store['sc2']
+
+
+def test_changes_of_nested_values_do_not_change_the_store():
+    store = ScenarioResultStore()
+    store['sc1'] = scenario(5.0, 2.0)
+    store['sc2'] = scenario(6.0, 2.0)
+
+    data = store['sc2']
+    data['U'].append(4)
+    data['ProductPrice'][2] = 0.0
+    data['FLOW'][1] = 100.0
+    assert store['sc1'] == scenario(5.0, 2.0)
+    assert store['sc2'] == scenario(6.0, 2.0)
+
+
+def test_shared_data_is_only_copied_on_access():
+    store = ScenarioResultStore()
+    store['sc1'] = scenario(5.0, 2.0)
+    store['sc2'] = scenario(6.0, 2.0)
+
+    data = store['sc2']
+    assert data['FLOW'] == {1: 2.0, 2: 0.0}
+    assert set(data._own) == {'ProductPrice', 'EBIT', 'FLOW'}
+    assert store.get_shared_data()['FLOW'] is not data['FLOW']
+
+    del data['U']
+    data['new'] = 1
+    assert list(data) == ['ProductPrice', 'FLOW', 'EBIT', 'new']
+    assert 'U' in store['sc2']
+    assert pickle.loads(pickle.dumps(data)) == dict(data)
+
+
+def test_results_objects_keep_their_attributes():
+    store = ScenarioResultStore()
+    store['sc1'] = Results(scenario(5.0, 2.0))
+    store['sc2'] = Results(scenario(5.0, 3.0), gap=1.5)
+
+    results = store['sc2']
+    assert isinstance(results, Results)
+    assert results._optimality_gap == 1.5
+    results._meta_data['Optimality gap'] = 0
+    assert store['sc2']._meta_data == {'Optimality gap': 1.5}
+
+
+def test_spills_to_disk_above_the_memory_limit(tmp_path):
+    store = ScenarioResultStore(memory_limit=1e-6, spill_directory=str(tmp_path))
+    for k in range(4):
+        store['sc{}'.format(k)] = scenario(5.0 + k, 2.0)
+    usage = store.memory_usage()
+    assert usage['scenarios in memory'] == 1 and usage['scenarios on disk'] == 3
+    assert store['sc0'] == scenario(5.0, 2.0)
+
+    # the spilled scenarios are pickled without loading them and are spilled again when the store is loaded
+    copy = pickle.loads(pickle.dumps(store))
+    assert store.memory_usage()['scenarios on disk'] == 3
+    assert copy.memory_usage()['scenarios on disk'] == 3
+    assert [copy[name] for name in copy] == [scenario(5.0 + k, 2.0) for k in range(4)]
+
+
+def test_memory_usage_counts_attributes_and_shared_data():
+    store = ScenarioResultStore()
+    store['sc1'] = Results(scenario(5.0, 2.0))
+    dataOnly = ScenarioResultStore()
+    dataOnly['sc1'] = scenario(5.0, 2.0)
+
+    assert store.memory_usage()['memory used (MB)'] > dataOnly.memory_usage()['memory used (MB)']
+    assert store.memory_usage()['shared data (MB)'] > 0
@@ -0,0 +1,120 @@
+import pyomo.environ as pyo
+
+from outdoor.outdoor_core.utils import solve_cache
+from outdoor.outdoor_core.utils.solve_cache import (SolveCache, clear_solve_caches, get_solve_cache, load_solution,
+                                                    structure_fingerprint)
+
+
+def build_model(capacity=10.0, price=2.0):
+    model = pyo.ConcreteModel()
+    model.U = pyo.Set(initialize=[1, 2])
+    model.capacity = pyo.Param(model.U, initialize={1: capacity, 2: capacity})
+    model.price = pyo.Param(mutable=True, initialize=price)
+    model.x = pyo.Var(model.U, bounds=(0, None))
+    model.y = pyo.Var(model.U, within=pyo.Binary)
+    model.limit = pyo.Constraint(model.U, rule=lambda m, u: m.x[u] <= m.capacity[u] * m.y[u])
+    model.Objective = pyo.Objective(expr=model.price * sum(model.x[u] for u in model.U), sense=pyo.maximize)
+    return model
+
+
+def test_fingerprint_equal_for_equal_instances():
+    assert structure_fingerprint(build_model()) == structure_fingerprint(build_model())
+
+
+def test_fingerprint_hashes_immutable_values():
+    assert structure_fingerprint(build_model(capacity=10)) != structure_fingerprint(build_model(capacity=20))
+
+
+def test_fingerprint_without_values_ignores_data():
+    first = structure_fingerprint(build_model(capacity=10), 'gurobi', values=False)
+    second = structure_fingerprint(build_model(capacity=20), 'gurobi', values=False)
+    assert first == second
+
+
+def test_fingerprint_without_values_ignores_fixed_values():
+    first, second = build_model(), build_model()
+    first.y[1].fix(0)
+    second.y[1].fix(1)
+    assert structure_fingerprint(first, values=False) == structure_fingerprint(second, values=False)
+    assert structure_fingerprint(first) != structure_fingerprint(second)
+
+
+def test_fingerprint_depends_on_solver_settings():
+    model = build_model()
+    assert structure_fingerprint(model, 'gurobi') != structure_fingerprint(model, 'cbc')
+    assert structure_fingerprint(model, 'gurobi', {'MIPGap': 0.01}) != structure_fingerprint(model, 'gurobi')
+
+
+def test_key_follows_mutable_parameters():
+    cache = SolveCache()
+    model = build_model()
+    key = cache.key(model, 'gurobi')
+    model.price = 3.0
+    assert cache.key(model, 'gurobi') != key
+    model.price = 2.0
+    assert cache.key(model, 'gurobi') == key
+
+
+def test_key_follows_structural_changes_of_the_same_instance():
+    cache = SolveCache()
+    model = build_model()
+    key = cache.key(model, 'gurobi')
+
+    model.y[1].fix(1)
+    fixedKey = cache.key(model, 'gurobi')
+    assert fixedKey != key
+
+    model.extra = pyo.Constraint(expr=model.x[1] <= 5)
+    assert cache.key(model, 'gurobi') != fixedKey
+
+
+def test_get_and_put_count_hits(tmp_path):
+    cache = SolveCache(str(tmp_path))
+    assert cache.get('missing') is None
+    cache.put('point', {'x': {1: 1.0}})
+    assert cache.get('point') == {'x': {1: 1.0}}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a second cache on the same directory reads the pickled run
+    assert SolveCache(str(tmp_path)).get('point') == {'x': {1: 1.0}}
+
+
+def test_runs_are_copied():
+    cache = SolveCache()
+    run = {'x': {1: 1.0}}
+    cache.put('point', run)
+    run['x'][1] = 2.0
+    cache.get('point')['x'][1] = 3.0
+    assert cache.get('point') == {'x': {1: 1.0}}
+
+
+def test_least_recently_used_runs_are_dropped():
+    cache = SolveCache(memory_limit=1e-6)
+    cache.put('first', {'x': 1.0})
+    cache.put('second', {'x': 2.0})
+    assert cache.get('first') is None
+    assert cache.get('second') == {'x': 2.0}
+
+
+def test_only_the_recent_session_caches_are_kept(monkeypatch, tmp_path):
+    monkeypatch.setattr(solve_cache, 'MAX_SESSION_CACHES', 2)
+    clear_solve_caches()
+    first = get_solve_cache()
+    get_solve_cache(str(tmp_path / 'a'))
+    assert get_solve_cache() is first
+    get_solve_cache(str(tmp_path / 'b'), memory_limit=10)
+    assert get_solve_cache() is first
+    assert get_solve_cache(str(tmp_path / 'b')).memory_limit == 10
+    assert set(solve_cache._SESSION_CACHES) == {None, str(tmp_path / 'b')}
+    clear_solve_caches()
+    assert get_solve_cache() is not first
+
+
+def test_load_solution_sets_free_variables():
+    model = build_model()
+    model.y[2].fix(0)
+    load_solution(model, {'x': {1: 4.0}, 'y': {1: 1}})
+    assert pyo.value(model.x[1]) == 4.0
+    assert pyo.value(model.x[2]) == 0
+    assert pyo.value(model.y[1]) == 1
+    assert pyo.value(model.y[2]) == 0
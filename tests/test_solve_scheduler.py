@@ -0,0 +1,107 @@
+import pyomo.environ as pyo
+import pytest
+from pyomo.opt import SolverResults
+
+from outdoor.outdoor_core.optimizers.customs.solve_scheduler import SolveScheduler, limit_options
+from outdoor.outdoor_core.utils.solver_status import incumbent_objective
+
+
+class Solver:
+    def __init__(self, **options):
+        self.options = dict(options)
+
+
+class Output:
+    def __init__(self, gap, condition='optimal'):
+        self._optimality_gap = gap
+        self._termination_condition = condition
+
+
+def test_limit_options_use_the_option_names_of_the_solver():
+    assert limit_options(Solver(), 'gurobi', 10, 0.01) == {'TimeLimit': 10, 'MIPGap': 0.01}
+    assert limit_options(Solver(), 'cbc', float('inf'), None) == {}
+
+
+def test_limit_options_of_gams_are_option_statements():
+    solver = Solver(add_options=['option threads=2;'])
+    options = limit_options(solver, 'gams', 10, 0.01)
+    assert options == {'add_options': ['option threads=2;', 'option reslim=10;', 'option optcr=0.01;']}
+    # the options of the solver are not changed
+    assert solver.options['add_options'] == ['option threads=2;']
+
+
+def test_unknown_solver_raises():
+    with pytest.raises(ValueError):
+        SolveScheduler('baron')
+
+
+def test_time_limit_shares_the_budget():
+    scheduler = SolveScheduler('gurobi', timeLimit=100, budget=60)
+    scheduler.start(Solver(), 3)
+    assert scheduler.time_limit() == pytest.approx(20, abs=0.1)
+
+    scheduler = SolveScheduler('gurobi', timeLimit=5, budget=60)
+    scheduler.start(Solver(), 3)
+    assert scheduler.time_limit() == 5
+
+
+def test_budget_used_up_skips_the_point():
+    scheduler = SolveScheduler('gurobi', budget=0)
+    scheduler.start(Solver(), 1)
+    assert scheduler.solve('a', lambda: Output(0.0)) == 'skipped'
+    assert scheduler.report().loc['a', 'status'] == 'skipped'
+
+
+def test_solve_restores_the_options():
+    solver = Solver(MIPGap=0.05)
+    scheduler = SolveScheduler('gurobi', timeLimit=10, gap=0.01)
+    scheduler.start(solver, 1)
+    seen = []
+    scheduler.solve('a', lambda: seen.append(dict(solver.options)) or Output(0.0))
+    assert seen == [{'MIPGap': 0.01, 'TimeLimit': 10}]
+    assert solver.options == {'MIPGap': 0.05}
+
+
+def test_refinement_queue_orders_by_gap():
+    scheduler = SolveScheduler('gurobi', timeLimit=10, gap=0.01)
+    scheduler.start(Solver(), 4)
+    scheduler.solve('optimal', lambda: Output(0.0))
+    scheduler.solve('small gap', lambda: Output(5.0, 'maxTimeLimit'))
+    scheduler.solve('large gap', lambda: Output(50.0, 'maxTimeLimit'))
+    scheduler.solve('no incumbent', lambda: 'time limit')
+    assert scheduler.refinement_queue() == ['no incumbent', 'large gap', 'small gap']
+
+
+def test_refinement_without_improvement_keeps_the_first_solution():
+    scheduler = SolveScheduler('gurobi', timeLimit=10, gap=0.01)
+    scheduler.start(Solver(), 1)
+    scheduler.solve('a', lambda: Output(10.0, 'maxTimeLimit'))
+    assert scheduler.solve('a', lambda: Output(20.0, 'maxTimeLimit'), refine=True) is None
+    assert scheduler.report().loc['a', 'gap [%]'] == 10.0
+
+
+def results(upper, lower, solutions=None):
+    result = SolverResults()
+    result.problem.upper_bound = upper
+    result.problem.lower_bound = lower
+    if solutions is not None:
+        result.problem.number_of_solutions = solutions
+    return result
+
+
+def model(sense):
+    instance = pyo.ConcreteModel()
+    instance.x = pyo.Var(initialize=3.0)
+    instance.Objective = pyo.Objective(expr=instance.x, sense=sense)
+    return instance
+
+
+def test_incumbent_objective_takes_the_bound_of_the_sense():
+    assert incumbent_objective(results(10.0, 8.0), model(pyo.minimize)) == 10.0
+    assert incumbent_objective(results(10.0, 8.0), model(pyo.maximize)) == 8.0
+
+
+def test_incumbent_objective_ignores_the_values_of_the_instance():
+    # the variables hold values of an earlier solve, the solver reports no solution
+    assert incumbent_objective(results(float('inf'), 8.0), model(pyo.minimize)) is None
+    assert incumbent_objective(results(10.0, 8.0, solutions=0), model(pyo.minimize)) is None
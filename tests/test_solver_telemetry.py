@@ -0,0 +1,95 @@
+import pyomo.environ as pyo
+import pytest
+from pyomo.opt import SolverResults, TerminationCondition
+
+from outdoor.outdoor_core.optimizers.main_optimizer import SingleOptimizer
+from outdoor.outdoor_core.utils.solver_telemetry import TelemetryCapture, parse_gurobi_log
+
+GUROBI_LOG = """
+Optimize a model with 120 rows, 80 columns and 400 nonzeros
+Found heuristic solution: objective 50.0000000
+Presolve time: 0.01s
+Presolved: 60 rows, 40 columns, 200 nonzeros
+Root relaxation: objective 1.200000e+02, 35 iterations, 0.00 seconds (0.00 work units)
+
+    Nodes    |    Current Node    |     Objective Bounds      |     Work
+ Expl Unexpl |  Obj  Depth IntInf | Incumbent    BestBd   Gap | It/Node Time
+
+     0     0  120.00000    0    5   50.00000  120.00000   140%     -    0s
+H    0     0                      90.0000000  120.00000  33.3%     -    0s
+     5     2  100.00000    3    2   90.00000  100.00000  11.1%   3.0    1s
+
+Explored 9 nodes (70 simplex iterations) in 1.50 seconds (0.01 work units)
+Best objective 9.000000000000e+01, best bound 9.000000000000e+01, gap 0.0000%
+"""
+
+
+class LimitSolver:
+    """
+    Stops at the time limit without incumbent, the variables keep the values of an earlier solve
+    """
+    options = {}
+
+    def __init__(self):
+        self.calls = []
+
+    def solve(self, model, **kwargs):
+        self.calls.append(kwargs)
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.maxTimeLimit
+        results.problem.upper_bound = float('inf')
+        results.problem.lower_bound = 8.0
+        results.problem.number_of_solutions = 0
+        return results
+
+
+def model(telemetry):
+    instance = pyo.ConcreteModel()
+    instance.x = pyo.Var(initialize=3.0)
+    instance.Objective = pyo.Objective(expr=instance.x, sense=pyo.minimize)
+    instance._solverTelemetry = telemetry
+    return instance
+
+
+def solve(telemetry):
+    optimizer = SingleOptimizer('cbc', 'local')
+    optimizer.solver = LimitSolver()
+    status = optimizer.run_optimization(model(telemetry), tee=False, printTimer=False)
+    assert status == 'time limit'
+    return optimizer
+
+
+def test_parse_gurobi_log():
+    record = parse_gurobi_log(GUROBI_LOG)
+    assert (record['rows'], record['columns']) == (120, 80)
+    assert (record['presolved rows'], record['presolved columns']) == (60, 40)
+    assert record['root relaxation'] == 120.0
+    assert (record['nodes'], record['iterations'], record['time [s]']) == (9, 70, 1.5)
+    assert (record['objective'], record['bound'], record['gap [%]']) == (90.0, 90.0, 0.0)
+    assert record['first incumbent'] == 50.0 and record['incumbents'] == 2
+    assert record['trajectory'][-1] == (1.5, 90.0, 90.0)
+
+
+def test_telemetry_is_off_by_default():
+    optimizer = solve(False)
+    assert 'logfile' not in optimizer.solver.calls[0]
+    assert optimizer.telemetry is None
+
+
+def test_telemetry_takes_the_objective_and_bound_from_the_results():
+    optimizer = solve(True)
+    assert 'logfile' in optimizer.solver.calls[0]
+    # the value 3 of the objective in the instance is stale, the solver reports no incumbent
+    assert optimizer.telemetry['objective'] is None
+    assert optimizer.telemetry['bound'] == 8.0
+    assert optimizer.telemetry['status'] == 'maxTimeLimit'
+
+
+def test_capture_without_log_uses_the_objective_and_bound():
+    capture = TelemetryCapture(None, 'gurobi')
+    capture.path = None
+    results = SolverResults()
+    results.solver.termination_condition = TerminationCondition.optimal
+    record = capture.record(results, objective=-4.0, bound=-5.0)
+    assert (record['objective'], record['bound']) == (-4.0, -5.0)
+    assert record['gap [%]'] == pytest.approx(25.0)
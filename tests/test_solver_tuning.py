@@ -0,0 +1,85 @@
+import types
+
+import pytest
+
+from outdoor.outdoor_core.main.superstructure_problem import SuperstructureProblem
+from outdoor.outdoor_core.optimizers.customs import solver_tuning
+from outdoor.outdoor_core.optimizers.customs.solver_tuning import (SolverTuner, has_tuned_options, load_tuned_options,
+                                                                   sample_data_files, save_tuned_options,
+                                                                   shifted_geometric_mean)
+
+
+def tuning_result(options):
+    return {'options': options, 'score': 1.0, 'baseline score': 2.0, 'improvement [%]': 50.0, 'points': ['nominal'],
+            'table': [None, None]}
+
+
+def test_shifted_geometric_mean():
+    assert shifted_geometric_mean([2.0, 2.0]) == pytest.approx(2.0)
+    # the shift keeps small times from dominating the mean
+    assert shifted_geometric_mean([0.0, 8.0], shift=1.0) == pytest.approx(2.0)
+
+
+def test_candidates_start_with_the_baseline():
+    tuner = SolverTuner('gurobi', space={'MIPFocus': [0, 1], 'Cuts': [0, 1]}, method='grid', trials=3)
+    assert tuner.candidates() == [{}, {'MIPFocus': 0, 'Cuts': 0}, {'MIPFocus': 0, 'Cuts': 1},
+                                  {'MIPFocus': 1, 'Cuts': 0}]
+
+    random = SolverTuner('gurobi', space={'MIPFocus': [0, 1, 2, 3]}, trials=2, seed=1).candidates()
+    assert random[0] == {} and len(random) == 3
+
+
+def test_unknown_solver_and_method_raise():
+    with pytest.raises(ValueError):
+        SolverTuner('baron')
+    with pytest.raises(ValueError):
+        SolverTuner('gurobi', method='bayes')
+
+
+def test_score_counts_limits_twice_and_rejects_other_objectives():
+    tuner = SolverTuner('gurobi', timeLimit=10)
+    baseline = {'a': {'status': 'optimal', 'time [s]': 4.0, 'objective': 100.0},
+                'b': {'status': 'optimal', 'time [s]': 4.0, 'objective': 50.0}}
+    limited = {'a': {'status': 'optimal', 'time [s]': 1.0, 'objective': 100.0},
+               'b': {'status': 'time limit', 'time [s]': 10.0, 'objective': None}}
+    score, rejected = tuner._score(limited, baseline)
+    assert not rejected
+    assert score == pytest.approx(shifted_geometric_mean([1.0, 20.0]))
+
+    wrong = {'a': {'status': 'optimal', 'time [s]': 1.0, 'objective': 90.0},
+             'b': {'status': 'optimal', 'time [s]': 1.0, 'objective': 50.0}}
+    assert tuner._score(wrong, baseline) == (float('inf'), True)
+
+
+def test_sample_data_files_of_points():
+    nominal = {None: {'ProductPrice': {'p': 10.0, 'q': 20.0}, 'H': {None: 8000}}}
+    superstructure = types.SimpleNamespace(create_DataFile=lambda: nominal)
+    dataFiles = sample_data_files(superstructure, points=[{'ProductPrice': {'p': 30.0}}, {'H': 6000}])
+    assert dataFiles['point 1'][None]['ProductPrice'] == {'p': 30.0, 'q': 20.0}
+    assert dataFiles['point 2'][None]['H'] == {None: 6000}
+    # the nominal Data_File is not changed
+    assert nominal[None]['ProductPrice']['p'] == 10.0
+
+
+def test_save_and_load_tuned_options(tmp_path, monkeypatch):
+    monkeypatch.setattr(solver_tuning, 'tuning_key', lambda superstructure, solver_name: 'key')
+    directory = str(tmp_path)
+    assert not has_tuned_options('gurobi', directory)
+
+    save_tuned_options('key', 'gurobi', tuning_result({'MIPFocus': 1}), directory)
+    assert has_tuned_options('gurobi', directory)
+    assert not has_tuned_options('cbc', directory)
+    assert load_tuned_options(None, 'gurobi', directory) == {'MIPFocus': 1}
+    assert load_tuned_options(None, 'cbc', directory) is None
+
+
+def test_tuned_options_are_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(solver_tuning, 'tuning_key', lambda superstructure, solver_name: 'key')
+    save_tuned_options('key', 'gurobi', tuning_result({'MIPFocus': 1, 'Cuts': 2}), str(tmp_path))
+    problem = SuperstructureProblem()
+
+    superstructure = types.SimpleNamespace(solverTuningDirectory=str(tmp_path))
+    assert problem.apply_tuned_options(superstructure, 'gurobi', {'Cuts': 0}) == {'Cuts': 0}
+
+    superstructure.solverTuning = True
+    assert problem.apply_tuned_options(superstructure, 'gurobi', {'Cuts': 0}) == {'MIPFocus': 1, 'Cuts': 0}